@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the lookup of the agent IDs: SCAN of the `agents:*` keyspace vs. registry of the agents.
+
+The keyspace is seeded with a few agents, owning the given amount of conversation keys in total, into a dedicated
+(and empty) Redis database, which is flushed at the end of the run.
+
+Usage:
+    python benchmarks/agents_registry.py [--agents 50] [--conversations 100000] [--runs 10] [--db 15]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def _seed(redis_client, agents: int, conversations: int) -> None:
+    from cat.db.database import DEFAULT_AGENTS_KEY, DEFAULT_AGENTS_REGISTRY_KEY, DEFAULT_CONVERSATIONS_KEY
+
+    pipeline = redis_client.pipeline(transaction=False)
+    for i in range(agents):
+        pipeline.json().set(f"{DEFAULT_AGENTS_KEY}:agent_{i}:agent", "$", [])
+        pipeline.zadd(DEFAULT_AGENTS_REGISTRY_KEY, {f"agent_{i}": time.time()})
+
+    for i in range(conversations):
+        key = f"{DEFAULT_AGENTS_KEY}:agent_{i % agents}:{DEFAULT_CONVERSATIONS_KEY}:user_{i % 97}:chat_{i}"
+        pipeline.json().set(key, "$", [])
+        if i % 10_000 == 0:
+            pipeline.execute()
+
+    pipeline.execute()
+
+
+async def _time(func, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from cat.db.cruds import settings as crud_settings
+    from cat.db.database import DEFAULT_AGENTS_KEY, get_async_db, get_sync_db
+
+    redis_client = get_sync_db()
+    if redis_client.dbsize():
+        print(f"Error: the Redis database {args.db} is not empty")
+        sys.exit(1)
+
+    try:
+        print(f"Seeding {args.agents} agents and {args.conversations} conversation keys...")
+        _seed(redis_client, args.agents, args.conversations)
+
+        scan = await _time(lambda: crud_settings.get_agents_main_keys(f"{DEFAULT_AGENTS_KEY}:*"), args.runs)
+        registry = await _time(crud_settings.get_agents_main_keys, args.runs)
+
+        assert await crud_settings.get_agents_main_keys(f"{DEFAULT_AGENTS_KEY}:*") == \
+               await crud_settings.get_agents_main_keys()
+
+        for name, timings in (("SCAN", scan), ("registry", registry)):
+            print(
+                f"{name:>10}: median {statistics.median(timings) * 1000:9.2f} ms, "
+                f"max {max(timings) * 1000:9.2f} ms over {args.runs} runs"
+            )
+        print(f"   speedup: {statistics.median(scan) / statistics.median(registry):.1f}x")
+    finally:
+        redis_client.flushdb()
+        await get_async_db().aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent IDs lookup benchmark")
+    parser.add_argument("--agents", type=int, default=50, help="Number of agents (default: 50)")
+    parser.add_argument(
+        "--conversations", type=int, default=100_000, help="Number of conversation keys (default: 100000)",
+    )
+    parser.add_argument("--runs", type=int, default=10, help="Number of timed runs per path (default: 10)")
+    parser.add_argument("--db", type=int, default=15, help="Empty Redis database to use (default: 15)")
+
+    args = parser.parse_args()
+    # point the clients of the Cat to the benchmark database
+    os.environ["CAT_REDIS_DB"] = str(args.db)
+
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the conversation history of a chat turn, for conversations of growing length: appending a message and
+re-reading the whole history vs. reading back the latest messages only, and reading the attributes of a conversation
+out of the whole conversation vs. out of its metadata record.
+
+Each conversation is seeded into a dedicated (and empty) Redis database, which is flushed at the end of the run.
+
+Usage:
+    python benchmarks/conversation_history.py [--messages 10 100 1000 10000] [--window 50] [--runs 50] [--db 15]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def _message(i: int):
+    from cat.services.memory.messages import CatMessage, ConversationMessage, UserMessage
+
+    content = UserMessage(text=f"message {i} " * 20) if i % 2 == 0 else CatMessage(text=f"answer {i} " * 40)
+    return ConversationMessage(who="user" if i % 2 == 0 else "assistant", content=content, when=time.time())
+
+
+async def _time(func, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _print(messages: int, name: str, timings: list[float]) -> None:
+    print(
+        f"{messages:>6} messages, {name:>18}: median {statistics.median(timings) * 1000:8.3f} ms, "
+        f"p99 {statistics.quantiles(timings, n=100)[-1] * 1000:8.3f} ms, max {max(timings) * 1000:8.3f} ms"
+    )
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from cat.db import crud
+    from cat.db.cruds import conversations as crud_conversations
+    from cat.db.database import get_async_db, get_sync_db
+
+    redis_client = get_sync_db()
+    if redis_client.dbsize():
+        print(f"Error: the Redis database {args.db} is not empty")
+        sys.exit(1)
+
+    db = get_async_db()
+    try:
+        print(f"Conversation history with a window of {args.window} messages, {args.runs} runs per case...")
+        for messages in args.messages:
+            agent_id, user_id, chat_id = "agent", "user", f"chat_{messages}"
+            key = crud_conversations.format_key(agent_id, user_id, chat_id)
+            await crud_conversations.set_messages(agent_id, user_id, chat_id, [_message(i) for i in range(messages)])
+
+            async def full_turn():
+                # the former turn: append, then re-read the whole history
+                message = crud.serialize_to_redis_json(_message(messages).model_dump())
+                await db.json().arrappend(key, "$.messages", message)  # type: ignore[arg-type]
+                await crud_conversations.get_messages(agent_id, user_id, chat_id)
+
+            async def windowed_turn():
+                await crud_conversations.update_messages(agent_id, user_id, chat_id, _message(messages), args.window)
+
+            async def full_attributes():
+                # the former read: the whole conversation
+                await db.json().mget([key], "$")
+
+            async def record_attributes():
+                await crud_conversations.get_conversation_attributes(agent_id, user_id, chat_id)
+
+            results = {
+                "full turn": await _time(full_turn, args.runs),
+                "windowed turn": await _time(windowed_turn, args.runs),
+                "full attributes": await _time(full_attributes, args.runs),
+                "record attributes": await _time(record_attributes, args.runs),
+            }
+            for name, timings in results.items():
+                _print(messages, name, timings)
+            print(
+                f"{messages:>6} messages, {'speedup':>18}: "
+                f"turn {statistics.median(results['full turn']) / statistics.median(results['windowed turn']):.1f}x, "
+                f"attributes {statistics.median(results['full attributes']) / statistics.median(results['record attributes']):.1f}x"
+            )
+    finally:
+        redis_client.flushdb()
+        await db.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversation history benchmark")
+    parser.add_argument(
+        "--messages", type=int, nargs="+", default=[10, 100, 1000, 10_000],
+        help="Lengths of the conversations (default: 10 100 1000 10000)",
+    )
+    parser.add_argument("--window", type=int, default=50, help="Number of messages read back (default: 50)")
+    parser.add_argument("--runs", type=int, default=50, help="Number of timed runs per case (default: 50)")
+    parser.add_argument("--db", type=int, default=15, help="Empty Redis database to use (default: 15)")
+
+    args = parser.parse_args()
+    # point the clients of the Cat to the benchmark database
+    os.environ["CAT_REDIS_DB"] = str(args.db)
+
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
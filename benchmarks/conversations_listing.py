@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the listing of the conversations of a user: SCAN of the conversations of the agent vs. index of the
+conversations of the user.
+
+The agent is seeded with the given amount of conversations, spread across the users, into a dedicated (and empty)
+Redis database, which is flushed at the end of the run.
+
+Usage:
+    python benchmarks/conversations_listing.py [--users 1000] [--conversations 100000] [--runs 10] [--db 15]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+AGENT_ID = "agent"
+
+
+def _seed(redis_client, users: int, conversations: int) -> None:
+    from cat.db.cruds import conversations as crud_conversations
+
+    now = time.time()
+    pipeline = redis_client.pipeline(transaction=False)
+    for i in range(conversations):
+        user_id, chat_id = f"user_{i % users}", f"chat_{i}"
+        pipeline.json().set(crud_conversations.format_key(AGENT_ID, user_id, chat_id), "$", {
+            "name": chat_id, "messages": [], "num_messages": 0, "created_at": now + i, "updated_at": now + i,
+        })
+        pipeline.zadd(crud_conversations.format_index_key(AGENT_ID, user_id), {chat_id: now + i})
+        pipeline.hset(crud_conversations.format_owners_key(AGENT_ID), chat_id, user_id)
+        if i % 10_000 == 0:
+            pipeline.execute()
+
+    pipeline.execute()
+
+
+async def _time(func, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from cat.db.cruds import conversations as crud_conversations
+    from cat.db.database import get_async_db, get_sync_db
+
+    redis_client = get_sync_db()
+    if redis_client.dbsize():
+        print(f"Error: the Redis database {args.db} is not empty")
+        sys.exit(1)
+
+    db = get_async_db()
+    try:
+        print(f"Seeding {args.conversations} conversations of {args.users} users...")
+        _seed(redis_client, args.users, args.conversations)
+
+        async def scan():
+            # the former listing: SCAN of the conversations of the agent, filtered by the user
+            keys = [k async for k in db.scan_iter(match=crud_conversations.format_key(AGENT_ID, "user_0", "*"))]
+            await db.json().mget(keys, "$")
+
+        async def index():
+            await crud_conversations.get_conversations_attributes(AGENT_ID, "user_0")
+
+        async def scan_owner():
+            # the former lookup of the owner of a chat
+            {k.split(":")[3] async for k in db.scan_iter(crud_conversations.format_key(AGENT_ID, "*", "chat_0"))}
+
+        async def index_owner():
+            await crud_conversations.get_user_id_from_conversation_keys(AGENT_ID, "chat_0")
+
+        results = {
+            "SCAN listing": await _time(scan, args.runs),
+            "index listing": await _time(index, args.runs),
+            "SCAN owner": await _time(scan_owner, args.runs),
+            "index owner": await _time(index_owner, args.runs),
+        }
+        for name, timings in results.items():
+            print(
+                f"{name:>14}: median {statistics.median(timings) * 1000:9.2f} ms, "
+                f"max {max(timings) * 1000:9.2f} ms over {args.runs} runs"
+            )
+        print(
+            f"{'speedup':>14}: listing "
+            f"{statistics.median(results['SCAN listing']) / statistics.median(results['index listing']):.1f}x, "
+            f"owner {statistics.median(results['SCAN owner']) / statistics.median(results['index owner']):.1f}x"
+        )
+    finally:
+        redis_client.flushdb()
+        await db.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversations listing benchmark")
+    parser.add_argument("--users", type=int, default=1000, help="Number of users (default: 1000)")
+    parser.add_argument(
+        "--conversations", type=int, default=100_000, help="Number of conversations (default: 100000)",
+    )
+    parser.add_argument("--runs", type=int, default=10, help="Number of timed runs per path (default: 10)")
+    parser.add_argument("--db", type=int, default=15, help="Empty Redis database to use (default: 15)")
+
+    args = parser.parse_args()
+    # point the clients of the Cat to the benchmark database
+    os.environ["CAT_REDIS_DB"] = str(args.db)
+
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
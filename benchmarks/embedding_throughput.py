@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the throughput of the dumb embedder, in its vocabulary and hashing modes, embedding batches of chunks
+(as the ingestion does) and single queries (as the recall does).
+
+The chunks resemble those of the default chunker: about 256 tokens of prose, with a few line breaks.
+
+Usage:
+    python benchmarks/embedding_throughput.py [--chunks 10000] [--chunk-chars 1000] [--batch 1000] [--queries 1000]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+_WORDS = (
+    "the cat grins and vanishes slowly beginning with the end of the tail and ending with the grin which remained "
+    "some time after the rest of it had gone Alice wondered whether she should ever see such a thing again"
+).split()
+
+
+def _chunks(chunks: int, chunk_chars: int) -> list[str]:
+    rnd = random.Random(42)
+    texts = []
+    for _ in range(chunks):
+        text = ""
+        while len(text) < chunk_chars:
+            text += " ".join(rnd.choices(_WORDS, k=12)).capitalize() + (".\n" if rnd.random() < 0.2 else ". ")
+        texts.append(text[:chunk_chars])
+    return texts
+
+
+def _run(args: argparse.Namespace) -> None:
+    from cat.services.factory.embedder import DumbEmbedder
+
+    texts = _chunks(args.chunks, args.chunk_chars)
+    print(f"Embedding {args.chunks} chunks of {args.chunk_chars} characters, in batches of {args.batch}...")
+    for mode in ("vocabulary", "hashing"):
+        embedder = DumbEmbedder(mode=mode)
+        embedder.embed_query("warm up")
+
+        start = time.perf_counter()
+        for i in range(0, len(texts), args.batch):
+            embedder.embed_documents(texts[i:i + args.batch])
+        elapsed = time.perf_counter() - start
+
+        timings = []
+        for text in texts[:args.queries]:
+            query_start = time.perf_counter()
+            embedder.embed_query(text[:200])
+            timings.append(time.perf_counter() - query_start)
+        timings.sort()
+
+        print(
+            f"{mode:>10} ({embedder.size} dims): {len(texts) / elapsed:9.0f} chunks/s, "
+            f"query median {statistics.median(timings) * 1000:.3f} ms, "
+            f"p99 {timings[int(len(timings) * .99) - 1] * 1000:.3f} ms, max {timings[-1] * 1000:.3f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dumb embedder throughput benchmark")
+    parser.add_argument("--chunks", type=int, default=10000, help="Number of chunks to embed (default: 10000)")
+    parser.add_argument("--chunk-chars", type=int, default=1000, help="Characters per chunk (default: 1000)")
+    parser.add_argument("--batch", type=int, default=1000, help="Chunks per embedding batch (default: 1000)")
+    parser.add_argument("--queries", type=int, default=1000, help="Number of timed queries (default: 1000)")
+
+    _run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Deterministic in-process fakes of the services the Cat depends on, so that the benchmarks run offline and their timings
+depend on the code of the Cat only:
+
+- Redis, with the RedisJSON commands and the Lua scripting, on a `fakeredis` server shared by all the clients of the
+  process (the clients of the Cat, the dedicated Pub/Sub connections and the job store of the White Rabbit);
+- the vector database, on the in-memory Qdrant client;
+- the LLM, answering with a fixed text streamed token by token to the callbacks, as a streaming provider does;
+- the `cl100k_base` encoding of tiktoken, when it is not cached yet and cannot be downloaded, with a byte-level one.
+
+The embedder is the `DumbEmbedder` of the Cat, i.e. the default one. `fakeredis` is not a dependency of the Cat:
+install it with `pip install "fakeredis[json,lua]"`.
+"""
+import asyncio
+import sys
+import time
+from typing import Any, List
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+
+from cat.services.factory.llm import LargeLanguageModel
+
+FAKE_LLM_ANSWER = (
+    "Would you tell me, please, which way I ought to go from here? That depends a good deal on where you want to get "
+    "to, said the Cat. I don't much care where, said Alice. Then it doesn't matter which way you go, said the Cat."
+)
+
+
+def _fakeredis():
+    try:
+        import fakeredis
+    except ImportError:
+        print('Error: the offline benchmarks need fakeredis, install it with `pip install "fakeredis[json,lua]"`')
+        sys.exit(1)
+    return fakeredis
+
+
+def install_fake_redis():
+    """
+    Point all the Redis clients of the Cat to a new in-process server.
+
+    Returns:
+        The fake server.
+    """
+    import redis
+    import redis.asyncio as aioredis
+    from apscheduler.jobstores import redis as apscheduler_redis
+
+    from cat.db.database import Database
+
+    fakeredis = _fakeredis()
+    from fakeredis.stack._json_mixin import JSONCommandsMixin
+
+    server = fakeredis.FakeServer()
+
+    # RedisJSON reads the root of the document when no path is given (as the Lua scripts of the Cat do), fakeredis
+    # reads nothing
+    json_get = JSONCommandsMixin.json_get
+
+    def json_get_root(self, key, *args):
+        return json_get(self, key, *(args or (b".",)))
+
+    JSONCommandsMixin.json_get = json_get_root
+
+    class FakeAsyncRedis(fakeredis.FakeAsyncRedis):
+        async def xreadgroup(self, *args, block: int | None = None, **kwargs):
+            # fakeredis answers at once, while the consumers of the Cat rely on the read waiting for the messages
+            deadline = time.monotonic() + (block or 0) / 1000
+            while not (messages := await super().xreadgroup(*args, **kwargs)) and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            return messages
+
+    def async_client(**kwargs) -> aioredis.Redis:
+        return FakeAsyncRedis(server=server, decode_responses=kwargs.get("decode_responses", True))
+
+    def sync_client(**kwargs) -> redis.Redis:
+        return fakeredis.FakeRedis(server=server, decode_responses=kwargs.get("decode_responses", True))
+
+    database = Database()
+    database._async_db = async_client()
+    database._sync_db = sync_client()
+
+    # the dedicated connections, opened from the connection string of the Cat
+    aioredis.Redis.from_url = classmethod(lambda cls, url, **kwargs: async_client(**kwargs))
+    redis.Redis.from_url = classmethod(lambda cls, url, **kwargs: sync_client(**kwargs))
+    apscheduler_redis.Redis = lambda **kwargs: sync_client(decode_responses=False)
+
+    return server
+
+
+def install_fake_vector_db():
+    """
+    Replace the Qdrant server with the in-memory Qdrant client.
+
+    Returns:
+        The in-memory client.
+    """
+    from qdrant_client import AsyncQdrantClient
+
+    from cat.services.factory.vector_db import QdrantHandler
+
+    client = AsyncQdrantClient(":memory:")
+
+    def init(self, *args, **kwargs):
+        super(QdrantHandler, self).__init__()
+        self._client = client
+        self.save_memory_snapshots = False
+
+    QdrantHandler.__init__ = init
+    QdrantHandler.close = lambda self: None
+
+    return client
+
+
+class FakeStreamingLLM(LargeLanguageModel):
+    """LLM answering with a fixed text, streamed word by word to the callbacks."""
+    answer: str = FAKE_LLM_ANSWER
+
+    @property
+    def _llm_type(self):
+        return "fake-streaming"
+
+    def _tokens(self) -> List[str]:
+        words = self.answer.split(" ")
+        return [words[0]] + [f" {word}" for word in words[1:]]
+
+    def _call(
+        self,
+        prompt: str,
+        stop: List[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> str:
+        for token in self._tokens():
+            if run_manager:
+                run_manager.on_llm_new_token(token)
+        return self.answer
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: List[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> str:
+        for token in self._tokens():
+            if run_manager:
+                await run_manager.on_llm_new_token(token)
+        return self.answer
+
+
+def install_fake_llm() -> FakeStreamingLLM:
+    """
+    Make every agent answer through the fake streaming LLM.
+
+    Returns:
+        The fake LLM.
+    """
+    from cat.services.service_provider import ServiceProvider
+
+    llm = FakeStreamingLLM()
+
+    async def get_large_language_model(self, agent_key, plugin_manager):
+        return llm
+
+    # the service provider is a singleton: patch the class it wraps
+    ServiceProvider.__wrapped__.get_large_language_model = get_large_language_model
+
+    return llm
+
+
+def install_fake_tokenizer() -> str:
+    """
+    Make the `cl100k_base` encoding available offline: the real one when it can be loaded, else a byte-level encoding
+    (one token per byte), so that the chunks are smaller but the ingestion does not fail.
+
+    Returns:
+        The name of the tokenizer in use, to be reported along with the timings.
+    """
+    import tiktoken
+    from tiktoken import registry
+
+    try:
+        tiktoken.get_encoding("cl100k_base")
+        return "cl100k_base"
+    except Exception:
+        pass
+
+    encoding = tiktoken.Encoding(
+        "cl100k_base",
+        pat_str=r"""\S+|\s+""",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={"<|endoftext|>": 256},
+    )
+    registry.ENCODINGS["cl100k_base"] = encoding
+    return "bytes"
+
+
+def install_fakes(storage_path: str) -> str:
+    """
+    Install all the fakes, before the Cat is started.
+
+    Args:
+        storage_path: The folder where the files of the agents are stored.
+
+    Returns:
+        The name of the tokenizer in use.
+    """
+    from cat import utils
+    from cat.looking_glass.mad_hatter.plugin import Plugin
+
+    install_fake_redis()
+    install_fake_vector_db()
+    install_fake_llm()
+    tokenizer = install_fake_tokenizer()
+
+    utils.get_file_manager_root_storage_path = lambda: storage_path
+
+    # do not install the requirements of the plugins, which would need the network
+    async def install_requirements(self):
+        pass
+
+    Plugin._install_requirements = install_requirements
+
+    return tokenizer
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the cost of a chain of hooks, when the hooks get deep copies or copy-on-write views of their arguments.
+
+The chain is made of the hook of the core plugin plus one hook per active plugin: most of them only read the
+arguments (as most hooks do), one in ten modifies and returns the first argument. The arguments resemble those of a
+chat turn: the recalled documents, with their metadata, and a working memory.
+
+Usage:
+    python benchmarks/hook_chain.py [--plugins 0 10 50] [--documents 20] [--runs 200]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def _documents(documents: int):
+    from langchain_core.documents import Document
+
+    return [
+        Document(
+            page_content="Lorem ipsum dolor sit amet " * 40,
+            metadata={"source": f"doc_{i}.pdf", "when": time.time(), "page": i, "tags": ["meow", "purr"]},
+        )
+        for i in range(documents)
+    ]
+
+
+def _working_memory(documents: int) -> dict:
+    return {
+        "history": [{"who": "user", "text": f"message {i}", "why": {"input": "meow"}} for i in range(50)],
+        "recall": _documents(documents),
+    }
+
+
+def _hooks(plugins: int, copy_on_write: bool):
+    from cat.looking_glass.mad_hatter.decorators.hook import CatHook
+
+    def core_hook(docs, working_memory, cat):
+        return docs
+
+    def reading_hook(docs, working_memory, cat):
+        if any("purr" in d.metadata["tags"] for d in docs) and len(working_memory["history"]) > 100:
+            return docs[:1]
+
+    def writing_hook(docs, working_memory, cat):
+        for d in docs:
+            d.metadata["score"] = 1.0
+        return docs
+
+    hooks = [CatHook("before_cat_recalls", core_hook, 0, "core_plugin", copy_on_write)]
+    hooks += [
+        CatHook("before_cat_recalls", writing_hook if i % 10 == 9 else reading_hook, 1, f"plugin_{i}", copy_on_write)
+        for i in range(plugins)
+    ]
+    return hooks
+
+
+async def _time(plugin_manager, args: tuple, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await plugin_manager.execute_hook("before_cat_recalls", *args, caller=None)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from cat.looking_glass.mad_hatter.mad_hatter import MadHatter
+
+    plugin_manager = MadHatter("benchmark")
+    hook_args = (_documents(args.documents), _working_memory(args.documents))
+
+    print(f"Hook chain over {args.documents} documents, {args.runs} runs per case...")
+    for plugins in args.plugins:
+        results = {}
+        for name, copy_on_write in (("deepcopy", False), ("copy-on-write", True)):
+            plugin_manager.hooks = {"before_cat_recalls": _hooks(plugins, copy_on_write)}
+            results[name] = await _time(plugin_manager, hook_args, args.runs)
+
+        for name, timings in results.items():
+            print(
+                f"{plugins:>3} plugins, {name:>13}: median {statistics.median(timings) * 1000:8.3f} ms, "
+                f"max {max(timings) * 1000:8.3f} ms"
+            )
+        print(f"{plugins:>3} plugins, {'speedup':>13}: "
+              f"{statistics.median(results['deepcopy']) / statistics.median(results['copy-on-write']):.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hook chain benchmark")
+    parser.add_argument(
+        "--plugins", type=int, nargs="+", default=[0, 10, 50], help="Numbers of active plugins (default: 0 10 50)",
+    )
+    parser.add_argument("--documents", type=int, default=20, help="Number of recalled documents (default: 20)")
+    parser.add_argument("--runs", type=int, default=200, help="Number of timed runs per case (default: 200)")
+
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the latency of the requests served while files are being parsed: the PDFs are parsed on the event loop,
+in a thread, or in the worker processes of the parser pool.
+
+A probe coroutine, standing in for a chat request, sleeps for a tick and measures how late it is woken up while the
+files are parsed concurrently: the lateness is the time a request would have waited for the event loop.
+
+Usage:
+    python benchmarks/parsing_latency.py [--files 20] [--workers 2] [--tick 10]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+SAMPLE_PDF = Path(__file__).parent.parent / "tests" / "mocks" / "sample.pdf"
+
+
+async def _probe(tick: float, stop: asyncio.Event) -> list[float]:
+    delays = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(tick)
+        delays.append(time.perf_counter() - start - tick)
+    return delays
+
+
+async def _measure(parse, files: int, tick: float) -> tuple[list[float], float]:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(tick, stop))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[parse(i) for i in range(files)])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    return await probe, elapsed
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from langchain_community.document_loaders.parsers.pdf import PyMuPDFParser
+    from langchain_community.document_loaders.parsers.txt import TextParser
+
+    from cat.services.parser_pool import ParserPool, _parse
+
+    data = SAMPLE_PDF.read_bytes()
+    handlers = {"application/pdf": PyMuPDFParser(), "text/plain": TextParser()}
+    tick = args.tick / 1000
+
+    async def inline(i: int):
+        await asyncio.sleep(0)
+        _parse(handlers, data, "application/pdf", f"sample_{i}.pdf")
+
+    async def thread(i: int):
+        await asyncio.to_thread(_parse, handlers, data, "application/pdf", f"sample_{i}.pdf")
+
+    os.environ["CAT_PARSER_WORKERS"] = str(args.workers)
+    os.environ["CAT_PARSER_CONCURRENCY_PER_MIME"] = str(args.workers)
+    pool = ParserPool()
+    await pool.start()
+
+    async def process_pool(i: int):
+        await pool.parse(handlers, data, "application/pdf", f"sample_{i}.pdf")
+
+    print(f"Parsing {args.files} copies of {SAMPLE_PDF.name}, probing the event loop every {args.tick} ms...")
+    try:
+        for name, parse in (("event loop", inline), ("thread", thread), ("processes", process_pool)):
+            delays, elapsed = await _measure(parse, args.files, tick)
+            delays.sort()
+            p99 = delays[min(int(len(delays) * 0.99), len(delays) - 1)]
+            print(
+                f"{name:>10}: request delay median {statistics.median(delays) * 1000:8.2f} ms, "
+                f"p99 {p99 * 1000:8.2f} ms, max {delays[-1] * 1000:8.2f} ms; parsed in {elapsed:.2f} s"
+            )
+    finally:
+        await pool.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request latency during file parsing benchmark")
+    parser.add_argument("--files", type=int, default=20, help="Number of PDFs to parse (default: 20)")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes of the parser pool (default: 2)")
+    parser.add_argument("--tick", type=float, default=10, help="Interval of the latency probe, in ms (default: 10)")
+
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
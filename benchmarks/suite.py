@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite of the hot paths of the Cat: a chat turn, the ingestion of a file, the authorization of a
+request, the dispatch of a hook and the operations on the conversation history.
+
+The Cat is started in process on the fakes of `benchmarks/fakes.py` (Redis with RedisJSON, the vector database and a
+streaming LLM, plus the dumb embedder), so that no service is needed and the timings are reproducible. Each case is
+warmed up, then timed over the given number of runs; the statistics of the timings are written as JSON and, given a
+baseline (i.e. the results of a former run), the suite fails when the median of a case is slower than the median of
+the baseline by more than the threshold of the case.
+
+Usage:
+    python benchmarks/suite.py [--cases chat_turn ingestion ...] [--runs 30] [--warmup 3] [--output results.json]
+                               [--baseline baseline.json] [--threshold 0.2] [--case-threshold ingestion=0.5 ...]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+from typing import Awaitable, Callable, Dict
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+AGENT_ID = "agent_benchmark"
+USER_ID = "user_benchmark"
+API_KEY = "meow_benchmark"
+JWT_SECRET = "meow_benchmark_jwt"
+
+# the paragraphs of the ingested files, each file made unique by its number so that it is never skipped as ingested
+PARAGRAPH = (
+    "Alice was beginning to get very tired of sitting by her sister on the bank, and of having nothing to do: once or "
+    "twice she had peeped into the book her sister was reading, but it had no pictures or conversations in it. "
+)
+
+
+class Context:
+    """The Cat started on the fakes, shared by the cases."""
+    def __init__(self, app, client, lizard, cheshire_cat, stray_cat, jwt: str, tokenizer: str):
+        self.app = app
+        self.client = client
+        self.lizard = lizard
+        self.cheshire_cat = cheshire_cat
+        self.stray_cat = stray_cat
+        self.jwt = jwt
+        self.tokenizer = tokenizer
+
+
+# a case prepares what it needs, then returns the operation to time, called with the number of the run
+Case = Callable[[Context], Awaitable[Callable[[int], Awaitable]]]
+
+
+def _message(i: int):
+    from cat.services.memory.messages import CatMessage, ConversationMessage, UserMessage
+
+    content = UserMessage(text=f"message {i} " * 20) if i % 2 == 0 else CatMessage(text=f"answer {i} " * 40)
+    return ConversationMessage(who="user" if i % 2 == 0 else "assistant", content=content, when=1705855981. + i)
+
+
+def _request(headers: Dict[str, str]):
+    from starlette.requests import Request
+
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/message",
+        "query_string": b"",
+        "path_params": {},
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+async def chat_turn(context: Context):
+    """A chat turn over HTTP, recalling the ingested memories and updating the conversation history."""
+    await _ingest(context, 0)
+    headers = {"Authorization": f"Bearer {API_KEY}", "X-Agent-ID": AGENT_ID, "X-User-ID": USER_ID, "X-Chat-ID": "chat"}
+
+    async def run(i: int):
+        response = await context.client.post("/message", json={"text": f"Who is the Cheshire Cat? ({i})"}, headers=headers)
+        response.raise_for_status()
+        if response.json()["message"].get("error"):
+            raise RuntimeError(response.json()["message"]["error"])
+
+    return run
+
+
+async def _ingest(context: Context, i: int):
+    from cat.db.cruds import ingestions as crud_ingestions
+
+    content = (f"Chapter {i}.\n\n" + "\n\n".join(f"{i}.{p} " + PARAGRAPH * 5 for p in range(40))).encode()
+    rabbit_hole = context.cheshire_cat.rabbit_hole
+    await rabbit_hole.ingest_file(
+        context.cheshire_cat, BytesIO(content), {}, f"chapter_{i}.txt", store_file=False, content_type="text/plain"
+    )
+
+    # the errors of the ingestion are logged only, while a failed ingestion must not be timed
+    file_hash = hashlib.sha256(content).hexdigest()
+    if not await crud_ingestions.get_source(AGENT_ID, rabbit_hole._collection_name, file_hash):
+        raise RuntimeError(f"chapter_{i}.txt not ingested")
+
+
+async def ingestion(context: Context):
+    """The ingestion of a text file of about 40 KB: parsing, chunking, embedding and storing its chunks."""
+    async def run(i: int):
+        await _ingest(context, i + 1)
+
+    return run
+
+
+async def auth_api_key(context: Context):
+    """The authorization of a request with the API key."""
+    from cat.auth.permissions import AuthPermission, AuthResource
+
+    auth_handler = context.cheshire_cat.custom_auth_handler
+    request = _request({"Authorization": f"Bearer {API_KEY}", "X-User-ID": USER_ID})
+
+    async def run(i: int):
+        if not await auth_handler.authorize(request, AuthResource.CHAT, AuthPermission.WRITE, AGENT_ID):
+            raise RuntimeError("Not authorized")
+
+    return run
+
+
+async def auth_jwt(context: Context):
+    """The authorization of a request with a JWT, already verified by a former request."""
+    from cat.auth.permissions import AuthPermission, AuthResource
+
+    auth_handler = context.cheshire_cat.custom_auth_handler
+    request = _request({"Authorization": f"Bearer {context.jwt}"})
+
+    async def run(i: int):
+        if not await auth_handler.authorize(request, AuthResource.CHAT, AuthPermission.WRITE, AGENT_ID):
+            raise RuntimeError("Not authorized")
+
+    return run
+
+
+async def hook_dispatch(context: Context):
+    """The dispatch of a hook of the chat turn through the active plugins."""
+    from cat.services.memory.messages import UserMessage
+
+    plugin_manager = context.cheshire_cat.plugin_manager
+    message = UserMessage(text="Who is the Cheshire Cat?")
+
+    async def run(i: int):
+        await plugin_manager.execute_hook("before_cat_reads_message", message, caller=context.stray_cat)
+
+    return run
+
+
+async def history_append(context: Context):
+    """The append of a message to a conversation of 200 messages, reading back the latest 50."""
+    from cat.db.cruds import conversations as crud_conversations
+
+    await crud_conversations.set_messages(AGENT_ID, USER_ID, "history_append", [_message(i) for i in range(200)])
+
+    async def run(i: int):
+        await crud_conversations.update_messages(AGENT_ID, USER_ID, "history_append", _message(200 + i), 50)
+
+    return run
+
+
+async def history_read(context: Context):
+    """The read of a conversation of 200 messages."""
+    from cat.db.cruds import conversations as crud_conversations
+
+    await crud_conversations.set_messages(AGENT_ID, USER_ID, "history_read", [_message(i) for i in range(200)])
+
+    async def run(i: int):
+        await crud_conversations.get_messages(AGENT_ID, USER_ID, "history_read")
+
+    return run
+
+
+CASES: Dict[str, Case] = {
+    "chat_turn": chat_turn,
+    "ingestion": ingestion,
+    "auth_api_key": auth_api_key,
+    "auth_jwt": auth_jwt,
+    "hook_dispatch": hook_dispatch,
+    "history_append": history_append,
+    "history_read": history_read,
+}
+
+
+def _stats(timings: list[float]) -> Dict[str, float]:
+    return {
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "p95": statistics.quantiles(timings, n=20, method="inclusive")[-1] if len(timings) > 1 else timings[0],
+        "min": min(timings),
+        "max": max(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.,
+        "runs": len(timings),
+    }
+
+
+async def _start(storage_path: str):
+    from asgi_lifespan import LifespanManager
+    from httpx import ASGITransport, AsyncClient
+
+    from cat.auth.auth_utils import hash_password
+    from cat.auth.permissions import AuthUserInfo, get_full_permissions
+    from cat.db.cruds import users as crud_users
+    from cat.looking_glass import StrayCat
+    from cat.startup import create_app
+    from fakes import install_fakes
+
+    tokenizer = install_fakes(storage_path)
+
+    app = create_app()
+    manager = LifespanManager(app, startup_timeout=60)
+    await manager.__aenter__()
+    client = AsyncClient(transport=ASGITransport(app=manager.app), base_url="http://benchmark")
+
+    lizard = app.state.lizard
+    cheshire_cat = await lizard.create_cheshire_cat(AGENT_ID)
+
+    user = {"id": USER_ID, "username": USER_ID, "password": hash_password(USER_ID), "permissions": get_full_permissions()}
+    await crud_users.create_user(AGENT_ID, user)
+    response = await client.post(
+        "/auth/token", json={"username": USER_ID, "password": USER_ID}, headers={"X-Agent-ID": AGENT_ID}
+    )
+    response.raise_for_status()
+
+    stray_cat = await StrayCat.from_cat(cat=cheshire_cat, user_data=AuthUserInfo(id=USER_ID, name=USER_ID))
+    return Context(app, client, lizard, cheshire_cat, stray_cat, response.json()["access_token"], tokenizer), manager
+
+
+async def _run(args: argparse.Namespace) -> tuple[Dict, str]:
+    results = {}
+    with tempfile.TemporaryDirectory() as storage_path:
+        context, manager = await _start(storage_path)
+        try:
+            for name in args.cases:
+                run = await CASES[name](context)
+                for i in range(args.warmup):
+                    await run(-i - 1)
+
+                timings = []
+                for i in range(args.runs):
+                    start = time.perf_counter()
+                    await run(i)
+                    timings.append(time.perf_counter() - start)
+
+                results[name] = _stats(timings)
+                print(
+                    f"{name:>15}: median {results[name]['median'] * 1000:9.3f} ms, "
+                    f"p95 {results[name]['p95'] * 1000:9.3f} ms, max {results[name]['max'] * 1000:9.3f} ms"
+                )
+        finally:
+            await context.client.aclose()
+            await manager.__aexit__(None, None, None)
+
+    return results, context.tokenizer
+
+
+def _compare(
+    results: Dict, tokenizer: str, baseline: Dict, threshold: float, case_thresholds: Dict[str, float]
+) -> list[str]:
+    regressions = []
+    print(f"\nComparison with the baseline of {baseline['metadata']['created_at']}:")
+    if baseline["metadata"].get("tokenizer") != tokenizer:
+        print(f"Warning: the baseline was run with the {baseline['metadata'].get('tokenizer')} tokenizer, not {tokenizer}")
+    for name, stats in results.items():
+        if name not in baseline["results"]:
+            print(f"{name:>15}: not in the baseline")
+            continue
+
+        change = stats["median"] / baseline["results"][name]["median"] - 1
+        allowed = case_thresholds.get(name, threshold)
+        regressed = change > allowed
+        print(f"{name:>15}: {change:+8.1%} (allowed {allowed:+.0%}){'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(name)
+
+    return regressions
+
+
+def _case_threshold(value: str) -> tuple[str, float]:
+    name, _, threshold = value.partition("=")
+    if name not in CASES or not threshold:
+        raise argparse.ArgumentTypeError(f"expected <case>=<threshold>, with a case among {', '.join(CASES)}")
+    return name, float(threshold)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument(
+        "--cases", nargs="+", choices=list(CASES), default=list(CASES), help="Cases to run (default: all)",
+    )
+    parser.add_argument("--runs", type=int, default=30, help="Number of timed runs per case (default: 30)")
+    parser.add_argument("--warmup", type=int, default=3, help="Number of untimed runs per case (default: 3)")
+    parser.add_argument("--output", type=Path, help="File where the results are written as JSON")
+    parser.add_argument("--baseline", type=Path, help="Results of a former run to compare with")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2,
+        help="Max slowdown of the median of a case with respect to the baseline (default: 0.2, i.e. 20%%)",
+    )
+    parser.add_argument(
+        "--case-threshold", type=_case_threshold, nargs="+", default=[], metavar="CASE=THRESHOLD",
+        help="Max slowdown of specific cases, overriding --threshold",
+    )
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+
+    # the Cat is configured before it is imported; the files are parsed in a thread, like on a single core
+    os.environ.update({
+        "CAT_REDIS_HOST": "localhost",
+        "CAT_API_KEY": API_KEY,
+        "CAT_JWT_SECRET": JWT_SECRET,
+        "CAT_DEBUG": "false",
+        "CAT_LOG_LEVEL": "ERROR",
+        "CAT_PARSER_WORKERS": "0",
+    })
+
+    # e.g. the warnings of the in-memory Qdrant about the unsupported search parameters
+    warnings.simplefilter("ignore")
+
+    print(f"Offline benchmark suite, {args.runs} runs per case after {args.warmup} warm-up runs...")
+    results, tokenizer = asyncio.run(_run(args))
+
+    output = {
+        "metadata": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": args.runs,
+            "warmup": args.warmup,
+            "tokenizer": tokenizer,
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(output, indent=2))
+        print(f"\nResults written to {args.output}")
+
+    if baseline:
+        regressions = _compare(results, tokenizer, baseline, args.threshold, dict(args.case_threshold))
+        if regressions:
+            print(f"\nError: regressions in {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
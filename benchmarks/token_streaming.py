@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Load test of the streaming of the LLM tokens to the WebSocket connections, through the Redis Pub/Sub fan-out of the
+WebSocket manager, with and without the coalescing of the tokens.
+
+Each stream sends its tokens at the pace of an LLM, then the final chat message, from a replica to a WebSocket
+connection held by another replica (two WebSocket managers in the same process). The Redis operations are counted out of the command statistics of the server, while the latency of
+each token is measured from the moment it is sent to the moment its WebSocket frame is delivered.
+
+Usage:
+    python benchmarks/token_streaming.py [--streams 500] [--tokens 200] [--token-interval 20] [--flush 0 0.03]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class _TimedWebSocket:
+    """WebSocket connection recording the delivery time of each streamed token."""
+    def __init__(self, sent: list[float]):
+        self.sent = sent
+        self.latencies: list[float] = []
+        self.frames = 0
+        self.done = asyncio.Event()
+
+    async def send_json(self, message: dict):
+        now = time.perf_counter()
+        self.frames += 1
+        if message["type"] == "chat":
+            self.done.set()
+            return
+
+        # the tokens are the indices of the tokens of the stream, separated by "|"
+        for index in message["content"].split("|")[:-1]:
+            self.latencies.append(now - self.sent[int(index)])
+
+    async def close(self):
+        pass
+
+
+async def _stream(manager, chat_id: str, websocket: _TimedWebSocket, tokens: int, token_interval: float):
+    for i in range(tokens):
+        websocket.sent.append(time.perf_counter())
+        await manager.send_to(chat_id, {"type": "chat_token", "content": f"{i}|"})
+        await asyncio.sleep(token_interval)
+
+    await manager.send_to(chat_id, {"type": "chat", "content": "{}"})
+    await websocket.done.wait()
+
+
+async def _publish_calls(redis_client) -> int:
+    stats = await redis_client.info("commandstats")
+    return stats.get("cmdstat_publish", {}).get("calls", 0)
+
+
+async def _run_case(args: argparse.Namespace, flush_interval: float) -> dict:
+    from cat.db.database import get_async_db
+    from cat.services.websocket_manager import WebSocketManager
+
+    os.environ["CAT_WS_FLUSH_INTERVAL"] = str(flush_interval)
+    producer, owner = WebSocketManager(), WebSocketManager()
+    await producer.start()
+    await owner.start()
+
+    websockets = {f"stream_{i}": _TimedWebSocket([]) for i in range(args.streams)}
+    for chat_id, websocket in websockets.items():
+        owner.add_connection(chat_id, websocket)
+    # let the owner claim its connections
+    await asyncio.sleep(1)
+
+    publish_calls = await _publish_calls(get_async_db())
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            _stream(producer, chat_id, websocket, args.tokens, args.token_interval / 1000)
+            for chat_id, websocket in websockets.items()
+        ))
+        elapsed = time.perf_counter() - start
+        publish_calls = await _publish_calls(get_async_db()) - publish_calls
+    finally:
+        await producer.close_connections()
+        await owner.close_connections()
+
+    latencies = sorted(latency for websocket in websockets.values() for latency in websocket.latencies)
+    return {
+        "elapsed": elapsed,
+        "publish_calls": publish_calls,
+        "frames": sum(websocket.frames for websocket in websockets.values()),
+        "tokens": len(latencies),
+        "median": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * .99) - 1],
+        "max": latencies[-1],
+    }
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from cat.db.database import get_async_db
+
+    print(
+        f"Streaming {args.tokens} tokens every {args.token_interval} ms to {args.streams} concurrent WebSocket "
+        f"connections..."
+    )
+    try:
+        for flush_interval in args.flush:
+            result = await _run_case(args, flush_interval)
+            name = f"flush {flush_interval * 1000:.0f} ms" if flush_interval else "no coalescing"
+            print(
+                f"{name:>14}: {result['publish_calls']:7d} Redis PUBLISH, {result['frames']:7d} frames for "
+                f"{result['tokens']} tokens in {result['elapsed']:.1f}s; token latency median "
+                f"{result['median'] * 1000:.1f} ms, p99 {result['p99'] * 1000:.1f} ms, max {result['max'] * 1000:.1f} ms"
+            )
+    finally:
+        await get_async_db().aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Token streaming load test")
+    parser.add_argument("--streams", type=int, default=500, help="Number of concurrent streams (default: 500)")
+    parser.add_argument("--tokens", type=int, default=200, help="Number of tokens per stream (default: 200)")
+    parser.add_argument(
+        "--token-interval", type=float, default=20, help="Milliseconds between the tokens of a stream (default: 20)",
+    )
+    parser.add_argument(
+        "--flush", type=float, nargs="+", default=[0, 0.03],
+        help="Flush intervals to compare, in seconds, 0 disabling the coalescing (default: 0 0.03)",
+    )
+    parser.add_argument("--db", type=int, default=15, help="Redis database to use (default: 15)")
+
+    args = parser.parse_args()
+    # Pub/Sub channels are not scoped by database, yet the database is used for the clients of the Cat
+    os.environ["CAT_REDIS_DB"] = str(args.db)
+
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
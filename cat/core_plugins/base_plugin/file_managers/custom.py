@@ -1,9 +1,11 @@
+import asyncio
 import hashlib
 import os
 import shutil
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Tuple, AsyncIterable, AsyncIterator
 from datetime import datetime
+import aiofiles
 
 from cat.log import log
 from cat.services.factory.file_manager import BaseFileManager, FileResponse
@@ -24,6 +26,43 @@ class LocalFileManager(BaseFileManager):
             log.error(f"Error while downloading file {file_path} from storage: {e}")
             return None
 
+    async def _open_read(self, file_path: str, start: int, end: int | None, chunk_size: int) -> AsyncIterator[bytes]:
+        async with aiofiles.open(file_path, "rb") as f:
+            await f.seek(start)
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                chunk = await f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    async def _open_write(self, chunks: AsyncIterable[bytes], destination_path: str) -> str:
+        os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+        # the file is written aside and moved in place once complete, so that it is never read half-written
+        partial_path = f"{destination_path}.part"
+        try:
+            async with aiofiles.open(partial_path, "wb") as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+            os.replace(partial_path, destination_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        return destination_path
+
+    async def _copy_file(self, file_path_from: str, file_path_to: str) -> str:
+        def copy_file() -> str:
+            os.makedirs(os.path.dirname(file_path_to), exist_ok=True)
+            # the content is copied by the kernel (sendfile on Linux), without going through the user space
+            return shutil.copyfile(file_path_from, file_path_to)
+
+        return await asyncio.to_thread(copy_file)
+
+    async def _atransfer(self, file_manager_from: BaseFileManager, remote_root_dir: str) -> bool:
+        return await self._stream_transfer(file_manager_from, remote_root_dir)
+
     def _upload_file(self, file_path: str, destination_path: str) -> str:
         if file_path != destination_path:
             os.makedirs(os.path.dirname(destination_path), exist_ok=True)
@@ -56,13 +95,6 @@ class LocalFileManager(BaseFileManager):
         return True
 
     def _list_files(self, remote_root_dir: str) -> List[FileResponse]:
-        def get_file_hash(file_path: str, chunk_size: int = 8192) -> str:
-            sha256 = hashlib.sha256()
-            with Path(file_path).open("rb") as f:
-                while chunk := f.read(chunk_size):
-                    sha256.update(chunk)
-            return sha256.hexdigest()
-
         if not os.path.exists(remote_root_dir):
             return []
 
@@ -71,7 +103,7 @@ class LocalFileManager(BaseFileManager):
             FileResponse(
                 path=os.path.join(remote_root_dir, file),
                 name=file,
-                hash=get_file_hash(os.path.join(remote_root_dir, file)),
+                hash=self._file_hash(os.path.join(remote_root_dir, file)),
                 size=int(os.path.getsize(os.path.join(remote_root_dir, file))),
                 last_modified=datetime.fromtimestamp(
                     os.path.getmtime(os.path.join(remote_root_dir, file))
@@ -81,6 +113,28 @@ class LocalFileManager(BaseFileManager):
             if os.path.isfile(os.path.join(remote_root_dir, file))
         ]
 
+    def _stat_files(self, remote_root_dir: str) -> Dict[str, Tuple[int, float | None]] | None:
+        if not os.path.isdir(remote_root_dir):
+            return {}
+
+        stats = {}
+        with os.scandir(remote_root_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    stats[entry.name] = (stat.st_size, stat.st_mtime)
+        return stats
+
+    def _file_mtime(self, file_path: str) -> float | None:
+        return os.path.getmtime(file_path) if os.path.isfile(file_path) else None
+
+    def _file_hash(self, file_path: str, chunk_size: int = 8192) -> str:
+        sha256 = hashlib.sha256()
+        with Path(file_path).open("rb") as f:
+            while chunk := f.read(chunk_size):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
     def _clone_folder(self, remote_root_dir_from: str, remote_root_dir_to: str) -> List[str]:
         cloned_files = []
         for root, _, files in os.walk(remote_root_dir_from):
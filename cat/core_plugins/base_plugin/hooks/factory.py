@@ -13,6 +13,7 @@ from cat import (
 )
 from cat.core_plugins.base_plugin.embedders.configs import EmbedderFakeConfig
 from cat.core_plugins.base_plugin.file_managers.configs import LocalFileManagerConfig
+from cat.core_plugins.base_plugin.vector_databases.configs import LocalVectorDatabaseConfig
 
 
 @hook(priority=0)
@@ -111,7 +112,7 @@ def factory_allowed_vector_databases(allowed: List[VectorDatabaseSettings], cat)
     Returns:
         supported: List of VectorDatabaseSettings classes for the allowed vector databases
     """
-    return allowed
+    return allowed + [LocalVectorDatabaseConfig]
 
 
 @hook(priority=0)
@@ -0,0 +1,23 @@
+from typing import Type
+from pydantic import ConfigDict
+from cat.services.factory.vector_db import VectorDatabaseSettings
+
+from .custom import LocalVectorDatabaseHandler
+
+
+class LocalVectorDatabaseConfig(VectorDatabaseSettings):
+    in_memory: bool = False
+    quantization: bool = True
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "humanReadableName": "Local Vector Database",
+            "description": "Configuration for the embedded vector database, storing the vectors in memory-mapped files. "
+            "Set `in_memory` to keep them in RAM only, and disable `quantization` to run exact searches.",
+            "link": "",
+        }
+    )
+
+    @classmethod
+    def pyclass(cls) -> Type[LocalVectorDatabaseHandler]:
+        return LocalVectorDatabaseHandler
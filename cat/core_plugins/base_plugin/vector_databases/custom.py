@@ -0,0 +1,928 @@
+import asyncio
+import fcntl
+import json
+import math
+import os
+import re
+import shutil
+import uuid
+from collections import Counter
+from typing import IO, Any, AsyncIterator, Dict, Iterable, List, Tuple
+import numpy as np
+from qdrant_client.http.models import (
+    FieldCondition,
+    Filter,
+    HasIdCondition,
+    IsEmptyCondition,
+    IsNullCondition,
+    MatchAny,
+    MatchExcept,
+    MatchText,
+    MatchValue,
+    Range,
+)
+
+from cat import utils
+from cat.log import log
+from cat.services.factory.vector_db import BaseVectorDatabaseHandler, QdrantDialectMixin, DEFAULT_SCROLL_PAGE_SIZE
+from cat.services.memory.models import (
+    DocumentRecall,
+    PointStruct,
+    Record,
+    ScoredPoint,
+    UpdateResult,
+    VectorMemoryType,
+)
+
+# Qdrant-like knobs of the brute-force search
+_QUANTIZATION_OVERSAMPLING = 2.0
+_RRF_K = 2
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def _normalize_id(point_id: int | str) -> int | str:
+    """Normalize a point id like Qdrant does: integers are kept, UUID-like strings are turned into canonical UUIDs."""
+    if isinstance(point_id, int):
+        return point_id
+
+    try:
+        return str(uuid.UUID(str(point_id)))
+    except ValueError:
+        raise ValueError(f"Point id `{point_id}` is neither an unsigned integer nor a UUID")
+
+
+def _id_sort_key(point_id: int | str) -> Tuple[int, int | str]:
+    # Qdrant scrolls integer ids first, then the UUIDs
+    return (0, point_id) if isinstance(point_id, int) else (1, point_id)
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _values_at(payload: Dict, key: str) -> List[Any]:
+    """
+    Collect the values found in *payload* at the Qdrant-like *key* (e.g. `metadata.source`, `metadata.tags[].name`).
+    Arrays are flattened, so that a condition matches if any of their elements matches.
+    """
+    values = [payload]
+    for segment in key.split("."):
+        is_array = segment.endswith("[]")
+        name = segment[:-2] if is_array else segment
+
+        found = []
+        for value in values:
+            if not isinstance(value, dict) or name not in value:
+                continue
+            if is_array and isinstance(value[name], list):
+                found.extend(value[name])
+            else:
+                found.append(value[name])
+        values = found
+
+    flattened = []
+    for value in values:
+        if isinstance(value, list):
+            flattened.extend(value)
+        else:
+            flattened.append(value)
+    return flattened
+
+
+def _match_field(payload: Dict, condition: FieldCondition) -> bool:
+    values = _values_at(payload, condition.key)
+    match = condition.match
+
+    if isinstance(match, MatchValue):
+        return any(v == match.value for v in values)
+    if isinstance(match, MatchText):
+        return any(isinstance(v, str) and match.text in v for v in values)
+    if isinstance(match, MatchAny):
+        return any(v in match.any for v in values)
+    if isinstance(match, MatchExcept):
+        return any(v not in match.except_ for v in values)
+    if isinstance(condition.range, Range):
+        r = condition.range
+        return any(
+            isinstance(v, (int, float))
+            and (r.gt is None or v > r.gt)
+            and (r.gte is None or v >= r.gte)
+            and (r.lt is None or v < r.lt)
+            and (r.lte is None or v <= r.lte)
+            for v in values
+        )
+
+    raise ValueError(f"Unsupported condition on `{condition.key}`")
+
+
+def _match(point_id: int | str, payload: Dict, condition: Any) -> bool:
+    """Evaluate a Qdrant `Filter` (or one of its conditions) on a point."""
+    if isinstance(condition, Filter):
+        if condition.must and not all(_match(point_id, payload, c) for c in condition.must):
+            return False
+        if condition.should and not any(_match(point_id, payload, c) for c in condition.should):
+            return False
+        if condition.must_not and any(_match(point_id, payload, c) for c in condition.must_not):
+            return False
+        return True
+    if isinstance(condition, FieldCondition):
+        return _match_field(payload, condition)
+    if isinstance(condition, HasIdCondition):
+        return point_id in {_normalize_id(i) for i in condition.has_id}
+    if isinstance(condition, IsEmptyCondition):
+        return not _values_at(payload, condition.is_empty.key)
+    if isinstance(condition, IsNullCondition):
+        return any(v is None for v in _values_at(payload, condition.is_null.key))
+
+    raise ValueError(f"Unsupported filter condition: {type(condition).__name__}")
+
+
+def _project_payload(payload: Dict, keys: List[str]) -> Dict:
+    """Keep only the given (possibly nested, dot-separated) keys of the payload, like the Qdrant payload selectors."""
+    projected: Dict = {}
+    for key in keys:
+        parts = key.split(".")
+        value: Any = payload
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+
+    return projected
+
+
+def _as_list(condition: Any) -> List:
+    if condition is None:
+        return []
+    return condition if isinstance(condition, list) else [condition]
+
+
+class _BM25Index:
+    """Sparse side index of the `page_content` of the points, scored with Okapi BM25."""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._terms: Dict[int, List[str]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+
+    def add(self, row: int, text: str):
+        self.remove(row)
+
+        terms = Counter(_tokenize(text))
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[row] = frequency
+        self._terms[row] = list(terms.keys())
+        self._lengths[row] = sum(terms.values())
+        self._total_length += self._lengths[row]
+
+    def remove(self, row: int):
+        if (length := self._lengths.pop(row, None)) is None:
+            return
+
+        self._total_length -= length
+        for term in self._terms.pop(row):
+            postings = self._postings[term]
+            postings.pop(row, None)
+            if not postings:
+                del self._postings[term]
+
+    def scores(self, query: str) -> Dict[int, float]:
+        if not self._lengths:
+            return {}
+
+        n = len(self._lengths)
+        average_length = self._total_length / n
+        scores: Dict[int, float] = {}
+        for term in set(_tokenize(query)):
+            if not (postings := self._postings.get(term)):
+                continue
+
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for row, frequency in postings.items():
+                norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * self._lengths[row] / average_length)
+                scores[row] = scores.get(row, 0.0) + idf * frequency * (_BM25_K1 + 1) / (frequency + norm)
+        return scores
+
+
+class _LocalCollection:
+    """
+    A collection of points shared by all the agents (tenants), in columns:
+
+    - the normalized dense vectors, as a float32 matrix, and their int8 scalar quantization, for the fast pre-scan;
+    - the tenant of each row, as an int32 column of codes, for vectorized tenant filtering;
+    - the ids, payloads and versions of the points, and the liveness mask of the rows.
+
+    On disk, the two matrices are memory-mapped files, while the points are an append-only JSON lines log replayed at
+    load time and compacted when mostly made of stale entries. Changes are applied in memory first, then written to
+    disk in a worker thread, in order; the matrices are flushed before the log entries referencing their rows are
+    appended, so that the log is never ahead of the vectors after a crash.
+    """
+
+    def __init__(self, path: str | None, meta: Dict):
+        self.path = path
+        self.meta = meta
+
+        self.ids: List[int | str | None] = []
+        self.payloads: List[Dict | None] = []
+        self.versions: List[int] = []
+        self.rows: Dict[int | str, int] = {}
+        self.free_rows: List[int] = []
+        self.tenant_codes: Dict[str, int] = {}
+        self.bm25 = _BM25Index()
+
+        self._sorted_ids: List[int | str] | None = None
+        self._log_entries = 0
+        # serializes the writes of the changes, run in worker threads
+        self._io_lock = asyncio.Lock()
+
+        capacity = self.meta.setdefault("capacity", 1024)
+        self.vectors = self._open_matrix("vectors.f32", np.float32, capacity)
+        self.quantized = self._open_matrix("vectors.i8", np.int8, capacity)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.tenants = np.full(capacity, -1, dtype=np.int32)
+
+        if self.path:
+            self._replay_log()
+
+    @property
+    def dim(self) -> int:
+        return self.meta["size"]
+
+    @property
+    def capacity(self) -> int:
+        return self.vectors.shape[0]
+
+    # ── Storage ────────────────────────────────────────────────────────────────
+
+    def _open_matrix(self, file_name: str, dtype, capacity: int) -> np.ndarray:
+        if not self.path:
+            return np.zeros((capacity, self.dim), dtype=dtype)
+
+        file_path = os.path.join(self.path, file_name)
+        mode = "r+" if os.path.exists(file_path) else "w+"
+        return np.memmap(file_path, dtype=dtype, mode=mode, shape=(capacity, self.dim))
+
+    def _grow(self):
+        capacity = self.capacity * 2
+        old_vectors, old_quantized = self.vectors, self.quantized
+
+        if self.path:
+            for matrix, file_name in ((old_vectors, "vectors.f32"), (old_quantized, "vectors.i8")):
+                matrix.flush()  # type: ignore[attr-defined]
+                with open(os.path.join(self.path, file_name), "r+b") as f:
+                    f.truncate(capacity * self.dim * matrix.dtype.itemsize)
+            self.vectors = self._open_matrix("vectors.f32", np.float32, capacity)
+            self.quantized = self._open_matrix("vectors.i8", np.int8, capacity)
+        else:
+            self.vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+            self.quantized = np.zeros((capacity, self.dim), dtype=np.int8)
+            self.vectors[:len(old_vectors)] = old_vectors
+            self.quantized[:len(old_quantized)] = old_quantized
+
+        self.alive = np.concatenate([self.alive, np.zeros(capacity - len(self.alive), dtype=bool)])
+        self.tenants = np.concatenate([self.tenants, np.full(capacity - len(self.tenants), -1, dtype=np.int32)])
+        # the new capacity reaches the disk along with the change that required it
+        self.meta["capacity"] = capacity
+
+    def write_meta(self, meta: Dict | None = None):
+        if not self.path:
+            return
+
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta or self.meta, f)
+
+    async def _persist(self, entries: List[Dict]):
+        """
+        Write a change, already applied in memory, to disk. The lines of the log (or the compacted log, when mostly made
+        of stale entries) are serialized here, so that the worker thread never reads the state mutated by the loop.
+        """
+        if not self.path:
+            return
+
+        lines = [json.dumps(e) + "\n" for e in entries]
+        compacted = None
+
+        self._log_entries += len(entries)
+        if self._log_entries > 2 * len(self.rows) + 1024:
+            compacted = [json.dumps(self._log_entry(row)) + "\n" for row in self.rows.values()]
+            self._log_entries = len(self.rows)
+
+        async with self._io_lock:
+            await asyncio.to_thread(self._write, lines, compacted, dict(self.meta))
+
+    def _write(self, lines: List[str], compacted: List[str] | None, meta: Dict):
+        # vectors first: a log entry must never reference a row not yet on disk
+        self.flush()
+        self.write_meta(meta)
+
+        log_path = os.path.join(self.path, "points.jsonl")  # type: ignore[arg-type]
+        if compacted is None:
+            with open(log_path, "a") as f:
+                f.writelines(lines)
+            return
+
+        with open(log_path + ".tmp", "w") as f:
+            f.writelines(compacted)
+        os.replace(log_path + ".tmp", log_path)
+
+    async def destroy(self):
+        """Remove the files of the collection, once the pending writes are done."""
+        if not self.path:
+            return
+
+        async with self._io_lock:
+            await asyncio.to_thread(shutil.rmtree, self.path, ignore_errors=True)
+
+    def flush(self):
+        """Write the memory-mapped matrices to disk."""
+        if not self.path:
+            return
+
+        for matrix in (self.vectors, self.quantized):
+            matrix.flush()  # type: ignore[attr-defined]
+
+    def _log_entry(self, row: int) -> Dict:
+        return {"row": row, "id": self.ids[row], "payload": self.payloads[row], "version": self.versions[row]}
+
+    def _replay_log(self):
+        log_path = os.path.join(self.path, "points.jsonl")  # type: ignore[arg-type]
+        if not os.path.exists(log_path):
+            return
+
+        with open(log_path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._log_entries += 1
+
+                if entry.get("deleted"):
+                    if (row := self.rows.get(entry["id"])) is not None:
+                        self._remove_row(row)
+                    continue
+
+                self._set_row(entry["row"], entry["id"], entry["payload"], entry["version"])
+
+        self.free_rows = sorted(set(range(len(self.ids))) - set(self.rows.values()), reverse=True)
+
+    # ── Rows ───────────────────────────────────────────────────────────────────
+
+    def tenant_code(self, tenant_id: str | None, create: bool = False) -> int:
+        if tenant_id is None:
+            return -1
+        if tenant_id not in self.tenant_codes and create:
+            self.tenant_codes[tenant_id] = len(self.tenant_codes)
+        return self.tenant_codes.get(tenant_id, -2)
+
+    def _set_row(self, row: int, point_id: int | str, payload: Dict, version: int):
+        while row >= self.capacity:
+            self._grow()
+        while row >= len(self.ids):
+            self.ids.append(None)
+            self.payloads.append(None)
+            self.versions.append(0)
+
+        self.ids[row] = point_id
+        self.payloads[row] = payload
+        self.versions[row] = version
+        self.rows[point_id] = row
+        self.alive[row] = True
+        self.tenants[row] = self.tenant_code(payload.get("tenant_id"), create=True)
+        self.bm25.add(row, str(payload.get("page_content") or ""))
+        self._sorted_ids = None
+
+    def _remove_row(self, row: int):
+        self.rows.pop(self.ids[row], None)  # type: ignore[arg-type]
+        self.ids[row] = None
+        self.payloads[row] = None
+        self.alive[row] = False
+        self.tenants[row] = -1
+        self.bm25.remove(row)
+        self.free_rows.append(row)
+        self._sorted_ids = None
+
+    async def upsert(self, points: List[Tuple[int | str, List[float], Dict]]) -> int:
+        """Insert or replace the given (id, dense vector, payload) points, returning the operation id."""
+        # validate the whole batch before writing anything
+        denses = []
+        for _, vector, _ in points:
+            dense = np.asarray(vector, dtype=np.float32)
+            if dense.shape != (self.dim,):
+                raise ValueError(f"Wrong input: vector dimension error: expected dim: {self.dim}, got {dense.shape}")
+            norm = np.linalg.norm(dense)
+            denses.append(dense / norm if norm else dense)
+
+        self.meta["operation_id"] = operation_id = self.meta.get("operation_id", 0) + 1
+
+        entries = []
+        for (point_id, _, payload), dense in zip(points, denses):
+            if (row := self.rows.get(point_id)) is None:
+                row = self.free_rows.pop() if self.free_rows else len(self.ids)
+
+            self._set_row(row, point_id, payload, operation_id)
+            self.vectors[row] = dense
+            self.quantized[row] = np.clip(np.rint(dense * 127), -127, 127).astype(np.int8)
+            entries.append(self._log_entry(row))
+
+        await self._persist(entries)
+        return operation_id
+
+    async def delete(self, point_ids: Iterable[int | str]) -> int:
+        """Delete the points with the given ids, returning the operation id."""
+        self.meta["operation_id"] = operation_id = self.meta.get("operation_id", 0) + 1
+
+        entries = []
+        for point_id in point_ids:
+            if (row := self.rows.get(point_id)) is None:
+                continue
+            self._remove_row(row)
+            entries.append({"id": point_id, "deleted": True})
+
+        await self._persist(entries)
+        return operation_id
+
+    # ── Queries ────────────────────────────────────────────────────────────────
+
+    def candidate_rows(self, query_filter: Filter | None) -> np.ndarray:
+        """
+        Return the rows matching *query_filter*. The tenant conditions at the top level of the filter are applied as a
+        vectorized mask over the tenant column; only the remaining conditions are evaluated point by point.
+        """
+        mask = self.alive.copy()
+        if query_filter is None:
+            return np.flatnonzero(mask)
+
+        remaining_must = []
+        for condition in _as_list(query_filter.must):
+            if (
+                isinstance(condition, FieldCondition)
+                and condition.key == "tenant_id"
+                and isinstance(condition.match, MatchValue)
+            ):
+                mask &= self.tenants == self.tenant_code(condition.match.value)
+            else:
+                remaining_must.append(condition)
+
+        rows = np.flatnonzero(mask)
+        remaining = Filter(must=remaining_must, should=query_filter.should, must_not=query_filter.must_not)
+        if not remaining_must and not remaining.should and not remaining.must_not:
+            return rows
+
+        return np.array(
+            [row for row in rows if _match(self.ids[row], self.payloads[row], remaining)],  # type: ignore[arg-type]
+            dtype=np.int64,
+        )
+
+    def top_k(self, query_vector: List[float], rows: np.ndarray, k: int | None, quantized: bool) -> List[Tuple[int, float]]:
+        """Brute-force cosine top-k over *rows*, optionally pre-scanning the int8 matrix and rescoring the best ones."""
+        if len(rows) == 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        query = query / norm if norm else query
+        k = len(rows) if k is None else min(k, len(rows))
+
+        if quantized and k < len(rows):
+            query_i8 = np.clip(np.rint(query * 127), -127, 127).astype(np.int32)
+            approximate = self.quantized[rows].astype(np.int32) @ query_i8
+            n_candidates = min(len(rows), int(math.ceil(k * _QUANTIZATION_OVERSAMPLING)))
+            rows = rows[np.argpartition(-approximate, n_candidates - 1)[:n_candidates]]
+
+        scores = self.vectors[rows] @ query
+        best = np.argpartition(-scores, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(rows[i]), float(scores[i])) for i in best]
+
+    def sorted_ids(self) -> List[int | str]:
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(self.rows.keys(), key=_id_sort_key)
+        return self._sorted_ids
+
+    def vector_of(self, row: int) -> List[float] | Dict[str, List[float]]:
+        vector = self.vectors[row].tolist()
+        if dense_name := self.meta.get("dense_vector_name"):
+            return {dense_name: vector}
+        return vector
+
+
+class LocalVectorStores:
+    """
+    Process-wide registry of the local collections, keyed by storage path (None for the in-memory ones), so that the
+    handlers of all the agents share the same collections, as they would on a vector database server.
+
+    A storage path is owned by one process at a time, via an exclusive lock on its `.lock` file: the memory-mapped
+    matrices and the logs are not safe for concurrent writers.
+    """
+
+    # the plugin modules are reloaded at every load of the plugins, which rebinds this class: the registry is kept
+    # under a stable key, so that a reload neither forgets the collections nor locks the storage against itself
+    _INSTANCE_KEY = "LocalVectorStores"
+
+    def __init__(self):
+        self._stores: Dict[str | None, Dict[str, _LocalCollection]] = {}
+        self._locks: Dict[str, IO] = {}
+
+    @classmethod
+    def instance(cls) -> "LocalVectorStores":
+        if (stores := utils.singleton.instances.get(cls._INSTANCE_KEY)) is None:
+            stores = utils.singleton.instances[cls._INSTANCE_KEY] = cls()
+        return stores
+
+    def collections(self, storage_path: str | None) -> Dict[str, _LocalCollection]:
+        if storage_path not in self._stores:
+            if storage_path:
+                self._lock(storage_path)
+            self._stores[storage_path] = self._load(storage_path)
+        return self._stores[storage_path]
+
+    def unload(self, storage_path: str | None):
+        """Flush and forget the collections of *storage_path*, releasing its lock, as at the exit of the process."""
+        for collection in self._stores.pop(storage_path, {}).values():
+            collection.flush()
+
+        if storage_path and (lock_file := self._locks.pop(storage_path, None)):
+            lock_file.close()
+
+    def _lock(self, storage_path: str):
+        os.makedirs(storage_path, exist_ok=True)
+        lock_file = open(os.path.join(storage_path, ".lock"), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise RuntimeError(
+                f"The local vector database at `{storage_path}` is in use by another process: run a single worker, "
+                "or use a vector database server (e.g. Qdrant)"
+            )
+        self._locks[storage_path] = lock_file
+
+    @staticmethod
+    def _load(storage_path: str | None) -> Dict[str, _LocalCollection]:
+        if not storage_path or not os.path.isdir(storage_path):
+            return {}
+
+        collections = {}
+        for name in sorted(os.listdir(storage_path)):
+            meta_path = os.path.join(storage_path, name, "meta.json")
+            if not os.path.isfile(meta_path):
+                continue
+            with open(meta_path) as f:
+                collections[name] = _LocalCollection(os.path.join(storage_path, name), json.load(f))
+        return collections
+
+
+class LocalVectorDatabaseHandler(QdrantDialectMixin, BaseVectorDatabaseHandler):
+    """
+    Embedded vector database handler, running brute-force searches over memory-mapped matrices with NumPy.
+
+    It speaks the same filter dialect of the `QdrantHandler` (`build_condition`/`filter_from_dict`), with tenant
+    filtering, int8 pre-scan with float32 rescoring (or exact search), a BM25 side index for the hybrid searches fused
+    with RRF, snapshots and scroll. No server is needed, which makes it suitable for tests, benchmarks and single-node
+    deployments.
+    """
+
+    def __init__(self, in_memory: bool = False, quantization: bool = True, save_memory_snapshots: bool = False):
+        super().__init__(save_memory_snapshots)
+        self.in_memory = in_memory
+        self.quantization = quantization
+        self.storage_path = None if in_memory else utils.get_vector_database_root_storage_path()
+
+    def _eq(self, other: "LocalVectorDatabaseHandler") -> bool:
+        return self.storage_path == other.storage_path and self.quantization == other.quantization
+
+    @property
+    def client(self):
+        return self._collections
+
+    @property
+    def _collections(self) -> Dict[str, _LocalCollection]:
+        return LocalVectorStores.instance().collections(self.storage_path)
+
+    def _collection(self, collection_name: str) -> _LocalCollection:
+        if (collection := self._collections.get(collection_name)) is None:
+            raise ValueError(f"Collection `{collection_name}` not found")
+        return collection
+
+    def is_db_remote(self) -> bool:
+        return False
+
+    async def _check_embedding_size(self, embedder_name: str, embedder_size: int, collection_name: str) -> bool:
+        meta = self._collection(collection_name).meta
+        if meta["size"] == embedder_size and meta.get("embedder_name") == embedder_name:
+            log.debug(f"Collection `{collection_name}` for the agent `{self.agent_id}` has the same embedder")
+            return True
+
+        log.warning(f"Collection `{collection_name}` for the agent `{self.agent_id}` has different embedder")
+        return False
+
+    async def _create(self, collection_name: str, meta: Dict):
+        path = os.path.join(self.storage_path, collection_name) if self.storage_path else None
+
+        def create() -> _LocalCollection:
+            if path:
+                os.makedirs(path, exist_ok=True)
+            collection = _LocalCollection(path, meta)
+            collection.write_meta()
+            return collection
+
+        self._collections[collection_name] = await asyncio.to_thread(create)
+
+    async def create_collection(self, embedder_name: str, embedder_size: int, collection_name: str):
+        log.warning(f"Creating collection `{collection_name}` for the agent `{self.agent_id}`...")
+        await self._create(collection_name, {"size": embedder_size, "embedder_name": embedder_name})
+
+    async def create_hybrid_collection(
+        self, collection_name: str, dense_vector_config_name: str, sparse_vector_config_name: str
+    ):
+        if collection_name in self._collections:
+            return
+
+        await self._create(collection_name, {
+            "size": self._collection(str(VectorMemoryType.DECLARATIVE)).dim,
+            "dense_vector_name": dense_vector_config_name,
+            "sparse_vector_name": sparse_vector_config_name,
+        })
+
+    async def delete_collection(self, collection_name: str, timeout: int | None = None):
+        if (collection := self._collections.pop(collection_name, None)) is None:
+            return
+
+        await collection.destroy()
+        log.warning(f"Collection `{collection_name}` for the agent `{self.agent_id}` deleted")
+
+    async def get_collection_names(self) -> List[str]:
+        return list(self._collections.keys())
+
+    async def save_dump(self, collection_name: str, folder="dormouse/"):
+        collection = self._collection(collection_name)
+
+        rows = np.array(sorted(collection.rows.values()), dtype=np.int64)
+        alias = self._get_local_alias(collection.meta.get("embedder_name", ""), collection_name)
+        snapshot_path = os.path.join(folder, alias.replace("/", "-") + ".snapshot")
+
+        # the snapshot is taken on the loop, then compressed and written in a worker thread
+        vectors = collection.vectors[rows]
+        points = json.dumps({
+            "meta": collection.meta,
+            "points": [{"id": collection.ids[row], "payload": collection.payloads[row]} for row in rows],
+        })
+
+        def write():
+            os.makedirs(folder, exist_ok=True)
+            # np.savez appends its own extension: write to a temporary name and rename
+            np.savez_compressed(snapshot_path + ".tmp", vectors=vectors, points=np.array(points))
+            os.replace(snapshot_path + ".tmp.npz", snapshot_path)
+
+        await asyncio.to_thread(write)
+        log.warning(f"Dump `{snapshot_path}` for the agent `{self.agent_id}` completed")
+
+    @staticmethod
+    def _get_local_alias(embedder_name: str, collection_name: str) -> str:
+        return f"{embedder_name}_{collection_name}"
+
+    def _dense_vector(self, collection: _LocalCollection, vector: Any) -> List[float]:
+        if isinstance(vector, dict):
+            dense_name = collection.meta.get("dense_vector_name")
+            if dense_name not in vector:
+                raise ValueError(f"Dense vector `{dense_name}` not found in point")
+            return vector[dense_name]
+        return vector
+
+    async def _upsert(self, collection_name: str, points: List[PointStruct]) -> int:
+        collection = self._collection(collection_name)
+        return await collection.upsert([
+            (_normalize_id(p.id), self._dense_vector(collection, p.vector), p.payload) for p in points  # type: ignore[arg-type]
+        ])
+
+    def _to_record(
+        self, collection: _LocalCollection, row: int, with_vectors: bool = True, with_payload: bool | List[str] = True
+    ) -> Record:
+        payload = collection.payloads[row]
+        if isinstance(with_payload, list):
+            payload = _project_payload(payload, with_payload)
+
+        return Record(
+            id=collection.ids[row],  # type: ignore[arg-type]
+            payload=payload if with_payload else None,
+            vector=collection.vector_of(row) if with_vectors else None,
+        )
+
+    def _to_scored_point(
+        self, collection: _LocalCollection, row: int, score: float, with_payload: bool = True, with_vectors: bool = True
+    ) -> ScoredPoint:
+        return ScoredPoint(
+            id=collection.ids[row],  # type: ignore[arg-type]
+            version=collection.versions[row],
+            score=score,
+            payload=collection.payloads[row] if with_payload else None,
+            vector=collection.vector_of(row) if with_vectors else None,
+        )
+
+    async def retrieve_tenant_points(self, collection_name: str, points: List) -> List[Record]:
+        collection = self._collection(collection_name)
+        rows = collection.candidate_rows(
+            Filter(must=[self.tenant_field_condition(), HasIdCondition(has_id=points)])
+        )
+        return [self._to_record(collection, row) for row in rows]
+
+    async def add_point_to_tenant(
+        self,
+        collection_name: str,
+        content: str,
+        vector: Iterable,
+        metadata: Dict = None,  # type: ignore[assignment]
+        id_point: str | None = None,
+        **kwargs,
+    ) -> PointStruct | None:
+        id_point = id_point or uuid.uuid4().hex
+
+        point = PointStruct(
+            id=id_point,
+            payload={
+                "id": id_point,
+                "page_content": content,
+                "metadata": metadata,
+                "tenant_id": self.agent_id,
+            },
+            vector=list(vector),  # type: ignore[arg-type]
+        )
+
+        await self._upsert(collection_name, [point])
+        return point
+
+    async def add_points_to_tenant(self, collection_name: str, points: List[PointStruct]) -> UpdateResult:
+        for point in points:
+            point.payload["tenant_id"] = self.agent_id  # type: ignore[index]
+
+        operation_id = await self._upsert(collection_name, points)
+        return UpdateResult(status="completed", operation_id=operation_id)
+
+    async def delete_tenant_points(self, collection_name: str, metadata: Dict | None = None) -> UpdateResult:
+        collection = self._collection(collection_name)
+        rows = collection.candidate_rows(Filter(must=self._build_metadata_conditions(metadata=metadata)))
+
+        operation_id = await collection.delete([collection.ids[row] for row in rows])  # type: ignore[misc]
+        return UpdateResult(status="completed", operation_id=operation_id)
+
+    async def delete_tenant_points_by_ids(self, collection_name: str, points_ids: List) -> UpdateResult:
+        operation_id = await self._collection(collection_name).delete([_normalize_id(i) for i in points_ids])
+        return UpdateResult(status="completed", operation_id=operation_id)
+
+    async def recall_tenant_memory_from_embedding(
+        self,
+        collection_name: str,
+        embedding: List[float],
+        metadata: Dict | None = None,
+        k: int | None = 5,
+        threshold: float | None = None,
+    ) -> List[DocumentRecall]:
+        points = await self.search_in_tenant(
+            collection_name,
+            embedding,
+            query_filter=Filter(must=self._build_metadata_conditions(metadata=metadata)),
+            limit=k,  # type: ignore[arg-type]
+            score_threshold=threshold,
+        )
+        return [self._to_document_recall(p) for p in points]
+
+    async def _iter_points(
+        self,
+        collection_name: str,
+        scroll_filter: Filter,
+        page_size: int = DEFAULT_SCROLL_PAGE_SIZE,
+        with_vectors: bool = False,
+        with_payload: bool | List[str] = True,
+    ) -> AsyncIterator[List[Record]]:
+        collection = self._collection(collection_name)
+        matching = set(collection.candidate_rows(scroll_filter).tolist())
+        point_ids = [point_id for point_id in collection.sorted_ids() if collection.rows[point_id] in matching]
+        del matching
+
+        for start in range(0, len(point_ids), page_size):
+            page = [
+                self._to_record(collection, row, with_vectors, with_payload)
+                for point_id in point_ids[start:start + page_size]
+                # points deleted while iterating are skipped, like a Qdrant scroll would do
+                if (row := collection.rows.get(point_id)) is not None
+            ]
+            if page:
+                yield page
+
+    def _scroll(
+        self,
+        collection_name: str,
+        scroll_filter: Filter,
+        limit: int | None = None,
+        offset: int | str | None = None,
+        with_vectors: bool = True,
+    ) -> Tuple[List[Record], int | str | None]:
+        collection = self._collection(collection_name)
+        matching = set(collection.candidate_rows(scroll_filter).tolist())
+
+        # points are scrolled by id, like Qdrant does: the offset is the id of the first point of the page
+        offset_key = _id_sort_key(_normalize_id(offset)) if offset is not None else None
+        page: List[Record] = []
+        for point_id in collection.sorted_ids():
+            if offset_key is not None and _id_sort_key(point_id) < offset_key:
+                continue
+            if (row := collection.rows[point_id]) not in matching:
+                continue
+            if limit is not None and len(page) == limit:
+                return page, point_id
+            page.append(self._to_record(collection, row, with_vectors))
+
+        return page, None
+
+    async def get_all_tenant_points(
+        self,
+        collection_name: str,
+        limit: int | None = None,
+        offset: str | None = None,
+        metadata: Dict | None = None,
+        with_vectors: bool = True,
+    ) -> Tuple[List[Record], int | str | None]:
+        return self._scroll(
+            collection_name,
+            Filter(must=self._build_metadata_conditions(metadata)),
+            limit=limit,
+            offset=offset,
+            with_vectors=with_vectors,
+        )
+
+    async def get_all_tenant_points_from_web(
+        self, collection_name: str, limit: int | None = None, offset: str | None = None
+    ) -> Tuple[List[Record], int | str | None]:
+        return self._scroll(collection_name, self._web_points_filter(), limit=limit, offset=offset, with_vectors=False)
+
+    async def get_all_tenant_points_from_files(
+        self, collection_name: str, limit: int | None = None, offset: str | None = None
+    ) -> Tuple[List[Record], int | str | None]:
+        return self._scroll(collection_name, self._files_points_filter(), limit=limit, offset=offset, with_vectors=False)
+
+    async def get_tenant_vectors_count(self, collection_name: str) -> int:
+        return len(self._collection(collection_name).candidate_rows(Filter(must=[self.tenant_field_condition()])))
+
+    async def search_in_tenant(
+        self,
+        collection_name: str,
+        query_vector: List[float],
+        query_filter: Any = None,
+        with_payload: bool = True,
+        with_vectors: bool = True,
+        limit: int = 10,
+        score_threshold: float | None = None,
+    ) -> List[ScoredPoint]:
+        collection = self._collection(collection_name)
+        rows = collection.candidate_rows(query_filter)
+
+        return [
+            self._to_scored_point(collection, row, score, with_payload, with_vectors)
+            for row, score in collection.top_k(query_vector, rows, limit, self.quantization)
+            if score_threshold is None or score >= score_threshold
+        ]
+
+    async def search_prefetched_in_tenant(
+        self,
+        collection_name: str,
+        query: str,
+        query_vector: List[float],
+        query_filter: Any,
+        k: int,
+        k_prefetched: int,
+        threshold: float,
+    ) -> List[ScoredPoint]:
+        collection = self._collection(collection_name)
+        rows = collection.candidate_rows(query_filter)
+
+        dense_ranking = [row for row, _ in collection.top_k(query_vector, rows, k_prefetched, self.quantization)]
+
+        allowed = set(rows.tolist())
+        sparse_scores = {row: s for row, s in collection.bm25.scores(query).items() if row in allowed}
+        sparse_ranking = sorted(sparse_scores, key=lambda row: -sparse_scores[row])[:k_prefetched]
+
+        # Reciprocal Rank Fusion of the two prefetched rankings
+        fused: Dict[int, float] = {}
+        for ranking in (dense_ranking, sparse_ranking):
+            for rank, row in enumerate(ranking):
+                fused[row] = fused.get(row, 0.0) + 1.0 / (rank + _RRF_K)
+
+        best = sorted(fused.items(), key=lambda item: -item[1])[:k]
+        return [
+            self._to_scored_point(collection, row, score)
+            for row, score in best
+            if threshold is None or score >= threshold
+        ]
+
+    async def close(self):
+        # collections are shared with the handlers of the other agents: just persist the matrices
+        for collection in list(self._collections.values()):
+            await asyncio.to_thread(collection.flush)
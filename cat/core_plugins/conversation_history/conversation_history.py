@@ -14,7 +14,7 @@ async def before_cat_reads_message(user_message: UserMessage, cat) -> UserMessag
     # update conversation history (user turn)
     await cat.working_memory.update_history(who="user", content=user_message)
     # if first message, set conversation name
-    if len(cat.working_memory.history) == 1:
+    if cat.working_memory.num_messages == 1:
         # first message, set name and metadata in the conversation
         await crud_conversations.set_attributes(
             cat.agent_key, cat.user.id, cat.id, name=cat.id, metadata={}, first_time=True
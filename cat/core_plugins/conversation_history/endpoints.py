@@ -1,5 +1,6 @@
 import os
 from typing import List, Dict, Any
+from fastapi import Query
 from pydantic import BaseModel, Field, model_validator
 
 from cat import (
@@ -72,9 +73,7 @@ async def delete_conversation(
         cat.file_manager.remove_folder(os.path.join(cat.agent_key, stray_cat.id))
 
         # delete the elements of the conversation from the vector memory
-        await cat.vector_memory_handler.delete_tenant_points(
-            str(VectorMemoryType.EPISODIC), {"chat_id": stray_cat.id},
-        )
+        await cat.delete_memory_points(str(VectorMemoryType.EPISODIC), {"chat_id": stray_cat.id})
 
         # Delete conversation from the database
         await crud_conversations.delete_conversation(stray_cat.agent_key, stray_cat.user.id, stray_cat.id)  # type: ignore[union-attr]
@@ -94,8 +93,10 @@ async def delete_conversation(
 async def get_conversation_history(
     info: AuthorizedInfo = check_permissions(AuthResource.MEMORY, AuthPermission.READ),
 ) -> GetConversationHistoryResponse:
-    """Get the specified user's conversation history from working memory"""
-    return GetConversationHistoryResponse(history=info.stray_cat.working_memory.history)
+    """Get the specified user's whole conversation history (the working memory only keeps the latest messages)"""
+    stray_cat = info.stray_cat
+    history = await crud_conversations.get_messages(stray_cat.agent_key, stray_cat.user.id, stray_cat.id)  # type: ignore[union-attr]
+    return GetConversationHistoryResponse(history=history)
 
 
 # GET conversation attributes
@@ -150,12 +151,21 @@ async def change_attribute_conversation(
     prefix="/conversations",
 )
 async def get_conversations(
+    limit: int | None = Query(default=None, gt=0, description="Maximum number of conversations to return"),
+    before: float | None = Query(
+        default=None, description="Only return the conversations last updated before this timestamp (pagination cursor)"
+    ),
     info: AuthorizedInfo = check_permissions(AuthResource.MEMORY, AuthPermission.READ),
 ) -> List[GetConversationsResponse]:
-    """Get the specified user's conversation history from working memory"""
+    """
+    Get the specified user's conversations, the most recently updated first. To paginate, pass as `before` the
+    `updated_at` of the last conversation of the previous page.
+    """
     agent_id = info.cheshire_cat.agent_key
     user_id = info.user.id
-    attributes_list = await crud_conversations.get_conversations_attributes(agent_id, user_id)
+    attributes_list = await crud_conversations.get_conversations_attributes(
+        agent_id, user_id, limit=limit, before=before
+    )
 
     return [GetConversationsResponse(**attributes_item) for attributes_item in attributes_list]
 
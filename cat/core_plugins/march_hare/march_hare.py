@@ -1,15 +1,40 @@
 import asyncio
 import json
+import os
 import random
+import time
 import redis.asyncio as aioredis
-from typing import Dict, Callable, Optional
+from redis.exceptions import RedisError, ResponseError
+from typing import Dict, Callable, List, Optional, Tuple
+from pydantic import BaseModel
 
-from cat import log, hook
+from cat import log, hook, endpoint, check_permissions, AuthorizedInfo, AuthResource, AuthPermission
 from cat.db.database import get_async_db
+from cat.env import get_env_int
 from cat.utils import pod_id, singleton
 
-# Max messages to keep in the stream to prevent memory explosion
-STREAM_MAX_LEN = 1000
+# Prefix of the consumer group of each replica, receiving all the events of a broadcast stream
+REPLICA_GROUP_PREFIX = "march_hare:replica:"
+
+# Bounds of the number of messages read at once: the batch grows while the reads come back full and shrinks while they
+# come back almost empty, so that a burst of events is drained in a few round trips
+MIN_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 500
+
+# Max messages being handled at once per stream; no more messages are read until some of them are acknowledged
+MAX_IN_FLIGHT = 500
+
+# Milliseconds a read waits for new messages: it returns as soon as a message arrives, and the listeners are cancelled
+# on shutdown, so there is no need to poll
+BLOCK_TIME = 5000
+
+# Seconds after which a message delivered to a consumer and not acknowledged yet is claimed by another consumer of the
+# group, and how often the pending messages are checked
+CLAIM_IDLE_TIME = 60
+CLAIM_INTERVAL = 10
+
+# Seconds after which the consumer group of a replica not reading anymore is destroyed
+REPLICA_GROUP_TTL = 24 * 60 * 60
 
 
 class MarchHareConfig:
@@ -25,14 +50,42 @@ class MarchHareConfig:
     }
 
 
+class MarchHareStream(BaseModel):
+    stream: str
+    group: str
+    length: int
+    lag: int | None
+    pending: int
+    consumers: int
+    last_delivered_id: str | None
+    batch_size: int
+    in_flight: int
+
+
 @singleton
 class MarchHare:
+    """
+    Event bus of the replicas, on Redis Streams read by consumer groups.
+
+    A stream is either broadcast to all the replicas (the default) or shared by them as a work queue:
+
+    - every replica reads a broadcast stream through a consumer group of its own, so that each replica receives each
+      event once and resumes from where it stopped after a restart;
+    - all the replicas read a shared stream through the same consumer group, so that each event is handled by one
+      replica only, and the events left pending by a dead replica are claimed by the others.
+
+    A message is acknowledged once handled: the messages being handled when a replica stops are delivered again.
+    """
+
     def __init__(self):
         self.pod_id = pod_id()
         self._async_redis_client = get_async_db()
         self._stop_event = asyncio.Event()
 
-        # Set once the lizard is fully bootstrapped; gates handler spawning so that
+        # Max messages kept in each stream; the older ones are trimmed even if a replica has not read them yet
+        self._stream_max_len = get_env_int("CAT_MARCH_HARE_STREAM_MAX_LEN")
+
+        # Set once the lizard is fully bootstrapped; gates message reading so that
         # listener tasks can be started early (before_lizard_bootstrap) without
         # dispatching events to a not-yet-ready system.
         self._ready_event = asyncio.Event()
@@ -40,6 +93,12 @@ class MarchHare:
         # One long-running listener Task per stream (stream_name → Task).
         self._listeners: Dict[str, asyncio.Task] = {}
 
+        # The consumer group reading each stream (stream_name → group).
+        self._groups: Dict[str, str] = {}
+
+        # The current number of messages read at once from each stream (stream_name → batch size).
+        self._batch_sizes: Dict[str, int] = {}
+
         # One short-lived handler Task per message being processed
         # (stream_name:message_id → Task).  Tasks are added when a message
         # arrives and removed automatically when they complete.
@@ -50,17 +109,28 @@ class MarchHare:
         self._max_delay = 60.0   # Cap at 1 minute
         self._factor = 2         # Double the wait each time
 
+    @property
+    def replica_group(self) -> str:
+        """The consumer group of this replica, reading the broadcast streams."""
+        return f"{REPLICA_GROUP_PREFIX}{self.pod_id}"
+
+    @property
+    def consumer_name(self) -> str:
+        """The name of this process in the consumer groups, changing at each restart."""
+        return f"{self.pod_id}:{os.getpid()}"
+
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
 
-    def start_consumer(self, stream_name: str, callback: Callable) -> None:
+    def start_consumer(self, stream_name: str, callback: Callable, group: str | None = None) -> None:
         """
         Spawn a long-running listener Task for *stream_name*.
 
-        For every message that arrives a dedicated handler Task is created
-        (see :meth:`_spawn_handler`).  A no-op if a live listener for that
-        stream already exists.
+        The stream is broadcast to all the replicas, unless a *group* shared by
+        the replicas is given.  For every message that arrives a dedicated
+        handler Task is created (see :meth:`_spawn_handler`).  A no-op if a
+        live listener for that stream already exists.
         """
         existing = self._listeners.get(stream_name)
         if existing and not existing.done():
@@ -70,28 +140,37 @@ class MarchHare:
         # Allow restart after stop() was called
         self._stop_event.clear()
 
+        group = group or self.replica_group
+        self._groups[stream_name] = group
+        self._batch_sizes[stream_name] = MIN_BATCH_SIZE
+
         task = asyncio.create_task(
-            self._listener_loop(callback, stream_name),
+            self._listener_loop(callback, stream_name, group),
             name=f"march_hare:listener:{stream_name}",
         )
         self._listeners[stream_name] = task
         task.add_done_callback(lambda t: self._on_listener_done(stream_name, t))
 
-        log.debug(f"[March Hare] Listener task started for stream '{stream_name}'.")
+        log.debug(f"[March Hare] Listener task started for stream '{stream_name}' (group '{group}').")
 
     def mark_ready(self) -> None:
         """
         Signal that the lizard is fully bootstrapped.
 
-        Until this is called, listener loops will read from the streams but
-        will not spawn handler tasks—messages received during startup are
-        silently skipped to avoid acting on events with a not-yet-ready system.
+        Until this is called, listener loops join their consumer groups but
+        do not read any message: the events published during startup stay in
+        the streams and are handled once the system is ready.
         """
         self._ready_event.set()
         log.debug("[March Hare] System ready — handlers will be spawned for incoming events.")
 
     async def stop(self) -> None:
-        """Signal all listeners and pending handlers to stop and await clean termination."""
+        """
+        Signal all listeners and pending handlers to stop and await clean termination.
+
+        The messages whose handlers are cancelled are not acknowledged: they are
+        delivered again once the replica restarts.
+        """
         self._stop_event.set()
         self._ready_event.clear()
 
@@ -118,7 +197,7 @@ class MarchHare:
             await self._async_redis_client.xadd(
                 name=stream_name,
                 fields=event,
-                maxlen=STREAM_MAX_LEN,
+                maxlen=self._stream_max_len,
                 approximate=True,
             )
 
@@ -126,21 +205,71 @@ class MarchHare:
         except Exception as e:
             log.error(f"[March Hare] Error publishing to Redis: {e}")
 
+    async def stats(self) -> List[Dict]:
+        """
+        The state of the consumer group of this replica on each stream being listened to.
+
+        The lag is the number of messages of the stream not delivered to the
+        group yet (None if it cannot be computed, e.g. because some of them
+        have been trimmed), the pending ones have been delivered but not
+        acknowledged yet.
+        """
+        stats = []
+        for stream_name, group in self._groups.items():
+            stream_stats = {
+                "stream": stream_name,
+                "group": group,
+                "length": 0,
+                "lag": None,
+                "pending": 0,
+                "consumers": 0,
+                "last_delivered_id": None,
+                "batch_size": self._batch_sizes.get(stream_name, MIN_BATCH_SIZE),
+                "in_flight": self._in_flight(stream_name),
+            }
+            try:
+                stream_stats["length"] = await self._async_redis_client.xlen(stream_name)
+                groups = await self._async_redis_client.xinfo_groups(stream_name)
+            except ResponseError:
+                # the stream does not exist yet
+                groups = []
+
+            if info := next((g for g in groups if g["name"] == group), None):
+                stream_stats |= {
+                    "lag": info.get("lag"),
+                    "pending": info["pending"],
+                    "consumers": info["consumers"],
+                    "last_delivered_id": info["last-delivered-id"],
+                }
+            stats.append(stream_stats)
+
+        return stats
+
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
 
-    def _spawn_handler(self, callback: Callable, stream_name: str, message_id: str, data: dict) -> None:
+    def _in_flight(self, stream_name: str) -> int:
+        prefix = f"{stream_name}:"
+        return sum(1 for handler_id in self._handlers if handler_id.startswith(prefix))
+
+    def _spawn_handler(
+        self, callback: Callable, stream_name: str, group: str, message_id: str, data: dict
+    ) -> None:
         """
         Create a short-lived asyncio Task to process a single message.
 
         The task is registered in :attr:`_handlers` on creation and removed
         automatically via a done-callback once it completes (successfully,
-        with an error, or cancelled).
+        with an error, or cancelled).  A no-op if the message is already being
+        processed, i.e. it has been claimed again while its handler runs.
         """
         handler_id = f"{stream_name}:{message_id}"
+        if handler_id in self._handlers:
+            return
+
         task = asyncio.create_task(
-            callback(data),
+            self._handle(callback, stream_name, group, message_id, data),
             name=f"march_hare:handler:{handler_id}",
         )
         self._handlers[handler_id] = task
@@ -148,6 +277,27 @@ class MarchHare:
 
         log.debug(f"[March Hare] Handler spawned for message '{message_id}' on '{stream_name}'.")
 
+    async def _handle(self, callback: Callable, stream_name: str, group: str, message_id: str, data: dict) -> None:
+        """
+        Process a message and acknowledge it.
+
+        A message whose processing fails is acknowledged anyway, since
+        delivering it again would fail the same way; a cancelled one is left
+        pending, to be delivered again.
+        """
+        try:
+            await callback(data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error(f"[March Hare] Error handling message '{message_id}' on '{stream_name}': {e}")
+
+        try:
+            await self._async_redis_client.xack(stream_name, group, message_id)
+        except RedisError as e:
+            # left pending: claimed and processed again later
+            log.warning(f"[March Hare] Error acknowledging message '{message_id}' on '{stream_name}': {e}")
+
     def _on_listener_done(self, stream_name: str, task: asyncio.Task) -> None:
         """Remove a finished listener from the registry and log the outcome."""
         self._listeners.pop(stream_name, None)
@@ -170,56 +320,136 @@ class MarchHare:
         else:
             log.debug(f"[March Hare] Handler '{handler_id}' completed successfully.")
 
-    async def _listener_loop(self, callback: Callable, stream_name: str) -> None:
+    async def _join_group(self, stream_name: str, group: str) -> None:
+        """
+        Create the consumer group reading *stream_name*, if missing, and clean up the stale ones.
+
+        A new group starts from the end of the stream: the events published
+        before this replica first joined are not replayed.  The consumers left
+        by the previous processes of the replica are removed once they have no
+        pending messages, and the groups of the replicas not reading anymore
+        are destroyed.
+        """
+        db = self._async_redis_client
+        try:
+            await db.xgroup_create(stream_name, group, id="$", mkstream=True)
+            log.debug(f"[March Hare] Consumer group '{group}' created on '{stream_name}'.")
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        # joined right away, since a group without consumers is considered stale
+        await db.xgroup_createconsumer(stream_name, group, self.consumer_name)
+
+        for info in await db.xinfo_groups(stream_name):
+            consumers = await db.xinfo_consumers(stream_name, info["name"])
+
+            if info["name"] == group:
+                for consumer in consumers:
+                    stale = consumer["idle"] > REPLICA_GROUP_TTL * 1000 or group == self.replica_group
+                    if consumer["name"] != self.consumer_name and not consumer["pending"] and stale:
+                        await db.xgroup_delconsumer(stream_name, group, consumer["name"])
+                continue
+
+            # the group of another replica, destroyed once none of its consumers has been reading for a while
+            if info["name"].startswith(REPLICA_GROUP_PREFIX) and all(
+                consumer["idle"] > REPLICA_GROUP_TTL * 1000 for consumer in consumers
+            ):
+                await db.xgroup_destroy(stream_name, info["name"])
+                log.info(f"[March Hare] Consumer group '{info['name']}' of a gone replica destroyed.")
+
+    async def _claim(self, stream_name: str, group: str, min_idle_time: float) -> List[Tuple[str, dict]]:
+        """Claim the messages pending for longer than *min_idle_time* seconds in the group."""
+        messages = []
+        start_id = "0-0"
+        while True:
+            claimed = await self._async_redis_client.xautoclaim(
+                stream_name, group, self.consumer_name, int(min_idle_time * 1000), start_id, count=MAX_BATCH_SIZE
+            )
+            start_id = claimed[0]
+            # the messages trimmed from the stream meanwhile have no data (Redis < 7 only, later they are just dropped)
+            messages += [(message_id, data) for message_id, data in claimed[1] if data]
+            if start_id == "0-0":
+                return messages
+
+    async def _listener_loop(self, callback: Callable, stream_name: str, group: str) -> None:
         """
-        Continuously poll *stream_name* and spawn a handler Task per message.
+        Continuously read *stream_name* as a consumer of *group* and spawn a handler Task per message.
 
-        The loop starts reading from the stream immediately (so no events are
-        missed due to startup timing) but defers handler spawning until the
-        system signals readiness via :meth:`mark_ready`.
+        The loop joins the group immediately (so no events are missed due to
+        startup timing) but starts reading only once the system signals
+        readiness via :meth:`mark_ready`.  The pending messages of the group
+        are claimed periodically: at first all the ones left by the previous
+        processes of this replica, then the ones idle for a while.
 
         Backoff state is local to each invocation so that concurrent listeners
         for different streams never interfere with each other.
         """
-        last_id = "$"
+        joined = False
         retries = 0
+        next_claim = 0.
+        # the consumers of the group of the replica are its own processes: the previous ones are surely gone
+        claim_idle_time = 0. if group == self.replica_group else CLAIM_IDLE_TIME
 
         log.debug(f"[March Hare] Listener loop started for stream '{stream_name}'.")
 
         while not self._stop_event.is_set():
             try:
-                # block=100 ms so the stop flag is checked frequently
-                events = await self._async_redis_client.xread(
-                    {stream_name: last_id}, count=10, block=100
+                if not joined:
+                    await self._join_group(stream_name, group)
+                    joined = True
+
+                await self._ready_event.wait()
+
+                messages = []
+                if time.monotonic() >= next_claim:
+                    messages += await self._claim(stream_name, group, claim_idle_time)
+                    claim_idle_time = CLAIM_IDLE_TIME
+                    next_claim = time.monotonic() + CLAIM_INTERVAL
+
+                free = MAX_IN_FLIGHT - self._in_flight(stream_name)
+                if free <= 0:
+                    await asyncio.sleep(0.05)
+                    continue
+
+                batch_size = min(self._batch_sizes[stream_name], free)
+                # the read waits no longer than the next claim of the pending messages
+                block = max(min(BLOCK_TIME, int((next_claim - time.monotonic()) * 1000)), 1)
+                events = await self._async_redis_client.xreadgroup(
+                    group, self.consumer_name, {stream_name: ">"}, count=batch_size, block=block
                 )
+                read = [message for _stream, stream_messages in events or [] for message in stream_messages]
+                messages += read
 
                 if retries > 0:
                     log.info(f"[March Hare] Redis reconnected for '{stream_name}'. Resetting backoff.")
                     retries = 0
 
-                if not events:
-                    continue
-
-                # Do not spawn handlers until the lizard is fully ready
-                if not self._ready_event.is_set():
-                    # Advance the cursor so we don't replay startup-era messages
-                    # once the system becomes ready
-                    for _stream, messages in events:
-                        for message_id, _data in messages:
-                            last_id = message_id
-                    continue
+                # Full reads mean a backlog to drain: read more at once; almost empty reads mean it has been drained
+                if len(read) >= batch_size:
+                    self._batch_sizes[stream_name] = min(self._batch_sizes[stream_name] * 2, MAX_BATCH_SIZE)
+                elif len(read) < batch_size // 4:
+                    self._batch_sizes[stream_name] = max(self._batch_sizes[stream_name] // 2, MIN_BATCH_SIZE)
 
-                for _stream, messages in events:
-                    for message_id, data in messages:
-                        self._spawn_handler(callback, stream_name, message_id, data)
-                        # Advance cursor immediately; each message is handled by
-                        # its own independent Task
-                        last_id = message_id
+                for message_id, data in messages:
+                    self._spawn_handler(callback, stream_name, group, message_id, data)
 
             except asyncio.CancelledError:
                 log.debug(f"[March Hare] Listener loop for '{stream_name}' cancelled.")
                 raise  # let asyncio handle the cancellation cleanly
 
+            except ResponseError as e:
+                if self._stop_event.is_set():
+                    break
+
+                if "NOGROUP" in str(e):
+                    # the stream or the group has been deleted meanwhile
+                    log.warning(f"[March Hare] Consumer group '{group}' missing on '{stream_name}', joining again.")
+                    joined = False
+                    continue
+
+                log.error(f"[March Hare] Unexpected error in listener loop for '{stream_name}': {e}")
+                await asyncio.sleep(2)
+
             except (aioredis.ConnectionError, aioredis.TimeoutError, ValueError) as e:
                 if self._stop_event.is_set():
                     break
@@ -271,6 +501,16 @@ async def _handle_plugin_event(lizard, data: dict) -> None:
         log.error(f"[March Hare] Error processing plugin event: {e}")
 
 
+@endpoint.get("/streams", tags=["March Hare"], prefix="/march_hare", response_model=List[MarchHareStream])
+async def get_march_hare_streams(
+    info: AuthorizedInfo = check_permissions(AuthResource.SYSTEM, AuthPermission.READ),
+) -> List[MarchHareStream]:
+    """Get the lag of this replica on each stream of events, and the messages it is handling"""
+    if _march_hare is None:
+        return []
+    return [MarchHareStream(**stream) for stream in await _march_hare.stats()]
+
+
 # ------------------------------------------------------------------
 # Lifecycle hooks
 # ------------------------------------------------------------------
@@ -45,7 +45,7 @@ async def destroy_all_collection_points(
 ) -> WipeCollectionsResponse:
     """Delete and create all collections"""
     to_return = {
-        collection: bool(await info.cheshire_cat.vector_memory_handler.delete_tenant_points(collection))
+        collection: bool(await info.cheshire_cat.delete_memory_points(collection))
         for collection in await info.cheshire_cat.vector_memory_handler.get_collection_names()
     }
 
@@ -70,7 +70,7 @@ async def destroy_all_single_collection_points(
     if collection_id not in existing_collections:
         raise CustomNotFoundException("Collection does not exist.")
 
-    ret = await info.cheshire_cat.vector_memory_handler.delete_tenant_points(collection_id)
+    ret = await info.cheshire_cat.delete_memory_points(collection_id)
     return WipeCollectionsResponse(deleted={collection_id: bool(ret)})
 
 
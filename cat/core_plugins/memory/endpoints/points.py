@@ -19,6 +19,7 @@ from cat.core_plugins.memory.routes_utils import (
 from cat.exceptions import CustomValidationException
 from cat.routes.routes_utils import create_dict_parser
 from cat.services.memory.models import DocumentRecall, UpdateResult, Record, VectorMemoryType
+from cat.services.query_embeddings import QueryEmbeddingCache
 
 
 class RecallResponseQuery(BaseModel):
@@ -104,7 +105,7 @@ async def recall_memory_points_from_text(
 
     # Embed the query to plot it in the Memory page
     embedder = await lizard.embedder()
-    query_embedding = embedder.embed_query(text)
+    query_embedding = await QueryEmbeddingCache().embed_query(embedder, text)
     collection_name = str(VectorMemoryType.DECLARATIVE if not info.stray_cat else VectorMemoryType.EPISODIC)
     metadata = {k: v for k, v in metadata.items() if k != "source"}
     if info.stray_cat:
@@ -211,7 +212,7 @@ async def delete_memory_point(
         await verify_memory_point_existence(info.cheshire_cat, collection_id, point_id)
 
         # delete point
-        await info.cheshire_cat.vector_memory_handler.delete_tenant_points_by_ids(collection_id, [point_id])
+        await info.cheshire_cat.delete_memory_points_by_ids(collection_id, [point_id])
 
         return DeleteMemoryPointResponse(deleted=point_id)
     except Exception as e:
@@ -235,7 +236,7 @@ async def delete_memory_points_by_metadata(
         metadata = metadata or {}
 
         # delete points
-        ret = await ccat.vector_memory_handler.delete_tenant_points(collection_id, metadata)
+        ret = await ccat.delete_memory_points(collection_id, metadata)
 
         if source := metadata.get("source"):
             # delete the file with path `metadata["source"]` from the file storage
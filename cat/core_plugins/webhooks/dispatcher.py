@@ -0,0 +1,433 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlsplit
+from uuid import uuid4
+import httpx
+from redis.exceptions import RedisError, ResponseError
+
+from cat.db.database import get_async_db
+from cat.env import get_env_float, get_env_int
+from cat.log import log
+from cat.looking_glass.mad_hatter.copy_on_write import unwrap
+from cat.services.string_crypto import StringCrypto
+from cat.utils import pod_id
+
+# stream of the deliveries to perform, consumed by the dispatchers of all the replicas as a group
+STREAM_KEY = "webhooks:deliveries"
+GROUP_NAME = "webhooks"
+# deliveries waiting to be retried, scored by the time of the retry
+RETRIES_KEY = "webhooks:retries"
+# deliveries given up
+DEAD_LETTERS_KEY = "webhooks:dead_letters"
+
+STREAM_MAX_LEN = 100_000
+DEAD_LETTERS_MAX_LEN = 10_000
+
+DEFAULT_SIGNATURE_HEADER = "X-CheshireCat-Signature"
+
+# deliveries read from the stream at once, and in flight on a replica
+BATCH_SIZE = 50
+MAX_IN_FLIGHT = 500
+# cap of the exponential backoff, in seconds
+MAX_BACKOFF = 3600.
+# deliveries pending for this long (e.g. read by a replica that died) are claimed by another replica
+CLAIM_IDLE_TIME = 300.
+
+# moves the retries that are due back to the stream of the deliveries, atomically, so that each retry is moved once
+# even when several replicas run the script
+_MOVE_DUE_RETRIES_SCRIPT = """
+local due = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", ARGV[1], "LIMIT", 0, tonumber(ARGV[2]))
+for _, delivery in ipairs(due) do
+    redis.call("ZREM", KEYS[1], delivery)
+    local fields = {}
+    for field, value in pairs(cjson.decode(delivery)) do
+        table.insert(fields, field)
+        table.insert(fields, value)
+    end
+    redis.call("XADD", KEYS[2], "MAXLEN", "~", ARGV[3], "*", unpack(fields))
+end
+return #due
+"""
+
+
+def sign(secret: str, body: bytes) -> str:
+    """The HMAC-SHA256 signature of the body of a delivery, hex encoded."""
+    return hmac.new(secret.encode("utf-8"), msg=body, digestmod=hashlib.sha256).hexdigest()
+
+
+async def enqueue_webhooks(
+    agent_id: str, event: str, webhooks: List[Dict[str, Any]], payload: Dict[str, Any]
+) -> None:
+    """
+    Enqueue the delivery of an event to the webhooks registered for it. The deliveries are performed in background by
+    the dispatchers, see :class:`WebhookDispatcher`.
+
+    Args:
+        agent_id: The ID of the agent the webhooks are registered for.
+        event: The event.
+        webhooks: The settings of the webhooks, with their encrypted secret.
+        payload: The payload of the event, possibly holding the copy-on-write views of the arguments of a hook.
+    """
+    body = json.dumps(unwrap(payload), separators=(",", ":"))
+
+    try:
+        pipeline = get_async_db().pipeline(transaction=False)
+        for webhook in webhooks:
+            pipeline.xadd(STREAM_KEY, {
+                "delivery_id": uuid4().hex,
+                "agent_id": agent_id,
+                "event": event,
+                "url": webhook["url"],
+                "header_key": webhook.get("header_key") or DEFAULT_SIGNATURE_HEADER,
+                "secret": webhook["secret"],
+                "payload": body,
+                "attempt": "0",
+                "enqueued_at": str(time.time()),
+            }, maxlen=STREAM_MAX_LEN, approximate=True)
+        await pipeline.execute()
+        log.debug(f"Enqueued {len(webhooks)} deliveries of the event '{event}' for the agent '{agent_id}'")
+    except RedisError as e:
+        log.error(f"Redis error enqueuing the deliveries of the event '{event}' for the agent '{agent_id}': {e}")
+
+
+async def get_dead_letters(count: int = 100) -> List[Dict[str, Any]]:
+    """
+    The latest deliveries given up, latest first.
+
+    Args:
+        count: The maximum number of deliveries.
+
+    Returns:
+        The deliveries, with their ID in the dead-letter queue and without the secret of the webhook.
+    """
+    try:
+        entries = await get_async_db().xrevrange(DEAD_LETTERS_KEY, count=count)
+    except RedisError as e:
+        log.error(f"Redis error reading the dead-letter queue of the webhooks: {e}")
+        raise
+
+    return [{"id": entry_id} | {k: v for k, v in fields.items() if k != "secret"} for entry_id, fields in entries]
+
+
+async def retry_dead_letter(entry_id: str) -> bool:
+    """
+    Enqueue again a delivery given up, with a fresh count of attempts.
+
+    Args:
+        entry_id: The ID of the delivery in the dead-letter queue.
+
+    Returns:
+        Whether the delivery was found in the dead-letter queue.
+    """
+    db = get_async_db()
+    try:
+        entries = await db.xrange(DEAD_LETTERS_KEY, min=entry_id, max=entry_id)
+        if not entries:
+            return False
+
+        _, fields = entries[0]
+        fields = {k: v for k, v in fields.items() if k not in ("error", "failed_at")} | {"attempt": "0"}
+
+        pipeline = db.pipeline()
+        pipeline.xadd(STREAM_KEY, fields, maxlen=STREAM_MAX_LEN, approximate=True)
+        pipeline.xdel(DEAD_LETTERS_KEY, entry_id)
+        await pipeline.execute()
+        return True
+    except RedisError as e:
+        log.error(f"Redis error retrying the delivery {entry_id} of the dead-letter queue of the webhooks: {e}")
+        raise
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of an endpoint: after `threshold` consecutive failed deliveries the circuit opens, and no delivery
+    is attempted for `cooldown` seconds. Then a single trial delivery is let through: the circuit closes if it
+    succeeds, and opens again otherwise. A threshold of 0 never opens the circuit.
+    """
+
+    def __init__(self, threshold: int, cooldown: float, trial_timeout: float):
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._trial_timeout = trial_timeout
+
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial = False
+
+    def blocked_until(self) -> float | None:
+        """
+        Whether a delivery can be attempted now.
+
+        Returns:
+            None if the delivery can be attempted, otherwise the time when it should be attempted again.
+        """
+        if self._opened_at is None:
+            return None
+
+        now = time.time()
+        if now < (trial_at := self._opened_at + self._cooldown):
+            return trial_at
+
+        if self._trial:
+            # the outcome of the trial is known within its timeout
+            return now + self._trial_timeout
+
+        self._trial = True
+        return None
+
+    def record(self, success: bool):
+        """Record the outcome of a delivery."""
+        self._trial = False
+        if success:
+            self._failures = 0
+            self._opened_at = None
+            return
+
+        self._failures += 1
+        if self._threshold and self._failures >= self._threshold:
+            self._opened_at = time.time()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+
+class WebhookDispatcher:
+    """
+    Delivery of the webhooks, durable on a Redis Stream: the hooks enqueue the deliveries (see :func:`enqueue_webhooks`)
+    and the dispatcher of each replica consumes them as part of a consumer group, posting them in background with an
+    async HTTP client. The body of a delivery is signed with the secret of the webhook (HMAC-SHA256, in the header
+    configured by the webhook).
+
+    - Up to `CAT_WEBHOOK_CONCURRENCY` deliveries per endpoint (scheme and host of the URL) are in flight at once, each
+      one for up to `CAT_WEBHOOK_TIMEOUT` seconds.
+    - Failed deliveries (network errors, timeouts, 5xx, 408, 425 and 429 responses) are retried with an exponential
+      backoff, starting from `CAT_WEBHOOK_BACKOFF` seconds, up to `CAT_WEBHOOK_MAX_ATTEMPTS` attempts. Then, or at the
+      first rejection (any other 4xx response), they are moved to the dead-letter queue, as the malformed ones.
+    - After `CAT_WEBHOOK_BREAKER_THRESHOLD` consecutive failures of an endpoint, its deliveries are postponed for
+      `CAT_WEBHOOK_BREAKER_COOLDOWN` seconds, without counting an attempt (see :class:`CircuitBreaker`).
+    - A delivery is acknowledged once delivered, retried or given up: the deliveries of a replica dying in between are
+      claimed by another replica, so that the deliveries are performed at least once. The idle time of the deliveries
+      in flight is reset periodically, so that they are not claimed while still being performed.
+    """
+
+    def __init__(self):
+        self._consumer = f"{pod_id()}:{os.getpid()}"
+
+        self._timeout = max(get_env_float("CAT_WEBHOOK_TIMEOUT") or 0., 0.) or None
+        self._concurrency = max(get_env_int("CAT_WEBHOOK_CONCURRENCY") or 1, 1)
+        self._max_attempts = max(get_env_int("CAT_WEBHOOK_MAX_ATTEMPTS") or 1, 1)
+        self._backoff = max(get_env_float("CAT_WEBHOOK_BACKOFF") or 0., 0.)
+        self._breaker_threshold = max(get_env_int("CAT_WEBHOOK_BREAKER_THRESHOLD") or 0, 0)
+        self._breaker_cooldown = max(get_env_float("CAT_WEBHOOK_BREAKER_COOLDOWN") or 0., 0.)
+
+        self._crypto = StringCrypto()
+        self._client: httpx.AsyncClient | None = None
+        self._worker: asyncio.Task | None = None
+        # ID of the message in the stream → delivery in flight
+        self._deliveries: Dict[str, asyncio.Task] = {}
+        # endpoint → semaphore limiting the deliveries in flight, and circuit breaker
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+        self._move_due_retries = get_async_db().register_script(_MOVE_DUE_RETRIES_SCRIPT)
+
+    async def start(self):
+        """Create the consumer group, if needed, and start consuming the deliveries."""
+        if self._worker is not None and not self._worker.done():
+            return
+
+        try:
+            await get_async_db().xgroup_create(STREAM_KEY, GROUP_NAME, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+        self._client = httpx.AsyncClient(timeout=self._timeout)
+        self._worker = asyncio.create_task(self._consume(), name="webhooks:dispatcher")
+        log.debug(f"Webhook dispatcher {self._consumer} started")
+
+    async def stop(self):
+        """
+        Stop consuming the deliveries. The deliveries in flight are interrupted, and will be claimed again once idle.
+        """
+        tasks = ([self._worker] if self._worker is not None else []) + list(self._deliveries.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self._worker = None
+        self._deliveries.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        log.debug(f"Webhook dispatcher {self._consumer} stopped")
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """The circuit breaker of the endpoint of a URL."""
+        endpoint = self._endpoint(url)
+        if endpoint not in self._breakers:
+            self._breakers[endpoint] = CircuitBreaker(
+                self._breaker_threshold, self._breaker_cooldown, self._timeout or MAX_BACKOFF
+            )
+        return self._breakers[endpoint]
+
+    @staticmethod
+    def _endpoint(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    async def _consume(self):
+        db = get_async_db()
+        retries = 0
+        claimed_at = 0.
+
+        while True:
+            try:
+                await self._move_due_retries(
+                    keys=[RETRIES_KEY, STREAM_KEY], args=[time.time(), BATCH_SIZE, STREAM_MAX_LEN]
+                )
+
+                messages = []
+                if time.monotonic() - claimed_at > CLAIM_IDLE_TIME / 10:
+                    claimed_at = time.monotonic()
+                    if self._deliveries:
+                        # the deliveries in flight are not idle: reset their idle time, so that no replica claims them
+                        await db.xclaim(
+                            STREAM_KEY, GROUP_NAME, self._consumer, 0, list(self._deliveries), justid=True
+                        )
+                    claimed = await db.xautoclaim(
+                        STREAM_KEY, GROUP_NAME, self._consumer, int(CLAIM_IDLE_TIME * 1000), count=BATCH_SIZE
+                    )
+                    # the deliveries of this replica in flight since before the reset are still in flight
+                    messages += [message for message in claimed[1] if message[0] not in self._deliveries]
+
+                if (free := MAX_IN_FLIGHT - len(self._deliveries)) > 0:
+                    streams = await db.xreadgroup(
+                        GROUP_NAME, self._consumer, {STREAM_KEY: ">"}, count=min(BATCH_SIZE, free), block=1000
+                    )
+                    messages += [message for _, stream_messages in streams or [] for message in stream_messages]
+                else:
+                    await asyncio.sleep(0.1)
+
+                for message_id, fields in messages:
+                    # entries deleted while pending
+                    if not fields:
+                        await db.xack(STREAM_KEY, GROUP_NAME, message_id)
+                        continue
+
+                    task = asyncio.create_task(self._deliver(message_id, fields))
+                    self._deliveries[message_id] = task
+                    task.add_done_callback(lambda _, message_id=message_id: self._deliveries.pop(message_id, None))
+
+                retries = 0
+            except asyncio.CancelledError:
+                raise
+            except RedisError as e:
+                delay = min(60., 2 ** retries) + random.uniform(0, 1)
+                log.warning(f"Redis error consuming the webhook deliveries: {e}. Retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                retries += 1
+            except Exception as e:
+                log.error(f"Unexpected error consuming the webhook deliveries: {e}")
+                await asyncio.sleep(2)
+
+    async def _deliver(self, message_id: str, fields: Dict[str, str]):
+        try:
+            endpoint = self._endpoint(fields["url"])
+            breaker = self.breaker(fields["url"])
+            semaphore = self._semaphores.setdefault(endpoint, asyncio.Semaphore(self._concurrency))
+
+            async with semaphore:
+                if (retry_at := breaker.blocked_until()) is not None:
+                    await self._retry(message_id, fields, retry_at)
+                    return
+
+                retryable, error = await self._post(fields)
+
+            # the rejections come from a responsive endpoint
+            breaker.record(error is None or not retryable)
+
+            attempt = int(fields["attempt"]) + 1
+            if error is None:
+                await self._ack(message_id)
+                log.debug(f"Delivered the event '{fields['event']}' to the webhook '{fields['url']}'")
+            elif not retryable or attempt >= self._max_attempts:
+                await self._dead_letter(message_id, fields | {"attempt": str(attempt)}, error)
+                log.error(
+                    f"Gave up delivering the event '{fields['event']}' to the webhook '{fields['url']}' after "
+                    f"{attempt} attempts: {error}"
+                )
+            else:
+                delay = min(self._backoff * 2 ** (attempt - 1), MAX_BACKOFF) * random.uniform(1, 1.25)
+                await self._retry(message_id, fields | {"attempt": str(attempt)}, time.time() + delay)
+                log.warning(
+                    f"Failed delivering the event '{fields['event']}' to the webhook '{fields['url']}' (attempt "
+                    f"{attempt}): {error}. Retrying in {delay:.2f}s"
+                )
+        except RedisError as e:
+            # the delivery stays pending, and will be claimed again
+            log.error(f"Redis error completing the delivery {message_id} of the webhook '{fields.get('url')}': {e}")
+        except (KeyError, ValueError) as e:
+            # a malformed delivery would fail again at every claim
+            error = f"Malformed delivery: {type(e).__name__}: {e}"
+            log.error(f"Gave up the delivery {message_id} of the webhooks: {error}")
+            try:
+                await self._dead_letter(message_id, fields, error)
+            except RedisError as e:
+                log.error(f"Redis error giving up the delivery {message_id} of the webhooks: {e}")
+
+    async def _post(self, fields: Dict[str, str]) -> Tuple[bool, str | None]:
+        body = fields["payload"].encode("utf-8")
+        try:
+            secret = self._crypto.decrypt(fields["secret"])
+        except Exception as e:
+            return False, f"Invalid secret: {e}"
+
+        headers = {
+            "Content-Type": "application/json",
+            fields["header_key"]: sign(secret, body),
+            "X-CheshireCat-Event": fields["event"],
+            "X-CheshireCat-Delivery": fields["delivery_id"],
+        }
+
+        try:
+            response = await self._client.post(fields["url"], content=body, headers=headers)  # type: ignore[union-attr]
+        except httpx.HTTPError as e:
+            return True, f"{type(e).__name__}: {e}"
+
+        if response.is_success:
+            return False, None
+
+        return response.status_code >= 500 or response.status_code in (408, 425, 429), f"HTTP {response.status_code}"
+
+    async def _ack(self, message_id: str):
+        pipeline = get_async_db().pipeline()
+        pipeline.xack(STREAM_KEY, GROUP_NAME, message_id)
+        pipeline.xdel(STREAM_KEY, message_id)
+        await pipeline.execute()
+
+    async def _retry(self, message_id: str, fields: Dict[str, str], retry_at: float):
+        pipeline = get_async_db().pipeline()
+        pipeline.zadd(RETRIES_KEY, {json.dumps(fields): retry_at})
+        pipeline.xack(STREAM_KEY, GROUP_NAME, message_id)
+        pipeline.xdel(STREAM_KEY, message_id)
+        await pipeline.execute()
+
+    async def _dead_letter(self, message_id: str, fields: Dict[str, str], error: str):
+        pipeline = get_async_db().pipeline()
+        pipeline.xadd(
+            DEAD_LETTERS_KEY,
+            fields | {"error": error, "failed_at": str(time.time())},
+            maxlen=DEAD_LETTERS_MAX_LEN,
+            approximate=True,
+        )
+        pipeline.xack(STREAM_KEY, GROUP_NAME, message_id)
+        pipeline.xdel(STREAM_KEY, message_id)
+        await pipeline.execute()
@@ -1,9 +1,5 @@
-import hashlib
-import hmac
-import json
 from typing import List, Literal, get_args, Dict, Any
-import requests
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 from cat import (
     hook,
@@ -13,10 +9,17 @@ from cat import (
     AuthResource,
     AuthPermission,
     PointStruct,
-    log,
     StrayCat,
 )
 import cat.core_plugins.webhooks.crud as crud_webhook
+from cat.core_plugins.webhooks.dispatcher import (
+    DEFAULT_SIGNATURE_HEADER,
+    WebhookDispatcher,
+    enqueue_webhooks,
+    get_dead_letters,
+    retry_dead_letter,
+)
+from cat.exceptions import CustomNotFoundException
 from cat.services.string_crypto import StringCrypto
 
 
@@ -37,31 +40,46 @@ WEBHOOK_CHESHIRECAT_EVENTS = [
 
 crypto = StringCrypto()
 
+_dispatcher: WebhookDispatcher | None = None
+
 
 class WebhookResponse(BaseModel):
     url: str
     event: WEBHOOK_EVENT
-    header_key: str | None = Field(default="X-CheshireCat-Signature")
+    header_key: str | None = Field(default=DEFAULT_SIGNATURE_HEADER)
 
 
 class WebhookPayload(WebhookResponse):
     secret: str
 
 
-def trigger_webhook(webhook_data: WebhookPayload, payload: Dict[str, Any]):
-    target_url = webhook_data.url
-    custom_header_key = webhook_data.header_key
-
-    secret = crypto.decrypt(webhook_data.secret)
-
-    signature = hmac.new(
-        secret.encode("utf-8"),
-        msg=json.dumps(payload, separators=(',', ':')).encode("utf-8"),
-        digestmod=hashlib.sha256,
-    ).hexdigest()
+class WebhookDeadLetter(BaseModel):
+    # a malformed delivery is dead-lettered as it is, so that any of its fields may be missing
+    id: str
+    delivery_id: str | None = None
+    agent_id: str | None = None
+    event: str | None = None
+    url: str | None = None
+    payload: str | None = None
+    attempt: int = 0
+    error: str = ""
+    failed_at: float | None = None
+
+    @field_validator("attempt", mode="before")
+    @classmethod
+    def validate_attempt(cls, v):
+        try:
+            return int(v)
+        except (TypeError, ValueError):
+            return 0
 
-    headers = {"Content-Type": "application/json", custom_header_key: signature}
-    requests.post(target_url, json=payload, headers=headers)
+    @field_validator("failed_at", mode="before")
+    @classmethod
+    def validate_failed_at(cls, v):
+        try:
+            return float(v)
+        except (TypeError, ValueError):
+            return None
 
 
 def parse_agent_key(info: AuthorizedInfo, webhook: WebhookPayload) -> str:
@@ -72,15 +90,11 @@ def parse_agent_key(info: AuthorizedInfo, webhook: WebhookPayload) -> str:
     return info.cheshire_cat.agent_key
 
 
-def notify_plugin_event_to_webhooks(plugin_id: str, webhooks: List[Dict[str, Any]], success: bool, what: str):
+async def notify_plugin_event_to_webhooks(
+    agent_id: str, event: str, plugin_id: str, webhooks: List[Dict[str, Any]], success: bool
+):
     payload = {"plugin_id": plugin_id, "success": success}
-
-    for webhook in webhooks:
-        try:
-            trigger_webhook(WebhookPayload(**webhook), payload)
-            log.info(f"Triggered webhook {webhook['url']} on plugin {what}")
-        except Exception as e:
-            log.error(f"Failed to trigger the webhook '{webhook['url']}' on plugin {what}: {e}")
+    await enqueue_webhooks(agent_id, event, webhooks, payload)
 
 
 @endpoint.get("/events", tags=["Webhooks"], prefix="/webhooks", response_model=List[str])
@@ -106,6 +120,26 @@ async def register_webhook(
     )
 
 
+@endpoint.get("/dead_letters", tags=["Webhooks"], prefix="/webhooks", response_model=List[WebhookDeadLetter])
+async def get_webhooks_dead_letters(
+    count: int = 100,
+    info: AuthorizedInfo = check_permissions(AuthResource.SYSTEM, AuthPermission.READ),
+) -> List[WebhookDeadLetter]:
+    """Get the latest deliveries of the webhooks given up, latest first"""
+    return [WebhookDeadLetter(**entry) for entry in await get_dead_letters(count)]
+
+
+@endpoint.post("/dead_letters/{entry_id}", tags=["Webhooks"], prefix="/webhooks")
+async def retry_webhooks_dead_letter(
+    entry_id: str,
+    info: AuthorizedInfo = check_permissions(AuthResource.SYSTEM, AuthPermission.WRITE),
+) -> Dict[str, bool]:
+    """Deliver again a delivery of a webhook given up"""
+    if not await retry_dead_letter(entry_id):
+        raise CustomNotFoundException("Delivery not found")
+    return {"success": True}
+
+
 @endpoint.delete("/", tags=["Webhooks"], prefix="/webhooks")
 async def delete_webhook(
     webhook: WebhookPayload,
@@ -119,6 +153,23 @@ async def delete_webhook(
     await crud_webhook.delete_webhook(agent_id, webhook.event, webhook.url, secret)
 
 
+@hook(priority=0)
+async def after_lizard_bootstrap(lizard) -> None:
+    global _dispatcher
+
+    _dispatcher = WebhookDispatcher()
+    await _dispatcher.start()
+
+
+@hook(priority=0)
+async def before_lizard_shutdown(lizard) -> None:
+    global _dispatcher
+
+    if _dispatcher is not None:
+        await _dispatcher.stop()
+        _dispatcher = None
+
+
 @hook(priority=0)
 async def after_rabbithole_stored_documents(source, stored_points: List[PointStruct], cat) -> None:
     webhooks = await crud_webhook.get_webhooks(cat.agent_key, "knowledge_source_loaded")
@@ -132,13 +183,7 @@ async def after_rabbithole_stored_documents(source, stored_points: List[PointStr
         "points": [point.payload.get("metadata") for point in stored_points],
         "success": len(stored_points) > 0,
     }
-
-    for webhook in webhooks:
-        try:
-            trigger_webhook(WebhookPayload(**webhook), payload)
-            log.info(f"Triggered the webhook '{webhook['url']}' for the agent '{cat.agent_key}' on knowledge source loaded")
-        except Exception as e:
-            log.error(f"Failed to trigger the webhook '{webhook['url']}' for the agent '{cat.agent_key}' on knowledge source loaded: {e}")
+    await enqueue_webhooks(cat.agent_key, "knowledge_source_loaded", webhooks, payload)
 
 
 @hook(priority=0)
@@ -148,7 +193,7 @@ async def lizard_notify_plugin_installation(plugin_id: str, plugin_path: str, li
         return
 
     success = bool(plugin_id and lizard.plugin_manager.plugins.get(plugin_id))
-    notify_plugin_event_to_webhooks(plugin_id, webhooks, success, "installation")
+    await notify_plugin_event_to_webhooks(lizard.agent_key, "plugin_installed", plugin_id, webhooks, success)
 
 
 @hook(priority=0)
@@ -158,7 +203,7 @@ async def lizard_notify_plugin_uninstallation(plugin_id: str, lizard) -> None:
         return
 
     success = lizard.plugin_manager.plugins.get(plugin_id) is None
-    notify_plugin_event_to_webhooks(plugin_id, webhooks, success, "uninstallation")
+    await notify_plugin_event_to_webhooks(lizard.agent_key, "plugin_uninstalled", plugin_id, webhooks, success)
 
 
 @hook(priority=0)
@@ -167,14 +212,7 @@ async def after_all_cheshire_cats_embedded(success: bool, lizard) -> None:
     if webhooks is None:
         return
 
-    payload = {"success": success}
-
-    for webhook in webhooks:
-        try:
-            trigger_webhook(WebhookPayload(**webhook), payload)
-            log.info(f"Triggered webhook {webhook['url']} on embedder updated")
-        except Exception as e:
-            log.error(f"Failed to trigger the webhook '{webhook['url']}' on embedder updated: {e}")
+    await enqueue_webhooks(lizard.agent_key, "embedder_updated", webhooks, {"success": success})
 
 
 @hook(priority=0)
@@ -184,13 +222,7 @@ async def after_file_manager_transfer_on_agent(success: bool, cat) -> None:
         return
 
     payload = {"agent": cat.agent_key, "success": success}
-
-    for webhook in webhooks:
-        try:
-            trigger_webhook(WebhookPayload(**webhook), payload)
-            log.info(f"Triggered the webhook '{webhook['url']}' for the agent '{cat.agent_key}' on knowledge source files transferred")
-        except Exception as e:
-            log.error(f"Failed to trigger the webhook '{webhook['url']}' for the agent '{cat.agent_key}' on knowledge source files transferred: {e}")
+    await enqueue_webhooks(cat.agent_key, "knowledge_source_files_transferred", webhooks, payload)
 
 
 @hook(priority=0)
@@ -200,10 +232,4 @@ async def after_vector_memory_transfer_on_agent(success: bool, cat) -> None:
         return
 
     payload = {"agent": cat.agent_key, "success": success}
-
-    for webhook in webhooks:
-        try:
-            trigger_webhook(WebhookPayload(**webhook), payload)
-            log.info(f"Triggered the webhook '{webhook['url']}' for the agent '{cat.agent_key}' on vector memory points transferred")
-        except Exception as e:
-            log.error(f"Failed to trigger the webhook '{webhook['url']}' for the agent '{cat.agent_key}' on vector memory points transferred: {e}")
+    await enqueue_webhooks(cat.agent_key, "vector_memory_files_transferred", webhooks, payload)
@@ -1,4 +1,5 @@
 from cat import hook, MessageWhy, CatMessage, AgenticWorkflowOutput
+from cat.looking_glass.mad_hatter.copy_on_write import unwrap
 
 
 @hook(priority=1)
@@ -15,7 +16,7 @@ def before_cat_sends_message(message: CatMessage, agent_output: AgenticWorkflowO
     # why this response?
     message.why = MessageWhy(
         input=cat.working_memory.user_message.text,
-        intermediate_steps=agent_output.intermediate_steps,
+        intermediate_steps=unwrap(agent_output.intermediate_steps),
         memory=memory,
     )
 
@@ -1,8 +1,17 @@
-from typing import Dict, List, Any
-from redis.exceptions import RedisError
+import json
+import time
+from typing import Dict, List, Any, Tuple
+from redis.asyncio.client import Pipeline
+from redis.exceptions import RedisError, ResponseError
 
 from cat.db import crud
-from cat.db.database import DEFAULT_AGENTS_KEY, DEFAULT_CONVERSATIONS_KEY, get_async_db
+from cat.db.database import (
+    DEFAULT_AGENTS_KEY,
+    DEFAULT_CONVERSATIONS_INDEX_KEY,
+    DEFAULT_CONVERSATIONS_KEY,
+    DEFAULT_CONVERSATIONS_OWNERS_KEY,
+    get_async_db,
+)
 from cat.env import get_env_int
 from cat.log import log
 from cat.services.memory.messages import ConversationMessage
@@ -25,6 +34,66 @@ def _get_expiration() -> int | None:
         raise ValueError(message)
 
 
+# paths of the attributes of a conversation, read without reading its messages: the metadata record of the conversation
+# (name, metadata, number of messages, creation and last update) maintained along with the messages, and the time of
+# the first and last messages, for the conversations stored before the record was introduced
+_ATTRIBUTES_PATHS = (
+    "$.name", "$.metadata", "$.num_messages", "$.created_at", "$.updated_at", "$.messages[0].when", "$.messages[-1].when",
+)
+
+
+# KEYS: conversation. Pops the last message and, only if a message was popped, updates the metadata record of the
+# conversation (missing in the conversations stored before it was introduced, thus left untouched). Returns the JSON of
+# the popped message, if any.
+_POP_LAST_MESSAGE_SCRIPT = """
+local key = KEYS[1]
+if redis.call("EXISTS", key) == 0 then
+    return nil
+end
+
+local popped = redis.call("JSON.ARRPOP", key, "$.messages", -1)[1]
+if not popped then
+    return nil
+end
+
+if #redis.call("JSON.TYPE", key, "$.num_messages") > 0 then
+    redis.call("JSON.NUMINCRBY", key, "$.num_messages", -1)
+end
+local updated_at = string.sub(redis.call("JSON.GET", key, "$.messages[-1].when"), 2, -2)
+redis.call("JSON.SET", key, "$.updated_at", updated_at ~= "" and updated_at or "null", "XX")
+return popped
+"""
+
+
+def _first(values: List | None, default: Any = None) -> Any:
+    # values of a JSONPath ("$...") read: a list of the matches
+    return values[0] if values else default
+
+
+def _result(result: Any) -> Any:
+    # JSON.ARRLEN fails on a missing key (a new conversation, or one expired in the meanwhile) instead of answering nil
+    if isinstance(result, ResponseError) and "doesn't exist" in str(result):
+        return None
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def _messages_path(latest_n: int | None) -> str:
+    return f"$.messages[-{latest_n}:]" if latest_n else "$.messages[*]"
+
+
+def _parse_attributes(chat_id: str, values: Dict[str, List], num_messages: List[int | None] | None) -> Dict[str, Any]:
+    return {
+        "chat_id": chat_id,
+        "name": _first(values.get("$.name"), chat_id),
+        "num_messages": _first(values.get("$.num_messages")) or _first(num_messages) or 0,
+        "metadata": _first(values.get("$.metadata"), {}),
+        "created_at": _first(values.get("$.created_at")) or _first(values.get("$.messages[0].when")),
+        "updated_at": _first(values.get("$.updated_at")) or _first(values.get("$.messages[-1].when")),
+    }
+
+
 def format_key(agent_id: str, user_id: str, chat_id: str) -> str:
     """
     Format Redis key for a conversation.
@@ -40,6 +109,68 @@ def format_key(agent_id: str, user_id: str, chat_id: str) -> str:
     return f"{DEFAULT_AGENTS_KEY}:{agent_id}:{DEFAULT_CONVERSATIONS_KEY}:{user_id}:{chat_id}"
 
 
+def format_index_key(agent_id: str, user_id: str) -> str:
+    """
+    Format Redis key for the index of the conversations of a user: a sorted set of the chat IDs, scored by the time of
+    their last activity.
+
+    Args:
+        agent_id: ID of the chatbot.
+        user_id: ID of the user.
+
+    Returns:
+        Formatted key (e.g., "agents:<agent_id>:conversations_index:<user_id>").
+    """
+    return f"{DEFAULT_AGENTS_KEY}:{agent_id}:{DEFAULT_CONVERSATIONS_INDEX_KEY}:{user_id}"
+
+
+def format_owners_key(agent_id: str) -> str:
+    """
+    Format Redis key for the chat ID -> user ID index of an agent. A chat ID used by several users maps to "".
+
+    Args:
+        agent_id: ID of the chatbot.
+
+    Returns:
+        Formatted key (e.g., "agents:<agent_id>:conversations_owners").
+    """
+    return f"{DEFAULT_AGENTS_KEY}:{agent_id}:{DEFAULT_CONVERSATIONS_OWNERS_KEY}"
+
+
+def _index_conversation(
+    pipeline: Pipeline, agent_id: str, user_id: str, chat_id: str, when: float, expiration: int | None
+):
+    # queue the indexing of a conversation along with its write, the owner of the chat ID being read back last
+    index_key = format_index_key(agent_id, user_id)
+    owners_key = format_owners_key(agent_id)
+
+    pipeline.zadd(index_key, {chat_id: when})
+    pipeline.hsetnx(owners_key, chat_id, user_id)
+    if expiration:
+        # the indexes live as long as the latest conversation they refer to
+        pipeline.expire(index_key, expiration)
+        pipeline.expire(owners_key, expiration)
+    pipeline.hget(owners_key, chat_id)
+
+
+async def _check_owner(agent_id: str, user_id: str, chat_id: str, owner: str | None):
+    # a chat ID used by several users has no single owner
+    if owner and owner != user_id:
+        log.warning(f"Conversation '{chat_id}' of agent '{agent_id}' is used by several users")
+        await get_async_db().hset(format_owners_key(agent_id), chat_id, "")
+
+
+async def _read_attributes(db, keys: List[str]) -> List[Tuple[Dict[str, List] | None, List[int | None] | None]]:
+    # One pipeline to read the attributes of every conversation in a single round-trip
+    pipeline = db.pipeline(transaction=False)
+    for key in keys:
+        pipeline.json().get(key, *_ATTRIBUTES_PATHS)
+        pipeline.json().arrlen(key, "$.messages")
+    raw_results = [_result(result) for result in await pipeline.execute(raise_on_error=False)]
+
+    return list(zip(raw_results[::2], raw_results[1::2]))
+
+
 async def get_conversation(agent_id: str, user_id: str, chat_id: str) -> Dict[str, Any] | None:
     """
     Retrieve a specific conversation from Redis.
@@ -66,16 +197,66 @@ async def get_conversation(agent_id: str, user_id: str, chat_id: str) -> Dict[st
         raise
 
 
-async def get_conversations_attributes(agent_id: str, user_id: str, with_user: bool = False) -> List[Dict[str, Any]]:
+async def _get_indexed_attributes(
+    db, agent_id: str, user_id: str, limit: int | None, before: float | None
+) -> List[Tuple[float, Dict[str, Any]]]:
+    index_key = format_index_key(agent_id, user_id)
+
+    if expiration := _get_expiration():
+        # lazy pruning of the conversations expired for sure
+        await db.zremrangebyscore(index_key, "-inf", f"({time.time() - expiration}")
+
+    results: List[Tuple[float, Dict[str, Any]]] = []
+    max_score = f"({before}" if before is not None else "+inf"
+    while True:
+        entries = await db.zrevrangebyscore(
+            index_key,
+            max_score,
+            "-inf",
+            start=0 if limit else None,
+            num=limit - len(results) if limit else None,
+            withscores=True,
+        )
+        if not entries:
+            break
+
+        keys = [format_key(agent_id, user_id, chat_id) for chat_id, _ in entries]
+        stale = []
+        for (chat_id, score), (values, num_messages) in zip(entries, await _read_attributes(db, keys)):
+            if not values:
+                stale.append(chat_id)
+                continue
+            results.append((score, _parse_attributes(chat_id, values, num_messages)))
+
+        if stale:
+            # lazy pruning of the conversations expired (or deleted) in the meanwhile
+            await db.zrem(index_key, *stale)
+
+        # a page shortened by the pruning is filled with the following conversations
+        if not limit or len(results) >= limit or not stale:
+            break
+        max_score = f"({entries[-1][1]}"
+
+    return results
+
+
+async def get_conversations_attributes(
+    agent_id: str, user_id: str, with_user: bool = False, limit: int | None = None, before: float | None = None
+) -> List[Dict[str, Any]]:
     """
-    Retrieve conversations parameters from Redis.
+    Retrieve conversations parameters from Redis, the most recently active first.
 
-    Uses a single SCAN + one MGET pipeline instead of N+1 individual round-trips.
+    The conversations are listed from the index of the conversations of the user, so the cost grows with the
+    conversations of the user instead of those of the whole agent, and their attributes are read in one pipeline, out
+    of their metadata record instead of their messages. Pages are requested with a cursor: the time of the last
+    activity of the last conversation of the previous page (i.e., its `updated_at`).
 
     Args:
         agent_id: ID of the chatbot.
-        user_id: ID of the user.
+        user_id: ID of the user, or "*" for the conversations of every user of the agent.
         with_user: Whether to include the user_id in the results (default: False).
+        limit: Maximum number of conversations to return (default: None, all the conversations).
+        before: Only return the conversations last active before this timestamp (default: None, no cursor).
 
     Returns:
         List of dictionaries, each one having the format
@@ -94,42 +275,23 @@ async def get_conversations_attributes(agent_id: str, user_id: str, with_user: b
     """
     try:
         db = get_async_db()
-        pattern = format_key(agent_id, user_id, "*")
 
-        # One SCAN to collect all conversation keys
-        keys = [k async for k in db.scan_iter(match=pattern)]
-        if not keys:
-            return []
-
-        # One MGET to read every conversation in a single round-trip
-        raw_results = await db.json().mget(keys, "$")
-
-        results = []
-        for key_str, raw in zip(keys, raw_results):
-            if not raw:
-                continue
-            parts = key_str.split(":")
-            if len(parts) != 5:
-                continue
-            _, _agent_id, _, _user_id, chat_id = parts
-
-            conversation = raw[0] if isinstance(raw, list) else raw
-            messages = conversation.get("messages", [])
-            num_messages = len(messages)
-            result = {
-                "chat_id": chat_id,
-                "name": conversation.get("name", chat_id),
-                "num_messages": num_messages,
-                "metadata": conversation.get("metadata", {}),
-                "created_at": messages[0]["when"] if num_messages > 0 else None,
-                "updated_at": messages[-1]["when"] if num_messages > 0 else None,
-            }
-            if with_user:
-                result["user_id"] = _user_id
-
-            results.append(result)
-
-        return results
+        if user_id == "*":
+            # one index per user: the SCAN grows with the users of the agent, not with their conversations
+            index_keys = [k async for k in db.scan_iter(match=format_index_key(agent_id, "*"))]
+            user_ids = [k.rsplit(":", 1)[-1] for k in index_keys]
+        else:
+            user_ids = [user_id]
+
+        scored = []
+        for _user_id in user_ids:
+            for score, result in await _get_indexed_attributes(db, agent_id, _user_id, limit, before):
+                if with_user:
+                    result["user_id"] = _user_id
+                scored.append((score, result))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [result for _, result in scored[:limit]]
     except RedisError as e:
         log.error(f"Failed to get chat attributes for '{agent_id}:{user_id}': {e}")
         raise
@@ -157,32 +319,19 @@ async def get_conversation_attributes(agent_id: str, user_id: str, chat_id: str)
         or None if conversation not found.
     """
     try:
-        conversation = await get_conversation(agent_id, user_id, chat_id)
-        if not conversation:
+        [(values, num_messages)] = await _read_attributes(get_async_db(), [format_key(agent_id, user_id, chat_id)])
+        if not values:
             return None
 
-        messages = conversation.get("messages", [])
-        num_messages = len(messages)
-
-        # Extract created_at (first message) and updated_at (last message)
-        created_at = messages[0]["when"] if num_messages > 0 else None
-        updated_at = messages[-1]["when"] if num_messages > 0 else None
-
-        # Retrieve the conversation name for the specific key
-        return {
-            "chat_id": chat_id,
-            "name": conversation.get("name", chat_id),
-            "num_messages": num_messages,
-            "metadata": conversation.get("metadata", {}),
-            "created_at": created_at,
-            "updated_at": updated_at,
-        }
+        return _parse_attributes(chat_id, values, num_messages)
     except RedisError as e:
         log.error(f"Failed to get chat attributes for '{agent_id}:{user_id}': {e}")
         raise
 
 
-async def get_messages(agent_id: str, user_id: str, chat_id: str) -> List[Dict[str, Any]]:
+async def get_messages(
+    agent_id: str, user_id: str, chat_id: str, latest_n: int | None = None
+) -> List[Dict[str, Any]]:
     """
     Retrieve conversation messages from Redis.
 
@@ -190,6 +339,7 @@ async def get_messages(agent_id: str, user_id: str, chat_id: str) -> List[Dict[s
         agent_id: ID of the chatbot.
         user_id: ID of the user.
         chat_id: ID of the chat session.
+        latest_n: Number of latest messages to retrieve, sliced by Redis. If None, all the messages are retrieved.
 
     Returns:
         List of conversation messages, or empty list if not found.
@@ -198,13 +348,44 @@ async def get_messages(agent_id: str, user_id: str, chat_id: str) -> List[Dict[s
         RedisError: If Redis connection fails.
     """
     try:
-        messages = await crud.read(format_key(agent_id, user_id, chat_id), path="$.messages")
+        messages = await get_async_db().json().get(format_key(agent_id, user_id, chat_id), _messages_path(latest_n))
         return messages if messages else []  # type: ignore[return-value]
     except RedisError as e:
         log.error(f"Failed to get conversation '{chat_id}' for '{agent_id}:{user_id}': {e}")
         raise
 
 
+async def get_latest_messages(
+    agent_id: str, user_id: str, chat_id: str, latest_n: int | None = None
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Retrieve the latest messages of a conversation from Redis, along with the number of messages of the conversation,
+    in a single round-trip.
+
+    Args:
+        agent_id: ID of the chatbot.
+        user_id: ID of the user.
+        chat_id: ID of the chat session.
+        latest_n: Number of latest messages to retrieve, sliced by Redis. If None, all the messages are retrieved.
+
+    Returns:
+        List of the latest conversation messages (empty if not found), and number of messages of the conversation.
+
+    Raises:
+        RedisError: If Redis connection fails.
+    """
+    try:
+        key = format_key(agent_id, user_id, chat_id)
+        pipeline = get_async_db().pipeline(transaction=False)
+        pipeline.json().get(key, _messages_path(latest_n))
+        pipeline.json().arrlen(key, "$.messages")
+        messages, num_messages = [_result(result) for result in await pipeline.execute(raise_on_error=False)]
+        return messages or [], _first(num_messages) or 0
+    except RedisError as e:
+        log.error(f"Failed to get conversation '{chat_id}' for '{agent_id}:{user_id}': {e}")
+        raise
+
+
 async def set_messages(
     agent_id: str, user_id: str, chat_id: str, messages: List[ConversationMessage]
 ) -> List[Dict[str, Any]]:
@@ -228,14 +409,30 @@ async def set_messages(
         formatted = [message.model_dump() for message in messages]
         expiration = _get_expiration()
         key = format_key(agent_id, user_id, chat_id)
+        updated_at = messages[-1].when if messages else None
 
-        existing_data = await crud.read(key)
-
-        if existing_data is None:
-            await crud.store(key, {"name": chat_id, "messages": formatted}, expire=expiration)
-            return formatted
+        db = get_async_db()
+        new = not await db.exists(key)
+
+        pipeline = db.pipeline()
+        if new:
+            pipeline.json().set(key, "$", crud.serialize_to_redis_json({
+                "name": chat_id,
+                "messages": formatted,
+                "num_messages": len(formatted),
+                "created_at": messages[0].when if messages else None,
+                "updated_at": updated_at,
+            }))
+        else:
+            pipeline.json().set(key, "$.messages", crud.serialize_to_redis_json(formatted))
+            pipeline.json().set(key, "$.num_messages", len(formatted))
+            pipeline.json().set(key, "$.updated_at", updated_at)
+        if expiration:
+            pipeline.expire(key, expiration)
+        _index_conversation(pipeline, agent_id, user_id, chat_id, updated_at or time.time(), expiration)
+        results = await pipeline.execute()
 
-        await crud.store(key, formatted, path="$.messages", expire=expiration)
+        await _check_owner(agent_id, user_id, chat_id, results[-1])
         return formatted
     except RedisError as e:
         log.error(f"Redis error storing conversation '{chat_id}' for '{agent_id}:{user_id}': {e}")
@@ -268,14 +465,14 @@ async def set_attributes(
         return
 
     try:
-        conversation = await get_conversation(agent_id, user_id, chat_id)
-        if not conversation:
+        key = format_key(agent_id, user_id, chat_id)
+        if not await get_async_db().exists(key):
             return
 
         if name:
-            await crud.store(format_key(agent_id, user_id, chat_id), name, path="$.name")
+            await crud.store(key, name, path="$.name")
 
-        current_metadata = conversation.get("metadata", {})
+        current_metadata = _first(await get_async_db().json().get(key, "$.metadata"), {})
         if metadata or first_time:
             current_metadata.update(metadata)
             await crud.store(
@@ -287,22 +484,25 @@ async def set_attributes(
 
 
 async def update_messages(
-    agent_id: str, user_id: str, chat_id: str, updated_info: ConversationMessage
-) -> List[Dict[str, Any]]:
+    agent_id: str, user_id: str, chat_id: str, updated_info: ConversationMessage, latest_n: int | None = None
+) -> Tuple[List[Dict[str, Any]], int]:
     """
     Append a new message to the conversation in Redis atomically.
 
-    Uses JSON.SET NX to initialise the structure if absent, then JSON.ARRAPPEND to append the message. Both operations
-    are atomic on the Redis side, so concurrent calls from multiple replicas cannot produce lost updates.
+    Uses JSON.SET NX to initialise the structure if absent, then JSON.ARRAPPEND to append the message and updates the
+    metadata record and the indexes of the conversation, in a single transaction. The operations are atomic on the Redis side, so
+    concurrent calls from multiple replicas cannot produce lost updates. The latest messages are read back in the same
+    transaction, sliced by Redis, so that the cost does not grow with the length of the conversation.
 
     Args:
         agent_id: ID of the chatbot.
         user_id: ID of the user.
         chat_id: ID of the chat session.
         updated_info: New conversation message to append.
+        latest_n: Number of latest messages to read back. If None, all the messages are read back.
 
     Returns:
-        Updated conversation messages.
+        Latest conversation messages, and number of messages of the conversation.
 
     Raises:
         RedisError: If Redis connection fails.
@@ -313,29 +513,72 @@ async def update_messages(
         serialized = crud.serialize_to_redis_json(updated_info.model_dump())
         expiration = _get_expiration()
 
-        db = get_async_db()
+        pipeline = get_async_db().pipeline()
 
         # Atomically initialise the root structure only if the key does not exist yet.
         # If two replicas race here, only one SET NX will succeed; the other is a no-op,
         # and both will then safely append via ARRAPPEND.
-        await db.json().set(key, "$", {"name": chat_id, "messages": []}, nx=True)
+        pipeline.json().set(key, "$", {
+            "name": chat_id,
+            "messages": [],
+            "num_messages": 0,
+            "created_at": updated_info.when,
+            "updated_at": None,
+        }, nx=True)
 
         # ARRAPPEND is a single atomic Redis command: no read-modify-write, no lost updates.
-        await db.json().arrappend(key, "$.messages", serialized)  # type: ignore[arg-type]
+        pipeline.json().arrappend(key, "$.messages", serialized)  # type: ignore[arg-type]
+
+        # the metadata record (missing in the conversations stored before it was introduced, thus left untouched)
+        pipeline.json().numincrby(key, "$.num_messages", 1)
+        pipeline.json().set(key, "$.updated_at", updated_info.when, xx=True)
 
         if expiration:
-            await db.expire(key, expiration)
+            pipeline.expire(key, expiration)
+
+        # the indexes of the conversations, in the same transaction
+        _index_conversation(pipeline, agent_id, user_id, chat_id, updated_info.when, expiration)
+
+        pipeline.json().get(key, _messages_path(latest_n))
+        results = await pipeline.execute()
+
+        await _check_owner(agent_id, user_id, chat_id, results[-2])
 
         log.debug(f"Appended conversation item for {agent_id}:{user_id}")
-        return await get_messages(agent_id, user_id, chat_id)
+        return results[-1] or [], _first(results[1]) or 0
     except (RedisError, ValueError) as e:
         log.error(f"Redis error updating conversation '{chat_id}' for '{agent_id}:{user_id}': {e}")
         raise
 
 
+async def pop_last_message(agent_id: str, user_id: str, chat_id: str) -> Dict[str, Any] | None:
+    """
+    Remove the last message of the conversation in Redis atomically, updating the number of messages and the time of
+    the last update of the conversation only if a message was removed.
+
+    Args:
+        agent_id: ID of the chatbot.
+        user_id: ID of the user.
+        chat_id: ID of the chat session.
+
+    Returns:
+        The removed message, or None if the conversation has no messages.
+
+    Raises:
+        RedisError: If Redis connection fails.
+    """
+    try:
+        script = get_async_db().register_script(_POP_LAST_MESSAGE_SCRIPT)
+        popped = await script(keys=[format_key(agent_id, user_id, chat_id)])
+        return json.loads(popped) if popped else None
+    except RedisError as e:
+        log.error(f"Redis error popping the last message of conversation '{chat_id}' for '{agent_id}:{user_id}': {e}")
+        raise
+
+
 async def delete_conversation(agent_id: str, user_id: str, chat_id: str):
     """
-    Delete conversation for a specific user and agent.
+    Delete conversation for a specific user and agent, along with its index entries.
 
     Args:
         agent_id: ID of the chatbot.
@@ -346,7 +589,15 @@ async def delete_conversation(agent_id: str, user_id: str, chat_id: str):
         RedisError: If Redis connection fails.
     """
     try:
-        return await crud.delete(format_key(agent_id, user_id, chat_id))
+        db = get_async_db()
+        pipeline = db.pipeline()
+        pipeline.json().delete(format_key(agent_id, user_id, chat_id), "$")
+        pipeline.zrem(format_index_key(agent_id, user_id), chat_id)
+        pipeline.hget(format_owners_key(agent_id), chat_id)
+        *_, owner = await pipeline.execute()
+
+        if owner == user_id:
+            await db.hdel(format_owners_key(agent_id), chat_id)
     except RedisError as e:
         log.error(f"Redis error deleting conversation '{chat_id}' for '{agent_id}:{user_id}': {e}")
         raise
@@ -354,7 +605,7 @@ async def delete_conversation(agent_id: str, user_id: str, chat_id: str):
 
 async def delete_conversations(agent_id: str, user_id: str):
     """
-    Delete all conversations for a specific user and agent.
+    Delete all conversations for a specific user and agent, along with their index.
 
     Args:
         agent_id: ID of the chatbot.
@@ -364,7 +615,21 @@ async def delete_conversations(agent_id: str, user_id: str):
         RedisError: If Redis connection fails.
     """
     try:
-        return await crud.delete(format_key(agent_id, user_id, "*"))
+        db = get_async_db()
+        index_key = format_index_key(agent_id, user_id)
+        owners_key = format_owners_key(agent_id)
+
+        chat_ids = await db.zrange(index_key, 0, -1)
+        if not chat_ids:
+            return
+
+        owners = await db.hmget(owners_key, chat_ids)
+
+        pipeline = db.pipeline()
+        pipeline.delete(*[format_key(agent_id, user_id, chat_id) for chat_id in chat_ids], index_key)
+        if owned := [chat_id for chat_id, owner in zip(chat_ids, owners) if owner == user_id]:
+            pipeline.hdel(owners_key, *owned)
+        await pipeline.execute()
     except RedisError as e:
         log.error(f"Redis error deleting conversations for {agent_id}:{user_id}: {e}")
         raise
@@ -372,7 +637,7 @@ async def delete_conversations(agent_id: str, user_id: str):
 
 async def destroy_all(agent_id: str):
     """
-    Delete all conversations for a specific agent.
+    Delete all conversations for a specific agent, along with their indexes.
 
     Args:
         agent_id: ID of the chatbot.
@@ -382,13 +647,51 @@ async def destroy_all(agent_id: str):
     """
     try:
         await crud.destroy(format_key(agent_id, "*", "*"))
+        await crud.destroy(format_index_key(agent_id, "*"))
+        await get_async_db().delete(format_owners_key(agent_id))
     except RedisError as e:
         log.error(f"Redis error destroying conversations for {agent_id}: {e}")
         raise
 
 
 async def get_user_id_from_conversation_keys(agent_id: str, chat_id: str) -> str | None:
-    pattern = format_key(agent_id, "*", chat_id)
+    """
+    Retrieve the user owning a conversation, through the chat ID -> user ID index of the agent.
+
+    Args:
+        agent_id: ID of the chatbot.
+        chat_id: ID of the chat session.
 
-    user_ids = list({k.split(":")[3] async for k in get_async_db().scan_iter(pattern)})
-    return user_ids[0] if len(user_ids) == 1 else None
+    Returns:
+        The ID of the user, or None if the conversation does not exist or is used by several users.
+
+    Raises:
+        RedisError: If Redis connection fails.
+    """
+    try:
+        db = get_async_db()
+        owners_key = format_owners_key(agent_id)
+
+        owner = await db.hget(owners_key, chat_id)
+        if owner is None:
+            return None
+
+        if owner:
+            if await db.exists(format_key(agent_id, owner, chat_id)):
+                return owner
+
+            # lazy pruning of the conversations expired (or deleted) in the meanwhile
+            await db.hdel(owners_key, chat_id)
+            return None
+
+        # a chat ID used by several users: the conversations are looked up, in case only one of them is left
+        user_ids = list({k.split(":")[3] async for k in db.scan_iter(format_key(agent_id, "*", chat_id))})
+        if not user_ids:
+            await db.hdel(owners_key, chat_id)
+        elif len(user_ids) == 1:
+            await db.hset(owners_key, chat_id, user_ids[0])
+
+        return user_ids[0] if len(user_ids) == 1 else None
+    except RedisError as e:
+        log.error(f"Redis error getting the user of conversation '{chat_id}' for '{agent_id}': {e}")
+        raise
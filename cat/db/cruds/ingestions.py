@@ -0,0 +1,264 @@
+import hashlib
+import json
+import uuid
+from typing import Dict, Iterable, List
+from redis.exceptions import RedisError
+
+from cat.db.database import DEFAULT_AGENTS_KEY, DEFAULT_INGESTIONS_KEY, get_async_db
+from cat.env import get_env_int
+from cat.log import log
+
+
+def format_key(agent_id: str) -> str:
+    """
+    Format Redis key for the index of the sources ingested by an agent.
+
+    Args:
+        agent_id: ID of the chatbot.
+
+    Returns:
+        Formatted key (e.g., "agents:<agent_id>:ingestions").
+    """
+    return f"{DEFAULT_AGENTS_KEY}:{agent_id}:{DEFAULT_INGESTIONS_KEY}"
+
+
+def format_chunks_key(agent_id: str) -> str:
+    """
+    Format Redis key for the index of the chunks ingested by an agent.
+
+    Args:
+        agent_id: ID of the chatbot.
+
+    Returns:
+        Formatted key (e.g., "agents:<agent_id>:ingestions_chunks").
+    """
+    return f"{DEFAULT_AGENTS_KEY}:{agent_id}:{DEFAULT_INGESTIONS_KEY}_chunks"
+
+
+def _source_field(collection_name: str, content_hash: str, chat_id: str | None = None) -> str:
+    return f"{collection_name}:{chat_id or ''}:{content_hash}"
+
+
+def _chunk_field(collection_name: str, embedder_hash: str, chunk_hash: str) -> str:
+    return f"{collection_name}:{embedder_hash}:{chunk_hash}"
+
+
+def point_key(point_id: int | str) -> str:
+    """Normalize a point ID, since the vector databases may return the UUIDs in a different format than the stored one."""
+    try:
+        return uuid.UUID(str(point_id)).hex
+    except ValueError:
+        return str(point_id)
+
+
+def config_hash(setting: Dict | None) -> str:
+    """
+    Hash the configuration of a service (e.g. the chunker or the embedder), as stored in the settings.
+
+    Args:
+        setting: The setting of the service, with its name and value.
+
+    Returns:
+        The hash of the configuration.
+    """
+    setting = setting or {}
+    config = {"name": setting.get("name"), "value": setting.get("value")}
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def metadata_hash(metadata: Dict | None) -> str:
+    """
+    Hash the metadata an ingested source was stored with.
+
+    Args:
+        metadata: The metadata of the source.
+
+    Returns:
+        The hash of the metadata.
+    """
+    return hashlib.sha256(json.dumps(metadata or {}, sort_keys=True, default=str).encode()).hexdigest()
+
+
+async def get_source(
+    agent_id: str, collection_name: str, content_hash: str, chat_id: str | None = None
+) -> Dict | None:
+    """
+    Retrieve the entry of an ingested source from the index, by the hash of its content.
+
+    Args:
+        agent_id: ID of the chatbot.
+        collection_name: Name of the collection the source was ingested into.
+        content_hash: The sha256 of the content of the source.
+        chat_id: ID of the chat session the source was ingested into, if any.
+
+    Returns:
+        The entry, with the `source`, the `chunker` and `embedder` configuration hashes, the hash of the `metadata` and
+        the number of `points`, or None if not found.
+    """
+    try:
+        entry = await get_async_db().hget(format_key(agent_id), _source_field(collection_name, content_hash, chat_id))
+        return json.loads(entry) if entry else None
+    except RedisError as e:
+        log.error(f"Redis error getting the ingestion of '{content_hash}' for {agent_id}: {e}")
+        raise
+
+
+async def set_source(
+    agent_id: str,
+    collection_name: str,
+    content_hash: str,
+    source: str,
+    chunker_hash: str,
+    embedder_hash: str,
+    points: int,
+    chat_id: str | None = None,
+    metadata_hash: str | None = None,
+):
+    """
+    Store the entry of an ingested source in the index.
+
+    Args:
+        agent_id: ID of the chatbot.
+        collection_name: Name of the collection the source was ingested into.
+        content_hash: The sha256 of the content of the source.
+        source: The name of the source (file name or URL).
+        chunker_hash: The hash of the chunker configuration used to split the source.
+        embedder_hash: The hash of the embedder configuration used to embed the chunks.
+        points: The number of points stored for the source.
+        chat_id: ID of the chat session the source was ingested into, if any.
+        metadata_hash: The hash of the metadata the source was stored with.
+    """
+    entry = {
+        "source": source,
+        "chunker": chunker_hash,
+        "embedder": embedder_hash,
+        "metadata": metadata_hash,
+        "points": points,
+    }
+    try:
+        await get_async_db().hset(
+            format_key(agent_id), _source_field(collection_name, content_hash, chat_id), json.dumps(entry)
+        )
+    except RedisError as e:
+        log.error(f"Redis error storing the ingestion of '{content_hash}' for {agent_id}: {e}")
+        raise
+
+
+async def get_chunks(
+    agent_id: str, collection_name: str, embedder_hash: str, chunk_hashes: List[str]
+) -> Dict[str, str]:
+    """
+    Retrieve the IDs of the points already storing the given chunks, embedded with the given embedder.
+
+    Args:
+        agent_id: ID of the chatbot.
+        collection_name: Name of the collection of the points.
+        embedder_hash: The hash of the embedder configuration.
+        chunk_hashes: The sha256 of the contents of the chunks.
+
+    Returns:
+        Dictionary of the known chunk hashes and the ID of the point storing them.
+    """
+    if not chunk_hashes:
+        return {}
+
+    try:
+        point_ids = await get_async_db().hmget(
+            format_chunks_key(agent_id), [_chunk_field(collection_name, embedder_hash, h) for h in chunk_hashes]
+        )
+        return {
+            h: point_id.decode() if isinstance(point_id, bytes) else point_id
+            for h, point_id in zip(chunk_hashes, point_ids)
+            if point_id
+        }
+    except RedisError as e:
+        log.error(f"Redis error getting the ingested chunks for {agent_id}: {e}")
+        raise
+
+
+async def set_chunks(agent_id: str, collection_name: str, embedder_hash: str, chunks: Dict[str, str]):
+    """
+    Store the IDs of the points storing the given chunks, embedded with the given embedder. Each entry expires after
+    `CAT_INGESTION_CHUNKS_TTL` seconds since it was last stored, so that the entries of the points deleted in any way
+    do not pile up.
+
+    Args:
+        agent_id: ID of the chatbot.
+        collection_name: Name of the collection of the points.
+        embedder_hash: The hash of the embedder configuration.
+        chunks: Dictionary of the chunk hashes and the ID of the point storing them.
+    """
+    if not chunks:
+        return
+
+    key = format_chunks_key(agent_id)
+    mapping = {_chunk_field(collection_name, embedder_hash, h): point_id for h, point_id in chunks.items()}
+    try:
+        pipeline = get_async_db().pipeline(transaction=False)
+        pipeline.hset(key, mapping=mapping)
+        if ttl := get_env_int("CAT_INGESTION_CHUNKS_TTL"):
+            pipeline.hexpire(key, ttl, *mapping.keys())
+        await pipeline.execute()
+    except RedisError as e:
+        log.error(f"Redis error storing the ingested chunks for {agent_id}: {e}")
+        raise
+
+
+async def prune_chunks(
+    agent_id: str,
+    collection_name: str | None = None,
+    point_ids: Iterable[int | str] | None = None,
+    embedder_hash: str | None = None,
+):
+    """
+    Remove from the index the chunks of a collection (of all the collections, if None), after their points were
+    deleted.
+
+    Args:
+        agent_id: ID of the chatbot.
+        collection_name: Name of the collection of the points, None for all the collections.
+        point_ids: If given, only the chunks stored by these points are removed.
+        embedder_hash: If given, only the chunks embedded with a different embedder are removed, e.g. after the
+            embedder changed.
+    """
+    deleted_points = {point_key(point_id) for point_id in point_ids} if point_ids is not None else None
+    if deleted_points is not None and not deleted_points:
+        return
+
+    key = format_chunks_key(agent_id)
+    db = get_async_db()
+    try:
+        fields = []
+        async for field, point_id in db.hscan_iter(key, match=f"{collection_name}:*" if collection_name else None):
+            field = field.decode() if isinstance(field, bytes) else field
+            point_id = point_id.decode() if isinstance(point_id, bytes) else point_id
+            if deleted_points is not None and point_key(point_id) not in deleted_points:
+                continue
+            if embedder_hash is not None and field.split(":")[1] == embedder_hash:
+                continue
+            fields.append(field)
+
+        for start in range(0, len(fields), 1000):
+            await db.hdel(key, *fields[start:start + 1000])
+        log.debug(f"Pruned {len(fields)} ingested chunks for {agent_id}")
+    except RedisError as e:
+        log.error(f"Redis error pruning the ingested chunks for {agent_id}: {e}")
+        raise
+
+
+async def destroy_all(agent_id: str):
+    """
+    Delete the ingestion indexes of a specific agent from Redis.
+
+    Args:
+        agent_id: ID of the chatbot.
+
+    Raises:
+        RedisError: If Redis connection fails.
+    """
+    try:
+        await get_async_db().delete(format_key(agent_id), format_chunks_key(agent_id))
+        log.debug(f"Destroyed the ingestion indexes for {agent_id}")
+    except RedisError as e:
+        log.error(f"Redis error destroying the ingestion indexes for {agent_id}: {e}")
+        raise
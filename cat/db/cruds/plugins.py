@@ -3,8 +3,9 @@ from redis.exceptions import RedisError
 
 from cat.db import crud
 from cat.db.cruds import settings as crud_settings
-from cat.db.database import DEFAULT_AGENTS_KEY, DEFAULT_AGENT_KEY, DEFAULT_SYSTEM_KEY, DEFAULT_PLUGINS_KEY, get_async_db
+from cat.db.database import DEFAULT_AGENTS_KEY, DEFAULT_SYSTEM_KEY, DEFAULT_PLUGINS_KEY
 from cat.log import log
+from cat.services.cheshire_cat_cache import invalidate_cheshire_cat
 
 
 def format_key(agent_id: str, plugin_id: str) -> str:
@@ -98,6 +99,7 @@ async def set_setting(agent_id: str, plugin_id: str, settings: Dict[str, Any]) -
     """
     try:
         await crud.store(format_key(agent_id, plugin_id), settings)
+        await invalidate_cheshire_cat(agent_id)
 
         log.debug(f"Stored settings for {agent_id}:{plugin_id}")
         return settings
@@ -145,6 +147,7 @@ async def delete_setting(agent_id: str, plugin_id: str):
     """
     try:
         await crud.delete(format_key(agent_id, plugin_id))
+        await invalidate_cheshire_cat(agent_id)
         log.debug(f"Deleted settings for {agent_id}:{plugin_id}")
     except RedisError as e:
         log.error(f"Redis error deleting settings for {agent_id}:{plugin_id}: {e}")
@@ -163,6 +166,7 @@ async def destroy_all(agent_id: str):
     """
     try:
         await crud.destroy(format_key(agent_id, "*"))
+        await invalidate_cheshire_cat(agent_id)
         log.debug(f"Destroyed plugin settings for {agent_id}")
     except RedisError as e:
         log.error(f"Redis error destroying settings for {agent_id}: {e}")
@@ -181,6 +185,7 @@ async def destroy_plugin(plugin_id: str):
     """
     try:
         await crud.destroy(format_key("*", plugin_id))
+        await invalidate_cheshire_cat()
         log.debug(f"Destroyed plugin settings for plugin {plugin_id}")
     except RedisError as e:
         log.error(f"Redis error destroying settings for plugin {plugin_id}: {e}")
@@ -191,9 +196,9 @@ async def get_agents_plugin_keys(plugin_id: str) -> List[str]:
     """
     Get all unique agent IDs where the plugin_id is listed in the active_plugins setting.
 
-    Uses a single SCAN on `agents:*:agent` keys followed by one JSON.MGET command to retrieve active_plugins from all
-    agents at once, then filters locally.
-    Total cost: 1 SCAN + 1 Redis command, regardless of the number of agents.
+    Reads the registry of the agents, followed by one pipeline retrieving active_plugins from all agents at once
+    through their index of the settings by name, then filters locally.
+    Total cost: 2 round-trips, regardless of the number of agents.
 
     Args:
         plugin_id: The name of the plugin to filter by.
@@ -205,21 +210,17 @@ async def get_agents_plugin_keys(plugin_id: str) -> List[str]:
         RedisError: If Redis connection fails.
     """
     try:
-        db = get_async_db()
-
-        # Scan directly for agent settings keys — no intermediate reconstruction needed
-        keys = [
-            k.decode() if isinstance(k, bytes) else k
-            async for k in db.scan_iter(f"{DEFAULT_AGENTS_KEY}:*:{DEFAULT_AGENT_KEY}")
-        ]
-        if not keys:
+        agent_ids = await crud_settings.get_agents_main_keys()
+        if not agent_ids:
             return []
 
-        # Single Redis command: read active_plugins entry from every key at once
-        results = await db.json().mget(keys, '$[?(@.name=="active_plugins")]')
+        # Single round-trip: read active_plugins of every agent at once
+        results = await crud_settings.get_settings_by_name_of_agents(agent_ids, "active_plugins")
 
         active_agents = [
-            key.split(":")[1] for key, result in zip(keys, results) if result and plugin_id in (result[0].get("value") or [])
+            agent_id
+            for agent_id, result in zip(agent_ids, results)
+            if result and plugin_id in (result.get("value") or [])
         ]
         return active_agents
     except RedisError as e:
@@ -1,14 +1,140 @@
-from typing import Dict, List, Any
-from redis.exceptions import RedisError
+import json
+import re
+import time
+from typing import Dict, List, Any, Literal, Tuple
+from redis.exceptions import RedisError, WatchError
 
 from cat.db import crud, models
-from cat.db.database import DEFAULT_AGENTS_KEY, DEFAULT_SYSTEM_KEY, DEFAULT_AGENT_KEY, get_async_db
+from cat.db.database import (
+    DEFAULT_AGENTS_KEY,
+    DEFAULT_AGENTS_REGISTRY_KEY,
+    DEFAULT_SYSTEM_KEY,
+    DEFAULT_AGENT_KEY,
+    get_async_db,
+)
 from cat.log import log
+from cat.services.cheshire_cat_cache import invalidate_cheshire_cat
+from cat.services.embedder_registry import invalidate_embedders
+
+
+# attempts of an upsert when the setting is changed concurrently, before giving up
+_MAX_UPSERT_ATTEMPTS = 3
+
+# Lua helper removing a stored setting from the indexes by name and category. The index by name is left untouched if
+# the setting keeps its name; otherwise, another setting with the same name (if any) takes its place.
+_UNINDEX_SETTING = """
+local function unindex(base, names, prefix, setting_id, new_name)
+    local stored = redis.call("HGET", base, setting_id)
+    if not stored then
+        return
+    end
+
+    local setting = cjson.decode(stored)
+    if type(setting.category) == "string" then
+        redis.call("ZREM", prefix .. setting.category, setting_id)
+    end
+    if setting.name ~= new_name and redis.call("HGET", names, setting.name) == setting_id then
+        redis.call("HDEL", names, setting.name)
+        local entries = redis.call("HGETALL", base)
+        for i = 1, #entries, 2 do
+            if entries[i] ~= setting_id and cjson.decode(entries[i + 1]).name == setting.name then
+                redis.call("HSET", names, setting.name, entries[i])
+                break
+            end
+        end
+    end
+end
+"""
+
+# KEYS: settings, names, versions, order. ARGV: ID of the replaced setting ("" if none), ID of the setting, JSON of the
+# setting, name, category ("" if none), expected version of the replaced setting ("" to skip the check), prefix of the
+# category indexes. Returns the new version of the setting, or -1 if the expected version does not match.
+_WRITE_SETTING_SCRIPT = _UNINDEX_SETTING + """
+local base, names, versions, order = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local replaced_id, setting_id, value, name, category, expected, prefix = unpack(ARGV)
+if replaced_id == "" then
+    replaced_id = setting_id
+end
+
+local version = tonumber(redis.call("HGET", versions, replaced_id) or "0")
+if expected ~= "" and tonumber(expected) ~= version then
+    return -1
+end
+
+-- the setting takes the position of the one it replaces, or goes last
+local position = redis.call("ZSCORE", order, replaced_id) or redis.call("ZSCORE", order, setting_id)
+if not position then
+    local last = redis.call("ZRANGE", order, -1, -1, "WITHSCORES")
+    position = (tonumber(last[2]) or 0) + 1
+end
+
+unindex(base, names, prefix, replaced_id, name)
+if replaced_id ~= setting_id then
+    unindex(base, names, prefix, setting_id, name)
+    redis.call("HDEL", base, replaced_id)
+    redis.call("HDEL", versions, replaced_id)
+    redis.call("ZREM", order, replaced_id)
+end
+
+redis.call("HSET", base, setting_id, value)
+redis.call("ZADD", order, position, setting_id)
+-- in case of duplicated names, the first setting keeps the name
+local owner = redis.call("HGET", names, name)
+if not owner or owner == replaced_id or redis.call("HEXISTS", base, owner) == 0 then
+    redis.call("HSET", names, name, setting_id)
+end
+if category ~= "" then
+    redis.call("ZADD", prefix .. category, position, setting_id)
+end
+
+version = version + 1
+redis.call("HSET", versions, setting_id, version)
+return version
+"""
+
+# KEYS: settings, names, versions, order. ARGV: ID of the setting, prefix of the category indexes.
+# Returns the JSON of the deleted setting, if any.
+_DELETE_SETTING_SCRIPT = _UNINDEX_SETTING + """
+local base, names, versions, order = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local setting_id, prefix = ARGV[1], ARGV[2]
+
+local stored = redis.call("HGET", base, setting_id)
+unindex(base, names, prefix, setting_id, nil)
+redis.call("HDEL", base, setting_id)
+redis.call("HDEL", versions, setting_id)
+redis.call("ZREM", order, setting_id)
+return stored
+"""
+
+# KEYS: settings, names, versions. ARGV: "id", "name" or "category", the value to look for, prefix of the category
+# indexes. Returns the ID, the JSON and the version of the setting (the first one of the category), if any.
+_READ_SETTING_SCRIPT = """
+local base, names, versions = KEYS[1], KEYS[2], KEYS[3]
+local by, what, prefix = ARGV[1], ARGV[2], ARGV[3]
+
+local setting_id
+if by == "id" then
+    setting_id = what
+elseif by == "name" then
+    setting_id = redis.call("HGET", names, what)
+else
+    setting_id = redis.call("ZRANGE", prefix .. what, 0, 0)[1]
+end
+if not setting_id then
+    return nil
+end
+
+local stored = redis.call("HGET", base, setting_id)
+if not stored then
+    return nil
+end
+return {setting_id, stored, redis.call("HGET", versions, setting_id) or "0"}
+"""
 
 
 def format_key(key_id: str) -> str:
     """
-    Format Redis key for settings.
+    Format Redis key for settings: a hash of the settings, one field (the JSON of the setting) per setting ID.
 
     Args:
         key_id: Settings key identifier.
@@ -23,9 +149,49 @@ def format_key(key_id: str) -> str:
     )
 
 
+def _format_index_keys(key_id: str) -> Tuple[List[str], str]:
+    # keys of the settings and of their indexes (by name, version and position), and prefix of the category indexes
+    key = format_key(key_id)
+    return [key, f"{key}:names", f"{key}:versions", f"{key}:order"], f"{key}:category:"
+
+
+def format_embedder_sizes_key(key_id: str) -> str:
+    """
+    Format Redis key for the dimensions of the embedders, probed once per configuration and stored next to the
+    settings.
+
+    Args:
+        key_id: Settings key identifier.
+
+    Returns:
+        Formatted key (e.g., "agents:<key_id>:agent:embedder_sizes" or "system:agent:embedder_sizes").
+    """
+    return f"{format_key(key_id)}:embedder_sizes"
+
+
+async def _on_setting_changed(key_id: str, *settings: Dict | None):
+    """
+    Invalidate what depends on the settings which changed: the live Cheshire Cats of the agent and, for the settings of
+    the embedders, the embedders and their probed dimensions.
+
+    Args:
+        key_id: Settings key identifier.
+        *settings: The settings which changed (before and after the change), None if unknown.
+    """
+    await invalidate_cheshire_cat(key_id)
+
+    embedder_settings = [s for s in settings if s is None or s.get("category") == "embedder"]
+    if not embedder_settings:
+        return
+
+    for setting in embedder_settings:
+        invalidate_embedders(setting.get("name") if setting else None)
+    await get_async_db().delete(format_embedder_sizes_key(key_id))
+
+
 async def get_settings(key_id: str, search: str = "") -> List[Dict]:
     """
-    Retrieve settings from Redis, optionally filtered by name.
+    Retrieve settings from Redis, in order of creation, optionally filtered by name.
 
     Args:
         key_id: Settings key identifier.
@@ -38,9 +204,15 @@ async def get_settings(key_id: str, search: str = "") -> List[Dict]:
         RedisError: If Redis connection fails.
     """
     try:
-        path = f'$[?(@.name =~ ".*{search}.*")]' if search else "$"
-
-        settings: List[Dict] = await crud.read(format_key(key_id), path)  # type: ignore[assignment]
+        (key, _, _, order_key), _ = _format_index_keys(key_id)
+        pipeline = get_async_db().pipeline(transaction=False)
+        pipeline.hgetall(key)
+        pipeline.zrange(order_key, 0, -1)
+        stored, order = await pipeline.execute()
+
+        settings = [json.loads(stored[setting_id]) for setting_id in order if setting_id in stored]
+        if search:
+            settings = [s for s in settings if re.search(search, s.get("name", ""))]
         if not settings:
             log.debug(f"No settings found for {key_id}, search: {search}")
             return []
@@ -54,16 +226,52 @@ async def get_settings(key_id: str, search: str = "") -> List[Dict]:
         raise
 
 
+async def _read_setting(
+    key_id: str, by: Literal["id", "name", "category"], what: str
+) -> Tuple[Dict, int] | Tuple[None, int]:
+    # the setting (found through the index by name or category) along with its version, in a single round-trip
+    keys, category_prefix = _format_index_keys(key_id)
+    script = get_async_db().register_script(_READ_SETTING_SCRIPT)
+    result = await script(keys=keys[:3], args=[by, what, category_prefix])
+    if not result:
+        return None, 0
+
+    _, stored, version = result
+    return json.loads(stored), int(version)
+
+
+async def _write_setting(key_id: str, value: Dict, replaced_id: str | None = None, version: int | None = None) -> int:
+    # write a setting and update its indexes atomically: the new version, or -1 if the replaced setting changed meanwhile
+    keys, category_prefix = _format_index_keys(key_id)
+    script = get_async_db().register_script(_WRITE_SETTING_SCRIPT)
+    return await script(keys=keys, args=[
+        replaced_id or "",
+        value["setting_id"],
+        json.dumps(crud.serialize_to_redis_json(value)),
+        value["name"],
+        value.get("category") or "",
+        "" if version is None else version,
+        category_prefix,
+    ])
+
+
+async def _delete_setting(key_id: str, setting_id: str) -> Dict | None:
+    keys, category_prefix = _format_index_keys(key_id)
+    script = get_async_db().register_script(_DELETE_SETTING_SCRIPT)
+    stored = await script(keys=keys, args=[setting_id, category_prefix])
+    return json.loads(stored) if stored else None
+
+
 async def get_settings_by_category(key_id: str, category: str) -> Dict | None:
     """
-    Retrieve settings from Redis filtered by category.
+    Retrieve the first setting of a category from Redis, through the index of the category.
 
     Args:
         key_id: Settings key identifier.
         category: Category to filter settings.
 
     Returns:
-        List of settings dictionaries, or None if none found.
+        Setting dictionary, or None if none found.
 
     Raises:
         RedisError: If Redis connection fails.
@@ -73,25 +281,40 @@ async def get_settings_by_category(key_id: str, category: str) -> Dict | None:
         return None
 
     try:
-        settings: List[Dict] = await crud.read(format_key(key_id), path=f'$[?(@.category=="{category}")]')  # type: ignore[assignment]
-        if not settings:
+        setting, _ = await _read_setting(key_id, "category", category)
+        if not setting:
             log.debug(f"No settings found for {key_id}, category: {category}")
             return None
 
         log.debug(f"Retrieved settings for {key_id}, category: {category}")
-        return settings[0]
+        return setting
     except RedisError as e:
         log.error(f"Redis error getting settings by category for {key_id}: {e}")
         raise
 
 
+def _has_changed(old_setting: Dict, new_setting: Dict) -> bool:
+    """
+    Check whether an upsert changes a setting, ignoring its update time.
+
+    Args:
+        old_setting: Setting dictionary stored before the upsert.
+        new_setting: Setting dictionary stored by the upsert.
+
+    Returns:
+        True if the name, the category or the value of the setting changed.
+    """
+    return any(old_setting.get(k) != new_setting.get(k) for k in ("name", "category", "value"))
+
+
 async def create_setting(key_id: str, payload: models.Setting) -> Dict:
     """
-    Append a new setting to the settings list in Redis atomically.
+    Add a new setting in Redis atomically, after the existing ones. Only the new setting is written, so concurrent
+    writers of different settings do not overwrite each other.
 
     Args:
         key_id: Settings key identifier.
-        payload: Setting object to append.
+        payload: Setting object to add.
 
     Returns:
         Created setting dictionary.
@@ -101,13 +324,10 @@ async def create_setting(key_id: str, payload: models.Setting) -> Dict:
         ValueError: If serialization fails.
     """
     try:
-        fkey_id = format_key(key_id)
         value = payload.model_dump()
 
-        existing_settings = await crud.read(fkey_id) or []
-        existing_settings.append(value)  # type: ignore[union-attr]
-
-        await crud.store(fkey_id, existing_settings)
+        await _write_setting(key_id, value)
+        await _on_setting_changed(key_id, value)
         log.debug(f"Created setting for {key_id}: {value.get('name')}")
 
         return value
@@ -116,15 +336,15 @@ async def create_setting(key_id: str, payload: models.Setting) -> Dict:
         raise
 
 
-async def _get_setting_by(key_id: str, what: str, value: str):
+async def _get_setting_by(key_id: str, what: Literal["id", "name", "category"], value: str):
     try:
-        settings: List[Dict] = await crud.read(format_key(key_id), path=f'$[?(@.{what}=="{value}")]')  # type: ignore[assignment]
-        if not settings:
+        setting, _ = await _read_setting(key_id, what, value)
+        if not setting:
             log.debug(f"No setting found for {key_id}, {what}: {value}")
             return None
 
         log.debug(f"Retrieved setting for {key_id}, {what}: {value}")
-        return settings[0]
+        return setting
     except RedisError as e:
         log.error(f"Redis error getting setting by {what} for {key_id}: {e}")
         raise
@@ -132,7 +352,7 @@ async def _get_setting_by(key_id: str, what: str, value: str):
 
 async def get_setting_by_name(key_id: str, name: str) -> Dict | None:
     """
-    Retrieve a single setting by name from Redis.
+    Retrieve a single setting by name from Redis, in O(1) through the index by name.
 
     Args:
         key_id: Settings key identifier.
@@ -161,7 +381,57 @@ async def get_setting_by_id(key_id: str, setting_id: str) -> Dict | None:
     Raises:
         RedisError: If Redis connection fails.
     """
-    return await _get_setting_by(key_id, "setting_id", setting_id)
+    return await _get_setting_by(key_id, "id", setting_id)
+
+
+async def get_setting_version(key_id: str, setting_id: str) -> int:
+    """
+    Retrieve the version of a setting, increased by each write of the setting.
+
+    Args:
+        key_id: Settings key identifier.
+        setting_id: ID of the setting.
+
+    Returns:
+        The version of the setting, 0 if not found.
+
+    Raises:
+        RedisError: If Redis connection fails.
+    """
+    try:
+        (_, _, versions_key, _), _ = _format_index_keys(key_id)
+        return int(await get_async_db().hget(versions_key, setting_id) or 0)
+    except RedisError as e:
+        log.error(f"Redis error getting the version of setting {setting_id} for {key_id}: {e}")
+        raise
+
+
+async def get_settings_by_name_of_agents(agent_ids: List[str], name: str) -> List[Dict | None]:
+    """
+    Retrieve a setting by name for several agents, in a single round-trip.
+
+    Args:
+        agent_ids: IDs of the agents.
+        name: Name of the setting.
+
+    Returns:
+        For each agent, the setting dictionary, or None if not found.
+
+    Raises:
+        RedisError: If Redis connection fails.
+    """
+    try:
+        db = get_async_db()
+        script = db.register_script(_READ_SETTING_SCRIPT)
+        pipeline = db.pipeline(transaction=False)
+        for agent_id in agent_ids:
+            keys, category_prefix = _format_index_keys(agent_id)
+            await script(keys=keys[:3], args=["name", name, category_prefix], client=pipeline)
+
+        return [json.loads(result[1]) if result else None for result in await pipeline.execute()]
+    except RedisError as e:
+        log.error(f"Redis error getting setting {name} of the agents: {e}")
+        raise
 
 
 async def delete_setting_by_id(key_id: str, setting_id: str):
@@ -176,7 +446,8 @@ async def delete_setting_by_id(key_id: str, setting_id: str):
         RedisError: If Redis connection fails.
     """
     try:
-        await crud.delete(format_key(key_id), path=f'$[?(@.setting_id=="{setting_id}")]')
+        setting = await _delete_setting(key_id, setting_id)
+        await _on_setting_changed(key_id, setting)
         log.debug(f"Deleted setting for {key_id}, setting_id: {setting_id}")
     except RedisError as e:
         log.error(f"Redis error deleting setting for {key_id}, setting_id: {setting_id}: {e}")
@@ -195,13 +466,46 @@ async def delete_settings_by_category(key_id: str, category: str):
         RedisError: If Redis connection fails.
     """
     try:
-        await crud.delete(format_key(key_id), path=f'$[?(@.category=="{category}")]')
+        _, category_prefix = _format_index_keys(key_id)
+        for setting_id in await get_async_db().zrange(f"{category_prefix}{category}", 0, -1):
+            await _delete_setting(key_id, setting_id)
+        await _on_setting_changed(key_id, {"category": category})
         log.debug(f"Deleted settings for {key_id}, category: {category}")
     except RedisError as e:
         log.error(f"Redis error deleting settings by category for {key_id}: {e}")
         raise
 
 
+async def _upsert_setting_by(
+    key_id: str, what: Literal["id", "name", "category"], lookup: str, payload: models.Setting
+) -> Dict:
+    """
+    Replace the setting found by ID, name or category with the payload, or create it if not exists.
+
+    The setting is replaced only if its version did not change since it was read (optimistic versioning): otherwise,
+    it is read again and the upsert retried, so that the invalidations follow the setting actually replaced.
+
+    Raises:
+        WatchError: If the setting keeps changing concurrently.
+    """
+    value = payload.model_dump()
+    for _ in range(_MAX_UPSERT_ATTEMPTS):
+        setting, version = await _read_setting(key_id, what, lookup)
+        replaced_id = setting["setting_id"] if setting else None
+        if await _write_setting(key_id, value, replaced_id, version if setting else None) < 0:
+            continue
+
+        if setting is None:
+            log.debug(f"Setting not found by {what} '{lookup}' for {key_id}, created")
+            await _on_setting_changed(key_id, value)
+        elif _has_changed(setting, value):
+            await _on_setting_changed(key_id, setting, value)
+
+        return value
+
+    raise WatchError(f"Setting {what} '{lookup}' for {key_id} changed concurrently {_MAX_UPSERT_ATTEMPTS} times")
+
+
 async def upsert_setting_by_id(key_id: str, payload: models.Setting) -> Dict | None:
     """
     Upsert a setting by ID in Redis atomically, or create it if not exists.
@@ -214,17 +518,11 @@ async def upsert_setting_by_id(key_id: str, payload: models.Setting) -> Dict | N
         Updated or created setting dictionary, or None if operation fails.
 
     Raises:
-        RedisError: If Redis connection fails.
+        RedisError: If Redis connection fails, or the setting keeps changing concurrently.
         ValueError: If serialization fails.
     """
     try:
-        setting = await get_setting_by_id(key_id, payload.setting_id)
-        if not setting:
-            log.debug(f"Setting {payload.setting_id} not found for {key_id}, creating")
-            return await create_setting(key_id, payload)
-
-        value = payload.model_dump()
-        await crud.store(format_key(key_id), value, path=f'$[?(@.setting_id=="{payload.setting_id}")]')
+        value = await _upsert_setting_by(key_id, "id", payload.setting_id, payload)
         log.debug(f"Updated setting {payload.setting_id} for {key_id}")
 
         return value
@@ -245,16 +543,11 @@ async def upsert_setting_by_name(key_id: str, payload: models.Setting) -> Dict:
         Upserted setting dictionary.
 
     Raises:
-        RedisError: If Redis connection fails.
+        RedisError: If Redis connection fails, or the setting keeps changing concurrently.
         ValueError: If serialization fails.
     """
     try:
-        if not await get_setting_by_name(key_id, payload.name):
-            log.debug(f"Setting not found by name '{payload.name}' for {key_id}, creating")
-            return await create_setting(key_id, payload)
-
-        value = payload.model_dump()
-        await crud.store(format_key(key_id), value, path=f'$[?(@.name=="{payload.name}")]')
+        value = await _upsert_setting_by(key_id, "name", payload.name, payload)
         log.debug(f"Upserted setting by name '{payload.name}' for {key_id}")
 
         return value
@@ -275,16 +568,11 @@ async def upsert_setting_by_category(key_id: str, payload: models.Setting) -> Di
         Upserted setting dictionary.
 
     Raises:
-        RedisError: If Redis connection fails.
+        RedisError: If Redis connection fails, or the setting keeps changing concurrently.
         ValueError: If serialization fails.
     """
     try:
-        if not await get_settings_by_category(key_id, payload.category):  # type: ignore[arg-type]
-            log.debug(f"Setting not found by category '{payload.category}' for {key_id}, creating")
-            return await create_setting(key_id, payload)
-
-        value = payload.model_dump()
-        await crud.store(format_key(key_id), value, path=f'$[?(@.category=="{payload.category}")]')
+        value = await _upsert_setting_by(key_id, "category", payload.category, payload)  # type: ignore[arg-type]
         log.debug(f"Upserted setting by category '{payload.category}' for {key_id}")
 
         return value
@@ -293,6 +581,47 @@ async def upsert_setting_by_category(key_id: str, payload: models.Setting) -> Di
         raise
 
 
+async def get_embedder_size(key_id: str, embedder_key: str) -> int | None:
+    """
+    Retrieve the probed dimension of an embedder.
+
+    Args:
+        key_id: Settings key identifier.
+        embedder_key: The key of the embedder, identifying its configuration class and settings.
+
+    Returns:
+        The dimension of the embedder, or None if not probed yet.
+
+    Raises:
+        RedisError: If Redis connection fails.
+    """
+    try:
+        size = await get_async_db().hget(format_embedder_sizes_key(key_id), embedder_key)
+        return int(size) if size is not None else None
+    except RedisError as e:
+        log.error(f"Redis error getting the size of the embedder {embedder_key} for {key_id}: {e}")
+        raise
+
+
+async def set_embedder_size(key_id: str, embedder_key: str, size: int):
+    """
+    Store the probed dimension of an embedder.
+
+    Args:
+        key_id: Settings key identifier.
+        embedder_key: The key of the embedder, identifying its configuration class and settings.
+        size: The dimension of the embedder.
+
+    Raises:
+        RedisError: If Redis connection fails.
+    """
+    try:
+        await get_async_db().hset(format_embedder_sizes_key(key_id), embedder_key, size)
+    except RedisError as e:
+        log.error(f"Redis error storing the size of the embedder {embedder_key} for {key_id}: {e}")
+        raise
+
+
 async def destroy_all(key_id: str):
     """
     Delete all settings for a specific key from Redis.
@@ -304,19 +633,64 @@ async def destroy_all(key_id: str):
         RedisError: If Redis connection fails.
     """
     try:
-        await crud.destroy(format_key(key_id))
+        # the settings, their indexes and the probed dimensions of the embedders
+        await crud.destroy(f"{format_key(key_id)}*")
+        if key_id != DEFAULT_SYSTEM_KEY:
+            await unregister_agent(key_id)
+        # the embedders are configured by the system agent only
+        await _on_setting_changed(key_id, *([None] if key_id == DEFAULT_SYSTEM_KEY else []))
         log.debug(f"Destroyed settings for {key_id}")
     except RedisError as e:
         log.error(f"Redis error destroying settings for {key_id}: {e}")
         raise
 
 
+async def register_agent(agent_id: str):
+    """
+    Add an agent to the registry of the agents, scored by its creation timestamp. Registering an already registered
+    agent keeps its original creation timestamp.
+
+    Args:
+        agent_id: The ID of the agent.
+
+    Raises:
+        RedisError: If Redis connection fails.
+    """
+    try:
+        await get_async_db().zadd(DEFAULT_AGENTS_REGISTRY_KEY, {agent_id: time.time()}, nx=True)
+        log.debug(f"Registered agent {agent_id}")
+    except RedisError as e:
+        log.error(f"Redis error registering agent {agent_id}: {e}")
+        raise
+
+
+async def unregister_agent(agent_id: str):
+    """
+    Remove an agent from the registry of the agents.
+
+    Args:
+        agent_id: The ID of the agent.
+
+    Raises:
+        RedisError: If Redis connection fails.
+    """
+    try:
+        await get_async_db().zrem(DEFAULT_AGENTS_REGISTRY_KEY, agent_id)
+        log.debug(f"Unregistered agent {agent_id}")
+    except RedisError as e:
+        log.error(f"Redis error unregistering agent {agent_id}: {e}")
+        raise
+
+
 async def get_agents_main_keys(pattern: str | None = None) -> List[str]:
     """
-    Get all unique agent IDs from Redis keys.
+    Get all unique agent IDs.
+
+    The IDs are read from the registry of the agents, maintained on agent creation, cloning and destruction, so the
+    cost is O(agents) instead of O(total keys). When a pattern is provided, the keyspace is scanned instead.
 
     Args:
-        pattern: Pattern to match keys (default: None, all agent keys).
+        pattern: Pattern to match keys (default: None, all the registered agents).
 
     Returns:
         List of unique agent IDs.
@@ -324,12 +698,12 @@ async def get_agents_main_keys(pattern: str | None = None) -> List[str]:
     Raises:
         RedisError: If Redis connection fails.
     """
-    pattern = f"{DEFAULT_AGENTS_KEY}:*" if pattern is None else pattern
-
     try:
-        return sorted(
-            list({k.split(":")[1] async for k in get_async_db().scan_iter(pattern)})
-        )
+        db = get_async_db()
+        if pattern is None:
+            return sorted(await db.zrange(DEFAULT_AGENTS_REGISTRY_KEY, 0, -1))
+
+        return sorted(list({k.split(":")[1] async for k in db.scan_iter(pattern)}))
     except RedisError as e:
         log.error(f"Redis error in get_agents_main_keys: {e}")
         raise
@@ -339,7 +713,7 @@ async def get_agents() -> List[Dict[str, Any]]:
     """
     Get all agents with their metadata.
 
-    Uses a single SCAN + one MGET pipeline instead of N+1 individual round-trips.
+    Uses the registry of the agents + two pipelines instead of N+1 individual round-trips.
 
     Returns:
         List of agents with their metadata.
@@ -348,23 +722,27 @@ async def get_agents() -> List[Dict[str, Any]]:
         RedisError: If Redis connection fails.
     """
     try:
-        db = get_async_db()
-
-        # One SCAN to collect all agent-settings keys
-        keys = [k async for k in db.scan_iter(f"{DEFAULT_AGENTS_KEY}:*:{DEFAULT_AGENT_KEY}")]
-        if not keys:
+        agent_ids = await get_agents_main_keys()
+        if not agent_ids:
             return []
 
-        # One MGET to read the metadata entry from every key — 1 RTT regardless of agent count
-        results = await db.json().mget(keys, '$[?(@.name=="metadata")]')
+        # One pipeline to read the metadata setting of every agent — 1 RTT regardless of agent count
+        pipeline = get_async_db().pipeline(transaction=False)
+        for agent_id in agent_ids:
+            pipeline.exists(format_key(agent_id))
+        stored = await pipeline.execute()
+        metadata_settings = await get_settings_by_name_of_agents(agent_ids, "metadata")
 
         agents = []
-        for key, result in zip(keys, results):
-            agent_id = key.split(":")[1]
-            metadata = result[0]["value"] if result and result[0] else {}
+        for agent_id, exists, setting in zip(agent_ids, stored, metadata_settings):
+            # registered agent whose settings are not stored (yet)
+            if not exists:
+                continue
+
+            metadata = setting["value"] if setting else {}
             agents.append({"agent_id": agent_id, "metadata": metadata})
 
-        return sorted(agents, key=lambda a: a["agent_id"])
+        return agents
     except RedisError as e:
         log.error(f"Redis error in get_agents: {e}")
         raise
@@ -401,24 +779,21 @@ async def clone_agent(source_prefix: str, target_prefix: str, skip_keys: List[st
             log.warning(f"No keys found with prefix '{source_prefix}'")
             return 0
 
+        await invalidate_cheshire_cat(target_prefix)
+
         cloned_count = 0
         for source_key in keys:
             # Determine the target key by replacing the prefix
             target_key = source_key.replace(source_prefix, target_prefix, 1)
 
-            # Read the source data
-            source_data = await db.json().get(source_key, "$")
-
-            if source_data:
-                # Handle JSONPath list wrapper
-                if isinstance(source_data, list) and len(source_data) > 0:
-                    source_data = source_data[0]
-
-                # Write to target
-                await db.json().set(target_key, "$", source_data)
+            # Copy server-side, whatever the type of the key (JSON documents, indexes, ...)
+            if await db.copy(source_key, target_key, replace=True):
                 cloned_count += 1
                 log.info(f"Cloned '{source_key}' to '{target_key}'")
 
+        if cloned_count:
+            await register_agent(target_prefix)
+
         return cloned_count
     except RedisError as e:
         log.error(f"Redis error in clone_agent: {e}")
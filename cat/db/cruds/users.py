@@ -5,8 +5,15 @@ from redis.exceptions import LockError, RedisError
 
 from cat.auth.auth_utils import check_password
 from cat.db import crud
-from cat.db.database import DEFAULT_AGENTS_KEY, DEFAULT_SYSTEM_KEY, DEFAULT_USERS_KEY, get_async_db
+from cat.db.database import (
+    DEFAULT_AGENTS_KEY,
+    DEFAULT_SYSTEM_KEY,
+    DEFAULT_USERS_INDEX_KEY,
+    DEFAULT_USERS_KEY,
+    get_async_db,
+)
 from cat.log import log
+from cat.services.principal_cache import revoke_principals
 
 
 def _extract_user_data(user_data: Dict, excluded_keys: List | None = None) -> Dict:
@@ -43,6 +50,23 @@ def format_key(agent_id: str, user_id: str) -> str:
     )
 
 
+def format_username_index_key(agent_id: str) -> str:
+    """
+    Format Redis key for the username -> user ID index of an agent.
+
+    Args:
+        agent_id: ID of the chatbot.
+
+    Returns:
+        Formatted key (e.g., "agents:<agent_id>:users_index" or "system:users_index" for the system agent).
+    """
+    return (
+        f"{DEFAULT_SYSTEM_KEY}:{DEFAULT_USERS_INDEX_KEY}"
+        if agent_id == DEFAULT_SYSTEM_KEY
+        else f"{DEFAULT_AGENTS_KEY}:{agent_id}:{DEFAULT_USERS_INDEX_KEY}"
+    )
+
+
 async def get_users(
     agent_id: str,
     with_password: bool = False,
@@ -237,8 +261,11 @@ async def create_user(agent_id: str, new_user: Dict) -> Dict | None:
             new_user_copy["created_at"] = datetime.now(timezone.utc).timestamp()
             new_user_copy["updated_at"] = new_user_copy["created_at"]
 
-            # Store user in its own Redis key
-            await crud.store(format_key(agent_id, new_id), new_user_copy)
+            # Store user in its own Redis key, along with its entry in the username index
+            pipe = get_async_db().pipeline()
+            pipe.json().set(format_key(agent_id, new_id), "$", crud.serialize_to_redis_json(new_user_copy))
+            pipe.hset(format_username_index_key(agent_id), username, new_id)
+            await pipe.execute()
             log.debug(f"Created user {new_id} for {agent_id}")
 
             return _extract_user_data(new_user_copy)
@@ -278,7 +305,19 @@ async def _get_user_by(agent_id: str, key: str, value: str, full: bool = False)
                 return user_data
             return _extract_user_data(user_data)
 
-        # For other lookups (e.g., username), scan and process in batches with early exit
+        # For username lookups, resolve the user ID through the username index
+        if key == "username":
+            user_id = await get_async_db().hget(format_username_index_key(agent_id), value)
+            if user_id and (user_data := await _get_user_by(agent_id, "id", user_id, full=True)):
+                # guard against a drifted index entry
+                if user_data.get("username") == value:
+                    log.debug(f"Retrieved user {value} for {agent_id}")
+                    return user_data if full else _extract_user_data(user_data)
+
+            log.debug(f"No user found for {agent_id}, {key}: {value}")
+            return None
+
+        # For other lookups, scan and process in batches with early exit
         # This avoids loading all users into memory at once
         db = get_async_db()
         pattern = format_key(agent_id, "*")
@@ -357,8 +396,24 @@ async def update_user(agent_id: str, user_id: str, updated_info: Dict) -> Dict |
             else existing_user.get("password")
         )
 
-        # Update the user's individual key
-        await crud.store(format_key(agent_id, user_id), updated_info_copy)
+        # Update the user's individual key, along with the username index if the username changed
+        db = get_async_db()
+        index_key = format_username_index_key(agent_id)
+        old_username = existing_user.get("username")
+        new_username = updated_info_copy.get("username")
+
+        pipe = db.pipeline()
+        pipe.json().set(format_key(agent_id, user_id), "$", crud.serialize_to_redis_json(updated_info_copy))
+        if old_username != new_username:
+            if old_username and await db.hget(index_key, old_username) == user_id:
+                pipe.hdel(index_key, old_username)
+            if new_username:
+                pipe.hset(index_key, new_username, user_id)
+        await pipe.execute()
+
+        # the principals cached for the tokens of the user carry the old username and permissions
+        if old_username != new_username or existing_user.get("permissions") != updated_info_copy.get("permissions"):
+            await revoke_principals(agent_id, user_id)
         log.debug(f"Updated user {user_id} for {agent_id}")
 
         return _extract_user_data(updated_info_copy)
@@ -387,8 +442,16 @@ async def delete_user(agent_id: str, user_id: str) -> Dict | None:
             log.debug(f"User {user_id} not found for {agent_id}")
             return None
 
-        # Delete the entire user key
-        await get_async_db().delete(format_key(agent_id, user_id))
+        # Delete the entire user key, along with its entry in the username index
+        db = get_async_db()
+        index_key = format_username_index_key(agent_id)
+
+        pipe = db.pipeline()
+        pipe.delete(format_key(agent_id, user_id))
+        if (username := user.get("username")) and await db.hget(index_key, username) == user_id:
+            pipe.hdel(index_key, username)
+        await pipe.execute()
+        await revoke_principals(agent_id, user_id)
 
         log.debug(f"Deleted user {user_id} for {agent_id}")
         return user
@@ -443,7 +506,68 @@ async def destroy_all(agent_id: str):
         # Use the wildcard pattern to destroy all user keys for this agent
         pattern = format_key(agent_id, "*")
         await crud.destroy(pattern)
+        await get_async_db().delete(format_username_index_key(agent_id))
+        await revoke_principals(agent_id)
         log.debug(f"Destroyed all user keys for {agent_id}")
     except RedisError as e:
         log.error(f"Redis error destroying users for {agent_id}: {e}")
         raise
+
+
+async def check_username_index(agent_id: str, repair: bool = False) -> Dict[str, List[str]]:
+    """
+    Check the username index of an agent against the stored users, optionally repairing any drift.
+
+    Args:
+        agent_id: ID of the chatbot.
+        repair: If True, fix the drifted index entries according to the stored users.
+
+    Returns:
+        Dictionary with the usernames missing from the index (`missing`), the index entries pointing to a missing or
+        different user (`stale`) and the usernames shared by more than one user (`duplicated`).
+
+    Raises:
+        RedisError: If Redis connection fails.
+    """
+    try:
+        db = get_async_db()
+        index_key = format_username_index_key(agent_id)
+
+        expected: Dict[str, str] = {}
+        duplicated = set()
+        async for user_id, user_data in get_users_stream(agent_id):
+            if not (username := user_data.get("username")):
+                continue
+            if username in expected:
+                duplicated.add(username)
+                continue
+            expected[username] = user_id
+
+        index = await db.hgetall(index_key)
+        report = {
+            "missing": sorted(username for username in expected if username not in index),
+            "stale": sorted(
+                username for username, user_id in index.items()
+                if expected.get(username) != user_id and username not in duplicated
+            ),
+            "duplicated": sorted(duplicated),
+        }
+
+        if repair and (report["missing"] or report["stale"]):
+            # targeted fixes only, so that users created meanwhile are not dropped from the index
+            pipe = db.pipeline()
+            for username in report["missing"] + report["stale"]:
+                if username in expected:
+                    pipe.hset(index_key, username, expected[username])
+                else:
+                    pipe.hdel(index_key, username)
+            await pipe.execute()
+            log.warning(
+                f"Repaired {len(report['missing']) + len(report['stale'])} entries of the username index for "
+                f"{agent_id}: {report}"
+            )
+
+        return report
+    except RedisError as e:
+        log.error(f"Error checking the username index for {agent_id}: {e}")
+        raise
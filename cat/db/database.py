@@ -6,10 +6,16 @@ from cat.env import get_env, get_env_int, get_env_bool
 from cat.utils import singleton
 
 DEFAULT_AGENTS_KEY = "agents"
+DEFAULT_AGENTS_REGISTRY_KEY = "agents_registry"
 DEFAULT_AGENT_KEY = "agent"
 DEFAULT_CONVERSATIONS_KEY = "conversations"
+DEFAULT_CONVERSATIONS_INDEX_KEY = "conversations_index"
+DEFAULT_CONVERSATIONS_OWNERS_KEY = "conversations_owners"
+DEFAULT_FILES_KEY = "files"
+DEFAULT_INGESTIONS_KEY = "ingestions"
 DEFAULT_PLUGINS_KEY = "plugins"
 DEFAULT_USERS_KEY = "users"
+DEFAULT_USERS_INDEX_KEY = "users_index"
 DEFAULT_SYSTEM_KEY = "system"
 
 
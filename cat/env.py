@@ -21,8 +21,35 @@ def get_supported_env_variables():
         "CAT_JWT_EXPIRE_MINUTES": str(60 * 24),  # JWT expires after 1 day
         "CAT_HTTPS_PROXY_MODE": "false",
         "CAT_HISTORY_EXPIRATION": None,  # in minutes
+        "CAT_HISTORY_WINDOW": "50",  # in messages, 0 = whole history
         "CAT_CRYPTO_KEY": "grinning_cat",
         "CAT_CRYPTO_SALT": "grinning_cat_salt",
+        "CAT_CHESHIRE_CAT_CACHE_SIZE": "100",
+        "CAT_CHESHIRE_CAT_CACHE_TTL": str(60 * 60),  # in seconds
+        "CAT_PRINCIPAL_CACHE_SIZE": "10000",
+        "CAT_PRINCIPAL_CACHE_TTL": str(5 * 60),  # in seconds
+        "CAT_INGESTION_BATCH_SIZE": "256",
+        "CAT_INGESTION_MAX_RETRIES": "3",
+        "CAT_INGESTION_CHUNKS_TTL": str(30 * 24 * 60 * 60),  # in seconds, 0 = no expiration
+        "CAT_PARSER_WORKERS": "2",
+        "CAT_PARSER_CONCURRENCY_PER_MIME": "2",
+        "CAT_PARSER_TIMEOUT": "300",  # in seconds
+        "CAT_PARSER_MEMORY_LIMIT": "0",  # in MB, 0 = no limit
+        "CAT_HOOK_TIME_BUDGET": "1.0",  # in seconds
+        "CAT_HOOK_THREADS": "4",
+        "CAT_QUERY_EMBEDDING_CACHE_SIZE": "1024",
+        "CAT_QUERY_EMBEDDING_SHARED_TTL": "0",  # in seconds, 0 = no shared cache
+        "CAT_WS_FLUSH_INTERVAL": "0.03",  # in seconds, 0 = no coalescing of the streamed messages
+        "CAT_WS_FLUSH_SIZE": "2048",  # in characters
+        "CAT_WS_OWNERSHIP_TTL": "30",  # in seconds
+        "CAT_FILE_INDEX_RECONCILE_INTERVAL": "300",  # in seconds, 0 = only when a folder is first listed
+        "CAT_WEBHOOK_TIMEOUT": "10",  # in seconds
+        "CAT_WEBHOOK_CONCURRENCY": "4",  # deliveries in flight per endpoint
+        "CAT_WEBHOOK_MAX_ATTEMPTS": "8",
+        "CAT_WEBHOOK_BACKOFF": "1",  # in seconds, doubled at each attempt
+        "CAT_WEBHOOK_BREAKER_THRESHOLD": "5",  # consecutive failures, 0 = no circuit breaking
+        "CAT_WEBHOOK_BREAKER_COOLDOWN": "60",  # in seconds
+        "CAT_MARCH_HARE_STREAM_MAX_LEN": "10000",  # in messages, per stream of events
     }
 
 
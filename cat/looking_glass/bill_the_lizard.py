@@ -5,7 +5,12 @@ from fastapi import FastAPI
 from cat.auth.auth_utils import DEFAULT_ADMIN_USERNAME, hash_password
 from cat.auth.permissions import get_full_permissions
 from cat.db import crud
-from cat.db.cruds import settings as crud_settings, plugins as crud_plugins, users as crud_users
+from cat.db.cruds import (
+    settings as crud_settings,
+    plugins as crud_plugins,
+    users as crud_users,
+    ingestions as crud_ingestions,
+)
 from cat.db.database import DEFAULT_SYSTEM_KEY, DEFAULT_CONVERSATIONS_KEY
 from cat.db.models import Setting
 from cat.env import get_env
@@ -15,7 +20,10 @@ from cat.looking_glass.mad_hatter.mad_hatter import MadHatter
 from cat.looking_glass.mad_hatter.registry import PluginRegistry
 from cat.mixins import OrchestratorMixin, NonCopyableMixin
 from cat.rabbit_hole import RabbitHole
+from cat.services.cheshire_cat_cache import CheshireCatCache
 from cat.services.factory.auth_handler import CoreAuthHandler
+from cat.services.parser_pool import ParserPool
+from cat.services.principal_cache import PrincipalCache
 from cat.services.websocket_manager import WebSocketManager
 from cat.utils import singleton, safe_deepcopy, sanitize_permissions
 
@@ -55,6 +63,9 @@ class BillTheLizard(OrchestratorMixin, NonCopyableMixin):
         self.websocket_manager = None
         self.rabbit_hole = None
         self.core_auth_handler = None
+        self.cheshire_cat_cache = None
+        self.principal_cache = None
+        self.parser_pool = None
 
     async def bootstrap(self):
         """
@@ -92,13 +103,42 @@ class BillTheLizard(OrchestratorMixin, NonCopyableMixin):
                 "permissions": permissions,  # base admin has all permissions, but CHAT
             })
 
+        # Repair the drift of the username indexes, if any (e.g. a user written without its index entry)
+        await self._repair_username_indexes()
+
         # Start Redis Pub/Sub listener so WebSocket messages are delivered
         # cross-replica in Docker Swarm deployments.  Degrades gracefully to
         # local-only mode if Redis pub/sub is unavailable.
         await self.websocket_manager.start()
 
+        # Listen for invalidations of the live Cheshire Cats, published by any replica
+        self.cheshire_cat_cache = CheshireCatCache()
+        await self.cheshire_cat_cache.start()
+
+        # Listen for revocations of the verified principals, published by any replica
+        self.principal_cache = PrincipalCache()
+        await self.principal_cache.start()
+
+        # Spawn the workers parsing the ingested files
+        self.parser_pool = ParserPool()
+        await self.parser_pool.start()
+
         await self.plugin_manager.execute_hook("after_lizard_bootstrap", caller=self)
 
+    @staticmethod
+    async def _repair_username_indexes():
+        try:
+            agent_ids = list(dict.fromkeys([DEFAULT_SYSTEM_KEY] + await crud_settings.get_agents_main_keys()))
+            repaired = 0
+            for agent_id in agent_ids:
+                report = await crud_users.check_username_index(agent_id, repair=True)
+                repaired += len(report["missing"]) + len(report["stale"])
+                if report["duplicated"]:
+                    log.warning(f"Usernames shared by more than one user for {agent_id}: {report['duplicated']}")
+            log.info(f"Checked the username indexes of {len(agent_ids)} agents, {repaired} entries repaired")
+        except Exception as e:
+            log.error(f"Error checking the username indexes: {e}")
+
     async def create_cheshire_cat(self, agent_id: str, metadata: Dict | None = None) -> CheshireCat:
         """
         Create the Cheshire Cat with the given id, directly from db.
@@ -118,6 +158,8 @@ class BillTheLizard(OrchestratorMixin, NonCopyableMixin):
 
         ccat = None
         try:
+            await crud_settings.register_agent(agent_id)
+
             ccat = await CheshireCat.create(agent_id)
             if metadata is not None:
                 await crud_settings.upsert_setting_by_name(
@@ -131,6 +173,9 @@ class BillTheLizard(OrchestratorMixin, NonCopyableMixin):
 
             await self.plugin_manager.execute_hook("after_cheshire_cat_creation", ccat, caller=self)
 
+            # the new Cheshire Cat is the live one: do not build it again at the first request
+            CheshireCatCache().put(agent_id, ccat)
+
             return ccat
         except Exception as e:
             log.error(f"Error creating Cheshire Cat `{agent_id}`: {e}")
@@ -155,6 +200,7 @@ class BillTheLizard(OrchestratorMixin, NonCopyableMixin):
             return
 
         await crud.delete(agent_id)
+        await crud_settings.unregister_agent(agent_id)
 
     async def _get_cheshire_cat_on_plugin_event(self, agent_id: str, plugin_id: str) -> CheshireCat | None:
         """
@@ -174,10 +220,10 @@ class BillTheLizard(OrchestratorMixin, NonCopyableMixin):
 
         return await self.get_cheshire_cat(agent_id)
 
-    @staticmethod
-    async def get_cheshire_cat(agent_id: str) -> CheshireCat | None:
+    async def get_cheshire_cat(self, agent_id: str) -> CheshireCat | None:
         """
-        Gets the Cheshire Cat with the given id, directly from db.
+        Gets the Cheshire Cat with the given id. The live instance is kept in the `CheshireCatCache` and reused until
+        the settings, the plugins or the factory configurations of the agent change; on a miss, it is built from db.
 
         Args:
             agent_id: The id of the agent to get
@@ -189,6 +235,19 @@ class BillTheLizard(OrchestratorMixin, NonCopyableMixin):
             log.debug("The system agent has been requested: returning null value.")
             return None
 
+        return await CheshireCatCache().get_or_create(agent_id, lambda: self._load_cheshire_cat(agent_id))
+
+    @staticmethod
+    async def _load_cheshire_cat(agent_id: str) -> CheshireCat | None:
+        """
+        Builds the Cheshire Cat with the given id, directly from db.
+
+        Args:
+            agent_id: The id of the agent to build
+
+        Returns:
+            The Cheshire Cat with the given id, or None if it has no settings
+        """
         if agent_id not in await crud_settings.get_agents_main_keys():
             log.debug(f"Requested not existing `{agent_id}`")
             raise ValueError("Bad Request")
@@ -238,6 +297,9 @@ class BillTheLizard(OrchestratorMixin, NonCopyableMixin):
             embedder = await self.embedder()
             embedder_name = embedder.name
             embedder_size = embedder.size
+            embedder_hash = crud_ingestions.config_hash(
+                await crud_settings.get_settings_by_category(DEFAULT_SYSTEM_KEY, "embedder")
+            )
 
             ccat_ids = await crud_settings.get_agents_main_keys()
             stored_files_by_ccat: List[Dict] = []
@@ -256,6 +318,8 @@ class BillTheLizard(OrchestratorMixin, NonCopyableMixin):
             # race conditions
             for entry in stored_files_by_ccat:
                 await entry["ccat"].vector_memory_handler.initialize(embedder_name, embedder_size)
+                # the chunks embedded by the previous embedder cannot be reused anymore
+                await crud_ingestions.prune_chunks(entry["ccat"].agent_key, embedder_hash=embedder_hash)
 
                 # finally, I can re-embed all the stored files in an asynchronous way
                 # limit concurrent embeddings to avoid overwhelming resources
@@ -372,6 +436,12 @@ class BillTheLizard(OrchestratorMixin, NonCopyableMixin):
             None
         """
         await self.plugin_manager.execute_hook("before_lizard_shutdown", caller=self)
+        if self.cheshire_cat_cache:
+            await self.cheshire_cat_cache.stop()
+        if self.principal_cache:
+            await self.principal_cache.stop()
+        if self.parser_pool:
+            await self.parser_pool.stop()
         if self.websocket_manager:
             await self.websocket_manager.close_connections()
 
@@ -384,6 +454,9 @@ class BillTheLizard(OrchestratorMixin, NonCopyableMixin):
             endpoint.deactivate(self.fastapi_app)
 
         self.core_auth_handler = None
+        self.cheshire_cat_cache = None
+        self.principal_cache = None
+        self.parser_pool = None
         self.plugin_manager = None
         self.rabbit_hole = None
         self.websocket_manager = None
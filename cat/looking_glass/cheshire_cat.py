@@ -1,10 +1,9 @@
 import asyncio
-import mimetypes
+import hashlib
 import os
-import tempfile
 import uuid
 from io import BytesIO
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 from cat.auth.permissions import AuthUserInfo
 from cat.db.cruds import (
@@ -12,6 +11,7 @@ from cat.db.cruds import (
     conversations as crud_conversations,
     plugins as crud_plugins,
     users as crud_users,
+    ingestions as crud_ingestions,
 )
 from cat.log import log
 from cat.looking_glass.mad_hatter.mad_hatter import MadHatter
@@ -19,9 +19,9 @@ from cat.looking_glass.mad_hatter.procedures import CatProcedureType
 from cat.looking_glass.models import StoredSourceWithMetadata
 from cat.looking_glass.stray_cat import StrayCat
 from cat.mixins import BotMixin, NonCopyableMixin
-from cat.services.factory.file_manager import BaseFileManager
+from cat.services.factory.file_manager import BaseFileManager, FILE_CHUNK_SIZE
 from cat.services.factory.vector_db import BaseVectorDatabaseHandler
-from cat.services.memory.models import VectorMemoryType, PointStruct
+from cat.services.memory.models import VectorMemoryType, PointStruct, UpdateResult
 from cat.utils import guess_file_type, is_url
 
 
@@ -98,6 +98,51 @@ class CheshireCat(BotMixin, NonCopyableMixin):
         for collection_name in await self.vector_memory_handler.get_collection_names():
             await self.vector_memory_handler.delete_tenant_points(collection_name)
 
+        # the ingested sources and chunks are gone with their points
+        await crud_ingestions.destroy_all(self._id)
+
+    async def delete_memory_points(self, collection_name: str, metadata: Dict | None = None) -> UpdateResult:
+        """
+        Delete the points matching the given metadata (all the points, if None) from a collection of the cat's memory,
+        along with their entries in the index of the ingested chunks.
+
+        Args:
+            collection_name (str): The name of the collection.
+            metadata (Dict | None): The metadata of the points to delete.
+
+        Returns:
+            UpdateResult: The result of the delete operation.
+        """
+        point_ids = None
+        if metadata:
+            point_ids = [
+                point.id
+                async for page in self.vector_memory_handler.iter_tenant_points(
+                    collection_name, metadata=metadata, with_payload=False
+                )
+                for point in page
+            ]
+
+        result = await self.vector_memory_handler.delete_tenant_points(collection_name, metadata)
+        await crud_ingestions.prune_chunks(self._id, collection_name, point_ids=point_ids)
+        return result
+
+    async def delete_memory_points_by_ids(self, collection_name: str, point_ids: List) -> UpdateResult:
+        """
+        Delete the points with the given IDs from a collection of the cat's memory, along with their entries in the index
+        of the ingested chunks.
+
+        Args:
+            collection_name (str): The name of the collection.
+            point_ids (List): The IDs of the points to delete.
+
+        Returns:
+            UpdateResult: The result of the delete operation.
+        """
+        result = await self.vector_memory_handler.delete_tenant_points_by_ids(collection_name, point_ids)
+        await crud_ingestions.prune_chunks(self._id, collection_name, point_ids=point_ids)
+        return result
+
     async def destroy(self):
         """Destroy all data from the cat."""
         log.info(f"Agent id: {self._id}. Destroying all data from the cat")
@@ -114,6 +159,7 @@ class CheshireCat(BotMixin, NonCopyableMixin):
         await crud_conversations.destroy_all(self._id)
         await crud_plugins.destroy_all(self._id)
         await crud_users.destroy_all(self._id)
+        await crud_ingestions.destroy_all(self._id)
 
     async def get_stored_sources_with_metadata(self) -> Dict[VectorMemoryType, List[StoredSourceWithMetadata]]:
         """Get all stored files with their metadata."""
@@ -121,33 +167,39 @@ class CheshireCat(BotMixin, NonCopyableMixin):
             VectorMemoryType.DECLARATIVE: set(),
             VectorMemoryType.EPISODIC: set(),
         }
+        # the points of a file share its content, read from the storage once
+        contents: Dict[Tuple[str, str], bytes | None] = {}
         for collection_name in results.keys():
-            points, _ = await self.vector_memory_handler.get_all_tenant_points(str(collection_name), with_vectors=False)
-            for point in points:
-                metadata = point.payload.get("metadata", {})  # type: ignore[union-attr]
-                filename = metadata.get("source")
-                if not filename:
-                    continue
+            points_pages = self.vector_memory_handler.iter_tenant_points(str(collection_name), with_payload=["metadata"])
+            async for points in points_pages:
+                for point in points:
+                    metadata = point.payload.get("metadata", {})  # type: ignore[union-attr]
+                    filename = metadata.get("source")
+                    if not filename:
+                        continue
+
+                    if is_url(filename):
+                        results[collection_name].add(
+                            StoredSourceWithMetadata(name=filename, content=None, metadata=metadata, path=filename)
+                        )
+                        continue
+
+                    file_path = self.agent_key
+                    if chat_id := metadata.get("chat_id"):
+                        file_path = os.path.join(file_path, chat_id)
+
+                    if (file_path, filename) not in contents:
+                        contents[(file_path, filename)] = self.file_manager.read_file(filename, file_path)
+
+                    file_content = contents[(file_path, filename)]
+                    if not file_content:
+                        continue
 
-                if is_url(filename):
                     results[collection_name].add(
-                        StoredSourceWithMetadata(name=filename, content=None, metadata=metadata, path=filename)
-                    )
-                    continue
-
-                file_path = self.agent_key
-                if chat_id := metadata.get("chat_id"):
-                    file_path = os.path.join(file_path, chat_id)
-
-                file_content = self.file_manager.read_file(filename, file_path)
-                if not file_content:
-                    continue
-
-                results[collection_name].add(
-                    StoredSourceWithMetadata(
-                        name=filename, content=BytesIO(file_content), metadata=metadata, path=file_path,
+                        StoredSourceWithMetadata(
+                            name=filename, content=BytesIO(file_content), metadata=metadata, path=file_path,
+                        )
                     )
-                )
 
         return {k: list(v) for k, v in results.items()}
 
@@ -195,9 +247,10 @@ class CheshireCat(BotMixin, NonCopyableMixin):
         Embeds stored sources into a vector memory collection.
 
         This method retrieves and processes a list of stored sources with their associated metadata and incorporates
-        them into a vector memory collection. During this process, any pre-existing embeddings in the collection are
-        cleared, and files are systematically ingested. The method handles potential irregularities such as missing
-        content or stray references and logs appropriate messages.
+        them into a vector memory collection. The stored files whose content was already ingested with the current
+        chunker and embedder configurations are kept as they are; any other pre-existing embedding in the collection is
+        cleared, and the remaining files are systematically ingested. The method handles potential irregularities such
+        as missing content or stray references and logs appropriate messages.
 
         Args:
             collection_name (VectorMemoryType): The name of the collection where the stored sources
@@ -211,16 +264,10 @@ class CheshireCat(BotMixin, NonCopyableMixin):
         """
         log.info(f"Agent id: {self._id}. Embedding stored files to the vector memory")
 
-        # first, clear all existing declarative and episodic embeddings
-        await self.vector_memory_handler.delete_tenant_points(str(collection_name))
-
         rabbit_hole = self.rabbit_hole
-        counter = 0
+        unchanged = set()
+        to_ingest = []
         for source in stored_sources:
-            content_type = None
-            if source.content:
-                content_type, _ = guess_file_type(source.content)
-
             cat = self
             if chat_id := source.metadata.get("chat_id"):
                 if not (stray_cat := await self._find_stray_cat(str(chat_id))):
@@ -229,6 +276,33 @@ class CheshireCat(BotMixin, NonCopyableMixin):
 
                 cat = stray_cat
 
+            # URLs have to be fetched again to know whether they changed
+            if source.content:
+                file_hash = hashlib.sha256(source.content.getvalue()).hexdigest()
+                await rabbit_hole.setup(cat)
+                if await rabbit_hole.is_ingested(source.name, file_hash):
+                    unchanged.add((source.name, file_hash, chat_id or None))
+                    continue
+
+            to_ingest.append((cat, source))
+
+        # then, clear all the existing declarative and episodic embeddings, except for the unchanged sources
+        async for points in self.vector_memory_handler.iter_tenant_points(
+            str(collection_name), with_payload=["metadata.source", "metadata.hash", "metadata.chat_id"]
+        ):
+            stale_ids = []
+            for point in points:
+                metadata = (point.payload or {}).get("metadata", {})
+                if (metadata.get("source"), metadata.get("hash"), metadata.get("chat_id")) not in unchanged:
+                    stale_ids.append(point.id)
+            if stale_ids:
+                await self.delete_memory_points_by_ids(str(collection_name), stale_ids)
+
+        for cat, source in to_ingest:
+            content_type = None
+            if source.content:
+                content_type, _ = guess_file_type(source.content)
+
             await rabbit_hole.ingest_file(
                 cat=cat,
                 file=source.content or source.name,
@@ -237,9 +311,10 @@ class CheshireCat(BotMixin, NonCopyableMixin):
                 store_file=False,
                 content_type=content_type,
             )
-            counter += 1
 
-        log.info(f"Agent id: {self._id}. Embedded {counter} files to the vector memory")
+        log.info(
+            f"Agent id: {self._id}. Embedded {len(to_ingest)} files to the vector memory, {len(unchanged)} unchanged"
+        )
 
     async def save_file(self, file_bytes: bytes, content_type: str, source: str, chat_id: str | None = None):
         """
@@ -251,24 +326,21 @@ class CheshireCat(BotMixin, NonCopyableMixin):
             source (str): The source of the file, i.e., the name used to store the file in the file manager.
             chat_id (str | None): The chat id of the stray cat, if any.
         """
-        # save a file in a temporary folder
-        extension = mimetypes.guess_extension(content_type)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=extension) as temp_file:
-            temp_file.write(file_bytes)
-            file_path = temp_file.name
+        async def chunks():
+            # views of the file bytes, not copies
+            view = memoryview(file_bytes)
+            for offset in range(0, len(view), FILE_CHUNK_SIZE):
+                yield view[offset:offset + FILE_CHUNK_SIZE]
 
-        # upload a file to CheshireCat's file manager
+        # stream the file to CheshireCat's file manager
         try:
             remote_root_dir = self.agent_key
             if chat_id:
                 remote_root_dir = os.path.join(remote_root_dir, chat_id)
 
-            self.file_manager.upload_file(file_path, remote_root_dir, source)
+            await self.file_manager.open_write(chunks(), source, remote_root_dir)
         except Exception as e:
-            log.error(f"Error while uploading file {file_path}: {e}")
-        finally:
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            log.error(f"Error while uploading file {source} ({content_type}): {e}")
 
     async def toggle_plugin(self, plugin_id: str):
         await self.plugin_manager.toggle_plugin(plugin_id)
@@ -328,15 +400,12 @@ class CheshireCat(BotMixin, NonCopyableMixin):
         log.info(f"Cloning vector memory from agent {ccat.agent_key} to agent {self.agent_key}")
         collection_name = str(VectorMemoryType.DECLARATIVE)
 
-        points, _ = await ccat.vector_memory_handler.get_all_tenant_points(collection_name, with_vectors=True)
-        if points:
-            await self.vector_memory_handler.add_points_to_tenant(
-                collection_name=collection_name,
-                points=[
-                    PointStruct(**{**p.model_dump(exclude={"shard_key", "order_value"}), "id": uuid.uuid4().hex})
-                    for p in points
-                ],
-            )
+        # the points are streamed page by page, with a new id since the source and target may share the collection
+        await self.vector_memory_handler.upsert_points_from(
+            ccat.vector_memory_handler,
+            collection_name,
+            transform=lambda p: p.model_copy(update={"id": uuid.uuid4().hex}),
+        )
         await self.embed_procedures()
 
         # clone the files from the ccat to the provided agent
@@ -345,8 +414,7 @@ class CheshireCat(BotMixin, NonCopyableMixin):
 
     async def transfer_files_from(self, previous_file_manager: BaseFileManager):
         try:
-            self.file_manager.transfer(previous_file_manager, self.agent_key)
-            success = True
+            success = await self.file_manager.atransfer(previous_file_manager, self.agent_key)
         except Exception as e:
             log.error(f"Error while transferring files from previous file manager: {e}")
             success = False
@@ -358,12 +426,7 @@ class CheshireCat(BotMixin, NonCopyableMixin):
         try:
             await self.vector_memory_handler.initialize(embedder.name, embedder.size)
             for collection_name in await previous_vector_memory_handler.get_collection_names():
-                points, _ = await previous_vector_memory_handler.get_all_tenant_points(collection_name, with_vectors=True)
-                if points:
-                    await self.vector_memory_handler.add_points_to_tenant(
-                        collection_name=collection_name,
-                        points=[PointStruct(**p.model_dump(exclude={"shard_key", "order_value"})) for p in points],
-                    )
+                await self.vector_memory_handler.upsert_points_from(previous_vector_memory_handler, collection_name)
             success = True
         except Exception as e:
             log.error(f"Error while transferring vector points from previous vector memory handler: {e}")
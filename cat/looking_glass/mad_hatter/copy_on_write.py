@@ -0,0 +1,266 @@
+import copy
+from collections import deque
+from enum import Enum
+from inspect import isawaitable
+from types import BuiltinFunctionType, BuiltinMethodType, FunctionType, MethodType, MethodWrapperType, ModuleType
+from typing import Any, Dict
+
+from cat.utils import safe_deepcopy
+
+# values that cannot be modified, hence handed to the hooks as they are
+_IMMUTABLE_TYPES = (
+    str, bytes, int, float, complex, bool, type(None), range, frozenset, Enum,
+    type, FunctionType, BuiltinFunctionType, ModuleType,
+)
+_BOUND_METHOD_TYPES = (MethodType, BuiltinMethodType, MethodWrapperType)
+
+# containers whose mutating methods are known: any other method of theirs only reads
+_CONTAINER_TYPES = (list, dict, set, bytearray, deque)
+_MUTATING_METHODS = {
+    "append", "extend", "insert", "pop", "remove", "clear", "sort", "reverse", "update", "setdefault", "popitem",
+    "add", "discard", "difference_update", "intersection_update", "symmetric_difference_update",
+    "appendleft", "extendleft", "popleft", "rotate", "move_to_end",
+}
+# methods of any other object known not to modify it: any other method is assumed to do it
+_READ_ONLY_METHODS = {
+    "get", "keys", "values", "items", "count", "index", "startswith", "endswith",
+    "model_dump", "model_dump_json", "dict", "json", "to_dict", "to_json",
+    "__str__", "__repr__", "__format__", "__len__", "__iter__", "__contains__", "__getitem__", "__eq__", "__hash__",
+}
+# methods returning a copy: the copy is made out of the current value, and handed over as a plain object
+_COPY_METHODS = {"copy", "model_copy", "__copy__"}
+
+
+class _CopyOnWriteRoot:
+    """The argument of a hook, deep-copied the first time the hook modifies it or anything reachable from it."""
+    __slots__ = ("original", "memo")
+
+    def __init__(self, original: Any):
+        self.original = original
+        # `copy.deepcopy` memo of the copy: the id of each original object -> its copy
+        self.memo: Dict[int, Any] | None = None
+
+    def resolve(self, obj: Any) -> Any:
+        if self.memo is None:
+            return obj
+        return self.memo.get(id(obj), obj)
+
+    def write(self):
+        if self.memo is not None:
+            return
+
+        memo: Dict[int, Any] = {}
+        try:
+            copy.deepcopy(self.original, memo)
+        except Exception:
+            memo = {id(self.original): safe_deepcopy(self.original)}
+        self.memo = memo
+
+
+class CopyOnWrite:
+    """
+    Cheap view of an argument of a hook. The view reads the original object, until the hook modifies it (setting an
+    attribute or an item, or calling a method which may change it): the first write deep-copies the original object,
+    and the view and any view derived from it (e.g. ``view.metadata["key"]``) read and write the copy from then on.
+    Hence, the caller of the hook never sees the changes, and the hooks pay for a copy only when they make changes.
+
+    A view passes `isinstance` checks as the wrapped object, but it is not the wrapped object: code requiring the
+    actual type (e.g. ``json.dumps`` or the validation of a Pydantic model) should be given ``unwrap(view)``.
+    Hooks can opt out of the views with ``@hook(copy_on_write=False)``, receiving deep copies of their arguments.
+    """
+    __slots__ = ("_cow_root", "_cow_obj")
+
+    def __init__(self, root: _CopyOnWriteRoot, obj: Any):
+        object.__setattr__(self, "_cow_root", root)
+        object.__setattr__(self, "_cow_obj", obj)
+
+    def _cow_target(self) -> Any:
+        return self._cow_root.resolve(self._cow_obj)
+
+    def _cow_write(self) -> Any:
+        self._cow_root.write()
+        return self._cow_target()
+
+    def _cow_call(self, name: str, *args, **kwargs) -> Any:
+        target = self._cow_target()
+        if name in _COPY_METHODS:
+            return getattr(safe_deepcopy(target), name)(*unwrap(args), **unwrap(kwargs))
+
+        mutating = name in _MUTATING_METHODS if isinstance(target, _CONTAINER_TYPES) else name not in _READ_ONLY_METHODS
+        if mutating:
+            target = self._cow_write()
+
+        return _wrap(self._cow_root, getattr(target, name)(*unwrap(args), **unwrap(kwargs)))
+
+    @property  # type: ignore[misc]
+    def __class__(self):
+        return type(self._cow_target())
+
+    def __getattr__(self, name: str) -> Any:
+        target = self._cow_target()
+        value = getattr(target, name)
+        if isinstance(value, _BOUND_METHOD_TYPES) and getattr(value, "__self__", None) is target:
+            return lambda *args, **kwargs: self._cow_call(name, *args, **kwargs)
+
+        return _wrap(self._cow_root, value)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._cow_write(), name, unwrap(value))
+
+    def __delattr__(self, name: str):
+        delattr(self._cow_write(), name)
+
+    def __getitem__(self, key: Any) -> Any:
+        return _wrap(self._cow_root, self._cow_target()[unwrap(key)])
+
+    def __setitem__(self, key: Any, value: Any):
+        self._cow_write()[unwrap(key)] = unwrap(value)
+
+    def __delitem__(self, key: Any):
+        del self._cow_write()[unwrap(key)]
+
+    def __iter__(self):
+        for item in self._cow_target():
+            yield _wrap(self._cow_root, item)
+
+    def __reversed__(self):
+        for item in reversed(self._cow_target()):
+            yield _wrap(self._cow_root, item)
+
+    def __len__(self) -> int:
+        return len(self._cow_target())
+
+    def __contains__(self, item: Any) -> bool:
+        return unwrap(item) in self._cow_target()
+
+    def __bool__(self) -> bool:
+        return bool(self._cow_target())
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self._cow_call("__call__", *args, **kwargs)
+
+    def __str__(self) -> str:
+        return str(self._cow_target())
+
+    def __repr__(self) -> str:
+        return repr(self._cow_target())
+
+    def __format__(self, format_spec: str) -> str:
+        return format(self._cow_target(), format_spec)
+
+    def __dir__(self):
+        return dir(self._cow_target())
+
+    def __hash__(self) -> int:
+        return hash(self._cow_target())
+
+    def __eq__(self, other: Any) -> bool:
+        return self._cow_target() == unwrap(other)
+
+    def __ne__(self, other: Any) -> bool:
+        return self._cow_target() != unwrap(other)
+
+    def __lt__(self, other: Any) -> bool:
+        return self._cow_target() < unwrap(other)
+
+    def __le__(self, other: Any) -> bool:
+        return self._cow_target() <= unwrap(other)
+
+    def __gt__(self, other: Any) -> bool:
+        return self._cow_target() > unwrap(other)
+
+    def __ge__(self, other: Any) -> bool:
+        return self._cow_target() >= unwrap(other)
+
+    def __add__(self, other: Any) -> Any:
+        return _wrap(self._cow_root, self._cow_target() + unwrap(other))
+
+    def __radd__(self, other: Any) -> Any:
+        return _wrap(self._cow_root, unwrap(other) + self._cow_target())
+
+    def __mul__(self, other: Any) -> Any:
+        return _wrap(self._cow_root, self._cow_target() * unwrap(other))
+
+    def __rmul__(self, other: Any) -> Any:
+        return _wrap(self._cow_root, unwrap(other) * self._cow_target())
+
+    def __or__(self, other: Any) -> Any:
+        return _wrap(self._cow_root, self._cow_target() | unwrap(other))
+
+    def __ror__(self, other: Any) -> Any:
+        return _wrap(self._cow_root, unwrap(other) | self._cow_target())
+
+    def __iadd__(self, other: Any) -> Any:
+        return self._cow_inplace("__iadd__", "__add__", other)
+
+    def __imul__(self, other: Any) -> Any:
+        return self._cow_inplace("__imul__", "__mul__", other)
+
+    def __ior__(self, other: Any) -> Any:
+        return self._cow_inplace("__ior__", "__or__", other)
+
+    def _cow_inplace(self, inplace_name: str, name: str, other: Any) -> Any:
+        if not hasattr(type(self._cow_target()), inplace_name):
+            return _wrap(self._cow_root, getattr(self._cow_target(), name)(unwrap(other)))
+
+        getattr(self._cow_write(), inplace_name)(unwrap(other))
+        return self
+
+    def __copy__(self) -> Any:
+        return safe_deepcopy(self._cow_target())
+
+    def __deepcopy__(self, memo: Dict) -> Any:
+        return copy.deepcopy(self._cow_target(), memo)
+
+    def __reduce_ex__(self, protocol: int):
+        return self._cow_target().__reduce_ex__(protocol)
+
+
+def _wrap(root: _CopyOnWriteRoot, value: Any) -> Any:
+    if isinstance(value, _IMMUTABLE_TYPES + _BOUND_METHOD_TYPES) or isawaitable(value) or type(value) is CopyOnWrite:
+        return value
+    return CopyOnWrite(root, value)
+
+
+def copy_on_write(value: Any) -> Any:
+    """
+    Hand a value over to a hook.
+
+    Args:
+        value: The argument of the hook.
+
+    Returns:
+        The value itself if it cannot be modified, otherwise a `CopyOnWrite` view of it.
+    """
+    if isinstance(value, _IMMUTABLE_TYPES) or type(value) is CopyOnWrite:
+        return value
+    return CopyOnWrite(_CopyOnWriteRoot(value), value)
+
+
+def unwrap(value: Any) -> Any:
+    """
+    Replace the `CopyOnWrite` views in a value (e.g. returned by a hook) with the objects they currently read.
+
+    Args:
+        value: The value to unwrap. Lists, tuples, sets and dicts built by the hook are unwrapped recursively.
+
+    Returns:
+        The unwrapped value.
+    """
+    if type(value) is CopyOnWrite:
+        return value._cow_target()
+
+    value_type = type(value)
+    if value_type in (list, tuple, set, frozenset):
+        items = [unwrap(item) for item in value]
+        if any(new is not old for new, old in zip(items, value)):
+            return value_type(items)
+        return value
+
+    if value_type is dict:
+        items = {unwrap(k): unwrap(v) for k, v in value.items()}
+        if any(items[unwrap(k)] is not v for k, v in value.items()) or any(type(k) is CopyOnWrite for k in value):
+            return items
+        return value
+
+    return value
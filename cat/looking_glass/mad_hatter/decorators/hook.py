@@ -3,11 +3,23 @@ from typing import Callable
 
 # class to represent a @hook
 class CatHook:
-    def __init__(self, name: str, func: Callable, priority: int, plugin_id: str | None = None):
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        priority: int,
+        plugin_id: str | None = None,
+        copy_on_write: bool = True,
+        blocking: bool = False,
+        budget: float | None = None,
+    ):
         self.function = func
         self.name = name
         self.priority = priority
         self.plugin_id = plugin_id
+        self.copy_on_write = copy_on_write
+        self.blocking = blocking
+        self.budget = budget
 
     def __repr__(self) -> str:
         return f"CatHook(name={self.name}, priority={self.priority}, plugin_id={self.plugin_id})"
@@ -17,7 +29,19 @@ class CatHook:
 # used by the Cat
 # @hook priority defaults to 1, the higher, the more important. Hooks in the default core plugin have all priority=0 so
 # they are automatically overwritten from plugins
-def hook(*args: str | Callable, priority: int = 1) -> Callable:
+# @hook copy_on_write defaults to True: the arguments are handed over as copy-on-write views. Legacy hooks relying on
+# receiving actual objects can set it to False, getting deep copies of the arguments instead
+# @hook blocking defaults to False: synchronous hooks declared as blocking (e.g. performing blocking I/O) are run in a
+# thread pool, instead of blocking the event loop
+# @hook budget is the time in seconds the hook is expected to take at most, defaulting to CAT_HOOK_TIME_BUDGET: slower
+# executions are logged and reported as slow by the telemetry of the hooks
+def hook(
+    *args: str | Callable,
+    priority: int = 1,
+    copy_on_write: bool = True,
+    blocking: bool = False,
+    budget: float | None = None,
+) -> Callable:
     """
     Make hooks out of functions, can be used with or without arguments.
     Examples:
@@ -28,10 +52,23 @@ def hook(*args: str | Callable, priority: int = 1) -> Callable:
             @hook("on_message", priority=2)
             def on_message(message: Message) -> str:
                 return "Hello!"
+            @hook(copy_on_write=False)
+            def on_message(message: Message) -> str:
+                return json.dumps(message)
+            @hook(blocking=True, budget=5)
+            def on_message(message: Message) -> str:
+                return requests.get("https://example.com").text
     """
     def _make_with_name(hook_name: str) -> Callable:
         def _make_hook(func: Callable[[str], str]) -> CatHook:
-            hook_ = CatHook(name=hook_name, func=func, priority=priority)
+            hook_ = CatHook(
+                name=hook_name,
+                func=func,
+                priority=priority,
+                copy_on_write=copy_on_write,
+                blocking=blocking,
+                budget=budget,
+            )
             return hook_
 
         return _make_hook
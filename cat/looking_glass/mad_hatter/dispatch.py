@@ -0,0 +1,146 @@
+import asyncio
+import functools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from inspect import iscoroutinefunction
+from typing import Any, Dict, List, Tuple
+
+from cat import utils
+from cat.env import get_env_float, get_env_int
+from cat.log import log
+from cat.looking_glass.mad_hatter.copy_on_write import copy_on_write
+from cat.looking_glass.mad_hatter.decorators.hook import CatHook
+
+# durations kept by the telemetry of each hook, to compute the percentiles
+_TELEMETRY_SAMPLES = 1024
+
+_blocking_hooks_executor: ThreadPoolExecutor | None = None
+
+
+def _get_blocking_hooks_executor() -> ThreadPoolExecutor:
+    global _blocking_hooks_executor
+
+    if _blocking_hooks_executor is None:
+        _blocking_hooks_executor = ThreadPoolExecutor(
+            max_workers=max(get_env_int("CAT_HOOK_THREADS") or 1, 1), thread_name_prefix="cat_hook",
+        )
+    return _blocking_hooks_executor
+
+
+class HookMode(Enum):
+    ASYNC = "async"  # awaited on the event loop
+    INLINE = "inline"  # called on the event loop
+    THREAD = "thread"  # called in the thread pool of the blocking hooks
+
+
+class HookTelemetry:
+    """Executions of a hook: number of calls, of slow calls (over the time budget) and of errors, and durations."""
+    def __init__(self):
+        self.calls = 0
+        self.slow_calls = 0
+        self.errors = 0
+        self._durations: deque[float] = deque(maxlen=_TELEMETRY_SAMPLES)
+
+    def record(self, duration: float, budget: float, failed: bool = False):
+        self.calls += 1
+        self._durations.append(duration)
+        if failed:
+            self.errors += 1
+        if duration > budget:
+            self.slow_calls += 1
+
+    def percentile(self, q: float) -> float:
+        """The q-th percentile (0 < q <= 100) of the durations of the latest calls, in seconds (0 if no call)."""
+        if not self._durations:
+            return 0.
+
+        durations = sorted(self._durations)
+        return durations[min(max(round(q / 100 * len(durations)) - 1, 0), len(durations) - 1)]
+
+
+class HookStep:
+    """A hook of a dispatch plan, with its execution mode and time budget resolved once, when the plan is compiled."""
+    def __init__(self, hook: CatHook, default_budget: float):
+        self.hook = hook
+        self.function = hook.function
+        self.copy_on_write = hook.copy_on_write
+        self.budget = hook.budget if hook.budget is not None else default_budget
+        if iscoroutinefunction(hook.function):
+            self.mode = HookMode.ASYNC
+        else:
+            self.mode = HookMode.THREAD if hook.blocking else HookMode.INLINE
+        self.telemetry = HookTelemetry()
+
+    def prepare_args(self, tea_cup: Any, args: Tuple) -> Tuple:
+        if self.copy_on_write:
+            return copy_on_write(tea_cup), *map(copy_on_write, args)
+        return utils.safe_deepcopy(tea_cup), *utils.safe_deepcopy(args)
+
+    async def run(self, hook_args: Tuple, kwargs: Dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        failed = False
+        try:
+            if self.mode is HookMode.ASYNC:
+                return await self.function(*hook_args, **kwargs)
+            if self.mode is HookMode.THREAD:
+                return await asyncio.get_running_loop().run_in_executor(
+                    _get_blocking_hooks_executor(), functools.partial(self.function, *hook_args, **kwargs)
+                )
+            return self.function(*hook_args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.telemetry.record(duration, self.budget, failed)
+            if duration > self.budget:
+                log.warning(
+                    f"Slow hook {self.hook.plugin_id}::{self.hook.name} ({self.mode.value}): {duration:.3f}s, "
+                    f"over its budget of {self.budget}s"
+                )
+
+
+def compile_dispatch_plans(hooks: Dict[str, List[CatHook]]) -> Dict[str, Tuple[HookStep, ...]]:
+    """
+    Compile the dispatch plans of the hooks, i.e. for each hook name, the steps to execute in order.
+
+    Args:
+        hooks: Dictionary of the hook names and the related hooks, sorted by priority.
+
+    Returns:
+        Dictionary of the hook names and the related dispatch plans.
+    """
+    default_budget = get_env_float("CAT_HOOK_TIME_BUDGET") or 1.
+    return {name: tuple(HookStep(h, default_budget) for h in hook_list) for name, hook_list in hooks.items()}
+
+
+def get_telemetry(plans: Dict[str, Tuple[HookStep, ...]]) -> List[Dict[str, Any]]:
+    """
+    Summarize the telemetry of the hooks of some dispatch plans.
+
+    Args:
+        plans: Dictionary of the hook names and the related dispatch plans.
+
+    Returns:
+        The list of the hooks, with their execution mode and budget, and the number of calls, slow calls and errors,
+        and the p50 and p99 of their durations (in seconds), the slowest first.
+    """
+    telemetry = [
+        {
+            "name": step.hook.name,
+            "plugin_id": step.hook.plugin_id,
+            "priority": step.hook.priority,
+            "mode": step.mode.value,
+            "budget": step.budget,
+            "calls": step.telemetry.calls,
+            "slow_calls": step.telemetry.slow_calls,
+            "errors": step.telemetry.errors,
+            "p50": step.telemetry.percentile(50),
+            "p99": step.telemetry.percentile(99),
+        }
+        for plan in plans.values()
+        for step in plan
+    ]
+    return sorted(telemetry, key=lambda t: t["p99"], reverse=True)
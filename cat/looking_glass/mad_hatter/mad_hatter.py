@@ -1,9 +1,8 @@
 import glob
-from inspect import iscoroutinefunction
 import os
 import shutil
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from pydantic import BaseModel, Field, ConfigDict
 
 from cat import utils
@@ -11,11 +10,14 @@ from cat.db.cruds import plugins as crud_plugins, settings as crud_settings
 from cat.db.database import DEFAULT_SYSTEM_KEY
 from cat.db.models import Setting
 from cat.log import log
+from cat.looking_glass.mad_hatter.copy_on_write import unwrap
 from cat.looking_glass.mad_hatter.decorators.endpoint import CatEndpoint
 from cat.looking_glass.mad_hatter.decorators.hook import CatHook
+from cat.looking_glass.mad_hatter.dispatch import HookStep, compile_dispatch_plans, get_telemetry
 from cat.looking_glass.mad_hatter.plugin import Plugin
 from cat.looking_glass.mad_hatter.plugin_extractor import PluginExtractor
 from cat.looking_glass.mad_hatter.procedures import CatProcedure
+from cat.services.cheshire_cat_cache import CheshireCatCache
 
 
 class LoadedPlugin(BaseModel):
@@ -37,7 +39,9 @@ class MadHatter:
         # a unified registry for all procedures (local tools, forms, remote clients)
         self.procedures_registry: Dict[str, CatProcedure] = {}
         # dict of active plugins hooks (hook_name -> [CatHook, CatHook, ...])
-        self.hooks: Dict[str, List[CatHook]] = {}
+        self._hooks: Dict[str, List[CatHook]] = {}
+        # dict of the dispatch plans of the hooks (hook_name -> (HookStep, HookStep, ...)), compiled with the hooks
+        self._dispatch_plans: Dict[str, Tuple[HookStep, ...]] = {}
         # list of active plugins endpoints
         self.endpoints: List[CatEndpoint] = []
 
@@ -219,7 +223,7 @@ class MadHatter:
         log.debug(self.active_plugins)
 
         # update cache and embeddings
-        self.hooks = {}
+        hooks: Dict[str, List[CatHook]] = {}
         self.procedures_registry = {}
         self.endpoints = []
 
@@ -231,46 +235,68 @@ class MadHatter:
 
             # cache hooks (indexed by hook name)
             for h in plugin.hooks:
-                self.hooks.setdefault(h.name, []).append(h)
+                hooks.setdefault(h.name, []).append(h)
 
         # sort each hooks list by priority
-        for hook_name in self.hooks.keys():
-            self.hooks[hook_name].sort(key=lambda x: x.priority, reverse=True)
+        for hook_name in hooks.keys():
+            hooks[hook_name].sort(key=lambda x: x.priority, reverse=True)
+
+        # compile the dispatch plans of the hooks
+        self.hooks = hooks
+
+        # the live Cheshire Cats of this replica hold the plugins loaded by the system: drop them, so that they are
+        # rebuilt with the plugins just (re)loaded
+        if self.agent_key == DEFAULT_SYSTEM_KEY:
+            CheshireCatCache().invalidate()
+
+    @property
+    def hooks(self) -> Dict[str, List[CatHook]]:
+        return self._hooks
+
+    @hooks.setter
+    def hooks(self, hooks: Dict[str, List[CatHook]]):
+        self._hooks = hooks
+        self._dispatch_plans = compile_dispatch_plans(hooks)
 
     async def execute_hook(self, hook_name: str, *args, caller: "ContextMixin") -> Any:  # type: ignore[override, name-defined]
         """
-        Execute a hook from an **async** call site.
-
-        Async plugin hooks are **awaited directly** on the running event loop —
-        no new OS thread, no new event loop, no `thread.join()` blocking.
-        Synchronous plugin hooks are called in-line (safe for typical I/O-light bodies).
+        Execute a hook from an **async** call site, following its dispatch plan.
 
-        Use this instead of `execute_hook` whenever the caller is already inside
-        an `async` function.  Keep `execute_hook` for sync call sites (e.g. ``__init__``).
+        Async plugin hooks are **awaited directly** on the running event loop.
+        Synchronous plugin hooks are called in-line (safe for typical I/O-light bodies), unless they are declared as
+        blocking: these are run in a thread pool, so that they do not block the event loop.
         """
-        if hook_name not in self.hooks:
+        if (plan := self._dispatch_plans.get(hook_name)) is None:
             raise Exception(f"Hook {hook_name} not present in any plugin")
 
-        tea_cup = utils.safe_deepcopy(args[0]) if args else None
-        for hook in self.hooks[hook_name]:
+        # the hooks never modify the arguments of the caller: they get copy-on-write views of them (or deep copies, if
+        # they opted out), and the first argument is replaced by the value returned by each hook, if any
+        tea_cup = args[0] if args else None
+        kwargs = {self.context_execute_hook: caller}
+        for step in plan:
             try:
-                log.debug(f"Executing {hook.plugin_id}::{hook.name} with priority {hook.priority}")
-                hook_args = (utils.safe_deepcopy(tea_cup), *utils.safe_deepcopy(args[1:])) if args else ()
-                kwargs = {self.context_execute_hook: caller}
-
-                tea_spoon = (
-                    await hook.function(*hook_args, **kwargs)
-                    if iscoroutinefunction(hook.function)
-                    else hook.function(*hook_args, **kwargs)
-                )
+                log.debug(f"Executing {step.hook.plugin_id}::{hook_name} with priority {step.hook.priority}")
+                hook_args = step.prepare_args(tea_cup, args[1:]) if args else ()
+
+                tea_spoon = await step.run(hook_args, kwargs)
                 if tea_spoon is not None:
-                    tea_cup = tea_spoon
+                    tea_cup = unwrap(tea_spoon)
             except Exception as e:
-                log.error(f"Error in plugin {hook.plugin_id}::{hook.name}: {e}")
-                log.warning(self.plugins[hook.plugin_id].plugin_specific_error_message())  # type: ignore[union-attr, index]
+                log.error(f"Error in plugin {step.hook.plugin_id}::{hook_name}: {e}")
+                log.warning(self.plugins[step.hook.plugin_id].plugin_specific_error_message())  # type: ignore[union-attr, index]
 
         return tea_cup
 
+    def get_hooks_telemetry(self) -> List[Dict[str, Any]]:
+        """
+        Get the telemetry of the active hooks, since they were last loaded.
+
+        Returns:
+            The list of the hooks, with their execution mode and budget, and the number of calls, slow calls and
+            errors, and the p50 and p99 of their durations (in seconds), the slowest first.
+        """
+        return get_telemetry(self._dispatch_plans)
+
     def get_plugin(self):
         name = utils.inspect_calling_folder()
         return self.plugins[name]
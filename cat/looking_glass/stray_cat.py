@@ -15,6 +15,7 @@ from cat.services.memory.messages import CatMessage, UserMessage
 from cat.services.memory.models import VectorMemoryType, RecallSettings
 from cat.services.memory.working_memory import WorkingMemory
 from cat.services.notifier import NotifierService
+from cat.services.query_embeddings import QueryEmbeddingCache
 from cat.templates import prompts
 
 
@@ -194,9 +195,11 @@ class StrayCat(BotMixin, NonCopyableMixin):
         )
 
         try:
+            # the user message is embedded off the event loop, and repeated messages reuse their embedding
             embedder = await self.lizard.embedder()
+            embedding = await QueryEmbeddingCache().embed_query(embedder, self.working_memory.user_message.text)  # type: ignore[arg-type]
             config = RecallSettings(
-                embedding=embedder.embed_query(self.working_memory.user_message.text),  # type: ignore[arg-type]
+                embedding=embedding,
                 metadata=self.working_memory.user_message.get("metadata", {})
             )
 
@@ -228,7 +231,10 @@ class StrayCat(BotMixin, NonCopyableMixin):
                 system_prompt=system_prompt,
                 user_prompt=self.working_memory.user_message.text,  # type: ignore[arg-type]
                 context=[m.document for m in self.working_memory.context_memories],
-                history=[h.langchainfy() for h in self.working_memory.history[-config.latest_n_history:]],
+                history=[
+                    h.langchainfy()
+                    for h in await self.working_memory.get_latest_history(config.latest_n_history)
+                ],
                 tools=tools,
             )
 
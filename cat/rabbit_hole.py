@@ -9,13 +9,23 @@ import uuid
 from io import BytesIO
 from typing import List, Dict, Tuple
 from httpx import AsyncClient
-from langchain_community.document_loaders.parsers.generic import MimeTypeBasedParser
-from langchain_core.documents.base import Document, Blob
+from langchain_core.documents.base import Document
 
+from cat.db.cruds import ingestions as crud_ingestions, settings as crud_settings
+from cat.db.database import DEFAULT_SYSTEM_KEY
+from cat.env import get_env_int
 from cat.log import log
 from cat.services.factory.chunker import BaseChunker
+from cat.services.factory.embedder import Embeddings
 from cat.services.memory.models import VectorMemoryType, PointStruct
-from cat.utils import is_url as fnc_is_url
+from cat.services.parser_pool import ParserPool
+from cat.utils import Enum, is_url as fnc_is_url
+
+
+class IngestionStatus(Enum):
+    INGESTED = "ingested"
+    SKIPPED = "skipped"
+    FAILED = "failed"
 
 
 class RabbitHole:
@@ -94,9 +104,12 @@ class RabbitHole:
                 raise Exception(f"Embedding size mismatch for file '{filename}': vectors length should be {embedder_size}")
 
             # Upsert memories in batch mode
-            await cat.vector_memory_handler.add_points_to_tenant(
-                collection_name=str(VectorMemoryType.DECLARATIVE), points=points,
-            )
+            batch_size = max(get_env_int("CAT_INGESTION_BATCH_SIZE") or len(points), 1)
+            for i in range(0, len(points), batch_size):
+                batch = points[i:i + batch_size]
+                await self._upsert_batch(
+                    str(VectorMemoryType.DECLARATIVE), batch, filename, i + len(batch), len(points)
+                )
         except Exception as e:
             log.error(f"Error uploading memories from file '{filename}': {e}")
 
@@ -108,7 +121,7 @@ class RabbitHole:
         filename: str | None = None,
         store_file: bool = True,
         content_type: str | None = None,
-    ):
+    ) -> IngestionStatus:
         """
         Load a file in the Cat's declarative memory.
 
@@ -123,11 +136,16 @@ class RabbitHole:
             store_file (bool): Whether to store the file in the Cat's file storage.
             content_type (str): The content type of the file. If not provided, it will be guessed based on the file extension.
 
+        Returns:
+            IngestionStatus: Whether the file was ingested, skipped since already ingested with the same content,
+                settings and metadata, or failed. Skipped files store no point, hence no hook is executed for them.
+
         See Also:
             before_rabbithole_stores_documents
         """
         source = ""
         points = []
+        status = IngestionStatus.FAILED
 
         try:
             await self.setup(cat)
@@ -136,18 +154,40 @@ class RabbitHole:
             if not filename:
                 raise ValueError("No filename provided.")
 
-            # split a file into a list of docs
-            source, file_bytes, content_type, docs, is_url = await self._file_to_docs(
+            # load the file and check whether the very same content was already ingested, before parsing it
+            source, file_bytes, content_type, is_url = await self._load_file(
                 file=file, filename=filename, content_type=content_type
             )
+            file_hash = hashlib.sha256(file_bytes).hexdigest()
+            if await self.is_ingested(source, file_hash, metadata):
+                log.info(
+                    f"Agent id: {self.cat.agent_key}. Skipping {filename}: already ingested with the same settings "
+                    f"and metadata"
+                )
+                status = IngestionStatus.SKIPPED
+                if store_file and not is_url:
+                    await self.cat.save_file(file_bytes, content_type, source, self.stray.id if self.stray else None)
+                await self._send_notification_message(f"I already know {source}, nothing new to read.")
+                return status
+
+            # split a file into a list of docs
+            docs = await self._file_to_docs(source=source, file_bytes=file_bytes, content_type=content_type)
             if not docs:
                 raise Exception(f"No valid chunks found in the file '{filename}'.")
 
             # store in memory
-            sha256 = hashlib.sha256()
-            sha256.update(file_bytes)
-            points = await self.store_documents(
-                docs=docs, source=source, file_hash=sha256.hexdigest(), metadata=metadata,
+            points = await self.store_documents(docs=docs, source=source, file_hash=file_hash, metadata=metadata)
+            chunker_hash, embedder_hash = await self._config_hashes()
+            await crud_ingestions.set_source(
+                self.cat.agent_key,
+                self._collection_name,
+                file_hash,
+                source,
+                chunker_hash,
+                embedder_hash,
+                len(points),
+                self.stray.id if self.stray else None,
+                crud_ingestions.metadata_hash(metadata),
             )
 
             # store in file storage
@@ -159,6 +199,7 @@ class RabbitHole:
             await self._send_notification_message(f"Finished reading {source}, I made {len(docs)} thoughts on it.")
 
             log.info(f"Agent id: {self.cat.agent_key}. Successfully ingested file: {filename}")
+            status = IngestionStatus.INGESTED
         except Exception as e:
             log.error(f"Error ingesting file {filename}: {e}")
             # Don't raise in background tasks - just log the error
@@ -169,18 +210,20 @@ class RabbitHole:
                     log.error(f"Failed to send error notification: {notify_error}")
         finally:
             # hook the points after they are stored in the vector memory
-            await self.cat.plugin_manager.execute_hook(
-                "after_rabbithole_stored_documents", source, points, caller=self.stray or self.cat,
-            )
+            if status != IngestionStatus.SKIPPED:
+                await self.cat.plugin_manager.execute_hook(
+                    "after_rabbithole_stored_documents", source, points, caller=self.stray or self.cat,
+                )
+
+        return status
 
-    async def _file_to_docs(
+    async def _load_file(
         self, file: str | BytesIO, filename: str, content_type: str | None = None
-    ) -> Tuple[str, bytes, str | None, List[Document], bool]:
+    ) -> Tuple[str, bytes, str | None, bool]:
         """
-        Load and convert files to Langchain `Document`.
+        Load a file in memory.
 
         This method takes a file either from a Python script, from the `/rabbithole/` or `/rabbithole/web` endpoints.
-        Hence, it loads it in memory and splits it in chunks.
 
         Args:
             file (str | BytesIO): The file can be either a string path if loaded programmatically, a `BytesIO` if coming from the `/rabbithole/` endpoint, or a URL if coming from the `/rabbithole/web` endpoint.
@@ -188,9 +231,9 @@ class RabbitHole:
             content_type (str): The content type of the file. If not provided, it will be guessed based on the file extension.
 
         Returns:
-            (source, file_bytes, content_type, docs, is_url): Tuple[str, bytes, str | None, List[Document], bool].
-                The file name, the file content in bytes, the content type, the list of chunked Langchain `Document` and
-                a boolean indicating if the file was loaded from a URL.
+            (source, file_bytes, content_type, is_url): Tuple[str, bytes, str | None, bool].
+                The file name, the file content in bytes, the content type and a boolean indicating if the file was
+                loaded from a URL.
         """
         def sanitize_filename(file_name: str) -> str:
             if "." not in file_name:
@@ -234,19 +277,71 @@ class RabbitHole:
         if not file_bytes:
             raise ValueError(f"Something went wrong with the source '{source}'")
 
+        return source, file_bytes, content_type, is_url  # type: ignore[return-value]
+
+    async def _file_to_docs(self, source: str, file_bytes: bytes, content_type: str | None = None) -> List[Document]:
+        """
+        Convert a loaded file to Langchain `Document`, split in chunks.
+
+        Args:
+            source (str): The name of the file, as returned by `_load_file`.
+            file_bytes (bytes): The file content in bytes.
+            content_type (str): The content type of the file.
+
+        Returns:
+            docs (List[Document]): The list of chunked Langchain `Document`.
+        """
         fh = await self.cat.file_handlers()
         log.debug(f"Attempting to parse source: {source}. Detected MIME type: {content_type}. Available handlers: {list(fh.keys())}")
 
-        # Load the bytes in the Blob schema and parse the content. Parser based on the mime type
+        # Parse the content, out of the event loop. Parser based on the mime type
         await self._send_notification_message("I'm parsing the content. Big content could require some minutes...")
-        super_docs = MimeTypeBasedParser(handlers=fh).parse(
-            Blob(data=file_bytes, mimetype=content_type).from_data(data=file_bytes, mime_type=content_type, path=source)
-        )
+        super_docs = await ParserPool().parse(fh, file_bytes, content_type, source)
 
         # Split
         await self._send_notification_message("Parsing completed. Now let's go with reading process...")
-        docs = await self._split_text(docs=super_docs)
-        return source, file_bytes, content_type, docs, is_url  # type: ignore[return-value]
+        return await self._split_text(docs=super_docs)
+
+    async def _config_hashes(self) -> Tuple[str, str]:
+        """Return the hashes of the chunker and embedder configurations currently used to ingest the sources."""
+        chunker_setting = await crud_settings.get_settings_by_category(self.cat.agent_key, "chunker")
+        embedder_setting = await crud_settings.get_settings_by_category(DEFAULT_SYSTEM_KEY, "embedder")
+        return crud_ingestions.config_hash(chunker_setting), crud_ingestions.config_hash(embedder_setting)
+
+    @property
+    def _collection_name(self) -> str:
+        return str(VectorMemoryType.DECLARATIVE if not self.stray else VectorMemoryType.EPISODIC)
+
+    async def is_ingested(self, source: str, file_hash: str, metadata: Dict | None = None) -> bool:
+        """
+        Check whether a source with the given content was already ingested with the current chunker and embedder
+        configurations, and its points are still stored in the vector memory.
+
+        Args:
+            source (str): The name of the source (file name or URL).
+            file_hash (str): The sha256 of the content of the source.
+            metadata (Dict | None): The metadata the source is going to be stored with, if it has to match the one it
+                was ingested with; None to ignore the metadata (e.g. when the stored points are embedded again).
+
+        Returns:
+            bool: True if the ingestion of the source can be skipped, False otherwise.
+        """
+        chat_id = self.stray.id if self.stray else None
+        entry = await crud_ingestions.get_source(self.cat.agent_key, self._collection_name, file_hash, chat_id)
+        if not entry or entry["source"] != source or (entry["chunker"], entry["embedder"]) != await self._config_hashes():
+            return False
+        if metadata is not None and entry.get("metadata") != crud_ingestions.metadata_hash(metadata):
+            return False
+
+        # the points may have been deleted in the meanwhile, e.g. by wiping the memory
+        metadata = {"source": source, "hash": file_hash} | ({"chat_id": chat_id} if chat_id else {})
+        stored = 0
+        async for page in self.cat.vector_memory_handler.iter_tenant_points(
+            self._collection_name, metadata=metadata, with_payload=False
+        ):
+            stored += len(page)
+
+        return stored == entry["points"]
 
     async def store_documents(
         self,
@@ -258,7 +353,9 @@ class RabbitHole:
         """Add documents to the Cat's declarative memory.
 
         This method loops a list of Langchain `Document` and adds some metadata. Namely, the source filename and the
-        timestamp of insertion. Once done, the method notifies the client via Websocket connection.
+        timestamp of insertion. The documents are then embedded and stored in batches of `CAT_INGESTION_BATCH_SIZE`,
+        the embedding of a batch overlapping with the storage of the previous one. Failed batches are retried, and the
+        client is notified of the progress via Websocket connection after each batch.
 
         Args:
             docs (List[Document]): List of Langchain `Document` to be inserted in the Cat's declarative memory.
@@ -298,20 +395,117 @@ class RabbitHole:
 
         # hook the points before they are stored in the vector memory
         valid_documents = list(filter(lambda doc_: doc_.page_content.strip(), docs))
-        storing_vectors = await asyncio.to_thread(
-            lambda: embedder.embed_documents([doc_.page_content for doc_ in valid_documents])
-        )
-        points = [PointStruct(
-            id=uuid.uuid4().hex,
-            payload=doc.model_dump(),
-            vector=vector,
-        ) for doc, vector in zip(valid_documents, storing_vectors)]
+        collection_name = self._collection_name
+        _, embedder_hash = await self._config_hashes()
 
-        collection_name = str(VectorMemoryType.DECLARATIVE if not self.stray else VectorMemoryType.EPISODIC)
-        await self.cat.vector_memory_handler.add_points_to_tenant(collection_name=collection_name, points=points)
+        # embed and upsert in batches: the embedding of a batch overlaps with the upsert of the previous one
+        batch_size = max(get_env_int("CAT_INGESTION_BATCH_SIZE") or len(valid_documents), 1)
+        batches = [valid_documents[i:i + batch_size] for i in range(0, len(valid_documents), batch_size)]
+
+        points: List[PointStruct] = []
+        chunk_hashes: List[str] = []
+        upsert_task: asyncio.Task | None = None
+        try:
+            for batch in batches:
+                batch_hashes = [hashlib.sha256(doc.page_content.encode()).hexdigest() for doc in batch]
+                storing_vectors = await self._embed_batch(embedder, embedder_hash, batch, batch_hashes)
+                batch_points = [PointStruct(
+                    id=self._point_id(collection_name, source, file_hash, len(points) + i, chunk_hash),
+                    payload=doc.model_dump(),
+                    vector=vector,
+                ) for i, (doc, chunk_hash, vector) in enumerate(zip(batch, batch_hashes, storing_vectors))]
+
+                # back-pressure: at most one upsert in flight while the next batch is embedded
+                if upsert_task is not None:
+                    await upsert_task
+
+                points.extend(batch_points)
+                chunk_hashes.extend(batch_hashes)
+                upsert_task = asyncio.create_task(
+                    self._upsert_batch(collection_name, batch_points, source, len(points), len(valid_documents))
+                )
+
+            if upsert_task is not None:
+                await upsert_task
+        finally:
+            if upsert_task is not None and not upsert_task.done():
+                upsert_task.cancel()
+
+        # the stored chunks can be reused by the next ingestions of (near-)identical documents
+        await crud_ingestions.set_chunks(
+            self.cat.agent_key,
+            collection_name,
+            embedder_hash,
+            {chunk_hash: str(point.id) for chunk_hash, point in zip(chunk_hashes, points)},
+        )
 
         return points
 
+    async def _embed_batch(
+        self, embedder: Embeddings, embedder_hash: str, batch: List[Document], chunk_hashes: List[str]
+    ) -> List[List[float]]:
+        """
+        Embed a batch of documents. The vectors of the chunks already stored with the same embedder configuration are
+        reused from the vector memory, so that only the new chunks are embedded.
+        """
+        vectors: Dict[str, List[float]] = {}
+
+        known_chunks = await crud_ingestions.get_chunks(
+            self.cat.agent_key, self._collection_name, embedder_hash, chunk_hashes
+        )
+        if known_chunks:
+            try:
+                records = await self.cat.vector_memory_handler.retrieve_tenant_points(
+                    self._collection_name, list(set(known_chunks.values()))
+                )
+                stored_vectors = {crud_ingestions.point_key(r.id): r.vector for r in records if isinstance(r.vector, list)}
+                vectors = {
+                    chunk_hash: stored_vectors[crud_ingestions.point_key(point_id)]
+                    for chunk_hash, point_id in known_chunks.items()
+                    if crud_ingestions.point_key(point_id) in stored_vectors
+                }
+            except Exception as e:
+                log.warning(f"Agent id: {self.cat.agent_key}. Could not reuse the stored chunks: {e}")
+
+        if missing := [i for i, chunk_hash in enumerate(chunk_hashes) if chunk_hash not in vectors]:
+            embedded = await asyncio.to_thread(
+                lambda: embedder.embed_documents([batch[i].page_content for i in missing])
+            )
+            vectors |= {chunk_hashes[i]: vector for i, vector in zip(missing, embedded)}
+
+        log.debug(f"Agent id: {self.cat.agent_key}. Embedded {len(missing)} of {len(batch)} chunks")
+        return [vectors[chunk_hash] for chunk_hash in chunk_hashes]
+
+    def _point_id(self, collection_name: str, source: str, file_hash: str | None, index: int, chunk_hash: str) -> str:
+        """
+        Deterministic id of the `index`-th chunk of a source, so that upserting a batch again (e.g. when retrying a
+        failed one) overwrites the same points instead of duplicating them.
+        """
+        chat_id = self.stray.id if self.stray else ""
+        name = f"{self.cat.agent_key}:{chat_id}:{collection_name}:{source}:{file_hash}:{index}:{chunk_hash}"
+        return uuid.uuid5(uuid.NAMESPACE_OID, name).hex
+
+    async def _upsert_batch(
+        self, collection_name: str, points: List[PointStruct], source: str, stored: int, total: int
+    ):
+        """Upsert a batch of points, retrying with an exponential backoff, and notify the progress to the client."""
+        max_retries = get_env_int("CAT_INGESTION_MAX_RETRIES") or 0
+        for attempt in range(max_retries + 1):
+            try:
+                await self.cat.vector_memory_handler.add_points_to_tenant(
+                    collection_name=collection_name, points=points,
+                )
+                break
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                log.warning(
+                    f"Agent id: {self.cat.agent_key}. Error storing a batch of {source} (attempt {attempt + 1}): {e}"
+                )
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+        await self._send_notification_message(f"Memorized {stored} of {total} chunks of {source}...")
+
     async def _split_text(self, docs: List[Document]):
         """Split LangChain documents in chunks.
 
@@ -3,7 +3,14 @@ from fastapi import APIRouter, Body, BackgroundTasks
 
 from cat.auth.connection import AuthorizedInfo
 from cat.auth.permissions import AuthResource, AuthPermission, check_permissions
-from cat.routes.routes_utils import GetSettingsResponse, GetSettingResponse, UpsertSettingResponse, run_background_task
+from cat.routes.routes_utils import (
+    GetSettingsResponse,
+    GetSettingResponse,
+    QueryEmbeddingCacheResponse,
+    UpsertSettingResponse,
+    run_background_task,
+)
+from cat.services.query_embeddings import QueryEmbeddingCache
 from cat.services.service_factory import ServiceFactory
 
 
@@ -71,3 +78,11 @@ async def upsert_embedder_setting(
         run_background_task(background_tasks, info.lizard.embed_all_in_cheshire_cats)
 
     return UpsertSettingResponse(**result)
+
+
+@router.get("/query_cache", response_model=QueryEmbeddingCacheResponse)
+async def get_query_embedding_cache_stats(
+    info: AuthorizedInfo = check_permissions(AuthResource.EMBEDDER, AuthPermission.READ),
+) -> QueryEmbeddingCacheResponse:
+    """Get the hits, the misses and the hit rate of the cache of the query embeddings of this replica"""
+    return QueryEmbeddingCacheResponse(**QueryEmbeddingCache().stats())
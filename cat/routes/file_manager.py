@@ -1,9 +1,9 @@
 import os
-from io import BytesIO
+import re
 from typing import Dict, List, Tuple
-from fastapi import APIRouter, Body, BackgroundTasks
+from fastapi import APIRouter, Body, BackgroundTasks, Request
 from pydantic import BaseModel
-from starlette.responses import StreamingResponse
+from starlette.responses import Response, StreamingResponse
 
 from cat.auth.connection import AuthorizedInfo
 from cat.auth.permissions import AuthResource, AuthPermission, check_permissions
@@ -43,6 +43,40 @@ def get_from_info(info: AuthorizedInfo) -> Tuple[str, VectorMemoryType, Dict]:
     return path, collection_id, metadata
 
 
+def parse_range(range_header: str, size: int) -> Tuple[int, int] | None:
+    """
+    Parse the `Range` header of a request for a file of `size` bytes.
+
+    Args:
+        range_header: The value of the header, e.g. `bytes=0-1023`, `bytes=1024-` or `bytes=-1024`
+        size: The size of the file
+
+    Returns:
+        The first byte of the range and the byte where it stops (excluded), None if the header is not a single range of
+        bytes, meaning that the whole file is returned
+
+    Raises:
+        ValueError: If the range is not satisfiable
+    """
+    if not (match := re.fullmatch(r"\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*", range_header)):
+        return None
+
+    first, last = match.groups()
+    if (not first and not last) or (first and last and int(last) < int(first)):
+        return None
+
+    if not first:
+        # the last bytes of the file
+        start, end = max(size - int(last), 0), size
+    else:
+        start, end = int(first), min(int(last) + 1, size) if last else size
+
+    if start >= end:
+        raise ValueError(f"Range {range_header} not satisfiable for {size} bytes")
+
+    return start, end
+
+
 # get configured Plugin File Managers and configuration schemas
 @router.get("/settings", response_model=GetSettingsResponse)
 async def get_file_managers_settings(
@@ -120,25 +154,43 @@ async def get_attributes(
 @router.get("/files/{source_name:path}")
 async def download_file(
     source_name: str,
+    request: Request,
     info: AuthorizedInfo = check_permissions(AuthResource.MEMORY, AuthPermission.READ),
-) -> StreamingResponse:
+) -> Response:
+    """Download a file, or the range of bytes of a file specified by the `Range` header"""
     path, _, _ = get_from_info(info)
 
     sanitized_source = sanitize_source_name(source_name, path=path)
 
-    # Download the file
-    file_content = info.cheshire_cat.file_manager.download_file(os.path.join(path, sanitized_source))
-    if file_content is None:
+    file_manager = info.cheshire_cat.file_manager
+    file_path = os.path.join(path, sanitized_source)
+    file = file_manager.file_info(file_path)
+    if file is None:
         raise CustomNotFoundException("File not found")
 
     # Sanitize the filename for the Content-Disposition header to prevent header injection
     safe_filename = sanitized_source.encode("ascii", "ignore").decode("ascii")
     safe_filename = "".join(c for c in safe_filename if c.isalnum() or c in ".-_")
+    headers = {"Content-Disposition": f"attachment; filename={safe_filename}", "Accept-Ranges": "bytes"}
+
+    # Stream the file, or the requested range of bytes, in chunks
+    start, end, status_code = 0, None, 200
+    if range_header := request.headers.get("range"):
+        try:
+            byte_range = parse_range(range_header, file.size)
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{file.size}"})
+
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            headers |= {"Content-Range": f"bytes {start}-{end - 1}/{file.size}", "Content-Length": str(end - start)}
 
     return StreamingResponse(
-        BytesIO(file_content),
+        file_manager.open_read(file_path, start, end),
+        status_code=status_code,
         media_type="application/octet-stream",
-        headers={"Content-Disposition": f"attachment; filename={safe_filename}"}
+        headers=headers,
     )
 
 
@@ -158,7 +210,7 @@ async def delete_file(
         res = info.cheshire_cat.file_manager.remove_file(os.path.join(path, sanitized_source))
 
         # delete points
-        await info.cheshire_cat.vector_memory_handler.delete_tenant_points(str(collection_id), metadata)  # type: ignore[arg-type]
+        await info.cheshire_cat.delete_memory_points(str(collection_id), metadata)  # type: ignore[arg-type]
 
         return FileManagerDeletedFiles(deleted=res)
     except Exception as e:
@@ -183,7 +235,7 @@ async def delete_files(
         # delete points
         for file in files:
             metadata |= {"source": file.name}
-            await info.cheshire_cat.vector_memory_handler.delete_tenant_points(str(collection_id), metadata)  # type: ignore[arg-type]
+            await info.cheshire_cat.delete_memory_points(str(collection_id), metadata)  # type: ignore[arg-type]
 
         return FileManagerDeletedFiles(deleted=res)
     except Exception as e:
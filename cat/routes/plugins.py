@@ -21,6 +21,7 @@ from cat.routes.routes_utils import (
     GetPluginDetailsResponse,
     DeletePluginResponse,
     InstallPluginFromRegistryResponse,
+    HooksTelemetryResponse,
     create_plugin_manifest,
     run_background_task,
 )
@@ -140,6 +141,14 @@ async def reset_cheshirecat_plugin_settings(
     return GetSettingResponse(name=plugin_id, value=factory_settings)
 
 
+@router.get("/hooks/telemetry", response_model=HooksTelemetryResponse)
+async def get_cheshirecat_hooks_telemetry(
+    info: AuthorizedInfo = check_permissions(AuthResource.PLUGIN, AuthPermission.READ),
+) -> HooksTelemetryResponse:
+    """Returns the number of calls, slow calls and errors, and the p50 and p99 durations of the hooks of the agent"""
+    return HooksTelemetryResponse(hooks=info.cheshire_cat.plugin_manager.get_hooks_telemetry())  # type: ignore[union-attr, arg-type]
+
+
 @router.get("/installed", response_model=GetAvailablePluginsResponse)
 async def get_lizard_available_plugins(
     query: str = None,  # type: ignore[assignment]
@@ -154,6 +163,14 @@ async def get_lizard_available_plugins(
     return await get_available_plugins(info.lizard.plugin_registry, info.lizard.plugin_manager, query)
 
 
+@router.get("/installed/hooks/telemetry", response_model=HooksTelemetryResponse)
+async def get_lizard_hooks_telemetry(
+    info: AuthorizedInfo = check_permissions(AuthResource.SYSTEM, AuthPermission.READ),
+) -> HooksTelemetryResponse:
+    """Returns the number of calls, slow calls and errors, and the p50 and p99 durations of the hooks of the system"""
+    return HooksTelemetryResponse(hooks=info.lizard.plugin_manager.get_hooks_telemetry())  # type: ignore[arg-type]
+
+
 @router.post("/install/upload", response_model=InstallPluginResponse)
 async def install_plugin(
     background_tasks: BackgroundTasks,
@@ -238,21 +238,21 @@ async def get_source_urls(
     """Retrieve the list of source URLs that have been uploaded to the Rabbit Hole"""
     collection = str(VectorMemoryType.DECLARATIVE if not info.stray_cat else VectorMemoryType.EPISODIC)
 
-    # Get all points
-    memory_points, _ = await info.cheshire_cat.vector_memory_handler.get_all_tenant_points_from_web(collection)
-
-    # retrieve all the memory points where the metadata["source"] is a URL
+    # retrieve all the memory points where the metadata["source"] is a URL, one page at a time
     result = []
-    for memory_point in memory_points:
-        metadata = memory_point.payload.get("metadata", {})  # type: ignore[union-attr]
-        if info.stray_cat and metadata.get("chat_id") != info.stray_cat.id:
-            continue
-
-        source = metadata.get("source")
-        if source is None or not source.startswith("http"):
-            continue
-
-        result.append(source)
+    async for memory_points in info.cheshire_cat.vector_memory_handler.iter_tenant_points_from_web(
+        collection, with_payload=["metadata.source", "metadata.chat_id"]
+    ):
+        for memory_point in memory_points:
+            metadata = memory_point.payload.get("metadata", {})  # type: ignore[union-attr]
+            if info.stray_cat and metadata.get("chat_id") != info.stray_cat.id:
+                continue
+
+            source = metadata.get("source")
+            if source is None or not source.startswith("http"):
+                continue
+
+            result.append(source)
 
     return result
 
@@ -18,6 +18,7 @@ from cat.looking_glass.mad_hatter.mad_hatter import MadHatter
 from cat.looking_glass.mad_hatter.plugin import Plugin
 from cat.looking_glass.mad_hatter.registry import PluginRegistry
 from cat.looking_glass.models import PluginManifest
+from cat.services.qdrant_clients import QdrantClientRegistry
 from cat.services.redis_search import RedisSearchService
 from cat.utils import safe_deepcopy
 
@@ -105,6 +106,40 @@ class DeletePluginResponse(BaseModel):
     deleted: str
 
 
+class HookTelemetry(BaseModel):
+    name: str
+    plugin_id: str | None
+    priority: int
+    mode: str
+    budget: float
+    calls: int
+    slow_calls: int
+    errors: int
+    p50: float
+    p99: float
+
+
+class HooksTelemetryResponse(BaseModel):
+    hooks: List[HookTelemetry]
+
+
+class QdrantClientsResponse(BaseModel):
+    live_channels: int
+    in_use: int
+    idle: int
+    acquisitions: int
+    reuse_hits: int
+
+
+class QueryEmbeddingCacheResponse(BaseModel):
+    size: int
+    local_hits: int
+    shared_hits: int
+    coalesced: int
+    misses: int
+    hit_rate: float
+
+
 def create_plugin_manifest(
     plugin: Plugin,
     active_plugins: List[str],
@@ -246,12 +281,16 @@ async def startup_app(app):
 
 
 async def shutdown_app(app):
+    qdrant_clients = QdrantClientRegistry()
     utils.singleton.instances.clear()
 
     # shutdown Manager
     await app.state.lizard.shutdown()
     del app.state.lizard
 
+    # close the vector database channels shared by the agents
+    await qdrant_clients.close_all()
+
     await get_async_db().aclose()
 
 
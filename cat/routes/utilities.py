@@ -11,6 +11,8 @@ from cat.db.database import get_async_db
 from cat.db.models import Setting
 from cat.log import log
 from cat.routes.routes_utils import startup_app, shutdown_app
+from cat.services.cheshire_cat_cache import invalidate_cheshire_cat
+from cat.services.principal_cache import revoke_principals
 import cat.utils as utils
 
 router = APIRouter(tags=["Utilities"], prefix="/utils")
@@ -77,6 +79,8 @@ async def factory_reset(
 
     try:
         await get_async_db().flushdb()
+        await invalidate_cheshire_cat()
+        await revoke_principals()
         deleted_settings = True
     except Exception as e:
         log.error(f"Error deleting settings: {e}")
@@ -3,7 +3,14 @@ from fastapi import APIRouter, Body, BackgroundTasks
 
 from cat.auth.connection import AuthorizedInfo
 from cat.auth.permissions import AuthPermission, AuthResource, check_permissions
-from cat.routes.routes_utils import GetSettingsResponse, GetSettingResponse, UpsertSettingResponse, run_background_task
+from cat.routes.routes_utils import (
+    GetSettingsResponse,
+    GetSettingResponse,
+    QdrantClientsResponse,
+    UpsertSettingResponse,
+    run_background_task,
+)
+from cat.services.qdrant_clients import QdrantClientRegistry
 from cat.services.service_factory import ServiceFactory
 
 router = APIRouter(tags=["Vector Database"], prefix="/vector_database")
@@ -75,3 +82,11 @@ async def upsert_vector_database_setting(
         run_background_task(background_tasks, ccat.transfer_vector_points_from, previous_vector_db)
 
     return UpsertSettingResponse(**result)
+
+
+@router.get("/clients", response_model=QdrantClientsResponse)
+async def get_qdrant_clients_metrics(
+    info: AuthorizedInfo = check_permissions(AuthResource.VECTOR_DATABASE, AuthPermission.READ),
+) -> QdrantClientsResponse:
+    """Get the open Qdrant clients (i.e. the live channels) of this replica, and how often they were reused"""
+    return QdrantClientsResponse(**QdrantClientRegistry().metrics())
@@ -91,6 +91,6 @@ async def websocket_chat(
     finally:
         # Remove connection on disconnect
         if websocket.client_state != WebSocketState.DISCONNECTED:
-            websocket_manager.close_connection(stray_cat.id)
+            await websocket_manager.close_connection(stray_cat.id)
         else:
             websocket_manager.remove_connection(stray_cat.id)
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Tuple
+
+from cat.db.database import DEFAULT_SYSTEM_KEY
+from cat.env import get_env_int
+from cat.log import log
+from cat.services.replicated_cache import ReplicatedCache
+from cat.utils import singleton
+
+# Redis channel used to propagate invalidations across replicas
+_INVALIDATION_CHANNEL = "cheshire_cats:invalidate"
+
+
+@singleton
+class CheshireCatCache(ReplicatedCache):
+    """
+    Bounded registry of live Cheshire Cats, keyed by agent id.
+
+    Entries are evicted in LRU order once `CAT_CHESHIRE_CAT_CACHE_SIZE` is exceeded, and expire after
+    `CAT_CHESHIRE_CAT_CACHE_TTL` seconds. A size of 0 disables the cache.
+
+    Whenever the settings, the plugins or the factory configurations of an agent change, the cruds call
+    :func:`invalidate_cheshire_cat`, which drops the local entry synchronously and publishes the invalidation on Redis,
+    so that every replica listening via :meth:`start` drops its stale entry too.
+
+    Call ``await start()`` once during application startup.
+    """
+
+    channel = _INVALIDATION_CHANNEL
+    name = "Cheshire Cat cache invalidation"
+
+    def __init__(self):
+        super().__init__()
+
+        self._max_size = max(get_env_int("CAT_CHESHIRE_CAT_CACHE_SIZE") or 0, 0)
+        self._ttl = max(get_env_int("CAT_CHESHIRE_CAT_CACHE_TTL") or 0, 0)
+
+        # agent_id → (Cheshire Cat, expiration timestamp), in LRU order
+        self._entries: OrderedDict[str, Tuple["CheshireCat", float]] = OrderedDict()  # type: ignore[name-defined]
+        # agent_id → lock, so that concurrent misses build the Cheshire Cat only once
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+        # bumped at every invalidation: a Cheshire Cat built while its agent was invalidated is not stored
+        self._generations: Dict[str, int] = {}
+        self._global_generation = 0
+
+    # ── Lookup ─────────────────────────────────────────────────────────────────
+
+    def get(self, agent_id: str) -> "CheshireCat | None":  # type: ignore[name-defined]
+        """Return the live Cheshire Cat of *agent_id*, or ``None`` if missing or expired."""
+        entry = self._entries.get(agent_id)
+        if entry is None:
+            return None
+
+        ccat, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(agent_id, None)
+            return None
+
+        self._entries.move_to_end(agent_id)
+        return ccat
+
+    async def get_or_create(
+        self,
+        agent_id: str,
+        factory: Callable[[], Awaitable["CheshireCat | None"]],  # type: ignore[name-defined]
+    ) -> "CheshireCat | None":  # type: ignore[name-defined]
+        """
+        Return the live Cheshire Cat of *agent_id*, building it with *factory* on a miss.
+
+        Args:
+            agent_id: The id of the agent.
+            factory: Coroutine function building the Cheshire Cat from the database.
+
+        Returns:
+            The Cheshire Cat, or None if the factory could not build it.
+        """
+        if (ccat := self.get(agent_id)) is not None:
+            return ccat
+
+        if not self._max_size:
+            return await factory()
+
+        lock = self._locks.setdefault(agent_id, asyncio.Lock())
+        async with lock:
+            if (ccat := self.get(agent_id)) is not None:
+                return ccat
+
+            generation = self._generation(agent_id)
+            ccat = await factory()
+
+            # do not store a Cheshire Cat whose agent was invalidated while it was being built
+            if ccat is not None and generation == self._generation(agent_id):
+                self._put(agent_id, ccat)
+
+            return ccat
+
+    def put(self, agent_id: str, ccat: "CheshireCat"):  # type: ignore[name-defined]
+        """Store *ccat* as the live Cheshire Cat of *agent_id*, e.g. right after the creation of the agent."""
+        if self._max_size:
+            self._put(agent_id, ccat)
+
+    def _put(self, agent_id: str, ccat: "CheshireCat"):  # type: ignore[name-defined]
+        self._entries[agent_id] = (ccat, time.monotonic() + self._ttl if self._ttl else float("inf"))
+        self._entries.move_to_end(agent_id)
+
+        while len(self._entries) > self._max_size:
+            evicted_id, _ = self._entries.popitem(last=False)
+            self._locks.pop(evicted_id, None)
+            log.debug(f"Cheshire Cat cache: evicted agent `{evicted_id}`")
+
+    def _generation(self, agent_id: str) -> Tuple[int, int]:
+        return self._global_generation, self._generations.get(agent_id, 0)
+
+    # ── Invalidation ───────────────────────────────────────────────────────────
+
+    def _on_message(self, payload: Dict):
+        self.invalidate(payload.get("agent_id"))
+
+    def _clear(self):
+        self.invalidate()
+
+    def invalidate(self, agent_id: str | None = None):
+        """
+        Drop the cached Cheshire Cat of *agent_id* from this process only. If *agent_id* is None, drop them all.
+
+        Evicted Cheshire Cats are not shut down, since in-flight requests may still be using them.
+        """
+        if agent_id is None:
+            self._global_generation += 1
+            self._generations.clear()
+            self._entries.clear()
+            return
+
+        self._generations[agent_id] = self._generations.get(agent_id, 0) + 1
+        self._entries.pop(agent_id, None)
+
+    async def publish_invalidation(self, agent_id: str | None = None):
+        """Invalidate *agent_id* locally and on every other replica."""
+        self.invalidate(agent_id)
+        await self._publish({"agent_id": agent_id})
+
+    def __contains__(self, agent_id: str) -> bool:
+        return self.get(agent_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+async def invalidate_cheshire_cat(agent_id: str | None = None):
+    """
+    Invalidate the live Cheshire Cat of *agent_id* across all the replicas.
+
+    Changes to the system agent affect every Cheshire Cat, so they invalidate all of them.
+
+    Args:
+        agent_id: The id of the agent whose settings, plugins or factory configurations changed. If None, all the
+            Cheshire Cats are invalidated.
+    """
+    await CheshireCatCache().publish_invalidation(None if agent_id == DEFAULT_SYSTEM_KEY else agent_id)
@@ -0,0 +1,87 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Tuple, Type
+
+from cat.log import log
+from cat.services.factory.embedder import Embeddings
+from cat.utils import singleton
+
+# distinct embedder configurations kept alive by each process
+_MAX_SIZE = 16
+
+
+def embedder_key(config_class: Type, config: Dict[str, Any]) -> str:
+    """
+    Identify an embedder by its configuration class and the hash of its settings.
+
+    Args:
+        config_class: The configuration class of the embedder.
+        config: The settings of the embedder, as stored.
+
+    Returns:
+        The key of the embedder (e.g. "EmbedderDumbConfig:<sha256 of the settings>").
+    """
+    settings_hash = hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{config_class.__name__}:{settings_hash}"
+
+
+@singleton
+class EmbedderRegistry:
+    """
+    Process-wide registry of the embedders, keyed by their configuration class and the hash of their settings, so that
+    the embedder is not rebuilt (and its dimension is not probed with an embedding request) on each call of
+    ``lizard.embedder()``. Entries are evicted in LRU order beyond 16 distinct configurations.
+
+    Since the key changes with the settings, a stale embedder is never returned. Nonetheless, whenever the settings of
+    an embedder change, the settings cruds call :func:`invalidate_embedders`, so that the stale embedders are released.
+    """
+
+    def __init__(self):
+        # key → (name of the configuration class, embedder), in LRU order
+        self._entries: OrderedDict[str, Tuple[str, Embeddings]] = OrderedDict()
+
+    def get(self, key: str) -> Embeddings | None:
+        if (entry := self._entries.get(key)) is None:
+            return None
+
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, embedder: Embeddings):
+        self._entries[key] = (key.split(":", 1)[0], embedder)
+        self._entries.move_to_end(key)
+        while len(self._entries) > _MAX_SIZE:
+            self._entries.popitem(last=False)
+
+    def key_of(self, embedder: Embeddings) -> str | None:
+        """The key of a registered embedder, or None if the embedder was not built by the factory."""
+        return next((k for k, (_, e) in self._entries.items() if e is embedder), None)
+
+    def invalidate(self, config_name: str | None = None):
+        """
+        Drop the embedders built from a configuration class, or all of them.
+
+        Args:
+            config_name: The name of the configuration class. If None, all the embedders are dropped.
+        """
+        stale = [k for k, (name, _) in self._entries.items() if config_name is None or name == config_name]
+        for key in stale:
+            del self._entries[key]
+
+        if stale:
+            log.debug(f"Embedder registry: dropped {len(stale)} embedders of {config_name or 'any configuration'}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def invalidate_embedders(config_name: str | None = None):
+    """
+    Drop the embedders built from a configuration class (or all of them) from the registry of the embedders.
+
+    Args:
+        config_name: The name of the configuration class whose settings changed. If None, all the embedders are
+            dropped.
+    """
+    EmbedderRegistry().invalidate(config_name)
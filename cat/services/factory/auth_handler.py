@@ -10,6 +10,7 @@ from cat.db.cruds import users as crud_users
 from cat.env import get_env
 from cat.log import log
 from cat.services.factory.models import BaseFactoryConfigModel
+from cat.services.principal_cache import PrincipalCache
 
 
 class BaseAuthHandler(ABC):
@@ -119,24 +120,31 @@ class CoreAuthHandler(BaseAuthHandler):
         auth_permission: AuthPermission,
         key_id: str,
     ) -> AuthUserInfo | None:
-        try:
-            # decode token
-            payload = jwt.decode(token, get_env("CAT_JWT_SECRET"), algorithms=[DEFAULT_JWT_ALGORITHM])
-        except jwt.ExpiredSignatureError:
-            log.error("Token expired")
-            return None
-        except jwt.InvalidTokenError:
-            log.error("Invalid token")
-            return None
-        except Exception as e:
-            log.error(f"Could not auth user from JWT: {e}")
-            return None
-
-        # get user from DB
-        user = await crud_users.get_user_by_username(key_id, payload["sub"])
-        if not user:
-            # do not pass
-            return None
+        # repeat callers: the token was already verified and its user fetched
+        principal_cache = PrincipalCache()
+        digest = principal_cache.digest(key_id, token)
+        if (user := principal_cache.get(digest)) is None:
+            try:
+                # decode token
+                payload = jwt.decode(token, get_env("CAT_JWT_SECRET"), algorithms=[DEFAULT_JWT_ALGORITHM])
+            except jwt.ExpiredSignatureError:
+                log.error("Token expired")
+                return None
+            except jwt.InvalidTokenError:
+                log.error("Invalid token")
+                return None
+            except Exception as e:
+                log.error(f"Could not auth user from JWT: {e}")
+                return None
+
+            # get user from DB
+            generation = principal_cache.generation(key_id)
+            user = await crud_users.get_user_by_username(key_id, payload["sub"])
+            if not user:
+                # do not pass
+                return None
+
+            principal_cache.put(digest, key_id, user, payload.get("exp"), generation)
 
         ar = str(auth_resource)
         ap = str(auth_permission)
@@ -145,13 +153,13 @@ class CoreAuthHandler(BaseAuthHandler):
             # do not pass
             return AuthUserInfo(
                 id=user["id"],
-                name=payload["sub"],
+                name=user["username"],
                 extra=user,
             )
 
         return AuthUserInfo(
             id=user["id"],
-            name=payload["sub"],
+            name=user["username"],
             permissions=user["permissions"],
             extra=user,
         )
@@ -1,12 +1,11 @@
-import re
 import string
 from abc import ABC, abstractmethod
-from functools import cached_property
+from functools import cache, cached_property
 from itertools import combinations
-from typing import Type, List
+from typing import Type, List, Literal, Tuple
+import numpy as np
 from langchain_core.embeddings import Embeddings as LangChainEmbeddings
-from pydantic import ConfigDict
-from sklearn.feature_extraction.text import CountVectorizer
+from pydantic import ConfigDict, Field
 
 from cat.services.factory.models import BaseFactoryConfigModel
 from cat.utils import get_nlp_object_name
@@ -47,6 +46,34 @@ class MultimodalEmbeddings(Embeddings, ABC):
         pass
 
 
+# the pairs of characters of the vocabulary of the dumb embedder are made of ASCII characters: any other character is
+# mapped to this code, which is never part of the vocabulary
+_NON_ASCII = 128
+_NEWLINE = ord("\n")
+# odd 64-bit multiplier (Fibonacci hashing) of the hashing mode of the dumb embedder
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+@cache
+def _pairs_vocabulary() -> Tuple[np.ndarray, int]:
+    """
+    The vocabulary of the dumb embedder, built once per process: all the pairs of printable characters (digits excluded,
+    lowercase), sorted. Returns a lookup table from the codes of the two characters of a pair to its index in the
+    vocabulary (or -1 if the pair is not part of it), and the size of the vocabulary.
+    """
+    # Get all printable characters numbers excluded and make everything lowercase
+    chars = [p.lower() for p in string.printable[10:]]
+
+    # Make the vocabulary with all possible combinations of 2 characters
+    voc = sorted(set([f"{k[0]}{k[1]}" for k in combinations(chars, 2)]))
+
+    table = np.full((_NON_ASCII + 1) ** 2, -1, dtype=np.int64)
+    for i, pair in enumerate(voc):
+        table[ord(pair[0]) * (_NON_ASCII + 1) + ord(pair[1])] = i
+    table.flags.writeable = False
+    return table, len(voc)
+
+
 class DumbEmbedder(Embeddings):
     """Default Dumb Embedder.
 
@@ -55,26 +82,83 @@ class DumbEmbedder(Embeddings):
 
     Notes
     -----
-    This class relies on the `CountVectorizer`[1]_ offered by Scikit-learn.
-    This embedder uses a naive approach to extract features from a text and build an embedding vector.
-    Namely, it looks for pairs of characters in text starting form a vocabulary with all possible pairs of
-    printable characters, digits excluded.
+    This embedder uses a naive approach to extract features from a text and build a binary embedding vector, in one
+    of two modes:
+
+    - ``vocabulary`` (default): it looks for pairs of characters in text (consecutive, non-overlapping pairs of each
+      line) starting from a vocabulary with all possible pairs of printable characters, digits excluded. The vocabulary
+      is built once per process, and the embeddings have 2367 dimensions.
+    - ``hashing``: it hashes all the overlapping pairs of characters of the lowercase text into ``n_features``
+      dimensions. The embedder is stateless, and any pair of characters contributes to the embedding.
+
+    In both modes, the features are extracted for a whole batch of texts at once, and only the non-zero dimensions
+    are computed. The embeddings are deterministic, hence stable across processes and replicas.
     """
-    def __init__(self):
-        # Get all printable characters numbers excluded and make everything lowercase
-        chars = [p.lower() for p in string.printable[10:]]
+    def __init__(self, mode: Literal["vocabulary", "hashing"] = "vocabulary", n_features: int = 1024):
+        if mode not in ("vocabulary", "hashing"):
+            raise ValueError(f"Unknown mode {mode} of the dumb embedder")
+        if n_features < 1:
+            raise ValueError("The number of features of the dumb embedder must be positive")
 
-        # Make the vocabulary with all possible combinations of 2 characters
-        voc = sorted(set([f"{k[0]}{k[1]}" for k in combinations(chars, 2)]))
+        self.mode = mode
+        self.n_features = n_features
 
-        # Naive embedder that counts occurrences of a couple of characters in text
-        self.embedder = CountVectorizer(
-            vocabulary=voc, analyzer=lambda s: re.findall("..", s), binary=True
-        )
+    @cached_property
+    def size(self) -> int:
+        """Embedding dimensionality — known without embedding anything."""
+        return _pairs_vocabulary()[1] if self.mode == "vocabulary" else self.n_features
+
+    def _features(self, texts: List[str]) -> np.ndarray:
+        """
+        The non-zero dimensions of the embeddings of the texts, as indices of the (texts x dimensions) matrix of the
+        embeddings, flattened. Indices may repeat.
+        """
+        if self.mode == "hashing":
+            texts = [text.lower() for text in texts]
+
+        # the codes of the characters of all the texts, one after the other
+        codes = np.frombuffer("".join(texts).encode("utf-32-le", "surrogatepass"), dtype=np.int32)
+        if len(codes) < 2:
+            return np.empty(0, dtype=np.int64)
+
+        # a pair of characters starts at any character followed by one of the same text
+        text_ends = np.cumsum([len(text) for text in texts], dtype=np.int64)
+        text_starts = text_ends[(text_ends > 0) & (text_ends < len(codes))]
+        is_start = np.ones(len(codes) - 1, dtype=bool)
+        is_start[text_starts - 1] = False
+        if self.mode == "vocabulary":
+            # the pairs of each line of a text start at its first character and do not overlap, as in `re.findall("..")`
+            positions = np.arange(len(codes), dtype=np.int64)
+            line_starts = np.zeros(len(codes), dtype=bool)
+            line_starts[0] = True
+            line_starts[text_starts] = True
+            line_starts[1:] |= codes[:-1] == _NEWLINE
+            offsets = positions - np.maximum.accumulate(np.where(line_starts, positions, 0))
+            is_start &= (offsets[:-1] % 2 == 0) & (codes[:-1] != _NEWLINE) & (codes[1:] != _NEWLINE)
+
+        starts = np.flatnonzero(is_start)
+        rows = np.searchsorted(text_ends, starts, side="right")
+        if self.mode == "hashing":
+            keys = (codes[starts].astype(np.uint64) << np.uint64(21)) | codes[starts + 1].astype(np.uint64)
+            dims = ((keys * _HASH_MULTIPLIER) >> np.uint64(32)) % np.uint64(self.n_features)
+            return rows * self.size + dims.astype(np.int64)
+
+        first = np.minimum(codes[starts], _NON_ASCII)
+        second = np.minimum(codes[starts + 1], _NON_ASCII)
+        dims = _pairs_vocabulary()[0][first * (_NON_ASCII + 1) + second]
+        found = dims >= 0
+        return rows[found] * self.size + dims[found]
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Embed a list of text and returns the embedding vectors that are lists of floats."""
-        return self.embedder.transform(texts).astype(float).todense().tolist()
+        non_zero = np.zeros(len(texts) * self.size, dtype=bool)
+        non_zero[self._features(texts)] = True
+
+        # set the non-zero dimensions only, the zeros of each embedding being a single shared float
+        embeddings = [[0.0] * self.size for _ in texts]
+        for cell in np.flatnonzero(non_zero).tolist():
+            embeddings[cell // self.size][cell % self.size] = 1.0
+        return embeddings
 
     def embed_query(self, text: str) -> List[float]:
         """Embed a string of text and returns the embedding vector as a list of floats."""
@@ -107,6 +191,13 @@ class EmbedderMultimodalSettings(EmbedderSettings, ABC):
 
 
 class EmbedderDumbConfig(EmbedderSettings):
+    mode: Literal["vocabulary", "hashing"] = Field(
+        default="vocabulary",
+        description="'vocabulary' encodes the pairs of printable characters (2367 dimensions), "
+                    "'hashing' hashes any pair of characters into `n_features` dimensions",
+    )
+    n_features: int = Field(default=1024, gt=0, description="Dimensions of the embeddings in 'hashing' mode")
+
     model_config = ConfigDict(
         json_schema_extra={
             "humanReadableName": "Dumb Embedder",
@@ -1,12 +1,23 @@
+import asyncio
+import hashlib
+import mimetypes
 import os
 import tempfile
+import time
 from abc import ABC, abstractmethod
-from typing import Type, List
+from datetime import datetime
+from typing import Type, List, Dict, Tuple, AsyncIterable, AsyncIterator
+import aiofiles
 from pydantic import ConfigDict, BaseModel
 
 from cat import utils
+from cat.env import get_env_int
 from cat.log import log
 from cat.services.factory.models import BaseFactoryConfigModel
+from cat.services.file_index import FileIndex
+
+# size of the chunks of the streamed files
+FILE_CHUNK_SIZE = 1024 * 1024
 
 
 class FileResponse(BaseModel):
@@ -15,17 +26,43 @@ class FileResponse(BaseModel):
     hash: str
     size: int
     last_modified: str
+    mime_type: str | None = None
+
+
+def _file_record(path: str, size: int, mtime: float | None, file_hash: str) -> Dict:
+    # the metadata of a file, as indexed: the modification time on the storage, if known, tells the changed files apart
+    name = os.path.basename(path)
+    return FileResponse(
+        path=path,
+        name=name,
+        hash=file_hash,
+        size=size,
+        last_modified=datetime.fromtimestamp(mtime if mtime is not None else time.time()).strftime("%Y-%m-%d"),
+        mime_type=mimetypes.guess_type(name)[0],
+    ).model_dump() | {"mtime": mtime}
 
 
 class BaseFileManager(ABC):
     """
     Base class for file storage managers. It defines the interface that all storage managers must implement. It is used
     to upload files and folders to a storage service.
+
+    Besides the synchronous interface, the files can be streamed in chunks (see `open_read` and `open_write`) and copied
+    on the storage (see `copy` and `atransfer`), so that they are never held in memory as a whole. The storages not
+    overriding the streaming methods fall back to their synchronous interface.
+
+    The metadata of the stored files are kept in an index (see `FileIndex`), updated whenever the files are uploaded,
+    written, removed or cloned, so that listing the files of a folder or checking the existence of a file does not need
+    to read (and hash) the files on the storage. The first listing of a folder, and then a listing every
+    `CAT_FILE_INDEX_RECONCILE_INTERVAL` seconds, reconciles the index with the storage, to detect the files added,
+    changed or removed out of band.
     """
     def __init__(self):
         self._excluded_dirs = ["__pycache__"]
         self._excluded_files = [".gitignore", ".DS_Store", ".gitkeep", ".git", ".dockerignore"]
         self._root_dir = utils.get_file_manager_root_storage_path()
+        self._index = FileIndex(self.__class__.__name__, self._root_dir)
+        self._reconcile_interval = max(get_env_int("CAT_FILE_INDEX_RECONCILE_INTERVAL") or 0, 0)
 
     def __eq__(self, other):
         if not isinstance(other, BaseFileManager):
@@ -72,7 +109,21 @@ class BaseFileManager(ABC):
         if any([ex_file in destination_path for ex_file in self._excluded_files]):
             return None
 
-        return self._upload_file(file_path, destination_path)
+        # the file is hashed before being uploaded, since the upload may move it
+        sha256 = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            while chunk := f.read(8192):
+                sha256.update(chunk)
+        size = os.path.getsize(file_path)
+
+        uploaded_path = self._upload_file(file_path, destination_path)
+        if uploaded_path:
+            self._index.put(
+                os.path.dirname(destination_path),
+                os.path.basename(destination_path),
+                _file_record(destination_path, size, self._file_mtime(destination_path), sha256.hexdigest()),
+            )
+        return uploaded_path
 
     @abstractmethod
     def _upload_file(self, file_path: str, destination_path: str) -> str:
@@ -95,6 +146,117 @@ class BaseFileManager(ABC):
     def _download_file(self, file_path: str) -> bytes | None:
         pass
 
+    def open_read(
+        self, file_path: str, start: int = 0, end: int | None = None, chunk_size: int = FILE_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream a single file from the storage, in chunks, optionally from the `start` byte up to the `end` one.
+
+        Args:
+            file_path: The path of the file to read from the storage
+            start: The first byte to read
+            end: The byte where the reading stops (excluded). If not specified, the file is read up to its end.
+            chunk_size: The maximum size of the chunks
+
+        Returns:
+            The asynchronous iterator of the chunks of the file, raising FileNotFoundError if the file does not exist
+        """
+        file_path = os.path.join(self._root_dir, file_path)
+        return self._open_read(file_path, start, end, chunk_size)
+
+    async def _open_read(self, file_path: str, start: int, end: int | None, chunk_size: int) -> AsyncIterator[bytes]:
+        # the storages not able to stream their files download them as a whole
+        file_content = await asyncio.to_thread(self._download_file, file_path)
+        if file_content is None:
+            raise FileNotFoundError(file_path)
+
+        file_content = memoryview(file_content)[start:end]
+        for offset in range(0, len(file_content), chunk_size):
+            yield bytes(file_content[offset:offset + chunk_size])
+
+    async def open_write(
+        self, chunks: AsyncIterable[bytes], remote_filename: str, remote_root_dir: str | None = None
+    ) -> str | None:
+        """
+        Write a single file on the storage, within the directory specified by `remote_root_dir`, from a stream of
+        chunks. The file is hashed while being written.
+
+        Args:
+            chunks: The asynchronous iterable of the chunks of the file
+            remote_filename: The name of the file on the storage
+            remote_root_dir: The directory on the storage where the file will be written. If None, the root directory of
+                the storage is used.
+
+        Returns:
+            The path of the file on the storage, None if the file has not been written
+        """
+        remote_root_dir = os.path.join(self._root_dir, remote_root_dir) if remote_root_dir else self._root_dir
+        destination_path = os.path.join(remote_root_dir, remote_filename)
+        if any([ex_file in destination_path for ex_file in self._excluded_files]):
+            return None
+
+        sha256 = hashlib.sha256()
+        size = 0
+
+        async def hashed_chunks():
+            nonlocal size
+            async for chunk in chunks:
+                sha256.update(chunk)
+                size += len(chunk)
+                yield chunk
+
+        written_path = await self._open_write(hashed_chunks(), destination_path)
+        if written_path:
+            self._index.put(
+                os.path.dirname(destination_path),
+                os.path.basename(destination_path),
+                _file_record(destination_path, size, self._file_mtime(destination_path), sha256.hexdigest()),
+            )
+        return written_path
+
+    async def _open_write(self, chunks: AsyncIterable[bytes], destination_path: str) -> str:
+        # the storages not able to stream their files upload them from a temporary file
+        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+            temp_path = temp_file.name
+
+        try:
+            async with aiofiles.open(temp_path, "wb") as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+            return await asyncio.to_thread(self._upload_file, temp_path, destination_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    async def copy(self, file_path_from: str, file_path_to: str) -> str | None:
+        """
+        Copy a single file on the storage, without downloading it, if the storage supports it.
+
+        Args:
+            file_path_from: The path of the file to copy, contained on the storage
+            file_path_to: The path of the copy on the storage
+
+        Returns:
+            The path of the copy on the storage, None if the file has not been copied
+        """
+        file_path_from = os.path.join(self._root_dir, file_path_from)
+        file_path_to = os.path.join(self._root_dir, file_path_to)
+        if (file := self.file_info(file_path_from)) is None:
+            return None
+
+        copied_path = await self._copy_file(file_path_from, file_path_to)
+        if copied_path:
+            # the content is the same, and so is the hash
+            self._index.put(
+                os.path.dirname(file_path_to),
+                os.path.basename(file_path_to),
+                _file_record(file_path_to, file.size, self._file_mtime(file_path_to), file.hash),
+            )
+        return copied_path
+
+    async def _copy_file(self, file_path_from: str, file_path_to: str) -> str:
+        return await self._open_write(self._open_read(file_path_from, 0, None, FILE_CHUNK_SIZE), file_path_to)
+
     def read_file(self, remote_filename: str, remote_root_dir: str | None = None) -> bytes | None:
         """
         Retrieves the content of a specified file from a remote directory as bytes.
@@ -143,11 +305,20 @@ class BaseFileManager(ABC):
 
         try:
             self._write_file(file_content, destination_path)  # type: ignore[call-arg]
-            return True
         except Exception as e:
             log.error(f"Error while writing file {destination_path}: {e}")
             return False
 
+        content = file_content.encode("utf-8") if isinstance(file_content, str) else file_content
+        self._index.put(
+            os.path.dirname(destination_path),
+            os.path.basename(destination_path),
+            _file_record(
+                destination_path, len(content), self._file_mtime(destination_path), hashlib.sha256(content).hexdigest()
+            ),
+        )
+        return True
+
     @abstractmethod
     def _write_file(self, file_content: str | bytes, file_path: str) -> None:
         pass
@@ -166,7 +337,11 @@ class BaseFileManager(ABC):
         if not self.file_exists(file_path):
             return False
 
-        return self._remove_file(file_path)
+        if not self._remove_file(file_path):
+            return False
+
+        self._index.remove(os.path.dirname(file_path), os.path.basename(file_path))
+        return True
 
     @abstractmethod
     def _remove_file(self, file_path: str) -> bool:
@@ -181,7 +356,11 @@ class BaseFileManager(ABC):
             True if the storage has been removed, False otherwise
         """
         remote_root_dir = os.path.join(self._root_dir, remote_root_dir) if remote_root_dir else self._root_dir
-        return self._remove_folder(remote_root_dir)
+        if not self._remove_folder(remote_root_dir):
+            return False
+
+        self._index.remove_tree(remote_root_dir)
+        return True
 
     @abstractmethod
     def _remove_folder(self, remote_root_dir: str) -> bool:
@@ -190,7 +369,7 @@ class BaseFileManager(ABC):
     def list_files(self, remote_root_dir: str) -> List[FileResponse]:
         remote_root_dir = os.path.join(self._root_dir, remote_root_dir) if remote_root_dir else self._root_dir
 
-        files = self._list_files(remote_root_dir)
+        files = self._indexed_files(remote_root_dir)
 
         excluded_paths = self._excluded_dirs + self._excluded_files
         file_names = [file.name for file in files]
@@ -201,6 +380,85 @@ class BaseFileManager(ABC):
     def _list_files(self, remote_root_dir: str) -> List[FileResponse]:
         pass
 
+    def _stat_files(self, remote_root_dir: str) -> Dict[str, Tuple[int, float | None]] | None:
+        """
+        The size and the modification time of the files of a folder on the storage, by name, without reading them. The
+        storages able to stat their files override this method, so that only the new and changed files are hashed when
+        reconciling the index with the storage.
+
+        Args:
+            remote_root_dir: The path of the folder on the storage.
+
+        Returns:
+            The size and the modification time of the files, None if the storage cannot list them without hashing them.
+        """
+        return None
+
+    def _file_mtime(self, file_path: str) -> float | None:
+        """The modification time of a file on the storage, None if unknown."""
+        return None
+
+    def _file_hash(self, file_path: str) -> str:
+        """The sha256 of the content of a file on the storage."""
+        return hashlib.sha256(self._read_file(file_path)).hexdigest()
+
+    def _indexed_files(self, remote_root_dir: str) -> List[FileResponse]:
+        records, reconciled_at = self._index.list(remote_root_dir) or ({}, None)
+        if reconciled_at is not None and (
+            not self._reconcile_interval or time.time() - reconciled_at < self._reconcile_interval
+        ):
+            return [FileResponse(**record) for record in records.values()]
+
+        records, _ = self._reconcile(remote_root_dir)
+        return [FileResponse(**record) for record in records.values()]
+
+    def _reconcile(self, remote_root_dir: str) -> Tuple[Dict[str, Dict], Dict[str, List[str]]]:
+        indexed, reconciled_at = self._index.list(remote_root_dir) or ({}, None)
+
+        stats = self._stat_files(remote_root_dir)
+        if stats is None:
+            records = {
+                file.name: file.model_dump() | {"mime_type": file.mime_type or mimetypes.guess_type(file.name)[0]}
+                for file in self._list_files(remote_root_dir)
+            }
+        else:
+            records = {}
+            for name, (size, mtime) in stats.items():
+                record = indexed.get(name)
+                # only the new files, and the ones changed since they were indexed, are hashed
+                if record is None or record["size"] != size or record.get("mtime") != mtime:
+                    path = os.path.join(remote_root_dir, name)
+                    record = _file_record(path, size, mtime, self._file_hash(path))
+                records[name] = record
+
+        changes = {
+            "added": sorted(set(records) - set(indexed)),
+            "changed": sorted(
+                name for name in set(records) & set(indexed)
+                if (records[name]["hash"], records[name]["size"]) != (indexed[name]["hash"], indexed[name]["size"])
+            ),
+            "removed": sorted(set(indexed) - set(records)),
+        }
+        if reconciled_at is not None and any(changes.values()):
+            log.info(f"Reconciled the index of the files of {remote_root_dir}: {changes}")
+
+        self._index.replace(remote_root_dir, records)
+        return records, changes
+
+    def reconcile(self, remote_root_dir: str) -> Dict[str, List[str]]:
+        """
+        Reconcile the index of the files of the `remote_root_dir` directory with the storage, detecting the files added,
+        changed or removed out of band. Only the new and changed files are hashed, if the storage can tell them apart.
+
+        Args:
+            remote_root_dir: The directory on the storage where the files are contained
+
+        Returns:
+            The names of the files added, changed and removed since the directory was last indexed
+        """
+        remote_root_dir = os.path.join(self._root_dir, remote_root_dir) if remote_root_dir else self._root_dir
+        return self._reconcile(remote_root_dir)[1]
+
     def clone_folder(self, remote_root_dir_from: str, remote_root_dir_to: str) -> List[str]:
         """
         Clone the entire `remote_root_dir_from` directory on the storage to the `remote_root_dir_to`.
@@ -218,7 +476,9 @@ class BaseFileManager(ABC):
         remote_root_dir_to = (
             os.path.join(self._root_dir, remote_root_dir_to) if remote_root_dir_to else self._root_dir
         )
-        return self._clone_folder(remote_root_dir_from, remote_root_dir_to)
+        cloned_files = self._clone_folder(remote_root_dir_from, remote_root_dir_to)
+        self._index.clone_tree(remote_root_dir_from, remote_root_dir_to)
+        return cloned_files
 
     @abstractmethod
     def _clone_folder(self, remote_root_dir_from: str, remote_root_dir_to: str) -> List[str]:
@@ -296,6 +556,42 @@ class BaseFileManager(ABC):
             log.error(f"Error while transferring files from the old file manager to the new one: {e}")
             return False
 
+    async def atransfer(self, file_manager_from: "BaseFileManager", remote_root_dir: str) -> bool:
+        """
+        Transfer files from the file manager specified in the `file_manager_from` to the current one, without blocking
+        the event loop. The storages able to stream their files stream them from a storage to the other one, in chunks;
+        the other ones fall back to `transfer`, through a temporary folder.
+
+        Args:
+            file_manager_from: The file manager to transfer the files from
+            remote_root_dir: The directory on the storage where the files are contained
+
+        Returns:
+            True if the files have been transferred, False otherwise
+        """
+        try:
+            return await self._atransfer(file_manager_from, remote_root_dir)
+        except Exception as e:
+            log.error(f"Error while transferring files from the old file manager to the new one: {e}")
+            return False
+
+    async def _atransfer(self, file_manager_from: "BaseFileManager", remote_root_dir: str) -> bool:
+        # the storages not able to stream their files transfer them through a temporary folder
+        return await asyncio.to_thread(self.transfer, file_manager_from, remote_root_dir)
+
+    async def _stream_transfer(self, file_manager_from: "BaseFileManager", remote_root_dir: str) -> bool:
+        # the storages able to stream their files use this in their `_atransfer`
+        for file in file_manager_from.list_files(remote_root_dir):
+            if any([ex_file in file.name for ex_file in self._excluded_files]):
+                continue
+
+            await self.open_write(
+                file_manager_from.open_read(os.path.join(remote_root_dir, file.name)), file.name, remote_root_dir
+            )
+
+        file_manager_from.remove_folder(remote_root_dir)
+        return True
+
     def file_exists(self, filename: str, remote_root_dir: str | None = None) -> bool:
         """
         Check if a file exists in the storage.
@@ -314,7 +610,33 @@ class BaseFileManager(ABC):
         if self._root_dir not in remote_root_dir:
             remote_root_dir = os.path.join(self._root_dir, remote_root_dir)  # type: ignore[assignment]
 
-        return filename in [file.name for file in self._list_files(remote_root_dir)]  # type: ignore[return-value]
+        exists = self._index.exists(remote_root_dir, filename)  # type: ignore[arg-type]
+        if exists is None:
+            exists = filename in self._reconcile(remote_root_dir)[0]  # type: ignore[arg-type]
+        return exists
+
+    def file_info(self, filename: str, remote_root_dir: str | None = None) -> FileResponse | None:
+        """
+        Get the metadata of a file in the storage.
+
+        Args:
+            filename: The name or path of the file
+            remote_root_dir: The directory on the storage where the file should be contained
+
+        Returns:
+            The metadata of the file, None if the file does not exist
+        """
+        if remote_root_dir is None:
+            remote_root_dir = os.path.dirname(filename)
+            filename = os.path.basename(filename)
+
+        if self._root_dir not in remote_root_dir:
+            remote_root_dir = os.path.join(self._root_dir, remote_root_dir)  # type: ignore[assignment]
+
+        record = self._index.get(remote_root_dir, filename)  # type: ignore[arg-type]
+        if record is None and self._index.exists(remote_root_dir, filename) is None:  # type: ignore[arg-type]
+            record = self._reconcile(remote_root_dir)[0].get(filename)  # type: ignore[arg-type]
+        return FileResponse(**record) if record else None
 
 
 class DummyFileManager(BaseFileManager):
@@ -4,13 +4,12 @@ import json
 import os
 import uuid
 from abc import ABC, abstractmethod
-from typing import Any, List, Iterable, Dict, Tuple, Type
+from typing import Any, AsyncIterator, Callable, List, Iterable, Dict, Set, Tuple, Type
 from urllib.parse import urlparse
 from langchain_core.documents import Document as LangChainDocument
 import aiofiles
 import httpx
 from pydantic import ConfigDict
-from qdrant_client import AsyncQdrantClient
 from qdrant_client.http.models import (
     Distance,
     VectorParams,
@@ -47,6 +46,10 @@ from cat.services.memory.models import (
     UpdateResult,
     VectorMemoryType,
 )
+from cat.services.qdrant_clients import QdrantClientRegistry
+
+DEFAULT_SCROLL_PAGE_SIZE = 1000
+DEFAULT_MAX_IN_FLIGHT_UPSERTS = 4
 
 
 class BaseVectorDatabaseHandler(ABC):
@@ -356,6 +359,120 @@ class BaseVectorDatabaseHandler(ABC):
         """
         pass
 
+    @abstractmethod
+    def iter_tenant_points(
+        self,
+        collection_name: str,
+        metadata: Dict | None = None,
+        page_size: int = DEFAULT_SCROLL_PAGE_SIZE,
+        with_vectors: bool = False,
+        with_payload: bool | List[str] = True,
+    ) -> AsyncIterator[List[Record]]:
+        """
+        Iterate over the points in the collection, one page at a time. Unlike `get_all_tenant_points`, only one page
+        is held in memory at a time, so that the memory footprint does not depend on the size of the collection.
+
+        Args:
+            collection_name: The name of the collection to retrieve points from.
+            metadata: Optional metadata filter to apply to the points.
+            page_size: The maximum number of points of each page.
+            with_vectors: If True, returns the points with their vectors.
+            with_payload: If True, returns the points with their payload. If a list of keys (e.g. `metadata.source`),
+                returns only the given keys of the payload.
+
+        Returns:
+            AsyncIterator: An async iterator over the pages of points.
+        """
+        pass
+
+    @abstractmethod
+    def iter_tenant_points_from_web(
+        self,
+        collection_name: str,
+        page_size: int = DEFAULT_SCROLL_PAGE_SIZE,
+        with_payload: bool | List[str] = True,
+    ) -> AsyncIterator[List[Record]]:
+        """
+        Iterate over the points in the collection coming from web access, one page at a time.
+
+        Args:
+            collection_name: The name of the collection to retrieve points from.
+            page_size: The maximum number of points of each page.
+            with_payload: If True, returns the points with their payload. If a list of keys, returns only those keys.
+
+        Returns:
+            AsyncIterator: An async iterator over the pages of points, without their vectors.
+        """
+        pass
+
+    @abstractmethod
+    def iter_tenant_points_from_files(
+        self,
+        collection_name: str,
+        page_size: int = DEFAULT_SCROLL_PAGE_SIZE,
+        with_payload: bool | List[str] = True,
+    ) -> AsyncIterator[List[Record]]:
+        """
+        Iterate over the points in the collection coming from file access, one page at a time.
+
+        Args:
+            collection_name: The name of the collection to retrieve points from.
+            page_size: The maximum number of points of each page.
+            with_payload: If True, returns the points with their payload. If a list of keys, returns only those keys.
+
+        Returns:
+            AsyncIterator: An async iterator over the pages of points, without their vectors.
+        """
+        pass
+
+    async def upsert_points_from(
+        self,
+        source: "BaseVectorDatabaseHandler",
+        collection_name: str,
+        transform: Callable[[PointStruct], PointStruct] | None = None,
+        page_size: int = DEFAULT_SCROLL_PAGE_SIZE,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT_UPSERTS,
+    ) -> int:
+        """
+        Copy the points of the tenant of `source` into the tenant of this handler, in the same collection. Pages are
+        read from `source` while the previous ones are being upserted, with at most `max_in_flight` pending upserts:
+        the memory footprint is bounded by `(max_in_flight + 1) * page_size` points, whatever the collection size.
+
+        Args:
+            source: The handler to read the points from.
+            collection_name: The name of the collection to copy the points of.
+            transform: Optional function applied to each point before the upsert (e.g. to assign a new id).
+            page_size: The maximum number of points read and upserted at a time.
+            max_in_flight: The maximum number of pages being upserted concurrently.
+
+        Returns:
+            int: The number of copied points.
+        """
+        copied = 0
+        pending: Set[asyncio.Task] = set()
+        try:
+            async for page in source.iter_tenant_points(collection_name, page_size=page_size, with_vectors=True):
+                points = [PointStruct(**p.model_dump(exclude={"shard_key", "order_value"})) for p in page]
+                if transform is not None:
+                    points = [transform(p) for p in points]
+
+                if len(pending) >= max_in_flight:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+
+                pending.add(asyncio.create_task(self.add_points_to_tenant(collection_name, points)))
+                copied += len(points)
+
+            if pending:
+                await asyncio.gather(*pending)
+                pending = set()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return copied
+
     @abstractmethod
     async def get_tenant_vectors_count(self, collection_name: str) -> int:
         """
@@ -528,53 +645,12 @@ class BaseVectorDatabaseHandler(ABC):
         pass
 
 
-class QdrantHandler(BaseVectorDatabaseHandler):
-    def __init__(
-        self,
-        host: str,
-        port: int,
-        api_key: str | None = None,
-        client_timeout: int | None = 100,
-        save_memory_snapshots: bool = False,
-    ):
-        if host is None:
-            raise ValueError("CAT_QDRANT_HOST environment variable is not set.")
-
-        super().__init__(save_memory_snapshots)
-        self.port = port
-        self.api_key = api_key or None
-
-        try:
-            parsed_url = urlparse(host)
-            self.is_https = parsed_url.scheme == "https"
-            self.host = parsed_url.netloc + parsed_url.path
-        except:
-            self.is_https = False
-            self.host = host
-
-        qdrant_client_timeout = int(client_timeout) if client_timeout is not None else None
-
-        try:
-            self._client = AsyncQdrantClient(
-                host=self.host,
-                port=self.port,
-                https=self.is_https,
-                api_key=self.api_key,
-                prefer_grpc=True,
-                force_disable_check_same_thread=True,
-                timeout=qdrant_client_timeout,
-            )
-        except Exception as e:
-            log.error(f"Qdrant does not respond to {self.host}:{port}")
-            raise e
-
-    def _eq(self, other: "QdrantHandler") -> bool:
-        return self.client.init_options == other.client.init_options
-
-    @property
-    def client(self):
-        return self._client
-
+class QdrantDialectMixin:
+    """
+    Filter dialect and point conversions shared by the vector database handlers speaking the Qdrant models: filters are
+    `Filter` objects built out of `FieldCondition` ones, and points are stored with a payload made of the `page_content`,
+    the `metadata` and the `tenant_id` of the agent.
+    """
     async def initialize(self, embedder_name: str, embedder_size: int):
         """
         Initializes the vector database with the specified embedder name and size.
@@ -636,6 +712,177 @@ class QdrantHandler(BaseVectorDatabaseHandler):
 
         return False
 
+    def _web_points_filter(self) -> Filter:
+        return Filter(
+            must=[
+                self.tenant_field_condition(),
+                FieldCondition(
+                    key="metadata.source",
+                    match=MatchText(text="http")  # Regex for "starts with http"
+                )
+            ]
+        )
+
+    def _files_points_filter(self) -> Filter:
+        return Filter(
+            must_not=[
+                FieldCondition(
+                    key="metadata.source",
+                    match=MatchText(text="http")  # Regex for "starts with http"
+                )
+            ],
+            must=[
+                self.tenant_field_condition(),
+                FieldCondition(
+                    key="metadata.source",
+                    match=MatchValue(value="^http")  # Regex for "starts with http"
+                )
+            ]
+        )
+
+    def iter_tenant_points(
+        self,
+        collection_name: str,
+        metadata: Dict | None = None,
+        page_size: int = DEFAULT_SCROLL_PAGE_SIZE,
+        with_vectors: bool = False,
+        with_payload: bool | List[str] = True,
+    ) -> AsyncIterator[List[Record]]:
+        return self._iter_points(  # type: ignore[attr-defined]
+            collection_name,
+            Filter(must=self._build_metadata_conditions(metadata)),
+            page_size=page_size,
+            with_vectors=with_vectors,
+            with_payload=with_payload,
+        )
+
+    def iter_tenant_points_from_web(
+        self,
+        collection_name: str,
+        page_size: int = DEFAULT_SCROLL_PAGE_SIZE,
+        with_payload: bool | List[str] = True,
+    ) -> AsyncIterator[List[Record]]:
+        return self._iter_points(  # type: ignore[attr-defined]
+            collection_name, self._web_points_filter(), page_size=page_size, with_payload=with_payload
+        )
+
+    def iter_tenant_points_from_files(
+        self,
+        collection_name: str,
+        page_size: int = DEFAULT_SCROLL_PAGE_SIZE,
+        with_payload: bool | List[str] = True,
+    ) -> AsyncIterator[List[Record]]:
+        return self._iter_points(  # type: ignore[attr-defined]
+            collection_name, self._files_points_filter(), page_size=page_size, with_payload=with_payload
+        )
+
+    async def recall_tenant_memory(self, collection_name: str) -> List[DocumentRecall]:
+        return [
+            self._to_document_recall(p)
+            async for page in self.iter_tenant_points(collection_name, with_vectors=True)
+            for p in page
+        ]
+
+    def filter_from_dict(self, filter_dict: Dict) -> Filter | None:
+        if not filter_dict or len(filter_dict) < 1:
+            return None
+
+        return Filter(
+            should=[
+                condition
+                for key, value in filter_dict.items()
+                for condition in self.build_condition(key, value)
+            ]
+        )
+
+    def _to_document_recall(self, m: Record | ScoredPoint) -> DocumentRecall:
+        """
+        Convert a Qdrant point to a DocumentRecall object
+
+        Args:
+            m (Record | ScoredPoint): The Qdrant point
+
+        Returns:
+            DocumentRecall: The converted DocumentRecall object
+        """
+        page_content = m.payload.get("page_content", "") if m.payload else ""
+        if isinstance(page_content, dict):
+            page_content = json.dumps(page_content)
+
+        metadata = m.payload.get("metadata", {}) if m.payload else {}
+        if isinstance(metadata, str):
+            try:
+                metadata = json.loads(metadata)
+            except json.JSONDecodeError:
+                metadata = {}
+
+        document = DocumentRecall(
+            document=LangChainDocument(
+                page_content=page_content,
+                metadata=metadata,
+                id=m.id,
+            ),
+            vector=m.vector,
+            id=m.id,
+        )
+
+        if isinstance(m, ScoredPoint):
+            document.score = m.score
+
+        return document
+
+
+class QdrantHandler(QdrantDialectMixin, BaseVectorDatabaseHandler):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        api_key: str | None = None,
+        client_timeout: int | None = 100,
+        save_memory_snapshots: bool = False,
+    ):
+        if host is None:
+            raise ValueError("CAT_QDRANT_HOST environment variable is not set.")
+
+        super().__init__(save_memory_snapshots)
+        self.port = port
+        self.api_key = api_key or None
+
+        try:
+            parsed_url = urlparse(host)
+            self.is_https = parsed_url.scheme == "https"
+            self.host = parsed_url.netloc + parsed_url.path
+        except:
+            self.is_https = False
+            self.host = host
+
+        qdrant_client_timeout = int(client_timeout) if client_timeout is not None else None
+
+        # handlers with the same connection configuration share the same client (and gRPC channel)
+        self._client_kwargs = {
+            "host": self.host,
+            "port": self.port,
+            "https": self.is_https,
+            "api_key": self.api_key,
+            "prefer_grpc": True,
+            "force_disable_check_same_thread": True,
+            "timeout": qdrant_client_timeout,
+        }
+        self._client_released = False
+
+        try:
+            self._client = QdrantClientRegistry().acquire(**self._client_kwargs)
+        except Exception as e:
+            log.error(f"Qdrant does not respond to {self.host}:{port}")
+            raise e
+
+    def _eq(self, other: "QdrantHandler") -> bool:
+        return self.client.init_options == other.client.init_options
+
+    @property
+    def client(self):
+        return self._client
+
     @staticmethod
     def _get_local_alias(embedder_name: str, collection_name: str) -> str:
         return f"{embedder_name}_{collection_name}"
@@ -749,8 +996,10 @@ class QdrantHandler(BaseVectorDatabaseHandler):
                 log.error(f"Error when creating a schema index: {e}")
 
     async def close(self):
-        if self._client and not self._client._client.closed:
-            await self._client.close()
+        # the client is shared: release it to the registry, which closes it when no longer needed
+        if self._client and not self._client_released:
+            self._client_released = True
+            await QdrantClientRegistry().release(**self._client_kwargs)
 
     async def delete_collection(self, collection_name: str, timeout: int | None = None):
         """
@@ -896,42 +1145,6 @@ class QdrantHandler(BaseVectorDatabaseHandler):
             operation_id=res.operation_id,
         )
 
-    def _to_document_recall(self, m: Record | ScoredPoint) -> DocumentRecall:
-        """
-        Convert a Qdrant point to a DocumentRecall object
-
-        Args:
-            m (Record | ScoredPoint): The Qdrant point
-
-        Returns:
-            DocumentRecall: The converted DocumentRecall object
-        """
-        page_content = m.payload.get("page_content", "") if m.payload else ""
-        if isinstance(page_content, dict):
-            page_content = json.dumps(page_content)
-
-        metadata = m.payload.get("metadata", {}) if m.payload else {}
-        if isinstance(metadata, str):
-            try:
-                metadata = json.loads(metadata)
-            except json.JSONDecodeError:
-                metadata = {}
-
-        document = DocumentRecall(
-            document=LangChainDocument(
-                page_content=page_content,
-                metadata=metadata,
-                id=m.id,
-            ),
-            vector=m.vector,
-            id=m.id,
-        )
-
-        if isinstance(m, ScoredPoint):
-            document.score = m.score
-
-        return document
-
     # retrieve similar memories from embedding
     async def recall_tenant_memory_from_embedding(
         self,
@@ -965,11 +1178,29 @@ class QdrantHandler(BaseVectorDatabaseHandler):
         retrieved_points = [ScoredPoint(**point.model_dump()) for point in query_response.points]
         return [self._to_document_recall(m) for m in retrieved_points]
 
-    async def recall_tenant_memory(self, collection_name: str) -> List[DocumentRecall]:
-        all_points, _ = await self.get_all_tenant_points(collection_name)
-        memories = [self._to_document_recall(p) for p in all_points]
+    async def _iter_points(
+        self,
+        collection_name: str,
+        scroll_filter: Filter,
+        page_size: int = DEFAULT_SCROLL_PAGE_SIZE,
+        with_vectors: bool = False,
+        with_payload: bool | List[str] = True,
+    ) -> AsyncIterator[List[Record]]:
+        offset = None
+        while True:
+            points_batch, offset = await self._client.scroll(  # type: ignore[attr-defined]
+                collection_name=collection_name,
+                scroll_filter=scroll_filter,
+                with_vectors=with_vectors,
+                with_payload=with_payload,
+                offset=offset,
+                limit=page_size,
+            )
+            if points_batch:
+                yield [Record(**point.model_dump()) for point in points_batch]
 
-        return memories
+            if offset is None:
+                break
 
     async def _get_all_points(
         self,
@@ -990,30 +1221,12 @@ class QdrantHandler(BaseVectorDatabaseHandler):
             )
             return [Record(**point.model_dump()) for point in points_batch], next_offset
 
-        # retrieve all points without limit
-        memory_points = []
-        limit = 10000
-        while True:
-            # Get a batch of points
-            points_batch, next_offset = await self._get_all_points(
-                collection_name=collection_name,
-                scroll_filter=scroll_filter,
-                limit=limit,
-                offset=offset,
-                with_vectors=with_vectors,
-            )
-
-            # Add filtered points to our collection
-            memory_points.extend(points_batch)
-
-            # Check if we have more pages
-            if next_offset is None:
-                # No more pages
-                break
-
-            # Set offset for the next iteration
-            offset = next_offset  # type: ignore[assignment]
-
+        # retrieve all points without limit: prefer the `iter_*` methods when the points can be consumed page by page
+        memory_points = [
+            point
+            async for page in self._iter_points(collection_name, scroll_filter, with_vectors=with_vectors)
+            for point in page
+        ]
         return memory_points, None
 
     # retrieve all the points in the collection
@@ -1037,17 +1250,9 @@ class QdrantHandler(BaseVectorDatabaseHandler):
     async def get_all_tenant_points_from_web(
         self, collection_name: str, limit: int | None = None, offset: str | None = None
     ) -> Tuple[List[Record], int | str | None]:
-        conditions = [
-            self.tenant_field_condition(),
-            FieldCondition(
-                key="metadata.source",
-                match=MatchText(text="http")  # Regex for "starts with http"
-            )
-        ]
-
         return await self._get_all_points(
             collection_name=collection_name,
-            scroll_filter=Filter(must=conditions),
+            scroll_filter=self._web_points_filter(),
             limit=limit,
             offset=offset,
             with_vectors=False,
@@ -1056,25 +1261,9 @@ class QdrantHandler(BaseVectorDatabaseHandler):
     async def get_all_tenant_points_from_files(
         self, collection_name: str, limit: int | None = None, offset: str | None = None
     ) -> Tuple[List[Record], int | str | None]:
-        filter_condition = Filter(
-            must_not=[
-                FieldCondition(
-                    key="metadata.source",
-                    match=MatchText(text="http")  # Regex for "starts with http"
-                )
-            ],
-            must=[
-                self.tenant_field_condition(),
-                FieldCondition(
-                    key="metadata.source",
-                    match=MatchValue(value="^http")  # Regex for "starts with http"
-                )
-            ]
-        )
-
         return await self._get_all_points(
             collection_name=collection_name,
-            scroll_filter=filter_condition,
+            scroll_filter=self._files_points_filter(),
             limit=limit,
             offset=offset,
             with_vectors=False
@@ -1156,17 +1345,6 @@ class QdrantHandler(BaseVectorDatabaseHandler):
 
         return response.points
 
-    def filter_from_dict(self, filter_dict: Dict) -> Filter | None:
-        if not filter_dict or len(filter_dict) < 1:
-            return None
-
-        return Filter(
-            should=[
-                condition
-                for key, value in filter_dict.items()
-                for condition in self.build_condition(key, value)
-            ]
-        )
 
 
 class VectorDatabaseSettings(BaseFactoryConfigModel, ABC):
@@ -0,0 +1,193 @@
+import json
+import os
+import re
+import time
+from typing import Dict, List, Tuple
+
+from redis.exceptions import RedisError
+
+from cat.db.database import get_sync_db, DEFAULT_AGENTS_KEY, DEFAULT_FILES_KEY, DEFAULT_SYSTEM_KEY
+from cat.log import log
+
+# reserved field of the index of a folder, storing when the folder was last reconciled with the storage
+_RECONCILED_FIELD = ""
+
+
+def _escape(pattern: str) -> str:
+    # the names of the folders are matched literally by the SCAN patterns
+    return re.sub(r"([*?\[\]\\])", r"\\\1", pattern)
+
+
+class FileIndex:
+    """
+    Metadata index of the files stored by a file manager, on Redis: one hash per folder of the storage, mapping the name
+    of each file to its metadata (path, name, size, modification time, hash and MIME type of the content).
+
+    The index of a folder belongs to the agent owning the folder (or to the system, for the root of the storage) and to
+    the class of the file manager, so that two file managers of the same agent (e.g. during a transfer of the files) do
+    not share it. A folder is indexed once it has been reconciled with the storage, see :meth:`replace`.
+
+    Redis errors are logged and reported as a missing index, so that the file manager falls back to the storage.
+    """
+
+    def __init__(self, file_manager_name: str, root_dir: str):
+        self._file_manager_name = file_manager_name
+        self._root_dir = root_dir
+
+    def _key(self, remote_root_dir: str) -> str:
+        relative_dir = os.path.relpath(remote_root_dir, self._root_dir).replace(os.sep, "/")
+        if relative_dir == ".":
+            return f"{DEFAULT_SYSTEM_KEY}:{DEFAULT_FILES_KEY}:{self._file_manager_name}:/"
+
+        agent_id, _, sub_dir = relative_dir.partition("/")
+        return f"{DEFAULT_AGENTS_KEY}:{agent_id}:{DEFAULT_FILES_KEY}:{self._file_manager_name}:/{sub_dir}"
+
+    def _tree_keys(self, remote_root_dir: str) -> List[str]:
+        key = self._key(remote_root_dir)
+        if os.path.relpath(remote_root_dir, self._root_dir) == ".":
+            patterns = [f"{DEFAULT_AGENTS_KEY}:*:{DEFAULT_FILES_KEY}:{_escape(self._file_manager_name)}:*"]
+        else:
+            # the index of the folder and of its sub-folders, not of the sibling folders sharing its prefix
+            patterns = [f"{_escape(key.rstrip('/'))}/*"]
+
+        db = get_sync_db()
+        keys = {key}
+        for pattern in patterns:
+            keys.update(db.scan_iter(match=pattern, count=1000))
+        return list(keys)
+
+    def list(self, remote_root_dir: str) -> Tuple[Dict[str, Dict], float | None] | None:
+        """
+        The metadata of the files of a folder, by name, and when the folder was last reconciled with the storage.
+
+        Args:
+            remote_root_dir: The path of the folder on the storage.
+
+        Returns:
+            The metadata of the files and the time of the last reconciliation (None if the folder has never been
+            reconciled, i.e. it is not indexed), None if the index cannot be read.
+        """
+        try:
+            stored = get_sync_db().hgetall(self._key(remote_root_dir))
+        except RedisError as e:
+            log.warning(f"Redis error reading the index of the files of {remote_root_dir}: {e}")
+            return None
+
+        reconciled_at = stored.pop(_RECONCILED_FIELD, None)
+        reconciled_at = float(reconciled_at) if reconciled_at is not None else None
+        return {name: json.loads(record) for name, record in stored.items()}, reconciled_at
+
+    def get(self, remote_root_dir: str, filename: str) -> Dict | None:
+        """
+        The metadata of a file of a folder.
+
+        Args:
+            remote_root_dir: The path of the folder on the storage.
+            filename: The name of the file.
+
+        Returns:
+            The metadata of the file, None if the file is not indexed or the index cannot be read.
+        """
+        try:
+            record = get_sync_db().hget(self._key(remote_root_dir), filename)
+        except RedisError as e:
+            log.warning(f"Redis error reading the index of the files of {remote_root_dir}: {e}")
+            return None
+
+        return json.loads(record) if record else None
+
+    def exists(self, remote_root_dir: str, filename: str) -> bool | None:
+        """
+        Whether a file of a folder is indexed.
+
+        Args:
+            remote_root_dir: The path of the folder on the storage.
+            filename: The name of the file.
+
+        Returns:
+            Whether the file is indexed, None if the folder is not indexed.
+        """
+        key = self._key(remote_root_dir)
+        try:
+            pipeline = get_sync_db().pipeline(transaction=False)
+            pipeline.hexists(key, _RECONCILED_FIELD)
+            pipeline.hexists(key, filename)
+            indexed, exists = pipeline.execute()
+        except RedisError as e:
+            log.warning(f"Redis error reading the index of the files of {remote_root_dir}: {e}")
+            return None
+
+        return bool(exists) if indexed else None
+
+    def put(self, remote_root_dir: str, filename: str, record: Dict):
+        """Index the metadata of a file of a folder."""
+        try:
+            get_sync_db().hset(self._key(remote_root_dir), filename, json.dumps(record))
+        except RedisError as e:
+            log.warning(f"Redis error indexing the file {filename} of {remote_root_dir}: {e}")
+
+    def remove(self, remote_root_dir: str, filename: str):
+        """Remove a file of a folder from the index."""
+        try:
+            get_sync_db().hdel(self._key(remote_root_dir), filename)
+        except RedisError as e:
+            log.warning(f"Redis error removing the file {filename} of {remote_root_dir} from the index: {e}")
+
+    def replace(self, remote_root_dir: str, records: Dict[str, Dict]):
+        """
+        Replace the index of a folder with the metadata of its files, as just reconciled with the storage.
+
+        Args:
+            remote_root_dir: The path of the folder on the storage.
+            records: The metadata of the files of the folder, by name.
+        """
+        key = self._key(remote_root_dir)
+        mapping = {name: json.dumps(record) for name, record in records.items()} | {_RECONCILED_FIELD: time.time()}
+        try:
+            pipeline = get_sync_db().pipeline()
+            pipeline.delete(key)
+            pipeline.hset(key, mapping=mapping)
+            pipeline.execute()
+        except RedisError as e:
+            log.warning(f"Redis error indexing the files of {remote_root_dir}: {e}")
+
+    def remove_tree(self, remote_root_dir: str):
+        """Remove a folder and its sub-folders from the index."""
+        try:
+            get_sync_db().delete(*self._tree_keys(remote_root_dir))
+        except RedisError as e:
+            log.warning(f"Redis error removing the files of {remote_root_dir} from the index: {e}")
+
+    def clone_tree(self, remote_root_dir_from: str, remote_root_dir_to: str):
+        """
+        Copy the index of a folder and of its sub-folders to another folder, whose files have been cloned from it.
+
+        Args:
+            remote_root_dir_from: The path of the cloned folder on the storage.
+            remote_root_dir_to: The path of the folder on the storage where the files have been cloned.
+        """
+        base_key_from = self._key(remote_root_dir_from).rstrip("/")
+        base_key_to = self._key(remote_root_dir_to).rstrip("/")
+
+        try:
+            db = get_sync_db()
+            pipeline = db.pipeline()
+            for key in self._tree_keys(remote_root_dir_from):
+                if not key.startswith(base_key_from) or not (stored := db.hgetall(key)):
+                    continue
+
+                mapping = {}
+                for name, record in stored.items():
+                    if name != _RECONCILED_FIELD:
+                        record = json.loads(record)
+                        if record["path"].startswith(remote_root_dir_from):
+                            record["path"] = remote_root_dir_to + record["path"][len(remote_root_dir_from):]
+                        record = json.dumps(record)
+                    mapping[name] = record
+
+                key_to = base_key_to + key[len(base_key_from):]
+                pipeline.delete(key_to)
+                pipeline.hset(key_to, mapping=mapping)
+            pipeline.execute()
+        except RedisError as e:
+            log.warning(f"Redis error copying the index of the files of {remote_root_dir_from}: {e}")
@@ -3,6 +3,8 @@ from typing import List, Any, Literal, Dict, Set
 from pydantic import Field, field_validator
 
 from cat.db.cruds import conversations as crud_conversations
+from cat.env import get_env_int
+from cat.looking_glass.mad_hatter.copy_on_write import unwrap
 from cat.services.memory.interactions import ModelInteraction
 from cat.services.memory.messages import BaseMessage, UserMessage, ConversationMessage
 from cat.services.memory.models import DocumentRecall
@@ -22,7 +24,10 @@ class WorkingMemory(BaseModelDict):
     chat_id: str
         The identifier of the chat session
     history: List[ConversationMessage]
-        A list that maintains the conversation history between the Human and the AI.
+        A list that maintains the latest messages of the conversation history between the Human and the AI (up to
+        `CAT_HISTORY_WINDOW` messages).
+    num_messages: int
+        The number of messages of the whole conversation history.
     user_message: Optional[UserMessage], default=None
         An optional UserMessage object representing the last user message.
     context_memories: List
@@ -36,6 +41,7 @@ class WorkingMemory(BaseModelDict):
 
     # stores conversation history
     history: List[ConversationMessage] | None = Field(default_factory=list)
+    num_messages: int = 0
     user_message: UserMessage | None = None
 
     context_memories: List[DocumentRecall] = Field(default_factory=list)
@@ -55,13 +61,17 @@ class WorkingMemory(BaseModelDict):
         super().__init__(**data)
         self.history =[]
 
+    @staticmethod
+    def _history_window() -> int | None:
+        return max(get_env_int("CAT_HISTORY_WINDOW") or 0, 0) or None
+
     @classmethod
     async def create(cls, agent_id: str, user_id: str, chat_id: str) -> "WorkingMemory":
         obj = cls(agent_id=agent_id, user_id=user_id, chat_id=chat_id)
-        obj.history =  [
-            ConversationMessage(**info)
-            for info in await crud_conversations.get_messages(agent_id, user_id, chat_id)
-        ]
+        messages, obj.num_messages = await crud_conversations.get_latest_messages(
+            agent_id, user_id, chat_id, cls._history_window()
+        )
+        obj.history = [ConversationMessage(**info) for info in messages]
         return obj
 
     async def reset_history(self) -> "WorkingMemory":
@@ -73,6 +83,7 @@ class WorkingMemory(BaseModelDict):
         """
         await crud_conversations.set_messages(self.agent_id, self.user_id, self.chat_id, [])
         self.history = []
+        self.num_messages = 0
 
         return self
 
@@ -86,29 +97,43 @@ class WorkingMemory(BaseModelDict):
             who: str, who said the message. Can either be "user" or "assistant".
             content: BaseMessage, the message said.
         """
-        # we are sure that who is not change in the current call
+        # we are sure that who is not change in the current call; the content may be the view of a hook argument
         conversation_history_item = ConversationMessage(
-            who=who, content=content, when=datetime.now(timezone.utc).timestamp()
+            who=who, content=unwrap(content), when=datetime.now(timezone.utc).timestamp()
         )
 
-        # append the latest message in conversation
-        self.history = [
-            ConversationMessage(**info)
-            for info in await crud_conversations.update_messages(
-                self.agent_id, self.user_id, self.chat_id, conversation_history_item
-            )
-        ]
+        # append the latest message in conversation, reading back the latest messages only
+        messages, self.num_messages = await crud_conversations.update_messages(
+            self.agent_id, self.user_id, self.chat_id, conversation_history_item, self._history_window()
+        )
+        self.history = [ConversationMessage(**info) for info in messages]
         return self
 
+    async def get_latest_history(self, latest_n: int) -> List[ConversationMessage]:
+        """
+        Get the latest messages of the conversation history. If more messages are requested than the ones kept in
+        memory (see `CAT_HISTORY_WINDOW`), they are read from Redis.
+
+        Args:
+            latest_n: int, number of latest messages to get.
+
+        Returns:
+            The latest messages of the conversation history.
+        """
+        if latest_n <= len(self.history) or len(self.history) >= self.num_messages:
+            return self.history[-latest_n:]
+
+        messages = await crud_conversations.get_messages(self.agent_id, self.user_id, self.chat_id, latest_n)
+        return [ConversationMessage(**info) for info in messages]
+
     async def pop_last_message_if_human(self) -> "WorkingMemory":
         """
         Pop the last message if it was said by the human.
         """
         if self.history and self.history[-1].who == "user":
             self.history.pop()
-            await crud_conversations.set_messages(
-                self.agent_id, self.user_id, self.chat_id, self.history
-            )
+            self.num_messages = max(self.num_messages - 1, 0)
+            await crud_conversations.pop_last_message(self.agent_id, self.user_id, self.chat_id)
         return self
 
     @property
@@ -30,10 +30,12 @@ class NotifierService:
         """
         Send a message via WebSocket.
 
-        The message is routed through the WebSocket manager which publishes it
-        to the Redis `ws:msg:<chat_id>` channel.  The replica that holds the
-        actual WebSocket connection will receive the pub/sub event and deliver
-        it locally.  In single-replica / no-Redis mode delivery is direct.
+        The message is routed through the WebSocket manager: it is delivered
+        directly when this replica holds the connection of the chat, otherwise
+        it is published to the Redis channel of the replica owning it
+        (``ws:replica:<id>``, as claimed in ``ws:owner:<chat_id>``).  When the
+        owner is unknown or gone, the message is published to the broadcast
+        channel, and the replica holding the connection, if any, delivers it.
 
         Args:
             content (str): The content of the message.
@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List
+from langchain_community.document_loaders.parsers.generic import MimeTypeBasedParser
+from langchain_core.documents.base import Document, Blob
+
+from cat.env import get_env_int
+from cat.log import log
+from cat.utils import singleton
+
+# parsers unpickled by the current worker process, keyed by the hash of their pickled form
+_WORKER_PARSERS: Dict[str, Dict] = {}
+_WORKER_PARSERS_MAX_SIZE = 16
+
+
+def _init_worker(memory_limit: int):
+    """Cap the address space of a worker process, so that a runaway parser fails with a `MemoryError`."""
+    if not memory_limit:
+        return
+
+    try:
+        import resource
+
+        limit = memory_limit * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        log.warning(f"Parser pool: could not cap the memory of the worker: {e}")
+
+
+def _warm_up() -> bool:
+    return True
+
+
+def _parse(file_handlers: Dict, data: bytes, mime_type: str | None, source: str) -> List[Document]:
+    return MimeTypeBasedParser(handlers=file_handlers).parse(
+        Blob.from_data(data=data, mime_type=mime_type, path=source)
+    )
+
+
+def _parse_in_worker(
+    handlers_key: str, handlers_blob: bytes, data: bytes, mime_type: str | None, source: str
+) -> List[Document]:
+    if (file_handlers := _WORKER_PARSERS.get(handlers_key)) is None:
+        if len(_WORKER_PARSERS) >= _WORKER_PARSERS_MAX_SIZE:
+            _WORKER_PARSERS.clear()
+        file_handlers = _WORKER_PARSERS[handlers_key] = pickle.loads(handlers_blob)
+
+    return _parse(file_handlers, data, mime_type, source)
+
+
+@singleton
+class ParserPool:
+    """
+    Pool of warm worker processes parsing the files ingested by the Rabbit Hole, so that CPU-bound parsers (PDF, HTML,
+    tables) do not stall the event loop, nor contend for the GIL with the requests being served.
+
+    - `CAT_PARSER_WORKERS` processes are spawned by :meth:`start`. With 0 workers, files are parsed in a thread.
+    - At most `CAT_PARSER_CONCURRENCY_PER_MIME` files of the same MIME type are parsed at the same time.
+    - A parsing lasting more than `CAT_PARSER_TIMEOUT` seconds fails: the workers are killed and replaced, since a
+      running parser cannot be interrupted otherwise. The other files being parsed by the killed workers are parsed
+      again by the new ones.
+    - If the workers cannot be started, files are parsed in a thread.
+    - Each worker can use at most `CAT_PARSER_MEMORY_LIMIT` MB of address space (0 disables the cap).
+
+    The parsers returned by the `rabbithole_instantiates_parsers` hook are pickled and sent to the workers, which cache
+    them by the hash of their pickled form. Parsers that cannot be pickled are run in a thread.
+
+    Call ``await start()`` once during application startup and ``await stop()`` during the shutdown.
+    """
+
+    def __init__(self):
+        self._workers = max(get_env_int("CAT_PARSER_WORKERS") or 0, 0)
+        self._concurrency_per_mime = max(get_env_int("CAT_PARSER_CONCURRENCY_PER_MIME") or 1, 1)
+        self._timeout = max(get_env_int("CAT_PARSER_TIMEOUT") or 0, 0)
+        self._memory_limit = max(get_env_int("CAT_PARSER_MEMORY_LIMIT") or 0, 0)
+
+        self._executor: ProcessPoolExecutor | None = None
+        # spawning the workers takes a while: the parsing timeout starts once they are ready
+        self._warming: asyncio.Task | None = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    # ── Lifecycle ──────────────────────────────────────────────────────────────
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # workers are spawned rather than forked: forking a process running an event loop and threads is unsafe
+        return ProcessPoolExecutor(
+            max_workers=self._workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self._memory_limit,),
+        )
+
+    async def start(self):
+        """Spawn the worker processes, and wait until they are ready to parse."""
+        if not self._workers or self._executor is not None:
+            return
+
+        self._executor = self._new_executor()
+        self._warming = asyncio.create_task(self._warm_up(self._executor))
+        await self._warming
+
+    async def _warm_up(self, executor: ProcessPoolExecutor) -> bool:
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.gather(*[loop.run_in_executor(executor, _warm_up) for _ in range(self._workers)])
+            log.info(f"Parser pool: {self._workers} workers ready")
+            return True
+        except Exception as e:
+            log.warning(f"Parser pool: could not start the workers, files will be parsed in a thread: {e}")
+            if self._executor is executor:
+                self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            return False
+
+    async def stop(self):
+        """Shut the worker processes down."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    def _restart(self, executor: ProcessPoolExecutor):
+        # the failures of the parsings running on the killed workers must not restart the new ones
+        if executor is not self._executor:
+            return
+
+        self._executor = self._new_executor()
+        self._warming = asyncio.create_task(self._warm_up(self._executor))
+
+        # a running task cannot be cancelled: the workers have to be killed
+        for process in list((executor._processes or {}).values()):  # type: ignore[attr-defined]
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # ── Parsing ────────────────────────────────────────────────────────────────
+
+    async def parse(self, file_handlers: Dict, data: bytes, mime_type: str | None, source: str) -> List[Document]:
+        """
+        Parse the content of a file with the parser registered for its MIME type.
+
+        Args:
+            file_handlers: Dictionary of the MIME types and the related parsers.
+            data: The content of the file.
+            mime_type: The MIME type of the file.
+            source: The name of the file.
+
+        Returns:
+            The list of Langchain `Document` parsed from the file.
+
+        Raises:
+            TimeoutError: If the parsing lasts more than `CAT_PARSER_TIMEOUT` seconds.
+        """
+        semaphore = self._semaphores.setdefault(mime_type or "", asyncio.Semaphore(self._concurrency_per_mime))
+        async with semaphore:
+            if self._executor is None:
+                return await self._wait(asyncio.to_thread(_parse, file_handlers, data, mime_type, source), source)
+
+            try:
+                handlers_blob = pickle.dumps(file_handlers)
+            except Exception as e:
+                log.debug(f"Parser pool: parsers cannot be sent to the workers, parsing {source} in a thread: {e}")
+                return await self._wait(asyncio.to_thread(_parse, file_handlers, data, mime_type, source), source)
+
+            handlers_key = hashlib.sha256(handlers_blob).hexdigest()
+            retried = False
+            while True:
+                if self._warming is not None:
+                    await asyncio.shield(self._warming)
+                # the workers could not be started
+                if (executor := self._executor) is None:
+                    return await self._wait(asyncio.to_thread(_parse, file_handlers, data, mime_type, source), source)
+
+                future = asyncio.get_running_loop().run_in_executor(
+                    executor, _parse_in_worker, handlers_key, handlers_blob, data, mime_type, source
+                )
+                try:
+                    return await self._wait(future, source)
+                except TimeoutError:
+                    self._restart(executor)
+                    raise
+                except BrokenProcessPool:
+                    # killed by the restart following the failure of another parsing: parse again, once
+                    if executor is self._executor or retried:
+                        self._restart(executor)
+                        raise
+                    retried = True
+
+    async def _wait(self, awaitable, source: str) -> List[Document]:
+        try:
+            return await asyncio.wait_for(awaitable, timeout=self._timeout or None)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Parsing of '{source}' timed out after {self._timeout} seconds")
+
+    @property
+    def workers(self) -> int:
+        return self._workers if self._executor is not None else 0
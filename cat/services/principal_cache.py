@@ -0,0 +1,164 @@
+import hashlib
+import time
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Dict, Set, Tuple
+
+from cat.env import get_env_int
+from cat.services.replicated_cache import ReplicatedCache
+from cat.utils import singleton
+
+# Redis channel used to propagate revocations across replicas
+_REVOCATION_CHANNEL = "principals:revoke"
+
+
+@singleton
+class PrincipalCache(ReplicatedCache):
+    """
+    Bounded registry of the principals verified from a JWT, keyed by a digest of the agent id and of the token.
+
+    A principal is the user record (without password) obtained when the token was verified. Entries are evicted in LRU
+    order once `CAT_PRINCIPAL_CACHE_SIZE` is exceeded, and expire after `CAT_PRINCIPAL_CACHE_TTL` seconds or at the
+    expiration (`exp` claim) of the token, whichever comes first. A size of 0 disables the cache.
+
+    Whenever a user is updated or deleted, the users cruds call :func:`revoke_principals`, which drops the principals
+    of the user synchronously and publishes the revocation on Redis, so that every replica listening via :meth:`start`
+    drops them too.
+
+    Call ``await start()`` once during application startup.
+    """
+
+    channel = _REVOCATION_CHANNEL
+    name = "Principal cache revocation"
+
+    def __init__(self):
+        super().__init__()
+
+        self._max_size = max(get_env_int("CAT_PRINCIPAL_CACHE_SIZE") or 0, 0)
+        self._ttl = max(get_env_int("CAT_PRINCIPAL_CACHE_TTL") or 0, 0)
+
+        # digest → (agent_id, user, expiration timestamp), in LRU order
+        self._entries: OrderedDict[str, Tuple[str, Dict, float]] = OrderedDict()
+        # agent_id → user_id → digests, so that the principals of a user can be revoked
+        self._by_user: Dict[str, Dict[str, Set[str]]] = {}
+
+        # bumped at every revocation: a principal verified while its agent was revoked is not stored
+        self._generations: Dict[str, int] = {}
+        self._global_generation = 0
+
+    # ── Lookup ─────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def digest(agent_id: str, token: str) -> str:
+        """Return the cache key of *token* for *agent_id*: the raw token is never kept in memory."""
+        return hashlib.sha256(f"{agent_id}:{token}".encode()).hexdigest()
+
+    def get(self, digest: str) -> Dict | None:
+        """Return the principal stored under *digest*, or ``None`` if missing or expired."""
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+
+        _, user, expires_at = entry
+        if expires_at <= time.time():
+            self._drop(digest)
+            return None
+
+        self._entries.move_to_end(digest)
+
+        # copies in and out, so that the changes of a request to its principal do not leak into the following ones
+        return deepcopy(user)
+
+    def generation(self, agent_id: str) -> Tuple[int, int]:
+        """Return the revocation generation of *agent_id*, to be passed to :meth:`put` once the token is verified."""
+        return self._global_generation, self._generations.get(agent_id, 0)
+
+    def put(self, digest: str, agent_id: str, user: Dict, token_expiration: float | None, generation: Tuple[int, int]):
+        """
+        Store the principal verified from a token.
+
+        Args:
+            digest: The cache key of the token, see :meth:`digest`.
+            agent_id: The id of the agent the token was verified for.
+            user: The user record the token was verified against.
+            token_expiration: The `exp` claim of the token, if any.
+            generation: The generation of the agent read before fetching the user, see :meth:`generation`.
+        """
+        if not self._max_size:
+            return
+
+        # do not store a principal whose agent was revoked while the token was being verified
+        if generation != self.generation(agent_id):
+            return
+
+        expires_at = time.time() + self._ttl if self._ttl else float("inf")
+        if token_expiration is not None:
+            expires_at = min(expires_at, float(token_expiration))
+
+        self._drop(digest)
+        self._entries[digest] = (agent_id, deepcopy(user), expires_at)
+        self._by_user.setdefault(agent_id, {}).setdefault(user["id"], set()).add(digest)
+
+        while len(self._entries) > self._max_size:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, digest: str):
+        if (entry := self._entries.pop(digest, None)) is None:
+            return
+
+        agent_id, user, _ = entry
+        users = self._by_user.get(agent_id, {})
+        if (digests := users.get(user["id"])) is not None:
+            digests.discard(digest)
+            if not digests:
+                users.pop(user["id"])
+        if not users:
+            self._by_user.pop(agent_id, None)
+
+    # ── Revocation ─────────────────────────────────────────────────────────────
+
+    def _on_message(self, payload: Dict):
+        self.revoke(payload.get("agent_id"), payload.get("user_id"))
+
+    def _clear(self):
+        self.revoke()
+
+    def revoke(self, agent_id: str | None = None, user_id: str | None = None):
+        """
+        Drop the principals of *user_id* in *agent_id* from this process only. If *user_id* is None, drop the ones of
+        the whole agent; if *agent_id* is None too, drop them all.
+        """
+        if agent_id is None:
+            self._global_generation += 1
+            self._generations.clear()
+            self._entries.clear()
+            self._by_user.clear()
+            return
+
+        self._generations[agent_id] = self._generations.get(agent_id, 0) + 1
+
+        users = self._by_user.get(agent_id, {})
+        user_ids = list(users.keys()) if user_id is None else [user_id]
+        for uid in user_ids:
+            for digest in list(users.get(uid, ())):
+                self._drop(digest)
+
+    async def publish_revocation(self, agent_id: str | None = None, user_id: str | None = None):
+        """Revoke the principals of *user_id* in *agent_id* locally and on every other replica."""
+        self.revoke(agent_id, user_id)
+        await self._publish({"agent_id": agent_id, "user_id": user_id})
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+async def revoke_principals(agent_id: str | None = None, user_id: str | None = None):
+    """
+    Revoke the cached principals of a user across all the replicas.
+
+    Args:
+        agent_id: The id of the agent of the user. If None, the principals of every agent are revoked.
+        user_id: The id of the user whose permissions changed or who was deleted. If None, the principals of every
+            user of the agent are revoked.
+    """
+    await PrincipalCache().publish_revocation(agent_id, user_id)
@@ -0,0 +1,115 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict
+from qdrant_client import AsyncQdrantClient
+
+from cat.log import log
+from cat.utils import singleton
+
+
+@singleton
+class QdrantClientRegistry:
+    """
+    Process-wide registry of the `AsyncQdrantClient` instances, keyed by a hash of their connection configuration.
+
+    Every `QdrantHandler` sharing the same host, port, scheme, API key and timeout shares the same client, and therefore
+    the same gRPC channel. Clients are reference counted: the handlers :meth:`acquire` a client when built and
+    :meth:`release` it when closed. A client no longer referenced is kept idle, so that the handlers rebuilt right after
+    (e.g. when an agent is reloaded) reuse its channel; only the least recently released idle clients beyond
+    `max_idle` are closed.
+
+    Call ``await close_all()`` once during application shutdown.
+    """
+
+    def __init__(self, max_idle: int = 4):
+        self._max_idle = max_idle
+
+        # config hash → client
+        self._clients: Dict[str, AsyncQdrantClient] = {}
+        # config hash → number of handlers using the client
+        self._ref_counts: Dict[str, int] = {}
+        # config hash of the clients no longer referenced, in release order
+        self._idle: OrderedDict[str, None] = OrderedDict()
+
+        self._acquisitions = 0
+        self._reuse_hits = 0
+
+    @staticmethod
+    def config_hash(**kwargs) -> str:
+        """Return the key of the client built with the given `AsyncQdrantClient` keyword arguments."""
+        return hashlib.sha256(json.dumps(kwargs, sort_keys=True, default=str).encode()).hexdigest()
+
+    def acquire(self, **kwargs) -> AsyncQdrantClient:
+        """
+        Return the client built with the given `AsyncQdrantClient` keyword arguments, creating it if needed.
+
+        Every call must be paired with a call to :meth:`release` with the same arguments.
+        """
+        key = self.config_hash(**kwargs)
+        self._acquisitions += 1
+
+        if (client := self._clients.get(key)) is not None:
+            self._reuse_hits += 1
+        else:
+            client = AsyncQdrantClient(**kwargs)
+            self._clients[key] = client
+            log.debug(f"Qdrant client registry: opened a client for `{kwargs.get('host')}:{kwargs.get('port')}`")
+
+        self._ref_counts[key] = self._ref_counts.get(key, 0) + 1
+        self._idle.pop(key, None)
+
+        return client
+
+    async def release(self, **kwargs):
+        """Release a client previously obtained via :meth:`acquire` with the same arguments."""
+        key = self.config_hash(**kwargs)
+        if key not in self._ref_counts:
+            return
+
+        self._ref_counts[key] -= 1
+        if self._ref_counts[key] > 0:
+            return
+
+        self._ref_counts.pop(key)
+        self._idle[key] = None
+
+        while len(self._idle) > self._max_idle:
+            evicted_key, _ = self._idle.popitem(last=False)
+            await self._close(evicted_key)
+
+    async def _close(self, key: str):
+        if (client := self._clients.pop(key, None)) is None:
+            return
+
+        try:
+            await client.close()
+        except Exception as e:
+            log.warning(f"Qdrant client registry: error while closing a client: {e}")
+
+    async def close_all(self):
+        """Close every client, whether still referenced or not."""
+        for key in list(self._clients.keys()):
+            await self._close(key)
+
+        self._ref_counts.clear()
+        self._idle.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Return the usage metrics of the registry.
+
+        Returns:
+            Dictionary with the number of open clients (`live_channels`), the ones in use (`in_use`) and idle (`idle`),
+            the total number of acquisitions (`acquisitions`) and the ones served by an existing client (`reuse_hits`).
+        """
+        return {
+            "live_channels": len(self._clients),
+            "in_use": len(self._ref_counts),
+            "idle": len(self._idle),
+            "acquisitions": self._acquisitions,
+            "reuse_hits": self._reuse_hits,
+        }
+
+    def __len__(self) -> int:
+        return len(self._clients)
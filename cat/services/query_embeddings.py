@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import json
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from uuid import uuid4
+from langchain_core.embeddings import Embeddings as LangChainEmbeddings
+from redis.exceptions import RedisError
+
+from cat.db.database import get_async_db
+from cat.env import get_env_int
+from cat.log import log
+from cat.services.embedder_registry import EmbedderRegistry
+from cat.services.factory.embedder import Embeddings
+from cat.utils import singleton
+
+# prefix of the Redis keys of the query embeddings shared by the replicas
+_SHARED_KEY_PREFIX = "query_embeddings"
+
+
+def normalize_query(text: str) -> str:
+    """Collapse the whitespaces of a query, so that queries differing only in spacing share their embedding."""
+    return " ".join(text.split())
+
+
+@singleton
+class QueryEmbeddingCache:
+    """
+    Embedding layer for the queries (e.g. the user messages recalling the memories), keyed by the embedder (its
+    configuration class and the hash of its settings) and by the normalized text of the query.
+
+    - Up to `CAT_QUERY_EMBEDDING_CACHE_SIZE` embeddings are kept in memory, in LRU order. A size of 0 disables them.
+    - With `CAT_QUERY_EMBEDDING_SHARED_TTL` > 0, embeddings are shared by the replicas on Redis for that many seconds.
+      Only the embedders built by the factory are shared, being identified by their settings. The settings of the
+      other embedders (e.g. built by a plugin) are unknown: their embeddings are kept per embedder instance, and not
+      cached at all if the instance cannot be weakly referenced.
+    - Concurrent requests for the same query are coalesced into a single embedding.
+    - Synchronous embedders run in a thread, so that they do not block the event loop.
+
+    The hits, coalesced requests and misses are counted, see :meth:`stats`.
+    """
+
+    def __init__(self):
+        self._max_size = max(get_env_int("CAT_QUERY_EMBEDDING_CACHE_SIZE") or 0, 0)
+        self._shared_ttl = max(get_env_int("CAT_QUERY_EMBEDDING_SHARED_TTL") or 0, 0)
+
+        # (embedder key, normalized query) → embedding, in LRU order
+        self._entries: OrderedDict[Tuple[str, str], Tuple[float, ...]] = OrderedDict()
+        # (embedder key, normalized query) → embedding being computed, awaited by the concurrent requests
+        self._in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+        # id of an embedder not built by the factory → weak reference to it and its key, unique to the instance even
+        # if its id is reused after it is garbage collected
+        self._instance_keys: Dict[int, Tuple[weakref.ref, str]] = {}
+
+        self._local_hits = 0
+        self._shared_hits = 0
+        self._coalesced = 0
+        self._misses = 0
+
+    async def embed_query(self, embedder: Embeddings, text: str) -> List[float]:
+        """
+        Embed a query, reusing the embedding computed for the same query and embedder, if any.
+
+        Args:
+            embedder: The embedder.
+            text: The query.
+
+        Returns:
+            The embedding of the normalized query.
+        """
+        query = normalize_query(text)
+        embedder_id = EmbedderRegistry().key_of(embedder)
+        shared = embedder_id is not None and self._shared_ttl > 0
+        if (embedder_key := embedder_id or self._instance_key(embedder)) is None:
+            self._misses += 1
+            return list(await self._embed(embedder, query))
+
+        key = (embedder_key, query)
+
+        if (embedding := self._entries.get(key)) is not None:
+            self._entries.move_to_end(key)
+            self._local_hits += 1
+            return list(embedding)
+
+        if (task := self._in_flight.get(key)) is not None:
+            self._coalesced += 1
+        else:
+            # the embedding is computed by a task of its own, so that cancelling the first request does not cancel the
+            # concurrent ones
+            task = asyncio.create_task(self._compute(embedder, key, shared))
+            task.add_done_callback(lambda t: self._on_computed(key, t))
+            self._in_flight[key] = task
+
+        return list(await asyncio.shield(task))
+
+    def _instance_key(self, embedder: Embeddings) -> str | None:
+        embedder_ref, key = self._instance_keys.get(id(embedder), (None, None))
+        if embedder_ref is not None and embedder_ref() is embedder:
+            return key
+
+        instance_id = id(embedder)
+        try:
+            embedder_ref = weakref.ref(embedder, lambda _: self._instance_keys.pop(instance_id, None))
+        except TypeError:
+            return None
+
+        key = f"{type(embedder).__name__}:{uuid4().hex}"
+        self._instance_keys[instance_id] = (embedder_ref, key)
+        return key
+
+    async def _compute(self, embedder: Embeddings, key: Tuple[str, str], shared: bool) -> Tuple[float, ...]:
+        if shared and (embedding := await self._get_shared(key)) is not None:
+            self._shared_hits += 1
+        else:
+            self._misses += 1
+            embedding = tuple(await self._embed(embedder, key[1]))
+            if shared:
+                await self._set_shared(key, embedding)
+
+        self._put(key, embedding)
+        return embedding
+
+    def _on_computed(self, key: Tuple[str, str], task: asyncio.Task):
+        del self._in_flight[key]
+        # retrieve the exception, in case no request is waiting for it anymore
+        if not task.cancelled():
+            task.exception()
+
+    @staticmethod
+    async def _embed(embedder: Embeddings, query: str) -> List[float]:
+        # embedders implementing a native async embedding are awaited, the others are run in a thread
+        if type(embedder).aembed_query is not LangChainEmbeddings.aembed_query:
+            return await embedder.aembed_query(query)
+        return await asyncio.to_thread(embedder.embed_query, query)
+
+    def _put(self, key: Tuple[str, str], embedding: Tuple[float, ...]):
+        if not self._max_size:
+            return
+
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _shared_key(key: Tuple[str, str]) -> str:
+        embedder_id, query = key
+        return f"{_SHARED_KEY_PREFIX}:{embedder_id}:{hashlib.sha256(query.encode()).hexdigest()}"
+
+    async def _get_shared(self, key: Tuple[str, str]) -> Tuple[float, ...] | None:
+        try:
+            embedding = await get_async_db().get(self._shared_key(key))
+            return tuple(json.loads(embedding)) if embedding else None
+        except RedisError as e:
+            log.warning(f"Redis error getting a shared query embedding: {e}")
+            return None
+
+    async def _set_shared(self, key: Tuple[str, str], embedding: Tuple[float, ...]):
+        try:
+            await get_async_db().set(self._shared_key(key), json.dumps(embedding), ex=self._shared_ttl)
+        except RedisError as e:
+            log.warning(f"Redis error storing a shared query embedding: {e}")
+
+    def stats(self) -> Dict[str, int | float]:
+        """
+        The metrics of the cache, since the process started.
+
+        Returns:
+            The number of embeddings kept in memory, of local and shared hits, of coalesced requests and of misses, and
+            the hit rate (the share of the requests not computing an embedding).
+        """
+        requests = self._local_hits + self._shared_hits + self._coalesced + self._misses
+        return {
+            "size": len(self._entries),
+            "local_hits": self._local_hits,
+            "shared_hits": self._shared_hits,
+            "coalesced": self._coalesced,
+            "misses": self._misses,
+            "hit_rate": (requests - self._misses) / requests if requests else 0.,
+        }
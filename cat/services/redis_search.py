@@ -4,32 +4,35 @@ from redis import RedisError
 
 from cat.auth.auth_utils import check_password
 import cat.db.cruds.users as crud_users
-from cat.db.database import get_async_db, DEFAULT_AGENTS_KEY, DEFAULT_SYSTEM_KEY
+from cat.db.database import (
+    get_async_db,
+    DEFAULT_AGENTS_KEY,
+    DEFAULT_AGENTS_REGISTRY_KEY,
+    DEFAULT_SYSTEM_KEY,
+    DEFAULT_USERS_INDEX_KEY,
+    DEFAULT_USERS_KEY,
+)
 from cat.log import log
 from cat.utils import singleton
 
 
 USERNAME_SEARCH_SCRIPT = f"""
 local matches = {{}}
-local cursor = "0"
-local pattern = "{DEFAULT_AGENTS_KEY}:*:users:*"
 local username = ARGV[1]
+local agent_names = redis.call("ZRANGE", "{DEFAULT_AGENTS_REGISTRY_KEY}", 0, -1)
 
-repeat
-    local result = redis.call("SCAN", cursor, "MATCH", pattern, "COUNT", 100)
-    cursor = result[1]
-    local keys = result[2]
+for i, agent_name in ipairs(agent_names) do
+    -- O(1) lookup of the user ID through the username index of the agent
+    local agent_prefix = "{DEFAULT_AGENTS_KEY}:" .. agent_name .. ":"
+    local user_id = redis.call("HGET", agent_prefix .. "{DEFAULT_USERS_INDEX_KEY}", username)
 
-    for i, key in ipairs(keys) do
-        local data = redis.call("JSON.GET", key)
+    if user_id then
+        local data = redis.call("JSON.GET", agent_prefix .. "{DEFAULT_USERS_KEY}:" .. user_id)
 
         if data then
             local user = cjson.decode(data)
 
             if user.username == username then
-                -- Extract agent_name from key pattern: agents:<agent_name>:users:<user_id>
-                local agent_name = string.match(key, "^{DEFAULT_AGENTS_KEY}:([^:]+):users:")
-
                 table.insert(matches, cjson.encode({{
                     user = user,
                     agent_name = agent_name,
@@ -37,7 +40,7 @@ repeat
             end
         end
     end
-until cursor == "0"
+end
 
 if #matches > 0 then
     return cjson.encode(matches)
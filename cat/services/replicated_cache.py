@@ -0,0 +1,143 @@
+import asyncio
+import json
+import random
+from typing import Dict
+from uuid import uuid4
+import redis.asyncio as aioredis
+
+from cat.db.database import get_async_db
+from cat.log import log
+
+
+class ReplicatedCache:
+    """
+    Base of the in-process caches kept consistent across replicas via a Redis pub/sub channel.
+
+    A change is applied locally, then published on :attr:`channel` with the origin of this process; every replica
+    listening via :meth:`start` applies the changes published by the others through :meth:`_on_message`.
+    Subclasses set :attr:`channel` and :attr:`name`, and implement :meth:`_on_message` and :meth:`_clear`.
+
+    When the connection is lost, the listener reconnects with an exponential backoff; since the changes published
+    meanwhile are missed, every cached entry is dropped once subscribed again.
+
+    Call ``await start()`` once during application startup.
+    """
+
+    # Redis channel used to propagate the changes across replicas
+    channel: str = ""
+    # name of the cache in the logs
+    name: str = ""
+
+    def __init__(self):
+        # identifies this process, in order to skip self-originated messages received via pub/sub
+        self._origin = uuid4().hex
+
+        self._redis: aioredis.Redis | None = None
+        self._pubsub: aioredis.client.PubSub | None = None
+        self._subscriber_task: asyncio.Task | None = None
+
+    # ── Lifecycle ──────────────────────────────────────────────────────────────
+
+    async def start(self):
+        """Connect to Redis and launch the pub/sub listener."""
+        if self._subscriber_task is not None:
+            return
+
+        await self._subscribe()
+
+        self._subscriber_task = asyncio.create_task(self._subscriber_loop(), name=f"{self.channel}-listener")
+        log.info(f"{self.name} listener started")
+
+    async def stop(self):
+        """Stop the pub/sub listener and drop every cached entry."""
+        if self._subscriber_task:
+            self._subscriber_task.cancel()
+            try:
+                await self._subscriber_task
+            except asyncio.CancelledError:
+                pass
+            self._subscriber_task = None
+
+        await self._unsubscribe()
+
+        self._clear()
+
+    async def _subscribe(self):
+        from cat.db.database import get_db_connection_string
+
+        self._redis = aioredis.Redis.from_url(get_db_connection_string(), decode_responses=True)
+        self._pubsub = self._redis.pubsub()  # type: ignore[no-untyped-call]
+        await self._pubsub.subscribe(self.channel)  # type: ignore[no-untyped-call]
+
+    async def _unsubscribe(self):
+        if self._pubsub:
+            try:
+                await self._pubsub.unsubscribe()
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+            self._pubsub = None
+
+        if self._redis:
+            try:
+                await self._redis.aclose()
+            except Exception:
+                pass
+            self._redis = None
+
+    async def _subscriber_loop(self):
+        retries = 0
+
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    # the changes published while disconnected are lost: drop everything, as it may be stale
+                    self._clear()
+                    retries = 0
+                    log.info(f"{self.name} listener reconnected")
+
+                async for raw in self._pubsub.listen():  # type: ignore[union-attr]
+                    if raw.get("type") != "message" or not isinstance(raw.get("data"), str):
+                        continue
+
+                    try:
+                        payload = json.loads(raw["data"])
+                    except (json.JSONDecodeError, TypeError):
+                        log.warning(f"{self.name}: malformed message on channel {raw.get('channel')}")
+                        continue
+
+                    if payload.get("origin") == self._origin:
+                        continue
+
+                    try:
+                        self._on_message(payload)
+                    except Exception as e:
+                        log.error(f"{self.name}: could not apply {payload}: {e}")
+
+                raise ConnectionError("subscription closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = min(60., 2 ** retries) + random.uniform(0, 1)
+                log.warning(f"{self.name} listener disconnected: {e}. Reconnecting in {delay:.2f}s")
+                await self._unsubscribe()
+                await asyncio.sleep(delay)
+                retries += 1
+
+    # ── Propagation ────────────────────────────────────────────────────────────
+
+    async def _publish(self, payload: Dict):
+        """Publish *payload*, already applied locally, to every other replica."""
+        try:
+            await get_async_db().publish(self.channel, json.dumps(payload | {"origin": self._origin}))
+        except Exception as e:
+            log.error(f"{self.name}: could not publish {payload}: {e}")
+
+    def _on_message(self, payload: Dict):
+        """Apply the change published by another replica."""
+        raise NotImplementedError
+
+    def _clear(self):
+        """Drop every cached entry of this process."""
+        raise NotImplementedError
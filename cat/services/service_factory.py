@@ -1,3 +1,4 @@
+import asyncio
 from typing import Type, Dict, Any, List, Literal
 from pydantic import BaseModel
 
@@ -6,11 +7,12 @@ from cat.exceptions import CustomValidationException
 from cat.log import log
 from cat.looking_glass.mad_hatter.mad_hatter import MadHatter
 from cat.routes.routes_utils import GetSettingsResponse, GetSettingResponse
+from cat.services.embedder_registry import EmbedderRegistry, embedder_key
 from cat.services.factory.agentic_workflow import CoreAgenticWorkflowConfig
 from cat.services.factory.auth_handler import CoreAuthConfig
 from cat.services.factory.chunker import RecursiveTextChunkerSettings
 from cat.services.factory.context_retriever import DefaultContextRetrieverSettings
-from cat.services.factory.embedder import EmbedderDumbConfig
+from cat.services.factory.embedder import EmbedderDumbConfig, Embeddings
 from cat.services.factory.file_manager import DummyFileManagerConfig
 from cat.services.factory.llm import LLMDefaultConfig
 from cat.services.factory.models import BaseFactoryConfigModel
@@ -91,6 +93,9 @@ class ServiceFactory:
         # get configuration and instantiate the finalized object by the factory
         selected_config = await crud_settings.get_setting_by_name(self._agent_key, config_name)
         try:
+            if self.setting_category == "embedder":
+                return await self._get_embedder(factory_class, selected_config["value"])  # type: ignore[index]
+
             obj = factory_class.get_from_config(selected_config["value"])  # type: ignore[index]
             if hasattr(obj, "agent_id"):
                 obj.agent_id = self._agent_key
@@ -98,6 +103,30 @@ class ServiceFactory:
         except:
             return self.default_config_class.get_from_config(self.default_config)
 
+    async def _get_embedder(self, factory_class: Type[BaseFactoryConfigModel], config: Dict) -> Embeddings:
+        # embedders are shared by the whole process, and their dimension is probed once for all the replicas
+        key = embedder_key(factory_class, config)
+        registry = EmbedderRegistry()
+        if (embedder := registry.get(key)) is not None:
+            return embedder
+
+        embedder = factory_class.get_from_config(config)
+        if hasattr(embedder, "agent_id"):
+            embedder.agent_id = self._agent_key
+
+        if (size := await crud_settings.get_embedder_size(self._agent_key, key)) is not None:
+            # seed the cached dimension of the embedder
+            embedder.__dict__["size"] = size
+        else:
+            try:
+                size = await asyncio.to_thread(lambda: embedder.size)
+                await crud_settings.set_embedder_size(self._agent_key, key, size)
+            except Exception as e:
+                log.warning(f"Could not probe the dimension of the embedder {factory_class.__name__}: {e}")
+
+        registry.put(key, embedder)
+        return embedder
+
     async def _get_allowed_classes(self) -> List[Type[BaseFactoryConfigModel]]:
         return await self._hook_manager.execute_hook(
             self.factory_allowed_handler_name, [self.default_config_class], caller=None
@@ -1,23 +1,112 @@
 import asyncio
 import json
-from typing import Dict, List
+import time
+from typing import Coroutine, Dict, List, Set, Tuple
+from uuid import uuid4
 import redis.asyncio as aioredis
 from fastapi.websockets import WebSocket
 
+from cat.env import get_env_float, get_env_int
 from cat.log import log
 
 # Redis channel names
-_TARGETED_PREFIX = "ws:msg"   # targeted: ws:msg:{chat_id}
+_REPLICA_PREFIX = "ws:replica"   # targeted: ws:replica:{replica_id}
 _BROADCAST_CHANNEL = "ws:broadcast"
+# Redis keys of the owners of the connections: ws:owner:{chat_id} → replica_id
+_OWNER_PREFIX = "ws:owner"
 
+# message types streamed piece by piece, whose consecutive messages are coalesced
+_STREAMED_TYPES = ("chat_token", "llm_thinking")
 
-class WebSocketManager:
+
+def _coalesce(last: dict, message: dict) -> dict | None:
     """
-    Manages WebSocket connections with Redis Pub/Sub fan-out.
+    Merge a streamed message into the previous one, if they belong to the same stream.
 
-    Every message is published to Redis so the replica that actually holds
-    the connection receives and delivers it – regardless of which replica
-    produced it.  Redis is a platform pre-requisite and is always available.
+    Args:
+        last: The last buffered message.
+        message: The new message.
+
+    Returns:
+        The merged message, or None if the messages cannot be merged.
+    """
+    if last["type"] != message["type"]:
+        return None
+
+    if message["type"] == "chat_token":
+        return {"type": "chat_token", "content": last["content"] + message["content"]}
+
+    # thinking messages are usually JSON-serialised ThinkingMessage, merged within the same thinking step; any other
+    # content (e.g. plain text sent via send_llm_thinking) is sent as it is
+    try:
+        last_thinking, thinking = json.loads(last["content"]), json.loads(message["content"])
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(last_thinking, dict) or not isinstance(thinking, dict):
+        return None
+    if not isinstance(last_thinking.get("content"), str) or not isinstance(thinking.get("content"), str):
+        return None
+    if last_thinking.get("step") != thinking.get("step"):
+        return None
+    last_thinking["content"] += thinking["content"]
+    return {"type": "llm_thinking", "content": json.dumps(last_thinking)}
+
+
+class _StreamBuffer:
+    """
+    Messages waiting to be published for a chat. Streamed messages (tokens, thinking steps) are coalesced until the
+    buffer is flushed, because it got too large, because its flush interval elapsed or because a message of another
+    kind (e.g. the final chat message, an error) is sent. Flushes of the same chat are published in order.
+    """
+    def __init__(self):
+        self.messages: List[dict] = []
+        self.chars = 0
+        self.flush_handle: asyncio.TimerHandle | None = None
+        # held while publishing, so that the flushes are published in the order they are taken
+        self.lock = asyncio.Lock()
+        # flushes taken and not published yet
+        self.flushes = 0
+
+    def add(self, message: dict):
+        self.chars += len(message["content"])
+        if self.messages and (merged := _coalesce(self.messages[-1], message)) is not None:
+            self.messages[-1] = merged
+        else:
+            self.messages.append(message)
+
+    @property
+    def idle(self) -> bool:
+        return not self.messages and not self.flushes
+
+    def take(self) -> List[dict]:
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        messages, self.messages, self.chars = self.messages, [], 0
+        return messages
+
+
+class WebSocketManager:
+    """
+    Manages WebSocket connections with Redis Pub/Sub routing.
+
+    Each replica subscribes to a channel of its own (``ws:replica:<id>``)
+    and to the broadcast channel, and claims the connections it holds in
+    Redis (``ws:owner:<chat_id>``), with a TTL of ``CAT_WS_OWNERSHIP_TTL``
+    seconds refreshed by a heartbeat.  A message for a chat is delivered
+    directly when the connection is held by the same replica, otherwise it
+    is published to the channel of the owner only.  When the owner is
+    unknown or gone (e.g. during a failover), the message is published to
+    the broadcast channel, and only the replica holding the connection, if
+    any, delivers it.  Redis is a platform pre-requisite and is always
+    available.
+
+    Streamed messages (LLM tokens and thinking steps) are coalesced per chat
+    for up to ``CAT_WS_FLUSH_INTERVAL`` seconds or ``CAT_WS_FLUSH_SIZE``
+    characters, and flushed before any other message of the same chat, so
+    that a long answer takes a few Redis messages and WebSocket frames
+    instead of one per token, in the same order.
 
     Call ``await start()`` once during application startup.
     """
@@ -26,30 +115,59 @@ class WebSocketManager:
         # chat_id → WebSocket for connections held by THIS replica
         self._local_connections: Dict[str, WebSocket] = {}
 
+        # chat_id → streamed messages produced by THIS replica, waiting to be published
+        self._buffers: Dict[str, _StreamBuffer] = {}
+        self._flush_interval = max(get_env_float("CAT_WS_FLUSH_INTERVAL") or 0., 0.)
+        self._flush_size = max(get_env_int("CAT_WS_FLUSH_SIZE") or 0, 0)
+
+        # ownership of the connections held by THIS replica
+        self.replica_id = uuid4().hex
+        self._ownership_ttl = max(get_env_int("CAT_WS_OWNERSHIP_TTL") or 1, 1)
+        # chat_id → (owner replica_id or None if unknown, expiry), for the chats held by other replicas
+        self._owners: Dict[str, Tuple[str | None, float]] = {}
+
         # async Redis client (initialised by start())
         self._redis: aioredis.Redis | None = None
         self._pubsub: aioredis.client.PubSub | None = None
         self._subscriber_task: asyncio.Task | None = None
+        self._heartbeat_task: asyncio.Task | None = None
+        self._background_tasks: Set[asyncio.Task] = set()
+
+    @property
+    def _replica_channel(self) -> str:
+        return f"{_REPLICA_PREFIX}:{self.replica_id}"
+
+    @property
+    def _heartbeat_interval(self) -> float:
+        return self._ownership_ttl / 3
 
     # ── Lifecycle ──────────────────────────────────────────────────────────────
 
-    async def start(self):
-        """Connect to Redis and launch the pub/sub listener background task."""
+    async def start(self, redis: aioredis.Redis | None = None):
+        """
+        Connect to Redis and launch the pub/sub listener and the heartbeat background tasks.
+
+        Args:
+            redis: The Redis client to use, with ``decode_responses=True``. If None, a client is connected to the
+                database of the Cat.
+        """
         from cat.db.database import get_db_connection_string
 
-        self._redis = aioredis.Redis.from_url(
+        self._redis = redis or aioredis.Redis.from_url(
             get_db_connection_string(), decode_responses=True
         )
 
         self._pubsub = self._redis.pubsub()  # type: ignore[no-untyped-call]
-        # Pattern-subscribe for targeted messages and subscribe for broadcasts
-        await self._pubsub.psubscribe(f"{_TARGETED_PREFIX}:*")  # type: ignore[no-untyped-call]
-        await self._pubsub.subscribe(_BROADCAST_CHANNEL)  # type: ignore[no-untyped-call]
+        # Subscribe for the messages targeting this replica and for broadcasts
+        await self._pubsub.subscribe(self._replica_channel, _BROADCAST_CHANNEL)  # type: ignore[no-untyped-call]
 
         self._subscriber_task = asyncio.create_task(
             self._subscriber_loop(), name="ws-pubsub-listener"
         )
-        log.info("WebSocket Redis Pub/Sub listener started")
+        self._heartbeat_task = asyncio.create_task(
+            self._heartbeat_loop(), name="ws-ownership-heartbeat"
+        )
+        log.info(f"WebSocket Redis Pub/Sub listener started for replica {self.replica_id}")
 
     async def _subscriber_loop(self):
         """
@@ -58,8 +176,7 @@ class WebSocketManager:
         """
         try:
             async for raw in self._pubsub.listen():  # type: ignore[no-untyped-call]
-                msg_type = raw.get("type")
-                if msg_type not in ("pmessage", "message"):
+                if raw.get("type") != "message":
                     continue
 
                 data = raw.get("data")
@@ -68,24 +185,73 @@ class WebSocketManager:
 
                 try:
                     payload = json.loads(data)
-                except (json.JSONDecodeError, TypeError):
+                    chat_id, message = payload.get("chat_id"), payload["message"]
+                except (json.JSONDecodeError, TypeError, KeyError, AttributeError):
                     log.warning(f"WS pubsub: malformed message on channel {raw.get('channel')}")
                     continue
 
-                if msg_type == "pmessage":
-                    # Targeted message: channel is "ws:msg:<chat_id>"
-                    channel: str = raw["channel"]
-                    chat_id = channel[len(_TARGETED_PREFIX) + 1:]
-                    await self._deliver_to_local(chat_id, payload)
-                else:
+                if chat_id is None:
                     # Broadcast to all connections on this replica
-                    await self._deliver_to_all_local(payload)
+                    await self._deliver_to_all_local(message)
+                elif chat_id in self._local_connections:
+                    await self._deliver_to_local(chat_id, message)
+                elif raw.get("channel") == self._replica_channel:
+                    # The connection left this replica after the publisher looked its owner up: the replica now
+                    # holding it, if any, gets the message through the broadcast channel
+                    await self._publish_envelopes(_BROADCAST_CHANNEL, [data])
 
         except asyncio.CancelledError:
             pass
         except Exception as e:
             log.error(f"WebSocket Pub/Sub listener crashed: {e}")
 
+    async def _heartbeat_loop(self):
+        """Background task: refresh the ownership of the connections held by this replica."""
+        try:
+            while True:
+                await asyncio.sleep(self._heartbeat_interval)
+                try:
+                    await self._claim(list(self._local_connections.keys()))
+                except Exception as e:
+                    log.warning(f"WS ownership heartbeat failed: {e}")
+        except asyncio.CancelledError:
+            pass
+
+    async def _claim(self, chat_ids: List[str]):
+        """Record this replica as the owner of the connections of *chat_ids*, for the ownership TTL."""
+        if not chat_ids:
+            return
+
+        async with self._redis.pipeline(transaction=False) as pipe:  # type: ignore[union-attr]
+            for chat_id in chat_ids:
+                pipe.set(f"{_OWNER_PREFIX}:{chat_id}", self.replica_id, ex=self._ownership_ttl)
+            await pipe.execute()
+
+    async def _release(self, chat_ids: List[str]):
+        """
+        Drop the ownership of the connections of *chat_ids*, unless claimed by another replica meanwhile. A release
+        racing with the claim of another replica is harmless: the heartbeat of that replica claims it again, and the
+        messages are broadcast in the meantime.
+        """
+        if not chat_ids:
+            return
+
+        owners = await self._redis.mget([f"{_OWNER_PREFIX}:{chat_id}" for chat_id in chat_ids])  # type: ignore[union-attr]
+        owned = [f"{_OWNER_PREFIX}:{chat_id}" for chat_id, owner in zip(chat_ids, owners) if owner == self.replica_id]
+        if owned:
+            await self._redis.delete(*owned)  # type: ignore[union-attr]
+
+    def _spawn(self, coroutine: Coroutine, description: str):
+        """Run *coroutine* in the background, keeping a reference to it until it is done."""
+        task = asyncio.create_task(coroutine)
+        self._background_tasks.add(task)
+        task.add_done_callback(lambda t: self._on_background_task_done(description, t))
+
+    def _on_background_task_done(self, description: str, task: asyncio.Task):
+        self._background_tasks.discard(task)
+        if not task.cancelled() and (e := task.exception()) is not None:
+            log.warning(f"WS {description} failed: {e}")
+
     async def _deliver_to_local(self, chat_id: str, message: dict):
         """Send *message* to the local WebSocket for *chat_id*, if present."""
         ws = self._local_connections.get(chat_id)
@@ -108,6 +274,9 @@ class WebSocketManager:
     def add_connection(self, chat_id: str, websocket: WebSocket):
         """Register a new WebSocket connection for *chat_id* on this replica."""
         self._local_connections[chat_id] = websocket
+        self._owners.pop(chat_id, None)
+        if self._redis is not None:
+            self._spawn(self._claim([chat_id]), f"claim of chat {chat_id}")
 
     def get_connection(self, chat_id: str) -> WebSocket | None:
         """Return the local WebSocket for *chat_id*, or ``None``."""
@@ -115,7 +284,8 @@ class WebSocketManager:
 
     def remove_connection(self, chat_id: str):
         """Unregister the WebSocket connection for *chat_id*."""
-        self._local_connections.pop(chat_id, None)
+        if self._local_connections.pop(chat_id, None) is not None and self._redis is not None:
+            self._spawn(self._release([chat_id]), f"release of chat {chat_id}")
 
     # ── Sending ────────────────────────────────────────────────────────────────
 
@@ -123,17 +293,112 @@ class WebSocketManager:
         """
         Send *message* to the WebSocket identified by *chat_id*.
 
-        The message is published to the Redis ``ws:msg:<chat_id>`` channel;
-        the replica that holds that connection will receive the pub/sub event
-        and deliver it locally.
+        The message is delivered directly if this replica holds the
+        connection, otherwise it is published to the Redis channel of the
+        replica owning it (or to the broadcast channel, if the owner is not
+        known); that replica will receive the pub/sub event and deliver it
+        locally.  Streamed messages are buffered and coalesced with the
+        following ones; any other message flushes the buffer first.
         """
-        await self._redis.publish(  # type: ignore[union-attr]
-            f"{_TARGETED_PREFIX}:{chat_id}", json.dumps(message)
-        )
+        buffer = self._buffers.get(chat_id)
+        if message.get("type") in _STREAMED_TYPES and self._flush_interval > 0:
+            if buffer is None:
+                buffer = self._buffers[chat_id] = _StreamBuffer()
+            buffer.add(message)
+
+            if self._flush_size and buffer.chars >= self._flush_size:
+                await self._flush(chat_id, buffer, buffer.take())
+            elif buffer.flush_handle is None:
+                buffer.flush_handle = asyncio.get_running_loop().call_later(
+                    self._flush_interval, self._schedule_flush, chat_id, buffer
+                )
+            return
+
+        if buffer is None:
+            await self._publish(chat_id, [message])
+            return
+
+        # message boundary: the buffered messages are published first, along with this one
+        await self._flush(chat_id, buffer, buffer.take() + [message])
+
+    def _schedule_flush(self, chat_id: str, buffer: _StreamBuffer):
+        buffer.flush_handle = None
+        task = asyncio.create_task(self._flush(chat_id, buffer, buffer.take()))
+        task.add_done_callback(lambda t: self._on_scheduled_flush_done(chat_id, t))
+
+    @staticmethod
+    def _on_scheduled_flush_done(chat_id: str, task: asyncio.Task):
+        if not task.cancelled() and (e := task.exception()) is not None:
+            log.error(f"WS flush failed for chat {chat_id}: {e}")
+
+    async def _flush(self, chat_id: str, buffer: _StreamBuffer, messages: List[dict]):
+        # the messages are taken before waiting for the lock, so that the flushes keep the order of the messages
+        buffer.flushes += 1
+        try:
+            async with buffer.lock:
+                await self._publish(chat_id, messages)
+        finally:
+            buffer.flushes -= 1
+            if buffer.idle and self._buffers.get(chat_id) is buffer:
+                del self._buffers[chat_id]
+
+    async def _publish(self, chat_id: str, messages: List[dict]):
+        if not messages:
+            return
+
+        if chat_id in self._local_connections:
+            for message in messages:
+                await self._deliver_to_local(chat_id, message)
+            return
+
+        envelopes = [json.dumps({"chat_id": chat_id, "message": message}) for message in messages]
+        owner = await self._get_owner(chat_id)
+        if owner is not None:
+            if await self._publish_envelopes(f"{_REPLICA_PREFIX}:{owner}", envelopes):
+                return
+
+            # nobody listens to the channel of the owner anymore: the replica is gone
+            log.debug(f"WS owner {owner} of chat {chat_id} is gone, broadcasting")
+            self._owners.pop(chat_id, None)
+
+        await self._publish_envelopes(_BROADCAST_CHANNEL, envelopes)
+
+    async def _publish_envelopes(self, channel: str, envelopes: List[str]) -> int:
+        """Publish the *envelopes* to *channel* in a single round trip, and return the number of receivers."""
+        if len(envelopes) == 1:
+            return await self._redis.publish(channel, envelopes[0])  # type: ignore[union-attr]
+
+        async with self._redis.pipeline(transaction=False) as pipe:  # type: ignore[union-attr]
+            for envelope in envelopes:
+                pipe.publish(channel, envelope)
+            return min(await pipe.execute())
+
+    async def _get_owner(self, chat_id: str) -> str | None:
+        """The replica owning the connection of *chat_id* (None if unknown), looked up once per heartbeat."""
+        owner, expiry = self._owners.get(chat_id, (None, 0.))
+        if expiry > time.monotonic():
+            return owner
+
+        owner = await self._redis.get(f"{_OWNER_PREFIX}:{chat_id}")  # type: ignore[union-attr]
+        self._owners[chat_id] = (owner, time.monotonic() + self._heartbeat_interval)
+        # forget the expired lookups, so that the cache does not grow with the chats
+        if len(self._owners) > 2 * len(self._local_connections) + 1024:
+            now = time.monotonic()
+            self._owners = {k: v for k, v in self._owners.items() if v[1] > now}
+        return owner
+
+    async def flush(self, chat_id: str | None = None):
+        """Publish the buffered messages of *chat_id* (or of every chat) right away."""
+        chat_ids = [chat_id] if chat_id is not None else list(self._buffers.keys())
+        for cid in chat_ids:
+            if (buffer := self._buffers.get(cid)) is not None:
+                await self._flush(cid, buffer, buffer.take())
 
     async def broadcast(self, message: dict):
         """Broadcast *message* to every connected WebSocket across all replicas."""
-        await self._redis.publish(_BROADCAST_CHANNEL, json.dumps(message))  # type: ignore[union-attr]
+        await self._redis.publish(  # type: ignore[union-attr]
+            _BROADCAST_CHANNEL, json.dumps({"chat_id": None, "message": message})
+        )
 
     # ── Introspection ──────────────────────────────────────────────────────────
 
@@ -171,27 +436,41 @@ class WebSocketManager:
 
     async def close_connections(self):
         """Close all local WebSocket connections and stop the pub/sub listener."""
-        # Stop the background subscriber first
-        if self._subscriber_task:
-            self._subscriber_task.cancel()
+        # Publish the pending streamed messages, while Redis is still there
+        try:
+            await self.flush()
+        except Exception as e:
+            log.warning(f"Could not flush the pending WebSocket messages: {e}")
+
+        # Stop the background subscriber and heartbeat first
+        for task in (self._subscriber_task, self._heartbeat_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._subscriber_task = None
+        self._heartbeat_task = None
+
+        # Release the ownership of the local connections, and close them
+        if self._redis and self._local_connections:
             try:
-                await self._subscriber_task
-            except asyncio.CancelledError:
-                pass
-            self._subscriber_task = None
+                await self._release(list(self._local_connections.keys()))
+            except Exception as e:
+                log.warning(f"Could not release the WebSocket connections: {e}")
 
-        # Close every local WebSocket
         for ws in list(self._local_connections.values()):
             try:
                 await ws.close()
             except Exception:
                 pass
         self._local_connections.clear()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
 
         # Tear down pub/sub and Redis client
         if self._pubsub:
             try:
-                await self._pubsub.punsubscribe()
                 await self._pubsub.unsubscribe()
                 await self._pubsub.aclose()
             except Exception:
@@ -207,7 +486,8 @@ class WebSocketManager:
 
     async def close_connection(self, chat_id: str):
         """Close the WebSocket connection for *chat_id* and unregister it."""
-        ws = self._local_connections.pop(chat_id, None)
+        ws = self._local_connections.get(chat_id)
+        self.remove_connection(chat_id)
         if ws:
             try:
                 await ws.close()
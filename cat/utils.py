@@ -165,6 +165,11 @@ def get_file_manager_root_storage_path() -> str:
     return os.path.join(get_data_path(), "storage")
 
 
+def get_vector_database_root_storage_path() -> str:
+    """Allows exposing the local vector database path."""
+    return os.path.join(get_data_path(), "vector_db")
+
+
 def explicit_error_message(e) -> str:
     # add more explicit info on "RateLimitError" by OpenAI, 'cause people can't get it
     error_description = str(e)